@@ -46,6 +46,13 @@ def create_app(config_object='config.Config'):
     app = Flask(__name__, instance_relative_config=True)
     print("--- INFO [app/__init__.py]: App Flask creada.")
 
+    # JSON sobre orjson con la misma salida que el proveedor de Flask (utils/json_utils.py)
+    from .utils.json_utils import ORJSONProvider, ORJSON_DISPONIBLE
+    if ORJSON_DISPONIBLE:
+        app.json = ORJSONProvider(app)
+    else:
+        print("WARN: [app/__init__.py] 'orjson' no está instalado. Se usa el JSON estándar de Flask.")
+
     # --- CONFIGURACIÓN DE CORS ---
     # Orígenes permitidos (tu frontend).
     # Asegúrate que la URL de Netlify sea exacta.
@@ -87,6 +94,22 @@ def create_app(config_object='config.Config'):
         }
         
         app.config['SECRET_KEY'] = os.environ.get('FLASK_SECRET_KEY', 'dev-secret-key-change-in-prod')
+
+        # Auditoría: cola en memoria + hilo que inserta de a lotes (utils/auditoria_utils.py)
+        app.config['AUDITORIA_ASINCRONICA'] = os.environ.get('AUDITORIA_ASINCRONICA', '1') == '1'
+        app.config['AUDITORIA_LOTE'] = int(os.environ.get('AUDITORIA_LOTE', '200'))
+        app.config['AUDITORIA_COLA_MAX'] = int(os.environ.get('AUDITORIA_COLA_MAX', '10000'))
+
+        # Caché compartida entre workers (Redis) con invalidación por tags (utils/cache_utils.py).
+        # Sin REDIS_URL queda SimpleCache en memoria del proceso.
+        redis_url = os.environ.get('REDIS_URL')
+        if redis_url:
+            app.config['CACHE_TYPE'] = 'RedisCache'
+            app.config['CACHE_REDIS_URL'] = redis_url
+            app.config['CACHE_KEY_PREFIX'] = os.environ.get('CACHE_KEY_PREFIX', 'quimex:')
+        else:
+            app.config['CACHE_TYPE'] = 'SimpleCache'
+        app.config['CACHE_DEFAULT_TIMEOUT'] = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', '21600'))
         
         log_uri = database_uri.replace(f":{DB_PASSWORD}@", ":***@") if DB_PASSWORD else database_uri
         print(f"--- INFO [app/__init__.py]: Configurando DB URI: {log_uri}")
@@ -99,7 +122,7 @@ def create_app(config_object='config.Config'):
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
-    cache.init_app(app)
+    cache.init_app(app, config={k: v for k, v in app.config.items() if k.startswith('CACHE_')})
     print("--- INFO [app/__init__.py]: Extensiones (SQLAlchemy, Migrate, LoginManager, Cache) inicializadas.")
 
     # --- Registrar Filtros Jinja2 ---
@@ -153,6 +176,7 @@ def create_app(config_object='config.Config'):
         from .blueprints.categorias import categorias_bp
         from .blueprints.categoria_productos import categoria_productos_bp
         from .blueprints.finanzas import finanzas_bp
+        from .blueprints.sync import sync_bp
 
         
         app.register_blueprint(auth_bp)
@@ -172,6 +196,7 @@ def create_app(config_object='config.Config'):
         app.register_blueprint(categorias_bp)
         app.register_blueprint(categoria_productos_bp)
         app.register_blueprint(finanzas_bp)
+        app.register_blueprint(sync_bp)
 
         print("--- INFO [app/__init__.py]: Todos los blueprints registrados.")
 
@@ -3,6 +3,7 @@
 
 from flask import Blueprint, request, jsonify
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from decimal import Decimal
 import traceback
 
@@ -11,6 +12,9 @@ from .. import db
 from ..models import CategoriaProducto, Producto
 from ..utils.decorators import token_required, roles_required
 from ..utils.permissions import ROLES
+from ..utils.indice_nombres_utils import IndiceNombres
+from ..utils.cache_utils import invalidar_tags, TAG_PRODUCTOS
+from ..utils.sincronizacion_utils import registrar_cambios, ENTIDAD_PRODUCTOS
 
 # --- Blueprint ---
 categoria_productos_bp = Blueprint('categoria_productos', __name__, url_prefix='/api/categoria_productos')
@@ -329,6 +333,8 @@ def asignar_categoria_por_nombres(current_user):
         reglas = data['reglas']
         resultados = []
         total_productos_actualizados = 0
+        # Índice de nombres de productos (una consulta) en lugar de un ILIKE por nombre
+        indice_productos = IndiceNombres.desde_columnas(Producto.id, Producto.nombre)
         
         for i, regla in enumerate(reglas):
             try:
@@ -361,31 +367,42 @@ def asignar_categoria_por_nombres(current_user):
                 
                 productos_encontrados = []
                 productos_no_encontrados = []
+                productos_ambiguos = {}
+                sugerencias = {}
                 productos_actualizados = 0
                 
+                coincidencias = []
                 for nombre_producto in nombres_productos:
                     if coincidencia_parcial:
-                        # Buscar productos que contengan el nombre (case insensitive)
-                        productos = Producto.query.filter(
-                            Producto.nombre.ilike(f'%{nombre_producto}%')
-                        ).all()
+                        # Productos cuyo nombre contiene el texto (sin distinguir mayúsculas ni tildes)
+                        ids = indice_productos.contienen(nombre_producto)
                     else:
-                        # Buscar producto con nombre exacto (case insensitive)
-                        productos = Producto.query.filter(
-                            Producto.nombre.ilike(nombre_producto)
-                        ).all()
-                    
-                    if productos:
-                        for producto in productos:
-                            productos_encontrados.append({
-                                'id': producto.id,
-                                'nombre': producto.nombre,
-                                'categoria_anterior': producto.categoria.nombre if producto.categoria else None
-                            })
-                            producto.categoria_id = categoria_id
-                            productos_actualizados += 1
+                        # Producto con nombre exacto (sin distinguir mayúsculas ni tildes)
+                        ids = indice_productos.exactos(nombre_producto)
+                        if len(ids) > 1:
+                            # Varios productos con el mismo nombre: no se asigna ninguno
+                            productos_ambiguos[nombre_producto] = [indice_productos.nombres[pid] for pid in ids]
+                            continue
+                    if ids:
+                        coincidencias.append(ids)
                     else:
                         productos_no_encontrados.append(nombre_producto)
+                        sugerencias[nombre_producto] = indice_productos.sugerencias(nombre_producto)
+                
+                ids_regla = {pid for ids in coincidencias for pid in ids}
+                productos_por_id = {
+                    p.id: p for p in Producto.query.options(joinedload(Producto.categoria)).filter(Producto.id.in_(ids_regla))
+                } if ids_regla else {}
+                for ids in coincidencias:
+                    for pid in ids:
+                        producto = productos_por_id[pid]
+                        productos_encontrados.append({
+                            'id': producto.id,
+                            'nombre': producto.nombre,
+                            'categoria_anterior': producto.categoria.nombre if producto.categoria else None
+                        })
+                        producto.categoria_id = categoria_id
+                        productos_actualizados += 1
                 
                 total_productos_actualizados += productos_actualizados
                 
@@ -396,6 +413,8 @@ def asignar_categoria_por_nombres(current_user):
                     'productos_actualizados': productos_actualizados,
                     'productos_encontrados': productos_encontrados,
                     'productos_no_encontrados': productos_no_encontrados,
+                    'productos_ambiguos': productos_ambiguos,
+                    'sugerencias': sugerencias,
                     'coincidencia_parcial': coincidencia_parcial
                 })
                 
@@ -439,26 +458,47 @@ def upload_clasificacion_csv(current_user):
         total_actualizados = 0
         productos_no_encontrados = []
         categorias_no_encontradas = []
+        # Índices de nombres (una consulta cada uno) en lugar de un ILIKE por fila
+        indice_productos = IndiceNombres.desde_columnas(Producto.id, Producto.nombre)
+        indice_categorias = IndiceNombres.desde_columnas(CategoriaProducto.id, CategoriaProducto.nombre)
+        categoria_por_producto = {}
         for fila in lector:
             nombre = fila.get('Nombre', '').strip()
             categoria_nombre = fila.get('Categoria', '').strip()
             if not nombre or not categoria_nombre:
                 continue
-            categoria = CategoriaProducto.query.filter(CategoriaProducto.nombre.ilike(categoria_nombre)).first()
-            if not categoria:
+            categoria_ids = indice_categorias.exactos(categoria_nombre)
+            if len(categoria_ids) > 1:
+                resultados.append({'nombre': nombre, 'error': f'Categoría "{categoria_nombre}" ambigua',
+                                   'coincidencias': [indice_categorias.nombres[c] for c in categoria_ids]})
+                continue
+            if not categoria_ids:
                 categorias_no_encontradas.append(categoria_nombre)
                 resultados.append({'nombre': nombre, 'error': f'Categoría "{categoria_nombre}" no encontrada'})
                 continue
-            productos = Producto.query.filter(Producto.nombre.ilike(f'%{nombre}%')).all()
-            if not productos:
+            categoria_id = categoria_ids[0]
+            producto_ids = indice_productos.contienen(nombre)
+            if not producto_ids:
                 productos_no_encontrados.append(nombre)
-                resultados.append({'nombre': nombre, 'error': 'Producto no encontrado'})
+                resultados.append({'nombre': nombre, 'error': 'Producto no encontrado',
+                                   'sugerencias': indice_productos.sugerencias(nombre)})
                 continue
-            for producto in productos:
-                producto.categoria_id = categoria.id
+            for producto_id in producto_ids:
+                categoria_por_producto[producto_id] = categoria_id
                 total_actualizados += 1
-                resultados.append({'id': producto.id, 'nombre': producto.nombre, 'categoria_id': categoria.id, 'categoria_nombre': categoria.nombre})
+                resultados.append({'id': producto_id, 'nombre': indice_productos.nombres[producto_id], 'categoria_id': categoria_id,
+                                   'categoria_nombre': indice_categorias.nombres[categoria_id]})
+        # Un UPDATE por categoría (si un producto aparece en varias filas gana la última)
+        productos_por_categoria = {}
+        for producto_id, categoria_id in categoria_por_producto.items():
+            productos_por_categoria.setdefault(categoria_id, []).append(producto_id)
+        for categoria_id, producto_ids in productos_por_categoria.items():
+            Producto.query.filter(Producto.id.in_(producto_ids)).update(
+                {Producto.categoria_id: categoria_id}, synchronize_session=False
+            )
+        registrar_cambios(ENTIDAD_PRODUCTOS, categoria_por_producto)
         db.session.commit()
+        invalidar_tags(TAG_PRODUCTOS)
         return jsonify({
             'mensaje': f'Clasificación completada. {total_actualizados} productos actualizados.',
             'resultados': resultados,
@@ -11,12 +11,15 @@ from .. import db
 from ..models import CategoriaProducto, Producto
 from ..utils.decorators import token_required, roles_required
 from ..utils.permissions import ROLES
+from ..utils.cache_utils import cache_con_tags, etag_por_tags, TAG_CATEGORIAS
 
 # --- Blueprint ---
 categorias_bp = Blueprint('categorias', __name__, url_prefix='/api/categorias')
 
 @categorias_bp.route('/', methods=['GET'])
 @token_required
+@etag_por_tags(TAG_CATEGORIAS)
+@cache_con_tags(TAG_CATEGORIAS, query_string=True)
 def listar_categorias(current_user):
     """
     Lista todas las categorías de productos.
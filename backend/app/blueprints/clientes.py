@@ -4,10 +4,13 @@ from ..utils.permissions import ROLES
 # blueprints/clientes.py
 
 from flask import Blueprint, request, jsonify
-from app import cache
 from datetime import datetime, timezone # Asegúrate de importar datetime y timezone si no lo haces globalmente
 from .. import db # Ajusta esta importación según la estructura de tu proyecto (donde inicializas db)
 from ..models import Cliente, PrecioEspecialCliente
+from ..utils.telefono_utils import telefono_nacional, invertir_telefono
+from ..utils.busqueda_clientes_utils import aplicar_busqueda_clientes
+from ..utils.cache_utils import cache_con_tags, TAG_CLIENTES
+from ..utils.serializadores_utils import Proyeccion, a_iso
 from sqlalchemy.orm import joinedload
 import pandas as pd
 import io
@@ -16,6 +19,9 @@ from sqlalchemy import or_
 
 clientes_bp = Blueprint('clientes', __name__, url_prefix='/api/clientes')
 
+# Candidatos devueltos cuando un teléfono coincide con varios clientes
+CANDIDATOS_POR_TELEFONO = 10
+
 # --- Helper Function ---
 def cliente_a_diccionario(cliente):
     """Convierte un objeto Cliente de SQLAlchemy a un diccionario serializable."""
@@ -42,6 +48,26 @@ def cliente_a_diccionario(cliente):
         # Se podría crear otro endpoint para obtener las ventas de un cliente.
     }
 
+
+# Misma salida que cliente_a_diccionario leyendo solo columnas (listados)
+PROYECCION_CLIENTE = Proyeccion(
+    ('id', Cliente.id),
+    ('nombre_razon_social', Cliente.nombre_razon_social),
+    ('cuit', Cliente.cuit),
+    ('direccion', Cliente.direccion),
+    ('localidad', Cliente.localidad),
+    ('provincia', Cliente.provincia),
+    ('codigo_postal', Cliente.codigo_postal),
+    ('telefono', Cliente.telefono),
+    ('email', Cliente.email),
+    ('contacto_principal', Cliente.contacto_principal),
+    ('condicion_iva', Cliente.condicion_iva),
+    ('lista_precio_asignada', Cliente.lista_precio_asignada),
+    ('observaciones', Cliente.observaciones),
+    ('fecha_alta', Cliente.fecha_alta, a_iso),
+    ('activo', Cliente.activo),
+)
+
 # --- Rutas CRUD ---
 
 # CREATE - Crear un nuevo cliente
@@ -90,7 +116,8 @@ def crear_cliente(current_user):
 @clientes_bp.route('/obtener_todos', methods=['GET'])
 # Hacer que la caché respete los parámetros de consulta (page, per_page, search_term)
 # para evitar devolver siempre la misma página cuando cambian los parámetros.
-@cache.cached(timeout=180, query_string=True)
+# Se invalida con cada commit que toca clientes (tag 'clientes').
+@cache_con_tags(TAG_CLIENTES, query_string=True)
 def obtener_clientes():
     """
     [ACTUALIZADO] Obtiene una lista de clientes con filtros, paginación y BÚSQUEDA.
@@ -106,28 +133,17 @@ def obtener_clientes():
         except Exception:
             pass
         
-        # Por defecto, solo muestra activos
-        query = Cliente.query.filter_by(activo=True)
+        # Por defecto, solo muestra activos (solo las columnas que se serializan)
+        query = PROYECCION_CLIENTE.consulta().filter(Cliente.activo == True)
 
-        # Filtro de búsqueda por search_term
-        if search_term:
-            like_term = f"%{search_term}%"
-            query = query.filter(
-                Cliente.nombre_razon_social.ilike(like_term) |
-                Cliente.localidad.ilike(like_term) |
-                Cliente.email.ilike(like_term) |
-                Cliente.cuit.ilike(like_term) |
-                Cliente.contacto_principal.ilike(like_term)
-            )
-
-        query = query.order_by(Cliente.nombre_razon_social)
+        # Filtro de búsqueda por search_term: FULLTEXT por relevancia si existe el índice; si no, ILIKE
+        query = aplicar_busqueda_clientes(query, search_term)
         paginated_clientes = query.paginate(page=page, per_page=per_page, error_out=False)
         try:
             print(f"[obtener_clientes] paginated -> page={paginated_clientes.page}, total={paginated_clientes.total}")
         except Exception:
             pass
-        clientes_db = paginated_clientes.items
-        clientes_list = [cliente_a_diccionario(c) for c in clientes_db]
+        clientes_list = PROYECCION_CLIENTE.lista(paginated_clientes.items)
 
         return jsonify({
             "clientes": clientes_list,
@@ -179,7 +195,7 @@ def actualizar_cliente(current_user, cliente_id):
         # Actualizar campos proporcionados en data
         for key, value in data.items():
             # Evitar actualizar campos protegidos como id o fecha_alta directamente
-            if hasattr(cliente, key) and key not in ['id', 'fecha_alta']:
+            if hasattr(cliente, key) and key not in ['id', 'fecha_alta', 'telefono_normalizado', 'telefono_normalizado_inv']:
                 setattr(cliente, key, value)
 
         db.session.commit()
@@ -331,16 +347,8 @@ def buscar_todos_clientes():
     try:
         search_term = request.args.get('search_term', default=None, type=str)
         query = Cliente.query.filter_by(activo=True)
-        if search_term:
-            like_term = f"%{search_term}%"
-            query = query.filter(
-                Cliente.nombre_razon_social.ilike(like_term) |
-                Cliente.localidad.ilike(like_term) |
-                Cliente.email.ilike(like_term) |
-                Cliente.cuit.ilike(like_term) |
-                Cliente.contacto_principal.ilike(like_term)
-            )
-        query = query.order_by(Cliente.nombre_razon_social)
+        # FULLTEXT por relevancia si existe el índice; si no, ILIKE sobre las cinco columnas
+        query = aplicar_busqueda_clientes(query, search_term)
         clientes_db = query.all()
         clientes_list = [cliente_a_diccionario(c) for c in clientes_db]
         return jsonify({"clientes": clientes_list, "total": len(clientes_list)}), 200
@@ -367,17 +375,8 @@ def obtener_clientes_con_precios():
         all_flag = request.args.get('all', default='false', type=str).lower() == 'true'
 
         query = Cliente.query.filter_by(activo=True)
-        if search_term:
-            like_term = f"%{search_term}%"
-            query = query.filter(
-                Cliente.nombre_razon_social.ilike(like_term) |
-                Cliente.localidad.ilike(like_term) |
-                Cliente.email.ilike(like_term) |
-                Cliente.cuit.ilike(like_term) |
-                Cliente.contacto_principal.ilike(like_term)
-            )
-
-        query = query.order_by(Cliente.nombre_razon_social)
+        # FULLTEXT por relevancia si existe el índice; si no, ILIKE sobre las cinco columnas
+        query = aplicar_busqueda_clientes(query, search_term)
 
         if all_flag:
             clientes_db = query.all()
@@ -434,11 +433,17 @@ def obtener_clientes_con_precios():
 @clientes_bp.route('/obtener_por_telefono', methods=['GET'])
 def obtener_cliente_por_telefono():
     """
-    Devuelve el primer cliente activo que coincide por teléfono (búsqueda flexible).
+    Devuelve el cliente activo con ese teléfono.
+    Compara el número nacional (solo dígitos, sin 54/9/0/15) contra la columna
+    indexada 'telefono_normalizado'; si no hay coincidencia exacta, busca los
+    teléfonos cargados que terminan en ese número (como la búsqueda por texto de
+    antes, vía 'telefono_normalizado_inv'). Nunca elige entre varios: el alta
+    rápida de puerta usa este endpoint para decidir si el cliente ya existe.
     Parámetros:
       - telefono (query string): número de teléfono a buscar.
     Respuestas:
-      - 200 con { cliente: {...} } si se encuentra al menos uno
+      - 200 con { cliente: {...} } si hay un único cliente
+      - 409 con { candidatos: [...] } si coincide con más de uno
       - 404 si no hay coincidencias
       - 400 si falta el parámetro
     """
@@ -448,21 +453,30 @@ def obtener_cliente_por_telefono():
 
     telefono = telefono.strip()
     try:
-        cliente = (
-            db.session.query(Cliente)
-            .filter(Cliente.activo == True)
-            .filter(Cliente.telefono.ilike(f"%{telefono}%"))
-            .order_by(Cliente.id.asc())
-            .first()
-        )
-        if not cliente:
+        activos = db.session.query(Cliente).filter(Cliente.activo == True).order_by(Cliente.id.asc())
+        nacional = telefono_nacional(telefono)
+        if nacional:
+            candidatos = activos.filter(Cliente.telefono_normalizado == nacional) \
+                .limit(CANDIDATOS_POR_TELEFONO + 1).all()
+            if not candidatos:
+                candidatos = activos.filter(
+                    Cliente.telefono_normalizado_inv.like(f"{invertir_telefono(nacional)}%")
+                ).limit(CANDIDATOS_POR_TELEFONO + 1).all()
+        else:
+            # Sin dígitos en la búsqueda: mantener el comportamiento por texto
+            candidatos = activos.filter(Cliente.telefono.ilike(f"%{telefono}%")) \
+                .limit(CANDIDATOS_POR_TELEFONO + 1).all()
+        if not candidatos:
             return jsonify({"error": "Cliente no encontrado"}), 404
+        if len(candidatos) > 1:
+            return jsonify({
+                "error": "El teléfono coincide con más de un cliente",
+                "candidatos": [cliente_a_diccionario(c) for c in candidatos[:CANDIDATOS_POR_TELEFONO]]
+            }), 409
 
         return jsonify({
-            "cliente": cliente_a_diccionario(cliente)
+            "cliente": cliente_a_diccionario(candidatos[0])
         }), 200
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": "Error interno del servidor"}), 500
-    
-    
\ No newline at end of file
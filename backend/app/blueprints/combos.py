@@ -6,6 +6,7 @@ from ..models import db, Combo, ComboComponente, Producto, Receta, TipoCambio
 from ..calculator.core import obtener_coeficiente_por_rango
 from sqlalchemy.exc import IntegrityError
 import traceback
+from ..utils.cache_utils import cache_con_tags, etag_por_tags, TAG_COMBOS, TAG_PRODUCTOS, TAG_TIPOS_CAMBIO
 
 combos_bp = Blueprint('combos_bp', __name__, url_prefix='/api/combos')
 
@@ -257,6 +258,9 @@ def obtener_precios_ars_combo(combo_id):
 
 # GET /api/v1/combos (sin cambios mayores, pero ahora to_dict puede recibir info_calculada)
 @combos_bp.route('/obtener-todos', methods=['GET'])
+# El precio calculado de cada combo depende de costos de productos y del TC
+@etag_por_tags(TAG_COMBOS, TAG_PRODUCTOS, TAG_TIPOS_CAMBIO)
+@cache_con_tags(TAG_COMBOS, TAG_PRODUCTOS, TAG_TIPOS_CAMBIO, query_string=True)
 def obtener_combos():
     incluir_componentes = request.args.get('incluir_componentes', 'false').lower() == 'true'
     incluir_info_usd = request.args.get('incluir_info_usd', 'false').lower() == 'true'
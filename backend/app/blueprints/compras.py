@@ -3,18 +3,19 @@
 from flask import Blueprint, request, jsonify
 from .. import db # Importar db desde app/__init__.py
 # Importar TODOS los modelos necesarios desde app/models.py
-from ..models import OrdenCompra, DetalleOrdenCompra, Producto, Proveedor, TipoCambio, AuditLog, MovimientoProveedor
+from ..models import OrdenCompra, DetalleOrdenCompra, Producto, Proveedor, TipoCambio, MovimientoProveedor
 # Importar funciones de cálculo si son necesarias (aunque actualizar costo se llama via endpoint)
 # from .productos import actualizar_costo_desde_compra # Podría llamarse directo si se refactoriza
 from decimal import Decimal, InvalidOperation, DivisionByZero
 import logging
 from ..utils.decorators import token_required, roles_required
 from ..utils.permissions import ROLES
+from ..utils.impuestos_utils import tasa_iibb as _parse_iibb_rate, tasa_porcentaje as _parse_percentage_rate
+from ..utils.auditoria_utils import registrar_auditoria
 import datetime
 import uuid # Sigue siendo útil si usas UUIDs para IDs de OrdenCompra
 import traceback
 import requests # Necesario para llamar al endpoint de actualizar costo
-import json
 
 #hola
 
@@ -96,43 +97,17 @@ def _obtener_tc_compras_actual():
     return None
 
 
-def _extract_tc_snapshot_from_text(texto):
-    """Intenta extraer tc_usado desde el marcador __TC_SNAPSHOT__: JSON."""
-    raw = str(texto or '')
-    marker = '__TC_SNAPSHOT__:'
-    if marker not in raw:
-        return None
-    for part in raw.split('\n'):
-        if part.startswith(marker):
-            try:
-                payload = json.loads(part[len(marker):].strip())
-                tc_val = payload.get('tc_usado')
-                if tc_val is None:
-                    return None
-                tc_dec = Decimal(str(tc_val))
-                return tc_dec if tc_dec > 0 else None
-            except Exception:
-                return None
-    return None
-
-
 def _obtener_tc_para_orden(orden_db):
-    """Devuelve el TC de la orden priorizando campo tipado y luego snapshot."""
-    try:
-        tc_columna = getattr(orden_db, 'tc_transaccion', None)
-        if tc_columna is not None:
-            tc_dec = Decimal(str(tc_columna))
-            if tc_dec > 0:
-                return tc_dec
-    except Exception:
-        pass
-
-    tc_obs = _extract_tc_snapshot_from_text(getattr(orden_db, 'observaciones_solicitud', None))
-    if tc_obs is not None:
-        return tc_obs
-    tc_notas = _extract_tc_snapshot_from_text(getattr(orden_db, 'notas_recepcion', None))
-    if tc_notas is not None:
-        return tc_notas
+    """Devuelve el TC de la orden priorizando tc_transaccion y luego tc_snapshot."""
+    for campo in ('tc_transaccion', 'tc_snapshot'):
+        try:
+            valor = getattr(orden_db, campo, None)
+            if valor is not None:
+                tc_dec = Decimal(str(valor))
+                if tc_dec > 0:
+                    return tc_dec
+        except Exception:
+            pass
     return None
 
 
@@ -187,70 +162,6 @@ def _resolver_tc_transaccion(data, ajuste_tc_flag, actual_tc=None):
     )
 
 
-def _upsert_tc_snapshot_text(texto_base, tc_snapshot):
-    """Inserta o reemplaza el marcador __TC_SNAPSHOT__ en un texto libre."""
-    marker = '__TC_SNAPSHOT__:'
-    snap = {
-        'tc_usado': float(tc_snapshot) if tc_snapshot is not None else None,
-        'fecha_snapshot': datetime.datetime.utcnow().isoformat()
-    }
-    new_line = marker + json.dumps(snap, ensure_ascii=False)
-
-    raw = str(texto_base or '')
-    lines = [line for line in raw.split('\n') if line]
-    out = []
-    replaced = False
-    for line in lines:
-        if line.startswith(marker):
-            if not replaced:
-                out.append(new_line)
-                replaced = True
-            continue
-        out.append(line)
-
-    if not replaced:
-        out.append(new_line)
-
-    return '\n'.join(out)
-
-
-def _parse_iibb_rate(iibb_value):
-    """Parsea el campo `iibb` que puede ser '3%', '0.03', '3' y devuelve la fracción (ej 0.03).
-    Si no puede parsear devuelve Decimal('0').
-    """
-    try:
-        if iibb_value is None:
-            return Decimal('0')
-        if isinstance(iibb_value, (int, float, Decimal)):
-            v = Decimal(str(iibb_value))
-            # si <=1 asumimos fracción, si >1 asumimos porcentaje
-            return (v if v <= 1 else (v / Decimal('100')))
-        s = str(iibb_value).strip()
-        if s.endswith('%'):
-            s = s[:-1].strip()
-            return (Decimal(s) / Decimal('100'))
-        # si tiene coma o punto
-        v = Decimal(s)
-        return (v if v <= 1 else (v / Decimal('100')))
-    except Exception:
-        return Decimal('0')
-
-
-def _parse_percentage_rate(value):
-    """Normaliza un valor porcentual como fracción decimal (ej. 21 -> 0.21)."""
-    try:
-        if value is None:
-            return Decimal('0')
-        raw = str(value).strip()
-        if not raw:
-            return Decimal('0')
-        normalized = raw.replace(',', '.')
-        parsed = Decimal(normalized)
-        return parsed if parsed <= 1 else (parsed / Decimal('100'))
-    except Exception:
-        return Decimal('0')
-
-
 def _descripcion_pago_orden(orden_id, contexto, forma_pago=None, referencia=None):
     partes = [f"OC {orden_id} - {contexto}"]
     if forma_pago:
@@ -316,12 +227,10 @@ def _importe_solicitado_con_impuestos(orden_db):
     if base <= Decimal('0'):
         return Decimal('0.00')
 
-    iva_raw = getattr(orden_db, 'iva', None)
-    iibb_raw = getattr(orden_db, 'iibb', None)
-
-    # Aplicar impuestos solo cuando el campo está habilitado/cargado en la orden.
-    iva_rate = _parse_percentage_rate(iva_raw) if str(iva_raw or '').strip() != '' else Decimal('0')
-    iibb_rate = _parse_iibb_rate(iibb_raw) if str(iibb_raw or '').strip() != '' else Decimal('0')
+    # Aplicar impuestos solo cuando el campo está habilitado/cargado en la orden
+    # (iva_tasa / iibb_tasa quedan en None si no se cargaron).
+    iva_rate = Decimal(str(getattr(orden_db, 'iva_tasa', None) or 0))
+    iibb_rate = Decimal(str(getattr(orden_db, 'iibb_tasa', None) or 0))
 
     iva_amt = (base * iva_rate).quantize(Decimal('0.01')) if iva_rate > 0 else Decimal('0.00')
     iibb_amt = (base * iibb_rate).quantize(Decimal('0.01')) if iibb_rate > 0 else Decimal('0.00')
@@ -360,7 +269,7 @@ def _importe_objetivo_pago(orden_db):
     return _importe_recepcionado_estimado(orden_db)
 
 
-def _actualizar_movimiento_deuda(orden_db, usuario_actualiza=None, descripcion=None):
+def _actualizar_movimiento_deuda(orden_db, usuario_actualiza=None, descripcion=None, debitos_por_orden=None):
     """Saldo proveedor en moneda de la orden: total objetivo OC menos abonado.
 
     Usa `_importe_objetivo_pago` (cabecera / solicitado / impuestos), no solo lo ya
@@ -368,6 +277,9 @@ def _actualizar_movimiento_deuda(orden_db, usuario_actualiza=None, descripcion=N
     tipo de cambio al actualizar DolarCompras (misma regla que migración 20260326).
 
     En `SOLICITADO` sin líneas recepcionadas aún no hay deuda contable por recepción.
+
+    `debitos_por_orden` ({orden_id: DEBITO}) evita la consulta por orden cuando se
+    recalculan muchas OCs por lote.
     """
     estado = _normalizar_estado_texto(getattr(orden_db, 'estado', None))
     recepcionado = _importe_recepcionado_estimado(orden_db)
@@ -377,10 +289,13 @@ def _actualizar_movimiento_deuda(orden_db, usuario_actualiza=None, descripcion=N
         base_deuda = _importe_objetivo_pago(orden_db)
     restante = base_deuda - (orden_db.importe_abonado or Decimal('0'))
     restante = restante if restante > Decimal('0') else Decimal('0')
-    debito = db.session.query(MovimientoProveedor).filter(
-        MovimientoProveedor.orden_id == orden_db.id,
-        MovimientoProveedor.tipo == 'DEBITO'
-    ).first()
+    if debitos_por_orden is not None:
+        debito = debitos_por_orden.get(orden_db.id)
+    else:
+        debito = db.session.query(MovimientoProveedor).filter(
+            MovimientoProveedor.orden_id == orden_db.id,
+            MovimientoProveedor.tipo == 'DEBITO'
+        ).first()
     descripcion_final = descripcion or f"OC {orden_db.id} - Deuda por total OC recalculada"
     monto_debito = _convert_to_ars(
         restante,
@@ -442,38 +357,19 @@ def _recalcular_importe_y_actualizar_deuda(orden_db, usuario_actualiza=None, iva
         # Base debe calcularse a partir de las líneas (sin impuestos) si están disponibles
         try:
             items = getattr(orden_db, 'items', None)
-            marker_key = '__BASE_SIN_IMPUESTOS__:'
-            obs = orden_db.observaciones_solicitud or ''
-            
-            # Calcular base desde líneas
+            base_guardada = getattr(orden_db, 'importe_base_sin_impuestos', None)
             if items and len(items) > 0:
                 base = sum([item.importe_linea_estimado or Decimal('0') for item in items])
-                # Persistir marcador de base para evitar recalculos errados
-                marker = marker_key + str(base)
-                if marker_key in obs:
-                    # Reemplazar marcador existente
-                    parts = [p for p in obs.split('\n') if not p.startswith(marker_key)]
-                    parts.append(marker)
-                    orden_db.observaciones_solicitud = '\n'.join([p for p in parts if p])
-                else:
-                    orden_db.observaciones_solicitud = (obs + ('\n' if obs else '') + marker)
+                # Persistir la base para evitar recalculos errados en OCs sin líneas
+                orden_db.importe_base_sin_impuestos = base
+            elif base_guardada is not None:
+                base = base_guardada
             else:
-                # Sin items línea: intentar leer base almacenada
-                base = None
-                if obs and marker_key in obs:
-                    try:
-                        for part in obs.split('\n'):
-                            if part.startswith(marker_key):
-                                base = Decimal(part.replace(marker_key, '').strip())
-                                break
-                    except Exception:
-                        base = None
-                # Si no hay marcador, usar el importe total actual como base
-                if base is None:
-                    base = orden_db.importe_total_estimado or Decimal('0')
+                # Sin base guardada, usar el importe total actual como base
+                base = orden_db.importe_total_estimado or Decimal('0')
         except Exception:
             base = orden_db.importe_total_estimado or Decimal('0')
-        
+
         # Calcular impuestos
         iva_amt = Decimal('0')
         if iva_flag is not None:
@@ -548,6 +444,20 @@ FORMAS_PAGO = ["Cheque", "Efectivo", "Transferencia", "Cuenta Corriente"]
 # (Adaptada para usar objetos SQLAlchemy y campos del modelo)
 # app/blueprints/compras.py
 
+def opciones_carga_orden():
+    """Loader options con todo lo que lee `formatear_orden_por_rol`.
+
+    Proveedor y aprobador van por JOIN en la misma consulta de la página; items y
+    sus productos por selectin (una consulta cada uno, sin importar el tamaño de la
+    página). Los roles comparten campos, así que comparten el perfil de carga.
+    """
+    return (
+        db.joinedload(OrdenCompra.proveedor),
+        db.joinedload(OrdenCompra.aprobador),
+        db.selectinload(OrdenCompra.items).selectinload(DetalleOrdenCompra.producto),
+    )
+
+
 def formatear_orden_por_rol(orden_db, rol="almacen", incluir_pagos=False):
     """Filtra campos sensibles según el rol desde el objeto DB.
     
@@ -556,6 +466,7 @@ def formatear_orden_por_rol(orden_db, rol="almacen", incluir_pagos=False):
     - ajuste_tc=False o moneda='ARS': Orden en pesos
     """
     if not orden_db: return None
+    # Para listados, cargar las órdenes con `opciones_carga_orden()` (evita N+1).
 
     # Inferir moneda: True -> USD, False -> ARS
     moneda = 'USD' if orden_db.ajuste_tc else 'ARS'
@@ -592,19 +503,9 @@ def formatear_orden_por_rol(orden_db, rol="almacen", incluir_pagos=False):
         "estado_recepcion": orden_db.estado_recepcion,
         "notas_recepcion": orden_db.notas_recepcion,
         "tc_snapshot": float(tc_snapshot) if tc_snapshot is not None else None,
-        "fecha_entrega_tentativa": None,  # Inicializar para extraer de observaciones
+        "fecha_entrega_tentativa": orden_db.fecha_entrega_tentativa.isoformat() if orden_db.fecha_entrega_tentativa else None,
     }
 
-    # Extraer fecha tentativa desde observaciones
-    try:
-        obs = orden_db.observaciones_solicitud or ''
-        marker_key = '__FECHA_ENTREGA_TENTATIVA__:'
-        if marker_key in obs:
-            part = obs.split(marker_key, 1)[1].strip().splitlines()[0].strip()
-            orden_dict['fecha_entrega_tentativa'] = part
-    except Exception:
-        pass
-
     # Procesar items
     items_list = []
     cantidad_total_solicitada = Decimal('0')
@@ -748,10 +649,10 @@ def crear_orden_compra(current_user):
         # nuevo_id_orden = str(uuid.uuid4())
         # O dejar que el autoincremento de la DB genere el ID int
 
-        # Generar número de solicitud interno (ejemplo simple)
-        # Podrías tener una secuencia en la DB o una lógica más robusta
-        num_ordenes_hoy = OrdenCompra.query.filter(db.func.date(OrdenCompra.fecha_creacion) == datetime.date.today()).count()
-        nro_interno_solicitud = f"OC-{datetime.date.today().strftime('%Y%m%d')}-{num_ordenes_hoy+1:04d}"
+        # Número de solicitud interno: correlativo diario tomado de la tabla secuencias
+        from ..utils.secuencias_utils import siguiente_valor
+        hoy_txt = datetime.date.today().strftime('%Y%m%d')
+        nro_interno_solicitud = f"OC-{hoy_txt}-{siguiente_valor(f'orden_compra:{hoy_txt}'):04d}"
 
         # Determinar si la orden debe ajustarse por TC (ajuste_tc=True => precios en USD)
         ajuste_tc_payload = None
@@ -762,7 +663,7 @@ def crear_orden_compra(current_user):
         else:
             ajuste_tc_payload = False
 
-        # Fecha tentativa: no creamos nueva columna para evitar migración; la guardamos en observaciones
+        # Fecha tentativa de entrega (columna tipada, filtrable/ordenable en el listado)
         fecha_entrega_payload = data.get('fecha_entrega_tentativa')
         fecha_entrega_dt = None
         if fecha_entrega_payload:
@@ -772,10 +673,6 @@ def crear_orden_compra(current_user):
                 fecha_entrega_dt = None
 
         obs_init = data.get("observaciones_solicitud") or ''
-        if fecha_entrega_dt:
-            marker = "__FECHA_ENTREGA_TENTATIVA__:" + fecha_entrega_dt.isoformat()
-            if '__FECHA_ENTREGA_TENTATIVA__' not in obs_init:
-                obs_init = (obs_init + ('\n' if obs_init else '') + marker)
 
         # Si el usuario es Admin, la OC se crea directamente como 'APROBADO' y se registra el aprobador
         if rol_usuario and rol_usuario.upper() == "ADMIN":
@@ -785,6 +682,7 @@ def crear_orden_compra(current_user):
                 forma_pago=data.get("forma_pago"),
                 importe_total_estimado=importe_total_estimado_calc,
                 observaciones_solicitud=obs_init,
+                fecha_entrega_tentativa=fecha_entrega_dt,
                 estado="APROBADO",
                 solicitado_por_id=usuario_solicitante_id,
                 aprobado_por_id=usuario_solicitante_id,
@@ -798,6 +696,7 @@ def crear_orden_compra(current_user):
                 forma_pago=data.get("forma_pago"),
                 importe_total_estimado=importe_total_estimado_calc,
                 observaciones_solicitud=obs_init,
+                fecha_entrega_tentativa=fecha_entrega_dt,
                 estado="SOLICITADO",
                 solicitado_por_id=usuario_solicitante_id,
                 ajuste_tc=ajuste_tc_payload
@@ -839,38 +738,22 @@ def crear_orden_compra(current_user):
             nueva_orden.cheque_perteneciente_a = None
 
         try:
-            tc_snapshot = _resolver_tc_snapshot_payload(data)
-            nueva_orden.observaciones_solicitud = _upsert_tc_snapshot_text(
-                nueva_orden.observaciones_solicitud,
-                tc_snapshot
-            )
+            nueva_orden.tc_snapshot = _resolver_tc_snapshot_payload(data)
         except Exception:
             pass
 
         db.session.add(nueva_orden)
         db.session.commit()
 
-        try:
-            log = AuditLog(  # type: ignore [call-arg]
-                entidad='OrdenCompra',
-                entidad_id=nueva_orden.id,
-                accion='CREAR',
-                usuario=usuario_nombre
-            )
-            log.set_nuevos({
-                'orden': formatear_orden_por_rol(nueva_orden, rol="ADMIN")
-            })
-            db.session.add(log)
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
+        # Devolver la orden completa (formateada por rol, ADMIN ve todo al crear)
+        orden_creada = formatear_orden_por_rol(nueva_orden, rol="ADMIN", incluir_pagos=True)
+        registrar_auditoria('OrdenCompra', nueva_orden.id, 'CREAR', usuario_nombre, nuevos={'orden': orden_creada})
 
         logger.info("Orden de compra creada: ID %s, Nro Interno %s", nueva_orden.id, nro_interno_solicitud)
-        # Devolver la orden completa (formateada por rol, ADMIN ve todo al crear)
         return jsonify({
             "status": "success",
             "message": "Orden de compra solicitada exitosamente.",
-            "orden": formatear_orden_por_rol(nueva_orden, rol="ADMIN", incluir_pagos=True)
+            "orden": orden_creada
         }), 201
 
     except (ValueError, TypeError, InvalidOperation) as e:
@@ -893,7 +776,7 @@ def obtener_ordenes_compra(current_user):
     rol_usuario = request.headers.get("X-User-Role", "almacen")  # Simular rol
 
     try:
-        query = OrdenCompra.query
+        query = OrdenCompra.query.options(*opciones_carga_orden())
 
         # --- Aplicar Filtros ---
         estado_filtro = request.args.get('estado')
@@ -908,8 +791,24 @@ def obtener_ordenes_compra(current_user):
             query = query.filter(OrdenCompra.proveedor_id == proveedor_id_filtro)
             logger.debug("Filtrando por proveedor ID: %s", proveedor_id_filtro)
 
-        # Ordenar (ej: por fecha creación descendente)
-        query = query.order_by(OrdenCompra.fecha_creacion.desc())
+        # Fecha tentativa de entrega (YYYY-MM-DD, ambos extremos inclusive)
+        try:
+            entrega_desde = request.args.get('entrega_desde')
+            if entrega_desde:
+                desde_dt = datetime.datetime.combine(datetime.date.fromisoformat(entrega_desde), datetime.time.min)
+                query = query.filter(OrdenCompra.fecha_entrega_tentativa >= desde_dt)
+            entrega_hasta = request.args.get('entrega_hasta')
+            if entrega_hasta:
+                hasta_dt = datetime.datetime.combine(datetime.date.fromisoformat(entrega_hasta), datetime.time.min)
+                query = query.filter(OrdenCompra.fecha_entrega_tentativa < hasta_dt + datetime.timedelta(days=1))
+        except ValueError:
+            return jsonify({"error": "'entrega_desde'/'entrega_hasta' deben tener formato YYYY-MM-DD"}), 400
+
+        # Ordenar (por defecto fecha de creación descendente; ?orden=fecha_entrega para próximas entregas)
+        if request.args.get('orden') == 'fecha_entrega':
+            query = query.order_by(OrdenCompra.fecha_entrega_tentativa.is_(None), OrdenCompra.fecha_entrega_tentativa.asc(), OrdenCompra.id)
+        else:
+            query = query.order_by(OrdenCompra.fecha_creacion.desc())
 
         # --- Paginación ---
         page = request.args.get('page', 1, type=int)
@@ -988,9 +887,7 @@ def obtener_orden_compra_por_id(current_user, orden_id):
     rol_usuario = request.headers.get("X-User-Role", "almacen") # Simular rol
 
     try:
-        # Usar .options(db.joinedload('*')) o selectinload para Eager Loading si es necesario
-        # orden_db = db.session.get(OrdenCompra, orden_id, options=[db.selectinload(OrdenCompra.items).selectinload(DetalleOrdenCompra.producto)])
-        orden_db = db.session.get(OrdenCompra, orden_id) # .get es bueno para PK
+        orden_db = db.session.get(OrdenCompra, orden_id, options=opciones_carga_orden())
         if not orden_db:
             return jsonify({"error": "Orden de compra no encontrada"}), 404
 
@@ -1095,8 +992,8 @@ def aprobar_orden_compra(current_user, orden_id):
         base_total = orden_db.importe_total_estimado or Decimal('0')
         
         # Usar nuevas tasas si vienen en el payload, sino usar las existentes
-        iva_rate_for_calc = _parse_percentage_rate(data.get('iva') if 'iva' in data else orden_db.iva or '0')
-        iibb_rate_for_calc = _parse_iibb_rate(data.get('iibb') if 'iibb' in data else orden_db.iibb or '0')
+        iva_rate_for_calc = _parse_percentage_rate(data.get('iva')) if 'iva' in data else (orden_db.iva_tasa or Decimal('0'))
+        iibb_rate_for_calc = _parse_iibb_rate(data.get('iibb')) if 'iibb' in data else (orden_db.iibb_tasa or Decimal('0'))
         
         iva_amount = (base_total * iva_rate_for_calc).quantize(Decimal('0.01')) if iva_rate_for_calc else Decimal('0')
         iibb_amount = (base_total * iibb_rate_for_calc).quantize(Decimal('0.01')) if iibb_rate_for_calc else Decimal('0')
@@ -1120,11 +1017,7 @@ def aprobar_orden_compra(current_user, orden_id):
             orden_db.cheque_perteneciente_a = None
 
         try:
-            tc_snapshot = _resolver_tc_snapshot_payload(data)
-            orden_db.observaciones_solicitud = _upsert_tc_snapshot_text(
-                orden_db.observaciones_solicitud,
-                tc_snapshot
-            )
+            orden_db.tc_snapshot = _resolver_tc_snapshot_payload(data)
         except Exception:
             pass
 
@@ -1174,25 +1067,14 @@ def aprobar_orden_compra(current_user, orden_id):
             
         except Exception:
             logger.warning("No se pudo registrar movimiento de proveedor (aprobación) para OC %s", orden_id)
-        try:
-            log = AuditLog(  # type: ignore [call-arg]
-                entidad='OrdenCompra',
-                entidad_id=orden_id,
-                accion='APROBAR',
-                usuario=usuario_aprobador
-            )
-            log.set_previos(prev)
-            log.set_nuevos(formatear_orden_por_rol(orden_db, rol_usuario, incluir_pagos=True))
-            db.session.add(log)
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
+        orden_actualizada = formatear_orden_por_rol(orden_db, rol_usuario, incluir_pagos=True)
+        registrar_auditoria('OrdenCompra', orden_id, 'APROBAR', usuario_aprobador, previos=prev, nuevos=orden_actualizada)
         logger.info("Orden %s aprobada por %s", orden_id, usuario_aprobador)
 
         return jsonify({
             "status": "success",
             "message": "Orden de compra aprobada.",
-            "orden": formatear_orden_por_rol(orden_db, rol_usuario, incluir_pagos=True) # Devolver estado actualizado
+            "orden": orden_actualizada # Devolver estado actualizado
         })
 
     except Exception as e:
@@ -1306,11 +1188,7 @@ def editar_orden_compra(current_user, orden_id):
 
         # Mantener snapshot de TC histórico cuando se edita la OC.
         try:
-            tc_snapshot = _resolver_tc_snapshot_payload(data)
-            orden_db.observaciones_solicitud = _upsert_tc_snapshot_text(
-                orden_db.observaciones_solicitud,
-                tc_snapshot
-            )
+            orden_db.tc_snapshot = _resolver_tc_snapshot_payload(data)
         except Exception:
             pass
 
@@ -1442,26 +1320,15 @@ def registrar_pago_orden(current_user, orden_id):
         db.session.add(movimiento_pago)
         db.session.commit()
 
-        try:
-            log = AuditLog(  # type: ignore [call-arg]
-                entidad='OrdenCompra',
-                entidad_id=orden_id,
-                accion='REGISTRAR_PAGO',
-                usuario=usuario_pago
-            )
-            log.set_previos(prev)
-            log.set_nuevos(formatear_orden_por_rol(orden_db, rol_usuario, incluir_pagos=True))
-            db.session.add(log)
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
+        orden_actualizada = formatear_orden_por_rol(orden_db, rol_usuario, incluir_pagos=True)
+        registrar_auditoria('OrdenCompra', orden_id, 'REGISTRAR_PAGO', usuario_pago, previos=prev, nuevos=orden_actualizada)
 
         return jsonify({
             "status": "success",
             "message": "Pago registrado correctamente.",
             "pago_ajustado": pago_ajustado,
             "tipo_pago": tipo_pago,
-            "orden": formatear_orden_por_rol(orden_db, rol_usuario, incluir_pagos=True),
+            "orden": orden_actualizada,
             "pago": {
                 "id": movimiento_pago.id,
                 "monto": float(movimiento_pago.monto),
@@ -1643,11 +1510,9 @@ def recibir_orden_compra(current_user, orden_id):
             orden_db.cheque_perteneciente_a = None # Limpiar si no es cheque
         orden_db.tipo_caja = data.get('tipo_caja', orden_db.tipo_caja)
         try:
-            tc_snapshot = _resolver_tc_snapshot_payload(data)
-            orden_db.notas_recepcion = _upsert_tc_snapshot_text(
-                orden_db.notas_recepcion,
-                tc_snapshot
-            )
+            # El snapshot tomado al crear/aprobar tiene prioridad sobre el de recepción
+            if orden_db.tc_snapshot is None:
+                orden_db.tc_snapshot = _resolver_tc_snapshot_payload(data)
         except Exception:
             pass
         prev = formatear_orden_por_rol(orden_db, rol_usuario)
@@ -1680,24 +1545,13 @@ def recibir_orden_compra(current_user, orden_id):
             logger.warning("No se pudo registrar movimiento de proveedor para OC %s", orden_db.id)
 
         db.session.commit()
-        try:
-            log = AuditLog(  # type: ignore [call-arg]
-                entidad='OrdenCompra',
-                entidad_id=orden_id,
-                accion='RECIBIR',
-                usuario=usuario_receptor
-            )
-            log.set_previos(prev)
-            log.set_nuevos(formatear_orden_por_rol(orden_db, rol_usuario, incluir_pagos=True))
-            db.session.add(log)
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
-        
+        orden_actualizada = formatear_orden_por_rol(orden_db, rol_usuario, incluir_pagos=True)
+        registrar_auditoria('OrdenCompra', orden_id, 'RECIBIR', usuario_receptor, previos=prev, nuevos=orden_actualizada)
+
         return jsonify({
             "status": "success",
             "message": "Mercadería registrada y orden actualizada correctamente.",
-            "orden": formatear_orden_por_rol(orden_db, rol_usuario, incluir_pagos=True)
+            "orden": orden_actualizada
         })
 
     except (InvalidOperation, TypeError) as e:
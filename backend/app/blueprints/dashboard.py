@@ -1,6 +1,7 @@
 # app/blueprints/dashboard.py
 
 from flask import Blueprint, jsonify, request
+from collections import defaultdict
 from sqlalchemy import func, case, or_, and_, literal
 from decimal import Decimal
 import datetime
@@ -13,7 +14,7 @@ except ImportError:
     AR_TZ = None
 
 from .. import db
-from ..models import Venta, DetalleVenta, OrdenCompra
+from ..models import VentaResumenDiario
 from ..utils.decorators import token_required, roles_required
 from ..utils.permissions import ROLES
 
@@ -50,169 +51,66 @@ def get_dashboard_kpis(current_user):
         else:
             fecha_fin = today
         
-        fecha_inicio_dt = datetime.datetime.combine(fecha_inicio, datetime.time.min)
-        fecha_fin_dt = datetime.datetime.combine(fecha_fin, datetime.time.max)
-        
-        # Construcción de filtros
-        filtro_base = Venta.fecha_pedido.between(fecha_inicio_dt, fecha_fin_dt)
-        
+        # Se suman filas del resumen diario (ventas_resumen_diario): el costo no
+        # depende de cuántas ventas haya en el rango. Puerta/pedido se distinguen
+        # por la dirección de entrega y el estado sale del prefijo de nombre_vendedor.
+        R = VentaResumenDiario
+        filtro_base = R.fecha.between(fecha_inicio, fecha_fin)
+
+        es_pedido = R.con_direccion == True
+        es_puerta = R.con_direccion == False
         if tipo_venta == 'puerta':
-            filtro_venta = or_(Venta.direccion_entrega.is_(None), Venta.direccion_entrega == '')
+            filtro_venta = es_puerta
         elif tipo_venta == 'pedido':
-            filtro_venta = (Venta.direccion_entrega.isnot(None)) & (Venta.direccion_entrega != '')
+            filtro_venta = es_pedido
         else:
             filtro_venta = literal(True)
-        
-        # INGRESOS totales
-        ingresos_total = db.session.query(
-            func.sum(Venta.monto_final_con_recargos)
-        ).filter(filtro_base, filtro_venta).scalar() or Decimal('0.0')
-        
-        # COSTOS totales
-        costos_total = db.session.query(
-            func.sum(DetalleVenta.cantidad * DetalleVenta.costo_unitario_momento_ars)
-        ).select_from(DetalleVenta).join(Venta).filter(filtro_base, filtro_venta).scalar() or Decimal('0.0')
-        
-        # MARGEN
-        margen_total = ingresos_total - costos_total
-        porcentaje_margen = (margen_total / ingresos_total * 100) if ingresos_total > 0 else 0
-        
-        # CANTIDAD de ventas
-        cantidad_ventas = db.session.query(
-            func.count(Venta.id)
-        ).filter(filtro_base, filtro_venta).scalar() or 0
-        
-        # PROMEDIO por venta
-        promedio_venta = float(ingresos_total / cantidad_ventas) if cantidad_ventas > 0 else 0
-        
-        # DESGLOSE por tipo de venta
-        desglose = db.session.query(
-            func.sum(case((or_(Venta.direccion_entrega.is_(None), Venta.direccion_entrega == ''), Venta.monto_final_con_recargos), else_=0)).label('puerta'),
-            func.sum(case(
-                ((Venta.direccion_entrega.isnot(None)) & (Venta.direccion_entrega != ''), Venta.monto_final_con_recargos),
-                else_=0
-            )).label('pedido'),
-            func.count(case(((Venta.direccion_entrega.isnot(None)) & (Venta.direccion_entrega != ''), 1))).label('count_pedidos'),
-            func.count(case((or_(Venta.direccion_entrega.is_(None), Venta.direccion_entrega == ''), 1))).label('count_puerta')
-        ).filter(filtro_base).first()
-        
-        # PAGOS por forma
-        pagos = db.session.query(
-            func.sum(case((Venta.forma_pago == 'efectivo', Venta.monto_final_con_recargos), else_=0)).label('efectivo'),
-            func.sum(case((Venta.forma_pago == 'transferencia', Venta.monto_final_con_recargos), else_=0)).label('transferencia'),
-            func.sum(case((Venta.forma_pago == 'factura', Venta.monto_final_con_recargos), else_=0)).label('factura')
-        ).filter(filtro_base, filtro_venta).first()
-        
-        # DATOS DE PENDIENTES (independiente de filtros de fecha)
-        # Filtro para pendientes: pedidos sin entregar
-        filtro_pendiente = (Venta.direccion_entrega.isnot(None)) & (Venta.direccion_entrega != '') & ~Venta.nombre_vendedor.ilike('%ENTREGADO%')
-        
-        # KGs pendientes de entrega
-        total_kgs_pendientes = db.session.query(
-            func.sum(DetalleVenta.cantidad)
-        ).select_from(DetalleVenta).join(Venta).filter(filtro_pendiente).scalar() or Decimal('0.0')
-        
-        # Cantidad de pedidos pendientes de entrega
-        cantidad_pedidos_pendientes = db.session.query(
-            func.count(Venta.id)
-        ).filter(filtro_pendiente).scalar() or 0
-        
-        # COSTOS en el período para cada tipo de venta
-        if tipo_venta == 'puerta':
-            costos_puerta = costos_total
-            costos_pedido = Decimal('0.0')
-        elif tipo_venta == 'pedido':
-            costos_puerta = Decimal('0.0')
-            costos_pedido = costos_total
-        else:
-            costos_puerta = db.session.query(
-                func.sum(DetalleVenta.cantidad * DetalleVenta.costo_unitario_momento_ars)
-            ).select_from(DetalleVenta).join(Venta).filter(
-                filtro_base,
-                or_(Venta.direccion_entrega.is_(None), Venta.direccion_entrega == '')
-            ).scalar() or Decimal('0.0')
-            
-            costos_pedido = db.session.query(
-                func.sum(DetalleVenta.cantidad * DetalleVenta.costo_unitario_momento_ars)
-            ).select_from(DetalleVenta).join(Venta).filter(
-                filtro_base,
-                (Venta.direccion_entrega.isnot(None)) & (Venta.direccion_entrega != '')
-            ).scalar() or Decimal('0.0')
-        
-        # Calcular ingresos de HOY para el dashboard
-        today_inicio = datetime.datetime.combine(today, datetime.time.min)
-        today_fin = datetime.datetime.combine(today, datetime.time.max)
-        
-        # Ingresos de hoy por tipo de venta (PEDIDO - con dirección)
-        ingreso_pedido_hoy = db.session.query(
-            func.sum(Venta.monto_final_con_recargos)
-        ).filter(
-            Venta.fecha_pedido.between(today_inicio, today_fin),
-            (Venta.direccion_entrega.isnot(None)) & (Venta.direccion_entrega != '')
-        ).scalar() or Decimal('0.0')
-        
-        # Ingresos de hoy por tipo de venta (PUERTA - sin dirección)
-        ingreso_puerta_hoy = db.session.query(
-            func.sum(Venta.monto_final_con_recargos)
-        ).filter(
-            Venta.fecha_pedido.between(today_inicio, today_fin),
-            or_(Venta.direccion_entrega.is_(None), Venta.direccion_entrega == '')
-        ).scalar() or Decimal('0.0')
-        
-        # Mañana
+
+        # Ventanas fijas de hoy y mañana (independientes de los filtros)
         manana = today + datetime.timedelta(days=1)
-        manana_inicio = datetime.datetime.combine(manana, datetime.time.min)
-        manana_fin = datetime.datetime.combine(manana, datetime.time.max)
-        
-        ingreso_pedido_manana = db.session.query(
-            func.sum(Venta.monto_final_con_recargos)
-        ).filter(
-            Venta.fecha_pedido.between(manana_inicio, manana_fin),
-            (Venta.direccion_entrega.isnot(None)) & (Venta.direccion_entrega != '')
-        ).scalar() or Decimal('0.0')
-        
-        print(f"DEBUG: Mañana ({manana}), ingreso_pedido_manana: {ingreso_pedido_manana}")
-        
-        kgs_manana = db.session.query(
-            func.sum(DetalleVenta.cantidad)
-        ).select_from(DetalleVenta).join(Venta).filter(
-            Venta.fecha_pedido.between(manana_inicio, manana_fin),
-            (Venta.direccion_entrega.isnot(None)) & (Venta.direccion_entrega != '')
-        ).scalar() or Decimal('0.0')
-        
-        # Cantidad de pedidos para mañana
-        pedidos_pendientes_manana = db.session.query(
-            func.count(Venta.id)
-        ).filter(
-            Venta.fecha_pedido.between(manana_inicio, manana_fin),
-            (Venta.direccion_entrega.isnot(None)) & (Venta.direccion_entrega != '')
-        ).scalar() or 0
-        
-        # DESGLOSE ingresos (relación pedidos vs puerta)
-        ingresos_pedido_mes = db.session.query(
-            func.sum(Venta.monto_final_con_recargos)
-        ).filter(
-            filtro_base,
-            (Venta.direccion_entrega.isnot(None)) & (Venta.direccion_entrega != '')
-        ).scalar() or Decimal('0.0')
-        
-        ingresos_puerta_mes = db.session.query(
-            func.sum(Venta.monto_final_con_recargos)
-        ).filter(
-            filtro_base,
-            or_(Venta.direccion_entrega.is_(None), Venta.direccion_entrega == '')
-        ).scalar() or Decimal('0.0')
-        
-        # DESGLOSE pagos
-        pagos_efectivo = db.session.query(
-            func.sum(Venta.monto_final_con_recargos)
-        ).filter(
-            filtro_base,
-            Venta.forma_pago == 'efectivo'
-        ).scalar() or Decimal('0.0')
-        
+        filtro_hoy = R.fecha == today
+        filtro_manana = R.fecha == manana
+
+        # Pendientes: pedidos sin entregar (independiente de filtros de fecha)
+        filtro_pendiente = es_pedido & (R.estado != 'ENTREGADO')
+
+        # Solo se recorren las filas que aportan a alguna métrica
+        filtro_alcance = or_(filtro_base, filtro_hoy, filtro_manana, filtro_pendiente)
+        monto = R.monto_con_recargos
+
+        def suma_si(condicion, valor):
+            return func.coalesce(func.sum(case((condicion, valor))), 0)
+
+        # Una sola pasada: ingresos y costos del período, hoy/mañana y pedidos pendientes
+        totales = db.session.query(
+            suma_si(and_(filtro_base, filtro_venta), monto).label('ingresos_total'),
+            suma_si(and_(filtro_base, filtro_venta), R.costo).label('costos_total'),
+            suma_si(and_(filtro_base, es_pedido), monto).label('ingresos_pedido_mes'),
+            suma_si(and_(filtro_base, es_puerta), monto).label('ingresos_puerta_mes'),
+            suma_si(and_(filtro_base, R.forma_pago == 'efectivo'), monto).label('pagos_efectivo'),
+            suma_si(and_(filtro_hoy, es_pedido), monto).label('ingreso_pedido_hoy'),
+            suma_si(and_(filtro_hoy, es_puerta), monto).label('ingreso_puerta_hoy'),
+            suma_si(and_(filtro_manana, es_pedido), monto).label('ingreso_pedido_manana'),
+            suma_si(and_(filtro_manana, es_pedido), R.unidades).label('pedidos_pendientes_manana'),
+            suma_si(and_(filtro_manana, es_pedido), R.kgs).label('kgs_manana'),
+            suma_si(filtro_pendiente, R.unidades).label('pedidos_pendientes'),
+            suma_si(filtro_pendiente, R.kgs).label('kgs_pendientes'),
+        ).filter(filtro_alcance).one()
+
+        ingresos_total = Decimal(str(totales.ingresos_total))
+        costos_total = Decimal(str(totales.costos_total))
+        ingreso_pedido_hoy = totales.ingreso_pedido_hoy
+        ingreso_puerta_hoy = totales.ingreso_puerta_hoy
+        ingreso_pedido_manana = totales.ingreso_pedido_manana
+        pedidos_pendientes_manana = int(totales.pedidos_pendientes_manana)
+        kgs_manana = totales.kgs_manana
+        ingresos_pedido_mes = totales.ingresos_pedido_mes
+        ingresos_puerta_mes = totales.ingresos_puerta_mes
+        pagos_efectivo = Decimal(str(totales.pagos_efectivo))
         pagos_otros = ingresos_total - pagos_efectivo
-        
+        total_kgs_pendientes = totales.kgs_pendientes
+        cantidad_pedidos_pendientes = int(totales.pedidos_pendientes)
+
         # Estructura de respuesta completa
         response_data = {
             "primera_fila": {
@@ -268,126 +166,59 @@ def get_dashboard_ventas_pedidos(current_user):
         now_local = datetime.datetime.now(AR_TZ) if AR_TZ else datetime.datetime.now()
         today = now_local.date()
         manana = today + datetime.timedelta(days=1)
-        today_start_dt = datetime.datetime.combine(today, datetime.time.min)
-        today_end_dt = datetime.datetime.combine(today, datetime.time.max)
-        manana_start_dt = datetime.datetime.combine(manana, datetime.time.min)
-        manana_end_dt = datetime.datetime.combine(manana, datetime.time.max)
 
-        # Filtro: Solo pedidos (con dirección de entrega)
-        filtro_pedido = (Venta.direccion_entrega.isnot(None)) & (Venta.direccion_entrega != '')
-        # Filtro: Excluir pedidos cancelados (aplica para hoy y mañana)
-        filtro_no_cancelado = ~Venta.nombre_vendedor.ilike('%CANCELADO%')
-        # Tomar solo pedidos de manana y considerar pendiente por defecto
-        # cuando no hay prefijo de estado; excluir entregados/cancelados.
-        filtro_pendiente = (
-            filtro_pedido
-            & Venta.fecha_pedido.between(manana_start_dt, manana_end_dt)
-            & and_(
-                ~Venta.nombre_vendedor.ilike('%ENTREGADO%'),
-                filtro_no_cancelado
-            )
-        )
-        # Filtro: Solo puerta (sin dirección de entrega)
-        filtro_puerta = (Venta.direccion_entrega.is_(None)) | (Venta.direccion_entrega == '')
-
-        # 0. Ingresos puerta hoy - SIN DESGLOSE (total general)
-        ingresos_puerta_hoy = db.session.query(
-            func.sum(Venta.monto_final_redondeado)
-        ).filter(
-            filtro_puerta,
-            Venta.fecha_pedido.between(today_start_dt, today_end_dt)
-        ).scalar() or Decimal('0.0')
-
-        # 0b. Ingresos puerta hoy - CON DESGLOSE POR FORMA DE PAGO
-        ingresos_puerta_por_pago = db.session.query(
-            Venta.forma_pago,
-            func.sum(Venta.monto_final_redondeado)
-        ).filter(
-            filtro_puerta,
-            Venta.fecha_pedido.between(today_start_dt, today_end_dt)
-        ).group_by(Venta.forma_pago).all()
-        
-        desglose_puerta = {}
-        for forma_pago, monto in ingresos_puerta_por_pago:
+        # Una consulta al resumen diario (hoy y mañana) y el resto se arma en Python.
+        # Pedido = con dirección de entrega; puerta = sin dirección.
+        R = VentaResumenDiario
+        filas = db.session.query(
+            R.fecha, R.con_direccion, R.forma_pago, R.estado,
+            func.sum(R.monto), func.sum(R.unidades), func.sum(R.kgs),
+        ).filter(R.fecha.in_((today, manana))).group_by(
+            R.fecha, R.con_direccion, R.forma_pago, R.estado
+        ).all()
+
+        ingresos_puerta_hoy = Decimal('0.0')
+        ingresos_pedido_hoy = Decimal('0.0')
+        cantidad_pedidos_hoy = 0
+        kgs_hoy = Decimal('0.0')
+        cantidad_pendientes = 0
+        kgs_pendientes = Decimal('0.0')
+        desglose_puerta = defaultdict(float)
+        desglose_pedidos = defaultdict(float)
+        desglose_cantidad_pedidos = defaultdict(int)
+
+        for fecha, con_direccion, forma_pago, estado, monto, unidades, kgs in filas:
+            unidades = int(unidades or 0)
+            if not unidades:
+                continue
+            monto = Decimal(str(monto or 0))
+            kgs = Decimal(str(kgs or 0))
             forma_pago_key = str(forma_pago or 'Desconocido').strip()
-            desglose_puerta[forma_pago_key] = float(monto or 0)
-
-        # 1. Ingresos del día - Pedidos (excluye cancelados)
-        ingresos_pedido_hoy = db.session.query(
-            func.sum(Venta.monto_final_redondeado)
-        ).filter(
-            filtro_pedido,
-            filtro_no_cancelado,
-            Venta.fecha_pedido.between(today_start_dt, today_end_dt)
-        ).scalar() or Decimal('0.0')
-
-        # 1b. Ingresos pedidos hoy - CON DESGLOSE POR FORMA DE PAGO (excluye cancelados)
-        ingresos_pedidos_por_pago = db.session.query(
-            Venta.forma_pago,
-            func.sum(Venta.monto_final_redondeado)
-        ).filter(
-            filtro_pedido,
-            filtro_no_cancelado,
-            Venta.fecha_pedido.between(today_start_dt, today_end_dt)
-        ).group_by(Venta.forma_pago).all()
-        
-        desglose_pedidos = {}
-        for forma_pago, monto in ingresos_pedidos_por_pago:
-            forma_pago_key = str(forma_pago or 'Desconocido').strip()
-            desglose_pedidos[forma_pago_key] = float(monto or 0)
-
-        # 2. Cantidad de pedidos del día (excluye cancelados)
-        cantidad_pedidos_hoy = db.session.query(
-            func.count(Venta.id)
-        ).filter(
-            filtro_pedido,
-            filtro_no_cancelado,
-            Venta.fecha_pedido.between(today_start_dt, today_end_dt)
-        ).scalar() or 0
-
-        # 2b. Cantidad de pedidos del día - CON DESGLOSE POR FORMA DE PAGO (excluye cancelados)
-        cantidad_pedidos_por_pago = db.session.query(
-            Venta.forma_pago,
-            func.count(Venta.id)
-        ).filter(
-            filtro_pedido,
-            filtro_no_cancelado,
-            Venta.fecha_pedido.between(today_start_dt, today_end_dt)
-        ).group_by(Venta.forma_pago).all()
-        
-        desglose_cantidad_pedidos = {}
-        for forma_pago, cantidad in cantidad_pedidos_por_pago:
-            forma_pago_key = str(forma_pago or 'Desconocido').strip()
-            desglose_cantidad_pedidos[forma_pago_key] = int(cantidad or 0)
-
-        # 3. Cantidad de kilos del día (excluye cancelados)
-        kgs_hoy = db.session.query(
-            func.sum(DetalleVenta.cantidad)
-        ).select_from(DetalleVenta).join(Venta).filter(
-            filtro_pedido,
-            filtro_no_cancelado,
-            Venta.fecha_pedido.between(today_start_dt, today_end_dt)
-        ).scalar() or Decimal('0.0')
-
-        # 4. Cantidad de pedidos pendientes de entrega (no entregados)
-        cantidad_pendientes = db.session.query(
-            func.count(Venta.id)
-        ).filter(filtro_pendiente).scalar() or 0
-
-        # 5. Cantidad de kilos pendientes de entrega
-        kgs_pendientes = db.session.query(
-            func.sum(DetalleVenta.cantidad)
-        ).select_from(DetalleVenta).join(Venta).filter(filtro_pendiente).scalar() or Decimal('0.0')
+            if fecha == today and not con_direccion:
+                # Ingresos puerta hoy (sin excluir cancelados), total y por forma de pago
+                ingresos_puerta_hoy += monto
+                desglose_puerta[forma_pago_key] += float(monto)
+            elif fecha == today and estado != 'CANCELADO':
+                # Pedidos del día (excluye cancelados): ingresos, cantidad y kilos
+                ingresos_pedido_hoy += monto
+                desglose_pedidos[forma_pago_key] += float(monto)
+                cantidad_pedidos_hoy += unidades
+                desglose_cantidad_pedidos[forma_pago_key] += unidades
+                kgs_hoy += kgs
+            elif fecha == manana and con_direccion and estado not in ('ENTREGADO', 'CANCELADO'):
+                # Pendientes de entrega: pedidos de mañana sin entregar ni cancelar
+                cantidad_pendientes += unidades
+                kgs_pendientes += kgs
 
         response_data = {
             "hoy": {
                 "cantidad_pedidos": cantidad_pedidos_hoy,
-                "cantidad_pedidos_por_forma_pago": desglose_cantidad_pedidos,
+                "cantidad_pedidos_por_forma_pago": dict(desglose_cantidad_pedidos),
                 "cantidad_kilos": float(kgs_hoy),
                 "ingreso_puerta_hoy": float(ingresos_puerta_hoy),
-                "ingreso_puerta_por_forma_pago": desglose_puerta,
+                "ingreso_puerta_por_forma_pago": dict(desglose_puerta),
                 "ingreso_pedidos_hoy": float(ingresos_pedido_hoy),
-                "ingreso_pedidos_por_forma_pago": desglose_pedidos
+                "ingreso_pedidos_por_forma_pago": dict(desglose_pedidos)
             },
             "pendiente_entrega": {
                 "cantidad_pedidos": cantidad_pendientes,
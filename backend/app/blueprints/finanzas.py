@@ -1,23 +1,23 @@
 from flask import Blueprint, request, jsonify
 from decimal import Decimal, InvalidOperation
-from sqlalchemy import func
+from datetime import datetime
+import base64
+import json
+from sqlalchemy import func, case, and_, or_
 from .. import db
-from ..models import MovimientoProveedor, Proveedor, OrdenCompra
+from ..models import MovimientoProveedor, Proveedor, OrdenCompra, SaldoProveedor
 from ..utils.decorators import token_required, roles_required
 from ..utils.permissions import ROLES
 
 finanzas_bp = Blueprint('finanzas', __name__, url_prefix='/api/finanzas')
 
+MOVIMIENTOS_LIMITE_DEFAULT = 100
+MOVIMIENTOS_LIMITE_MAX = 500
+
 def _deuda_proveedor(proveedor_id: int) -> Decimal:
-    debitos = db.session.query(func.coalesce(func.sum(MovimientoProveedor.monto), 0)).filter(
-        MovimientoProveedor.proveedor_id == proveedor_id,
-        MovimientoProveedor.tipo == 'DEBITO'
-    ).scalar() or Decimal('0')
-    creditos = db.session.query(func.coalesce(func.sum(MovimientoProveedor.monto), 0)).filter(
-        MovimientoProveedor.proveedor_id == proveedor_id,
-        MovimientoProveedor.tipo == 'CREDITO'
-    ).scalar() or Decimal('0')
-    return Decimal(str(debitos)) - Decimal(str(creditos))
+    """Deuda (débitos - créditos) leída del saldo acumulado: una lectura por clave primaria."""
+    saldo = db.session.get(SaldoProveedor, proveedor_id)
+    return saldo.deuda if saldo else Decimal('0')
 
 @finanzas_bp.route('/transacciones/registrar', methods=['POST'])
 @token_required
@@ -60,72 +60,252 @@ def registrar_transaccion(current_user):
     db.session.commit()
     return jsonify({'message': 'Transacción registrada', 'movimiento_id': mov.id}), 201
 
+def _importe_con_signo():
+    """Débito suma deuda, crédito la descuenta."""
+    tipo = func.upper(MovimientoProveedor.tipo)
+    return case(
+        (tipo == 'DEBITO', MovimientoProveedor.monto),
+        (tipo == 'CREDITO', -MovimientoProveedor.monto),
+        else_=0
+    )
+
+
+def _codificar_cursor(datos: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(datos).encode('utf-8')).decode('ascii')
+
+
+def _decodificar_cursor(cursor: str) -> dict:
+    """Devuelve {'fecha': datetime, 'id': int, ...}; ValueError si el cursor es inválido."""
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        datos['fecha'] = datetime.fromisoformat(datos['fecha'])
+        datos['id'] = int(datos['id'])
+        return datos
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+
+def _parsear_limite():
+    try:
+        limite = int(request.args.get('limit', MOVIMIENTOS_LIMITE_DEFAULT))
+    except (TypeError, ValueError):
+        raise ValueError('limit inválido')
+    return max(1, min(limite, MOVIMIENTOS_LIMITE_MAX))
+
+
+def _fecha_param(nombre):
+    """Fecha ISO del query string; None si falta o es inválida (se ignora, como antes)."""
+    valor = request.args.get(nombre)
+    if not valor:
+        return None
+    try:
+        return datetime.fromisoformat(valor)
+    except ValueError:
+        return None
+
+
+def _filtros_fecha_movimientos():
+    filtros = []
+    fecha_desde, fecha_hasta = _fecha_param('fecha_desde'), _fecha_param('fecha_hasta')
+    if fecha_desde:
+        filtros.append(MovimientoProveedor.fecha >= fecha_desde)
+    if fecha_hasta:
+        filtros.append(MovimientoProveedor.fecha <= fecha_hasta)
+    return filtros
+
+
+def _movimiento_a_dict(m):
+    return {
+        'id': m.id,
+        'proveedor_id': m.proveedor_id,
+        'orden_id': m.orden_id,
+        'tipo': m.tipo,
+        'monto': float(m.monto),
+        'fecha': m.fecha.isoformat() if m.fecha else None,
+        'descripcion': m.descripcion,
+        'usuario': m.usuario
+    }
+
+
+def _totales_movimientos(*filtros):
+    """Totales de débitos/créditos calculados en la base para el filtro dado."""
+    tipo = func.upper(MovimientoProveedor.tipo)
+    debitos, creditos = db.session.query(
+        func.coalesce(func.sum(case((tipo == 'DEBITO', MovimientoProveedor.monto), else_=0)), 0),
+        func.coalesce(func.sum(case((tipo == 'CREDITO', MovimientoProveedor.monto), else_=0)), 0),
+    ).filter(*filtros).one()
+    return Decimal(str(debitos)), Decimal(str(creditos))
+
+
 @finanzas_bp.route('/movimientos', methods=['GET'])
 @token_required
 @roles_required(ROLES['ADMIN'], ROLES['CONTABLE'])
 def listar_movimientos(current_user):
+    """
+    Movimientos de proveedores (más recientes primero) con totales calculados en SQL.
+    Con 'limit' pagina por keyset sobre (fecha, id): la respuesta trae 'siguiente_cursor'
+    para pedir la página siguiente con 'cursor'. Sin 'limit' devuelve todo, como antes.
+    """
     tipo = request.args.get('tipo')
-    fecha_desde = request.args.get('fecha_desde')
-    fecha_hasta = request.args.get('fecha_hasta')
-    q = db.session.query(MovimientoProveedor).order_by(MovimientoProveedor.fecha.desc())
+    filtros = _filtros_fecha_movimientos()
     if tipo in ('DEBITO', 'CREDITO'):
-        q = q.filter(MovimientoProveedor.tipo == tipo)
-    if fecha_desde:
-        try:
-            from datetime import datetime
-            fd = datetime.fromisoformat(fecha_desde)
-            q = q.filter(MovimientoProveedor.fecha >= fd)
-        except Exception:
-            pass
-    if fecha_hasta:
+        filtros.append(MovimientoProveedor.tipo == tipo)
+
+    q = db.session.query(MovimientoProveedor).filter(*filtros).order_by(
+        MovimientoProveedor.fecha.desc(), MovimientoProveedor.id.desc()
+    )
+    limite = None
+    if request.args.get('limit') or request.args.get('cursor'):
         try:
-            from datetime import datetime
-            fh = datetime.fromisoformat(fecha_hasta)
-            q = q.filter(MovimientoProveedor.fecha <= fh)
-        except Exception:
-            pass
-    movimientos = q.all()
-    total_debitos = sum([float(m.monto) for m in movimientos if m.tipo == 'DEBITO'])
-    total_creditos = sum([float(m.monto) for m in movimientos if m.tipo == 'CREDITO'])
-    return jsonify({
-        'movimientos': [
-            {
-                'id': m.id,
-                'proveedor_id': m.proveedor_id,
-                'orden_id': m.orden_id,
-                'tipo': m.tipo,
-                'monto': float(m.monto),
-                'fecha': m.fecha.isoformat() if m.fecha else None,
-                'descripcion': m.descripcion,
-                'usuario': m.usuario
-            } for m in movimientos
-        ],
+            limite = _parsear_limite()
+            if request.args.get('cursor'):
+                cursor = _decodificar_cursor(request.args['cursor'])
+                q = q.filter(or_(
+                    MovimientoProveedor.fecha < cursor['fecha'],
+                    and_(MovimientoProveedor.fecha == cursor['fecha'], MovimientoProveedor.id < cursor['id'])
+                ))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        movimientos = q.limit(limite + 1).all()
+    else:
+        movimientos = q.all()
+
+    siguiente_cursor = None
+    if limite is not None and len(movimientos) > limite:
+        movimientos = movimientos[:limite]
+        ultimo = movimientos[-1]
+        siguiente_cursor = _codificar_cursor({'fecha': ultimo.fecha.isoformat(), 'id': ultimo.id})
+
+    total_debitos, total_creditos = _totales_movimientos(*filtros)
+    respuesta = {
+        'movimientos': [_movimiento_a_dict(m) for m in movimientos],
         'totales': {
-            'debitos': total_debitos,
-            'creditos': total_creditos,
-            'neto': total_creditos - total_debitos
+            'debitos': float(total_debitos),
+            'creditos': float(total_creditos),
+            'neto': float(total_creditos - total_debitos)
         }
-    })
+    }
+    if limite is not None:
+        respuesta['siguiente_cursor'] = siguiente_cursor
+    return jsonify(respuesta)
+
+
+@finanzas_bp.route('/proveedores/<int:proveedor_id>/estado-cuenta', methods=['GET'])
+@token_required
+@roles_required(ROLES['ADMIN'], ROLES['CONTABLE'])
+def estado_cuenta_proveedor(current_user, proveedor_id):
+    """
+    Estado de cuenta del proveedor en orden cronológico, con saldo acumulado por
+    movimiento (SUM() OVER (ORDER BY fecha, id)) y paginación por keyset.
+
+    Parámetros: limit, cursor (de 'siguiente_cursor'), fecha_desde, fecha_hasta.
+    La ventana se calcula solo sobre la página; el saldo previo viaja en el cursor,
+    así cada página cuesta lo mismo sin importar cuántos movimientos haya antes.
+    Los totales se devuelven en la primera página.
+    """
+    return respuesta_estado_cuenta(proveedor_id)
+
+
+def respuesta_estado_cuenta(proveedor_id):
+    """Respuesta del estado de cuenta (ver estado_cuenta_proveedor); lee limit/cursor/fechas del request."""
+    if not db.session.get(Proveedor, proveedor_id):
+        return jsonify({'error': 'Proveedor no encontrado'}), 404
+    try:
+        limite = _parsear_limite()
+        cursor = _decodificar_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        saldo_inicial = Decimal(str(cursor.get('saldo', '0'))) if cursor else Decimal('0')
+    except (ValueError, InvalidOperation) as e:
+        return jsonify({'error': str(e)}), 400
+
+    filtros = [MovimientoProveedor.proveedor_id == proveedor_id] + _filtros_fecha_movimientos()
+    fecha_desde = _fecha_param('fecha_desde')
+    if cursor is None and fecha_desde:
+        # Saldo arrastrado de los movimientos anteriores al rango pedido
+        saldo_inicial = Decimal(str(db.session.query(func.coalesce(func.sum(_importe_con_signo()), 0)).filter(
+            MovimientoProveedor.proveedor_id == proveedor_id,
+            MovimientoProveedor.fecha < fecha_desde
+        ).scalar()))
+
+    pagina = db.session.query(
+        MovimientoProveedor.id,
+        MovimientoProveedor.proveedor_id,
+        MovimientoProveedor.orden_id,
+        MovimientoProveedor.tipo,
+        MovimientoProveedor.monto,
+        MovimientoProveedor.fecha,
+        MovimientoProveedor.descripcion,
+        MovimientoProveedor.usuario,
+        _importe_con_signo().label('importe'),
+    ).filter(*filtros)
+    if cursor:
+        pagina = pagina.filter(or_(
+            MovimientoProveedor.fecha > cursor['fecha'],
+            and_(MovimientoProveedor.fecha == cursor['fecha'], MovimientoProveedor.id > cursor['id'])
+        ))
+    pagina = pagina.order_by(MovimientoProveedor.fecha, MovimientoProveedor.id).limit(limite + 1).subquery()
+
+    filas = db.session.query(
+        pagina,
+        func.sum(pagina.c.importe).over(order_by=(pagina.c.fecha, pagina.c.id)).label('saldo_parcial'),
+    ).order_by(pagina.c.fecha, pagina.c.id).all()
+
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    movimientos = []
+    for fila in filas:
+        movimiento = _movimiento_a_dict(fila)
+        movimiento['saldo'] = float(saldo_inicial + Decimal(str(fila.saldo_parcial)))
+        movimientos.append(movimiento)
+
+    siguiente_cursor = None
+    if hay_mas:
+        ultimo = filas[-1]
+        siguiente_cursor = _codificar_cursor({
+            'fecha': ultimo.fecha.isoformat(),
+            'id': ultimo.id,
+            'saldo': str(saldo_inicial + Decimal(str(ultimo.saldo_parcial))),
+        })
+
+    respuesta = {
+        'proveedor_id': proveedor_id,
+        'saldo_inicial': float(saldo_inicial),
+        'movimientos': movimientos,
+        'siguiente_cursor': siguiente_cursor,
+    }
+    if cursor is None:
+        if len(filtros) == 1:
+            saldo = db.session.get(SaldoProveedor, proveedor_id)
+            debitos = Decimal(str(saldo.debitos)) if saldo else Decimal('0')
+            creditos = Decimal(str(saldo.creditos)) if saldo else Decimal('0')
+        else:
+            debitos, creditos = _totales_movimientos(*filtros)
+        respuesta['totales'] = {
+            'debitos': float(debitos),
+            'creditos': float(creditos),
+            'saldo': float(debitos - creditos),
+        }
+    return jsonify(respuesta)
 
 @finanzas_bp.route('/dashboard', methods=['GET'])
 @token_required
 @roles_required(ROLES['ADMIN'], ROLES['CONTABLE'])
 def dashboard_financiero(current_user):
-    proveedores = db.session.query(Proveedor).all()
+    # Una sola lectura: proveedores con su saldo acumulado (mantenido en cada movimiento)
+    filas = db.session.query(
+        Proveedor.id, Proveedor.nombre, SaldoProveedor.debitos, SaldoProveedor.creditos
+    ).outerjoin(SaldoProveedor, SaldoProveedor.proveedor_id == Proveedor.id).order_by(Proveedor.id).all()
     resumen = []
     deuda_total = Decimal('0')
     pagos_total = Decimal('0')
-    for p in proveedores:
-        deuda = _deuda_proveedor(p.id)
+    for proveedor_id, nombre, debitos, creditos in filas:
+        debitos = Decimal(str(debitos or 0))
+        pagos = Decimal(str(creditos or 0))
+        deuda = debitos - pagos
         deuda_total += deuda if deuda > 0 else Decimal('0')
-        pagos = db.session.query(func.coalesce(func.sum(MovimientoProveedor.monto), 0)).filter(
-            MovimientoProveedor.proveedor_id == p.id,
-            MovimientoProveedor.tipo == 'CREDITO'
-        ).scalar() or Decimal('0')
-        pagos_total += Decimal(str(pagos))
+        pagos_total += pagos
         resumen.append({
-            'proveedor_id': p.id,
-            'proveedor_nombre': p.nombre,
+            'proveedor_id': proveedor_id,
+            'proveedor_nombre': nombre,
             'deuda': float(deuda),
             'estado': 'ROJO' if deuda > 0 else 'VERDE'
         })
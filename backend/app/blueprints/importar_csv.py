@@ -5,6 +5,7 @@ from datetime import datetime
 
 from app.models import Producto  # Importa el modelo Producto
 from app import db              # Importa la instancia db
+from app.utils.indice_nombres_utils import IndiceNombres
 
 import_csv_bp = Blueprint('import_csv', __name__, url_prefix='/api/import_csv')
 
@@ -33,6 +34,9 @@ def generar_sql_desde_csv():
         errores = []
         productos_procesados = 0
         productos_actualizados = 0
+        # Índice de nombres (una consulta) en lugar de buscar el producto fila por fila
+        indice_productos = IndiceNombres.desde_columnas(Producto.id, Producto.nombre)
+        costos_por_producto = {}
 
         for i, fila in enumerate(lector_csv):
             productos_procesados += 1
@@ -56,16 +60,25 @@ def generar_sql_desde_csv():
                 errores.append(f"Línea {i+2}: Costo USD inválido ('{nuevo_costo_usd_str}') para '{nombre_producto_csv}'. Se omite.")
                 continue
 
-            # Busca el producto por nombre (ajusta si el nombre no es único)
-            producto = Producto.query.filter(Producto.nombre == nombre_producto_csv).first()
-            if not producto:
-                errores.append(f"Línea {i+2}: Producto '{nombre_producto_csv}' no encontrado en la base de datos. Se omite.")
+            # Busca el producto por nombre exacto (sin distinguir mayúsculas, tildes ni espacios repetidos)
+            producto_ids = indice_productos.exactos(nombre_producto_csv)
+            if len(producto_ids) > 1:
+                coincidencias = ', '.join(indice_productos.nombres[pid] for pid in producto_ids)
+                errores.append(f"Línea {i+2}: Producto '{nombre_producto_csv}' ambiguo (coincide con: {coincidencias}). Se omite.")
+                continue
+            if not producto_ids:
+                sugerencias = indice_productos.sugerencias(nombre_producto_csv)
+                detalle = f" ¿Quiso decir: {', '.join(sugerencias)}?" if sugerencias else ""
+                errores.append(f"Línea {i+2}: Producto '{nombre_producto_csv}' no encontrado en la base de datos. Se omite.{detalle}")
                 continue
 
-            producto.costo_referencia_usd = nuevo_costo_usd
-            producto.fecha_actualizacion_costo = datetime.now()
+            costos_por_producto[producto_ids[0]] = nuevo_costo_usd
             productos_actualizados += 1
 
+        ahora = datetime.now()
+        for producto in Producto.query.filter(Producto.id.in_(list(costos_por_producto))).all() if costos_por_producto else []:
+            producto.costo_referencia_usd = costos_por_producto[producto.id]
+            producto.fecha_actualizacion_costo = ahora
         db.session.commit()
 
         return jsonify({
@@ -1,22 +1,25 @@
 # app/blueprints/precios_especiales.py
 from flask import Blueprint, request, jsonify, send_file
 from sqlalchemy.orm import joinedload # Para cargar datos relacionados eficientemente
-from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from decimal import Decimal, InvalidOperation
 import traceback
 import logging
 import pandas as pd
 import io
 import csv
-import unicodedata
-import re
 import datetime
+from openpyxl import Workbook
 
 # --- Imports locales ---
 from .. import db
-from ..models import PrecioEspecialCliente, Cliente, Producto, TipoCambio
+from ..models import PrecioEspecialCliente, Cliente, Producto, TipoCambio, AjustePrecioEspecial
 from ..utils.decorators import token_required, roles_required
 from ..utils.permissions import ROLES
-from ..utils.math_utils import redondear_a_siguiente_decena_simplificado
+from ..utils.ajuste_precios_utils import aplicar_ajuste_global, revertir_ajuste
+from ..utils.cache_utils import cache_con_tags, TAG_CLIENTES, TAG_PRECIOS_ESPECIALES, TAG_PRODUCTOS, TAG_TIPOS_CAMBIO
+from ..utils.importar_precios_utils import importar_precios_especiales
+from ..utils.indice_nombres_utils import normalizar_texto
+from ..utils.trabajos_utils import crear_trabajo, lanzar_trabajo
 # Importar función de redondeo si la necesitas
 # from ..utils.cost_utils import redondear_decimal
 
@@ -26,6 +29,9 @@ precios_especiales_bp = Blueprint('precios_especiales', __name__, url_prefix='/a
 # Logger del módulo
 logger = logging.getLogger(__name__)
 
+TIPO_TRABAJO_CARGA_PRECIOS = 'CARGA_PRECIOS_ESPECIALES'
+FILAS_POR_TANDA_PLANTILLA = 1000
+
 # --- Helpers ---
 def precio_especial_a_dict(precio_esp):
     """Serializa un objeto PrecioEspecialCliente a diccionario."""
@@ -141,6 +147,41 @@ def calcular_precio_ars(precio_esp):
     return (precio_ars, tipo_cambio_actual)
 
 
+def calculadora_precios_ars_lote(producto_ids_precio_base):
+    """
+    Versión por lotes de calcular_precio_ars para listados grandes: lee el TC
+    'Oficial' una sola vez y calcula el precio base una vez por producto (no por
+    fila). Devuelve una función fila -> Decimal | None, donde 'fila' expone los
+    mismos atributos que PrecioEspecialCliente.
+    """
+    from ..utils.precios_utils import calculate_price
+
+    tc_obj = TipoCambio.query.filter_by(nombre='Oficial').first()
+    tipo_cambio = Decimal(str(tc_obj.valor)) if tc_obj and tc_obj.valor else None
+    precios_base = {}
+    for producto_id in producto_ids_precio_base:
+        try:
+            resultado = calculate_price(producto_id, 1, cliente_id=None, db=db)
+            base = Decimal(str(resultado.get('precio_unitario_ars', '0'))) if resultado.get('status') == 'success' else None
+        except Exception:
+            logger.exception("[calculadora_precios_ars_lote] error calculando precio base de producto %s", producto_id)
+            base = None
+        precios_base[producto_id] = base if base and base > 0 else None
+
+    def calcular(fila):
+        if fila.usar_precio_base:
+            base = precios_base.get(fila.producto_id)
+            if base is None:
+                return None
+            margen = Decimal(str(fila.margen_sobre_base)) if fila.margen_sobre_base is not None else Decimal('0')
+            return base * (Decimal('1') + margen)
+        if (fila.moneda_original or 'ARS').upper() == 'USD' and fila.precio_original is not None:
+            return Decimal(str(fila.precio_original)) * tipo_cambio if tipo_cambio else None
+        return Decimal(str(fila.precio_unitario_fijo_ars)) if fila.precio_unitario_fijo_ars is not None else None
+
+    return calcular
+
+
 @precios_especiales_bp.route('/descargar_plantilla_precios', methods=['GET'])
 @token_required
 @roles_required(ROLES['ADMIN'])
@@ -151,6 +192,8 @@ def descargar_plantilla_precios(current_user):
     - 'PRECIOS_ACTUALES': lista de precios especiales actualmente guardados (cliente, producto, precio en ARS).
 
     Esto facilita que el usuario descargue, corrija y vuelva a subir el archivo en el formato esperado.
+    Los precios actuales salen de una única consulta (clientes LEFT JOIN precios) que se
+    recorre en streaming y se vuelca a un workbook write-only de openpyxl.
     """
     try:
         # Hoja plantilla: columnas y ejemplos (Title Case para coincidir con la UI)
@@ -160,14 +203,13 @@ def descargar_plantilla_precios(current_user):
         plantilla_cols = ['Cliente', 'Producto', 'Precio', 'Moneda', 'Usar Precio Base', 'Margen Sobre Base']
         plantilla_ejemplo = [
             # Fila: precio fijo en ARS
-            {'Cliente': 'ACME S.A.', 'Producto': 'Detergente 1L', 'Precio': '1234.56', 'Moneda': 'ARS', 'Usar Precio Base': False, 'Margen Sobre Base': ''},
+            ['ACME S.A.', 'Detergente 1L', '1234.56', 'ARS', False, ''],
             # Fila: precio original en USD (se convertirá a ARS con TC 'Oficial')
-            {'Cliente': 'ACME S.A.', 'Producto': 'Shampoo 500ml', 'Precio': '10.00', 'Moneda': 'USD', 'Usar Precio Base': False, 'Margen Sobre Base': ''},
+            ['ACME S.A.', 'Shampoo 500ml', '10.00', 'USD', False, ''],
             # Fila: usar precio base del producto y aplicar 10% adicional
-            {'Cliente': 'ACME S.A.', 'Producto': 'Jabón Pastilla 50g', 'Precio': '', 'Moneda': '', 'Usar Precio Base': True, 'Margen Sobre Base': '0.10'},
-            {'Cliente': '', 'Producto': '', 'Precio': '', 'Moneda': '', 'Usar Precio Base': '', 'Margen Sobre Base': ''},
+            ['ACME S.A.', 'Jabón Pastilla 50g', '', '', True, '0.10'],
+            ['', '', '', '', '', ''],
         ]
-        df_plantilla = pd.DataFrame(plantilla_ejemplo, columns=plantilla_cols)
 
         # Hoja de instrucciones (una sola columna con texto multilínea)
         instrucciones = [
@@ -180,85 +222,72 @@ def descargar_plantilla_precios(current_user):
             "- Si un cliente tiene 2 precios especiales (p.ej. para dos presentaciones), agregue dos filas con el mismo Cliente y distinto Producto.",
             "- Evite columnas adicionales; mantenga los nombres tal cual. Puede incluir columnas vacías al final, pero no renombre columnas.",
             "- Guarde el archivo como .xlsx y súbalo usando el endpoint /precios_especiales/cargar_csv (o desde la UI si está disponible).",
+            "- 'Precio Vigente (ARS)' es informativo: el precio que se cobraría hoy según la regla (TC y precio base actuales).",
         ]
-        df_instrucciones = pd.DataFrame({'Notas': instrucciones})
-
-    # Hoja con precios actuales: incluir TODOS los clientes.
-    # - Si el cliente tiene precios especiales, añadir una fila por cada precio.
-    # - Si el cliente NO tiene precios especiales, añadir una sola fila con producto/precio/moneda vacíos.
-        precios = []
-        clientes_all = Cliente.query.order_by(Cliente.nombre_razon_social).all()
-        for c in clientes_all:
-            # obtener precios especiales del cliente (si los tiene)
-            precios_cliente = db.session.query(PrecioEspecialCliente).options(
-                joinedload(PrecioEspecialCliente.cliente),
-                joinedload(PrecioEspecialCliente.producto)
-            ).filter(PrecioEspecialCliente.cliente_id == c.id).all()
-
-            if precios_cliente:
-                for p in precios_cliente:
-                    precios.append({
-                        'cliente_id': p.cliente_id,
-                        'cliente': p.cliente.nombre_razon_social if p.cliente else (c.nombre_razon_social if c else None),
-                        'producto_id': p.producto_id,
-                        'producto': p.producto.nombre if p.producto else None,
-                        # precio en ARS (valor computado/guardado)
-                        'precio_ars': float(p.precio_unitario_fijo_ars) if p.precio_unitario_fijo_ars is not None else None,
-                        # campos nuevos
-                        'usar_precio_base': bool(getattr(p, 'usar_precio_base', False)),
-                        'margen_sobre_base': float(p.margen_sobre_base) if getattr(p, 'margen_sobre_base', None) is not None else None,
-                        # preservar moneda_original y precio_original para trazabilidad
-                        'moneda_original': p.moneda_original if hasattr(p, 'moneda_original') and p.moneda_original is not None else 'ARS',
-                        'precio_original': float(p.precio_original) if hasattr(p, 'precio_original') and p.precio_original is not None else None,
-                    })
-            else:
+
+        # Precio base calculado una vez por producto con reglas 'usar precio base'
+        productos_precio_base = [pid for (pid,) in db.session.query(PrecioEspecialCliente.producto_id).filter(
+            PrecioEspecialCliente.usar_precio_base.is_(True)
+        ).distinct()]
+        precio_vigente = calculadora_precios_ars_lote(productos_precio_base)
+
+        wb = Workbook(write_only=True)
+        hoja_plantilla = wb.create_sheet('PLANTILLA')
+        hoja_actuales = wb.create_sheet('PRECIOS_ACTUALES')
+        hoja_raw = wb.create_sheet('PRECIOS_ACTUALES_RAW')
+        hoja_instrucciones = wb.create_sheet('INSTRUCCIONES')
+
+        hoja_plantilla.append(plantilla_cols)
+        for fila in plantilla_ejemplo:
+            hoja_plantilla.append(fila)
+        hoja_instrucciones.append(['Notas'])
+        for linea in instrucciones:
+            hoja_instrucciones.append([linea])
+
+        # Hoja con precios actuales: incluir TODOS los clientes.
+        # - Si el cliente tiene precios especiales, añadir una fila por cada precio.
+        # - Si el cliente NO tiene precios especiales, añadir una sola fila con producto/precio/moneda vacíos.
+        hoja_actuales.append(['cliente_id', 'Cliente', 'producto_id', 'Producto', 'Precio (ARS)', 'Usar Precio Base',
+                              'Margen Sobre Base', 'Moneda Original', 'Precio Original', 'Precio Vigente (ARS)'])
+        hoja_raw.append(['cliente_id', 'cliente', 'producto_id', 'producto', 'precio_ars', 'usar_precio_base',
+                         'margen_sobre_base', 'moneda_original', 'precio_original', 'precio_vigente_ars'])
+        consulta = db.select(
+            Cliente.id.label('cliente_id'), Cliente.nombre_razon_social,
+            PrecioEspecialCliente.id.label('precio_id'), PrecioEspecialCliente.producto_id,
+            Producto.nombre.label('producto_nombre'), PrecioEspecialCliente.precio_unitario_fijo_ars,
+            PrecioEspecialCliente.usar_precio_base, PrecioEspecialCliente.margen_sobre_base,
+            PrecioEspecialCliente.moneda_original, PrecioEspecialCliente.precio_original,
+        ).select_from(Cliente).outerjoin(
+            PrecioEspecialCliente, PrecioEspecialCliente.cliente_id == Cliente.id
+        ).outerjoin(
+            Producto, Producto.id == PrecioEspecialCliente.producto_id
+        ).order_by(Cliente.nombre_razon_social, Producto.nombre).execution_options(yield_per=FILAS_POR_TANDA_PLANTILLA)
+
+        for r in db.session.execute(consulta):
+            if r.precio_id is None:
                 # Cliente sin precios especiales: una fila con producto/precio vacíos
-                precios.append({
-                    'cliente_id': c.id,
-                    'cliente': c.nombre_razon_social,
-                    'producto_id': None,
-                    'producto': '',
-                    'precio_ars': None,
-                    'usar_precio_base': False,
-                    'margen_sobre_base': None,
-                    'moneda_original': '',
-                    'precio_original': None
-                })
-
-        # Ordenar por cliente nombre y producto para facilitar la revisión
-        # Aseguramos columnas claras y Title Case para facilitar la lectura en Excel/UI
-        df_precios_actuales = pd.DataFrame(precios, columns=['cliente_id', 'cliente', 'producto_id', 'producto', 'precio_ars', 'usar_precio_base', 'margen_sobre_base', 'moneda_original', 'precio_original'])
-        # También creamos una vista con headers amigables (Title Case) que algunos usuarios esperan
-        df_precios_actuales_view = df_precios_actuales.rename(columns={
-            'cliente': 'Cliente',
-            'producto': 'Producto',
-            'precio_ars': 'Precio (ARS)',
-            'usar_precio_base': 'Usar Precio Base',
-            'margen_sobre_base': 'Margen Sobre Base',
-            'moneda_original': 'Moneda Original',
-            'precio_original': 'Precio Original'
-        })
-        df_precios_actuales.sort_values(by=['cliente', 'producto'], inplace=True)
-        df_precios_actuales.sort_values(by=['cliente', 'producto'], inplace=True)
+                fila = [r.cliente_id, r.nombre_razon_social, None, '', None, False, None, '', None, None]
+            else:
+                try:
+                    vigente = precio_vigente(r)
+                except Exception:
+                    vigente = None
+                fila = [
+                    r.cliente_id, r.nombre_razon_social, r.producto_id, r.producto_nombre,
+                    # precio en ARS (valor guardado)
+                    float(r.precio_unitario_fijo_ars) if r.precio_unitario_fijo_ars is not None else None,
+                    bool(r.usar_precio_base),
+                    float(r.margen_sobre_base) if r.margen_sobre_base is not None else None,
+                    # preservar moneda_original y precio_original para trazabilidad
+                    r.moneda_original if r.moneda_original is not None else 'ARS',
+                    float(r.precio_original) if r.precio_original is not None else None,
+                    float(vigente) if vigente is not None else None,
+                ]
+            hoja_actuales.append(fila)
+            hoja_raw.append(fila)
 
-        # Escribir a Excel en memoria
         output = io.BytesIO()
-        try:
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df_plantilla.to_excel(writer, sheet_name='PLANTILLA', index=False)
-                # Escribir la versión detallada con títulos amigables
-                df_precios_actuales_view.to_excel(writer, sheet_name='PRECIOS_ACTUALES', index=False)
-                # Mantener también una hoja con los datos 'raw' (IDs) para trazabilidad
-                df_precios_actuales.to_excel(writer, sheet_name='PRECIOS_ACTUALES_RAW', index=False)
-                df_instrucciones.to_excel(writer, sheet_name='INSTRUCCIONES', index=False)
-        except Exception:
-            # Fallback: intentar con xlsxwriter si openpyxl no está disponible
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                df_plantilla.to_excel(writer, sheet_name='PLANTILLA', index=False)
-                df_precios_actuales_view.to_excel(writer, sheet_name='PRECIOS_ACTUALES', index=False)
-                df_precios_actuales.to_excel(writer, sheet_name='PRECIOS_ACTUALES_RAW', index=False)
-                df_instrucciones.to_excel(writer, sheet_name='INSTRUCCIONES', index=False)
-
+        wb.save(output)
         output.seek(0)
         filename = 'plantilla_precios_especiales.xlsx'
         logger.info("[descargar_plantilla_precios] Usuario %s descargó plantilla/actuales", getattr(current_user, 'id', None))
@@ -411,6 +440,7 @@ def crear_precio_especial(current_user):
 @precios_especiales_bp.route('/obtener-todos', methods=['GET'])
 @token_required
 @roles_required(ROLES['ADMIN']) # O 'VENTAS', 'USER'?
+@cache_con_tags(TAG_PRECIOS_ESPECIALES, TAG_CLIENTES, TAG_PRODUCTOS, TAG_TIPOS_CAMBIO, query_string=True)
 def listar_precios_especiales(current_user):
     """Lista los precios especiales con filtros opcionales."""
     try:
@@ -461,6 +491,7 @@ def listar_precios_especiales(current_user):
 @precios_especiales_bp.route('/obtener-por-cliente/<int:client_id>', methods=['GET'])
 @token_required
 @roles_required(ROLES['ADMIN'], ROLES['VENTAS_PEDIDOS'])
+@cache_con_tags(TAG_PRECIOS_ESPECIALES, TAG_CLIENTES, TAG_PRODUCTOS, TAG_TIPOS_CAMBIO)
 def obtener_precio_especial(current_user, client_id):
     """Obtiene todos los precios especiales para un cliente por su ID.
 
@@ -1087,44 +1118,32 @@ def actualizar_precios_masivamente(current_user):
         factor_multiplicador = Decimal('1') + factor_porcentual
         
     try:
-        # --- 3. Consulta y Actualización (CON LÓGICA DE REDONDEO CONDICIONAL) ---
-        precios_a_actualizar = PrecioEspecialCliente.query.filter_by(activo=True).all()
-
-        if not precios_a_actualizar:
+        # --- 3. Ajuste en SQL por tramos de ids (ver utils.ajuste_precios_utils) ---
+        hay_activos = db.session.query(
+            PrecioEspecialCliente.query.filter_by(activo=True).exists()
+        ).scalar()
+        if not hay_activos:
             return jsonify({"message": "No hay precios especiales activos para actualizar."}), 200
 
-        updated_count = 0
-        for precio_esp in precios_a_actualizar:
-            if precio_esp.precio_unitario_fijo_ars is not None and precio_esp.precio_unitario_fijo_ars > 0:
-                precio_original = precio_esp.precio_unitario_fijo_ars
-                precio_calculado = precio_original * factor_multiplicador
-                
-                # --- LÓGICA DE REDONDEO MEJORADA ---
-                precio_final = None
-                aviso_redondeo = ""
-
-                if direccion == 'subida':
-                    # Para subidas, sí aplicamos el redondeo a la siguiente decena.
-                    precio_final, _ = redondear_a_siguiente_decena_simplificado(precio_calculado)
-                    aviso_redondeo = "Todos los precios fueron redondeados a la siguiente decena."
-                else: # direccion == 'bajada'
-                    # Para bajadas, simplemente redondeamos al centavo más cercano.
-                    # Redondear hacia arriba iría en contra del descuento.
-                    precio_final = precio_calculado.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-                    aviso_redondeo = "Los precios fueron ajustados al centavo más cercano."
-
-                precio_esp.precio_unitario_fijo_ars = precio_final
-                updated_count += 1
-        
-        # --- 4. Confirmación y Respuesta ---
-        if updated_count > 0:
-            db.session.commit()
+        ajuste = aplicar_ajuste_global(
+            porcentaje_decimal, direccion, factor_multiplicador,
+            usuario=getattr(current_user, 'nombre_usuario', None)
+        )
+        if direccion == 'subida':
+            aviso_redondeo = "Todos los precios fueron redondeados a la siguiente decena."
+        else:
+            # Redondear hacia arriba iría en contra del descuento
+            aviso_redondeo = "Los precios fueron ajustados al centavo más cercano."
+
+        # --- 4. Respuesta ---
+        if ajuste.total_precios > 0:
             return jsonify({
                 "message": "Actualización masiva completada exitosamente.",
-                "total_precios_actualizados": updated_count,
+                "total_precios_actualizados": ajuste.total_precios,
                 "porcentaje_ajuste": f"{porcentaje_decimal}%",
                 "direccion": direccion,
-                "aviso": aviso_redondeo
+                "aviso": aviso_redondeo,
+                "ajuste_id": ajuste.id
             }), 200
         else:
             return jsonify({"message": "No se realizaron cambios."}), 200
@@ -1134,8 +1153,44 @@ def actualizar_precios_masivamente(current_user):
         logger.exception("ERROR [actualizar_precios_masivamente]: Excepción durante actualización masiva")
         return jsonify({"error": "Error interno durante la actualización masiva."}), 500
 
- 
-    
+
+@precios_especiales_bp.route('/actualizar-global/ajustes', methods=['GET'])
+@token_required
+@roles_required(ROLES['ADMIN'])
+def listar_ajustes_globales(current_user):
+    """Últimos ajustes globales aplicados (para elegir cuál revertir)."""
+    limite = request.args.get('limite', 20, type=int)
+    ajustes = AjustePrecioEspecial.query.order_by(AjustePrecioEspecial.id.desc()).limit(max(1, min(limite, 200))).all()
+    return jsonify([a.to_dict() for a in ajustes]), 200
+
+
+@precios_especiales_bp.route('/actualizar-global/<int:ajuste_id>/revertir', methods=['POST'])
+@token_required
+@roles_required(ROLES['ADMIN'])
+def revertir_ajuste_global(current_user, ajuste_id):
+    """
+    Deshace un ajuste global devolviendo cada precio a su valor anterior. Los
+    precios modificados después del ajuste se dejan como están y se informan como omitidos.
+    """
+    ajuste = db.session.get(AjustePrecioEspecial, ajuste_id)
+    if not ajuste:
+        return jsonify({"error": f"Ajuste {ajuste_id} no encontrado."}), 404
+    try:
+        revertidos, omitidos = revertir_ajuste(ajuste)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception:
+        db.session.rollback()
+        logger.exception("ERROR [revertir_ajuste_global]: Excepción revirtiendo ajuste %s", ajuste_id)
+        return jsonify({"error": "Error interno al revertir el ajuste."}), 500
+    return jsonify({
+        "message": "Ajuste revertido.",
+        "total_precios_revertidos": revertidos,
+        "omitidos_por_cambios_posteriores": omitidos,
+        "ajuste": ajuste.to_dict()
+    }), 200
+
+
 @precios_especiales_bp.route('/cargar_csv', methods=['POST'])
 @token_required
 @roles_required(ROLES['ADMIN'])
@@ -1144,6 +1199,10 @@ def cargar_precios_desde_csv(current_user):
     [VERSIÓN CON LÓGICA DE TC SIMPLIFICADA]
     Crea/actualiza precios masivamente desde un CSV. Si la moneda es 'USD', siempre usa el TC Oficial.
     Detecta el delimitador y procesa todas las filas válidas, informando errores.
+    Con ?dry_run=true devuelve el diff (crear/actualizar) sin escribir nada.
+    Sin dry_run la carga corre en segundo plano: responde 202 con el trabajo y el
+    progreso por lote, el resumen y las filas con error se consultan en
+    /api/tipos_cambio/trabajos/<id> ('resultado' al terminar).
     """
     if 'archivo_precios' not in request.files:
         return jsonify({"error": "No se encontró el archivo. La clave debe ser 'archivo_precios'."}), 400
@@ -1224,19 +1283,6 @@ def cargar_precios_desde_csv(current_user):
                 engine='python'
             )
 
-        # Helpers para normalizar cabeceras, claves y parsing de precio
-        def normalize_text(s: str) -> str:
-            if s is None:
-                return ''
-            s2 = str(s).strip().lower()
-            # Remover tildes/diacríticos
-            s2 = ''.join(ch for ch in unicodedata.normalize('NFKD', s2) if not unicodedata.combining(ch))
-            # Remover caracteres no alfanuméricos salvo espacio
-            s2 = re.sub(r'[^a-z0-9 ]+', '', s2)
-            # Colapsar espacios
-            s2 = re.sub(r'\s+', ' ', s2).strip()
-            return s2
-
         # Mapeos de variantes de nombres de columna a nombre canónico
         column_variants = {
             'cliente': ['cliente', 'nombre', 'nombre razon social', 'razon social', 'razon_social', 'cliente nombre', 'cliente_nombre', 'nombre_cliente', 'customer', 'customer name', 'customer_name'],
@@ -1254,15 +1300,15 @@ def cargar_precios_desde_csv(current_user):
         column_variants['margen_sobre_base'] = ['margen sobre base', 'margen_sobre_base', 'margen', 'margen sobre', 'margen_sobre']
 
         def find_column(df_columns, targets):
-            cols_norm = {normalize_text(c): c for c in df_columns}
+            cols_norm = {normalizar_texto(c): c for c in df_columns}
             for t in targets:
-                t_norm = normalize_text(t)
+                t_norm = normalizar_texto(t)
                 if t_norm in cols_norm:
                     return cols_norm[t_norm]
             # fallback: try exact contains
             for norm, orig in cols_norm.items():
                 for t in targets:
-                    if normalize_text(t) in norm:
+                    if normalizar_texto(t) in norm:
                         return orig
             return None
 
@@ -1288,13 +1334,6 @@ def cargar_precios_desde_csv(current_user):
             if precio_col is None: missing.append('Precio')
             return jsonify({"error": f"El CSV debe contener las columnas (o variantes) requeridas: {', '.join(missing)}"}), 400
 
-        # Normalizar diccionarios de búsqueda de cliente/producto (más tolerante)
-        def normalize_key_name(name: str) -> str:
-            return normalize_text(str(name or ''))
-
-        clientes_db = {normalize_key_name(c.nombre_razon_social): c for c in Cliente.query.all()}
-        productos_db = {normalize_key_name(p.nombre): p for p in Producto.query.all()}
-
         # --- 3. PREPARACIÓN DE DATOS (CACHÉ) ---
         tc_oficial_obj = TipoCambio.query.filter_by(nombre='Oficial').first()
         if not tc_oficial_obj or not tc_oficial_obj.valor or tc_oficial_obj.valor <= 0:
@@ -1306,492 +1345,52 @@ def cargar_precios_desde_csv(current_user):
             logger.exception("Tipo de cambio 'Oficial' no convertible a Decimal: %s", tc_oficial_obj.valor)
             return jsonify({"error": "Tipo de cambio 'Oficial' inválido."}), 500
 
-        # clientes_db y productos_db fueron creados arriba con claves normalizadas (normalize_key_name)
-        precios_existentes = {(pe.cliente_id, pe.producto_id): pe for pe in PrecioEspecialCliente.query.all()}
-
-        # --- 4. PROCESAMIENTO DE FILAS ---
-        registros_creados = 0
-        registros_actualizados = 0
-        filas_ignoradas = 0  # Filas vacías / sin datos relevantes
-        contador_margen_explicito = 0
-        contador_margen_objetivo = 0
-        contador_fijo = 0
-        filas_fallidas = []
-        acciones_por_fila = []
-
-        def registrar_error(linea_num, cliente_raw, producto_raw, motivo):
-            filas_fallidas.append({
-                "linea": linea_num,
-                "cliente": cliente_raw,
-                "producto": producto_raw,
-                "motivo": motivo
-            })
-
-        # Función robusta para parsear precios con variantes (ej: "$1.234,56", "1,234.56", "1234.56", "1234,56")
-        def parse_price_to_decimal(raw: str):
-            if raw is None:
-                raise InvalidOperation("Precio vacío")
-            s = str(raw).strip()
-            if s == '':
-                raise InvalidOperation("Precio vacío")
-            # Remover símbolos de moneda comunes
-            s = re.sub(r'[\$€£]', '', s)
-            # Remover espacios y proteger guiones
-            s = s.replace('\u00A0', '').replace(' ', '')
-            # Si tiene coma y punto, inferir formato: si la última coma está después del último punto -> comma decimal
-            if ',' in s and '.' in s:
-                if s.rfind(',') > s.rfind('.'):
-                    # Ej: 1.234,56 -> remover puntos, reemplazar coma por punto
-                    s = s.replace('.', '').replace(',', '.')
-                else:
-                    # Ej: 1,234.56 -> remover comas
-                    s = s.replace(',', '')
-            else:
-                # Solo comas: 1234,56 -> reemplazar por punto
-                if ',' in s and '.' not in s:
-                    s = s.replace(',', '.')
-                # Solo punto: dejar como está
-            # Remover cualquier caracter que no sea dígito o punto
-            s = re.sub(r'[^0-9\.-]', '', s)
-            if s in ['', '.', '-']:
-                raise InvalidOperation("Formato de precio inválido")
-            return Decimal(s)
-
-        def parse_margin_to_decimal(raw: str):
-            if raw is None:
-                return None
-            s = str(raw).strip()
-            if s == '':
-                return None
-            # aceptar formatos: '0.10', '10%', '10'
-            s = s.replace('%', '').strip()
-            try:
-                val = Decimal(s)
-            except Exception:
-                # intentar reemplazos comunes
-                s2 = s.replace(',', '.')
-                try:
-                    val = Decimal(s2)
-                except Exception:
-                    raise InvalidOperation(f"Formato de margen inválido: {raw}")
-            # si el valor parece un porcentaje (>=1), convertir a fracción
-            if abs(val) > 1:
-                try:
-                    val = (val / Decimal('100'))
-                except Exception:
-                    pass
-            return val
-
-        def parse_bool_like(raw: str) -> bool:
-            if raw is None:
-                return False
-            s = str(raw).strip().lower()
-            # Aceptar variantes en inglés y español
-            true_values = {'1','true','t','si','sí','yes','y','verdadero','v','x'}
-            false_values = {'0','false','f','no','n','falso'}
-            if s in true_values:
-                return True
-            if s in false_values:
-                return False
-            # Si contiene al menos 'verdad' parcial también consideramos True
-            if 'verdad' in s:
-                return True
-            return False
-
-        # Aceptar variantes de moneda en columnas: 'ARS', 'USD', 'U$S', 'US$', 'peso', 'dolar', 'dólar'
-        moneda_aliases = {
-            'ars': 'ARS', 'peso': 'ARS', 'pesos': 'ARS', 'arg': 'ARS',
-            'usd': 'USD', 'u$s': 'USD', 'us$': 'USD', 'dolar': 'USD', 'dólar': 'USD', 'dollars': 'USD'
+        # --- 4. PIPELINE POR COLUMNAS (ver utils.importar_precios_utils) ---
+        columnas = {
+            'cliente': cliente_col, 'cliente_id': cliente_id_col,
+            'producto': producto_col, 'producto_id': producto_id_col,
+            'precio': precio_col, 'moneda': moneda_col,
+            'usar_precio_base': usar_precio_base_col, 'margen_sobre_base': margen_sobre_base_col,
         }
+        dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+        if not dry_run:
+            # El progreso por lote queda consultable en /api/tipos_cambio/trabajos/<id>. Si un
+            # lote falla, el trabajo queda en ERROR con las filas ya confirmadas en 'procesados'.
+            trabajo = crear_trabajo(TIPO_TRABAJO_CARGA_PRECIOS, len(df), usuario=getattr(current_user, 'nombre_usuario', None))
+            db.session.commit()
+            lanzar_trabajo(trabajo.id, importar_precios_especiales, df, columnas, valor_dolar_oficial)
+            return jsonify({
+                "status": "accepted",
+                "message": f"Carga de {len(df)} filas en curso.",
+                "trabajo_id": trabajo.id,
+                "trabajo": trabajo.to_dict()
+            }), 202
 
-        for index, row in df.iterrows():
-            linea_num = index + 2
-            # Soportar identificación por ID si viene en el Excel exportado
-            cliente_raw = None
-            producto_raw = None
-            cliente_id_val = None
-            producto_id_val = None
-            if cliente_id_col:
-                cliente_id_val = row.get(cliente_id_col, None)
-            if producto_id_col:
-                producto_id_val = row.get(producto_id_col, None)
-            if cliente_col:
-                cliente_raw = row.get(cliente_col, '')
-            if producto_col:
-                producto_raw = row.get(producto_col, '')
-            precio_raw = row.get(precio_col, '')
-            moneda_raw = row.get(moneda_col, '') if moneda_col else ''
-            modo_precio_raw = row.get(modo_precio_col, 'fijo') if modo_precio_col else 'fijo'
-
-            # Detectar fila totalmente vacía (blancos/None) para ignorarla silenciosamente
-            def vacio(v):
-                if v is None:
-                    return True
-                s = str(v).strip().lower()
-                return s == '' or s in {'none','null','-'}
-            # Capturar potenciales columnas extra de margen/base para decidir si es realmente vacía
-            usar_precio_base_val_tmp = row.get(usar_precio_base_col, None) if usar_precio_base_col else None
-            margen_sobre_base_val_tmp = row.get(margen_sobre_base_col, None) if margen_sobre_base_col else None
-            if all(vacio(v) for v in [cliente_raw, cliente_id_val, producto_raw, producto_id_val, precio_raw, moneda_raw, usar_precio_base_val_tmp, margen_sobre_base_val_tmp]):
-                filas_ignoradas += 1
-                try:
-                    logger.debug(f"[CSV DEBUG] Fila {linea_num} ignorada (vacía)")
-                except Exception:
-                    pass
-                continue
-
-            # NUEVO: Ignorar filas que tienen cliente y producto pero no aportan ninguna definición de precio
-            # (sin precio, sin usar_precio_base, sin margen). Son placeholders o filas que el usuario dejó incompletas.
-            if (not vacio(cliente_raw) or not vacio(cliente_id_val)) and (not vacio(producto_raw) or not vacio(producto_id_val)):
-                if vacio(precio_raw) and vacio(usar_precio_base_val_tmp) and vacio(margen_sobre_base_val_tmp):
-                    filas_ignoradas += 1
-                    try:
-                        logger.debug(f"[CSV DEBUG] Fila {linea_num} ignorada (cliente+producto sin precio ni modo)")
-                    except Exception:
-                        pass
-                    continue
-
-            # Resolver cliente/ producto por ID si vienen
-            cliente = None
-            producto = None
-            if cliente_id_val and str(cliente_id_val).strip() != '':
-                try:
-                    cid = int(float(cliente_id_val))
-                    cliente = db.session.get(Cliente, cid)
-                except Exception:
-                    cliente = None
-            else:
-                cliente_key = normalize_text(cliente_raw)
-                cliente = clientes_db.get(cliente_key)
-
-            if not cliente:
-                registrar_error(linea_num, cliente_raw or cliente_id_val, producto_raw or producto_id_val, f"Cliente '{cliente_raw or cliente_id_val}' no encontrado.")
-                acciones_por_fila.append({
-                    'linea': linea_num,
-                    'accion': 'error',
-                    'motivo': f"Cliente '{cliente_raw or cliente_id_val}' no encontrado.",
-                    'cliente': cliente_raw or cliente_id_val,
-                    'producto': producto_raw or producto_id_val
-                })
-                continue
-
-            if producto_id_val and str(producto_id_val).strip() != '':
-                try:
-                    pid = int(float(producto_id_val))
-                    producto = db.session.get(Producto, pid)
-                except Exception:
-                    producto = None
-            else:
-                producto_key = normalize_text(producto_raw)
-                producto = productos_db.get(producto_key)
-
-            if not producto:
-                registrar_error(linea_num, cliente_raw or cliente_id_val, producto_raw or producto_id_val, f"Producto '{producto_raw or producto_id_val}' no encontrado.")
-                acciones_por_fila.append({
-                    'linea': linea_num,
-                    'accion': 'error',
-                    'motivo': f"Producto '{producto_raw or producto_id_val}' no encontrado.",
-                    'cliente': cliente_raw or cliente_id_val,
-                    'producto': producto_raw or producto_id_val
-                })
-                continue
-
-            # Debug: registrar coincidencias para diagnósticos
-            try:
-                logger.info("[cargar_csv] fila=%s cliente_key=%s cliente_id=%s producto_key=%s producto_id=%s", linea_num, cliente_key, getattr(cliente, 'id', None), producto_key, getattr(producto, 'id', None))
-            except Exception:
-                logger.info("[cargar_csv] fila=%s cliente_key=%s producto_key=%s (no ids disponibles)", linea_num, cliente_key, producto_key)
-
-            moneda_norm = normalize_text(moneda_raw)
-            moneda_csv = moneda_aliases.get(moneda_norm, None) if moneda_norm else None
-            # Si no viene moneda, asumimos ARS
-            if moneda_csv is None:
-                moneda_csv = 'ARS'
-
-            if moneda_csv not in ['ARS', 'USD']:
-                registrar_error(linea_num, cliente_raw, producto_raw, f"Moneda '{moneda_raw}' no válida. Use 'ARS' o 'USD'.")
-                acciones_por_fila.append({
-                    'linea': linea_num,
-                    'accion': 'error',
-                    'motivo': f"Moneda '{moneda_raw}' no válida.",
-                    'cliente': cliente_raw,
-                    'producto': producto_raw,
-                    'moneda': moneda_raw
-                })
-                continue
-
-            # Primero leemos las columnas de margen para saber si es modo margen explícito
-            usar_precio_base_val = None
-            margen_sobre_base_val = None
-            if usar_precio_base_col:
-                usar_precio_base_val = row.get(usar_precio_base_col, None)
-            if margen_sobre_base_col:
-                margen_sobre_base_val = row.get(margen_sobre_base_col, None)
-
-            # Determinar si usará precio base
-            if usar_precio_base_val is not None and str(usar_precio_base_val).strip() != '':
-                parsed_bool = parse_bool_like(usar_precio_base_val)
-                if not parsed_bool:
-                    # Loguear si la cadena parece contener algo pero no se reconoció como true
-                    try:
-                        logger.debug(f"[CSV DEBUG] Valor no reconocido como TRUE para usar_precio_base: '{usar_precio_base_val}' (fila {linea_num})")
-                    except Exception:
-                        pass
-                usar_precio_base = parsed_bool
-            else:
-                usar_precio_base = False
-
-            # Verificar si es margen explícito (tiene margen y usar_precio_base=TRUE)
-            es_margen_explicito = (
-                usar_precio_base and
-                margen_sobre_base_val is not None and
-                str(margen_sobre_base_val).strip() != ''
-            )
-
-            # --- Nueva lógica de parsing de precio ---
-            # Problema reportado: Filas con usar_precio_base=TRUE + margen daban error "Precio vacío" porque
-            # se intentaba parsear el precio antes de considerar el modo margen. Ajustamos el flujo para:
-            # 1. Si usar_precio_base es TRUE:
-            #    a) Si hay margen explícito => ignorar precio (puede estar vacío)
-            #    b) Si NO hay margen pero sí un precio objetivo => parsear precio para calcular margen (CASO 2)
-            #    c) Si no hay margen ni precio => se validará más adelante (CASO 3) con mensaje específico
-            # 2. Si usar_precio_base es FALSE => precio obligatorio (modo fijo, como antes)
-
-            precio_original = None
-            if usar_precio_base:
-                if es_margen_explicito:
-                    # Modo margen explícito: ignoramos precio (puede estar vacío)
-                    precio_original = Decimal('0')
-                else:
-                    # Puede ser un precio objetivo para calcular margen (CASO 2) o estar vacío (CASO 3)
-                    if precio_raw is not None and str(precio_raw).strip() != '':
-                        try:
-                            precio_original = parse_price_to_decimal(precio_raw)
-                            if precio_original < 0:
-                                raise ValueError("Precio negativo")
-                        except (InvalidOperation, ValueError) as e:
-                            registrar_error(linea_num, cliente_raw, producto_raw, f"Precio objetivo '{precio_raw}' no es un número válido: {e}")
-                            acciones_por_fila.append({
-                                'linea': linea_num,
-                                'accion': 'error',
-                                'motivo': f"Precio objetivo '{precio_raw}' no es un número válido: {e}",
-                                'cliente': cliente_raw,
-                                'producto': producto_raw,
-                                'precio_raw': precio_raw
-                            })
-                            continue
-                    else:
-                        # Dejamos precio_original en 0 para que CASO 3 valide falta de margen y precio
-                        precio_original = Decimal('0')
-            else:
-                # Modo fijo: precio obligatorio
-                try:
-                    precio_original = parse_price_to_decimal(precio_raw)
-                    if precio_original < 0:
-                        raise ValueError("Precio negativo")
-                except (InvalidOperation, ValueError) as e:
-                    registrar_error(linea_num, cliente_raw, producto_raw, f"Precio '{precio_raw}' no es un número válido: {e}")
-                    acciones_por_fila.append({
-                        'linea': linea_num,
-                        'accion': 'error',
-                        'motivo': f"Precio '{precio_raw}' no es un número válido: {e}",
-                        'cliente': cliente_raw,
-                        'producto': producto_raw,
-                        'precio_raw': precio_raw
-                    })
-                    continue
-
-            # --- LÓGICA DE CONVERSIÓN Y REGISTRO DE MONEDA ---
-            # Normalizar modo_precio
-            modo_precio = 'margen' if normalize_text(modo_precio_raw) == 'margen' else 'fijo'
-
-            # Debug: mostrar valores leídos para filas con margen
-            if margen_sobre_base_val is not None and str(margen_sobre_base_val).strip() != '':
-                logger.info(f"[CSV DEBUG] Fila {linea_num} - margen_sobre_base_val: '{margen_sobre_base_val}' (tipo: {type(margen_sobre_base_val)})")
-
-            margen_sobre_base_calculado = None
-            precio_final_ars = None
-            precio_original_guardado = precio_original
-            moneda_original_guardada = moneda_csv
-            
-            if usar_precio_base:
-                # MODO MARGEN: Usar el precio base del producto con margen
-                try:
-                    # CASO 1: Margen explícito - Prioridad máxima
-                    if margen_sobre_base_val is not None and str(margen_sobre_base_val).strip() != '':
-                        try:
-                            margen_sobre_base_calculado = parse_margin_to_decimal(margen_sobre_base_val)
-                            precio_final_ars = Decimal('0')  # Modo margen: precio se calcula dinámicamente
-                            # En este caso, precio_original puede ser 0 (vacío) - no importa
-                            logger.info(f"[CSV] Fila {linea_num}: Margen explícito {margen_sobre_base_calculado}")
-                            contador_margen_explicito += 1
-                        except Exception as e:
-                            raise ValueError(f"Margen sobre base inválido: {e}")
-                    
-                    # CASO 2: Precio objetivo - Calcular margen automáticamente
-                    elif precio_original is not None and precio_original > 0:
-                        from ..utils.precios_utils import calculate_price
-
-                        # 1. Calcular precio base usando la función de cálculo para cantidad = 1
-                        resultado_calculo = calculate_price(producto.id, 1, cliente_id=None, db=db)
-                        if resultado_calculo.get('status') != 'success':
-                            raise ValueError(f"Error en cálculo de precio: {resultado_calculo.get('message', 'Unknown error')}")
-
-                        # 2. Obtener precio base del producto en ARS
-                        precio_base_ars = Decimal(str(resultado_calculo.get('precio_unitario_ars', '0')))
-                        if precio_base_ars <= 0:
-                            raise ValueError("El precio base del producto es cero o negativo, no se puede calcular margen.")
-
-                        # 3. Convertir precio objetivo a ARS
-                        precio_objetivo_ars = precio_original * valor_dolar_oficial if moneda_csv == 'USD' else precio_original
-
-                        # 4. Redondear el precio objetivo al múltiplo de 100 más cercano
-                        precio_objetivo_ars = Decimal(round(float(precio_objetivo_ars) / 100) * 100)
-
-                        # 5. Calcular el margen necesario para llegar al precio objetivo
-                        margen_sobre_base_calculado = (precio_objetivo_ars / precio_base_ars) - Decimal('1')
-                        precio_final_ars = Decimal('0')  # Modo margen: precio se calcula dinámicamente
-                        
-                        logger.info(f"[CSV] Fila {linea_num}: Margen calculado {margen_sobre_base_calculado} para precio objetivo {precio_objetivo_ars}")
-                        contador_margen_objetivo += 1
-                    
-                    # CASO 3: Error - usar_precio_base=TRUE pero sin margen ni precio
-                    else:
-                        raise ValueError("Para usar precio base debe especificar un margen en 'Margen Sobre Base' o un precio objetivo")
-
-                except Exception as e:
-                    registrar_error(linea_num, cliente_raw, producto_raw, f"Error en modo margen: {e}")
-                    acciones_por_fila.append({
-                        'linea': linea_num,
-                        'accion': 'error',
-                        'motivo': f"Error en modo margen: {e}",
-                        'cliente': cliente_raw,
-                        'producto': producto_raw
-                    })
-                    continue # Saltar a la siguiente fila
-            else:
-                # MODO FIJO: Precio fijo tradicional
-                if precio_original is None or precio_original <= 0:
-                    registrar_error(linea_num, cliente_raw, producto_raw, "Precio requerido para modo precio fijo")
-                    acciones_por_fila.append({
-                        'linea': linea_num,
-                        'accion': 'error',
-                        'motivo': "Precio requerido para modo precio fijo",
-                        'cliente': cliente_raw,
-                        'producto': producto_raw
-                    })
-                    continue
-                    
-                if moneda_csv == 'USD':
-                    precio_final_ars = precio_original * valor_dolar_oficial
-                else:
-                    precio_final_ars = precio_original
-                contador_fijo += 1
-
-            # --- VALIDACIÓN DE RANGO PARA EVITAR OVERFLOW EN NUMERIC(15,4) ---
-            # precision=15, scale=4 => máximo entero permitido: 11 dígitos ( < 100_000_000_000 )
-            if precio_final_ars is not None:
-                try:
-                    entero_abs = abs(precio_final_ars.quantize(Decimal('1')))
-                    if entero_abs >= Decimal('100000000000'):  # 1e11 => 12 dígitos o overflow
-                        registrar_error(
-                            linea_num,
-                            cliente_raw,
-                            producto_raw,
-                            f"Precio resultante {precio_final_ars} excede el límite permitido (máx < 100000000000). Verifique formato (separadores de miles / tipo de cambio)."
-                        )
-                        acciones_por_fila.append({
-                            'linea': linea_num,
-                            'accion': 'error',
-                            'motivo': f"Precio final fuera de rango para la columna NUMERIC(15,4): {precio_final_ars}",
-                            'cliente': cliente_raw,
-                            'producto': producto_raw,
-                            'precio_final_ars': str(precio_final_ars)
-                        })
-                        continue
-                except Exception:
-                    registrar_error(
-                        linea_num,
-                        cliente_raw,
-                        producto_raw,
-                        f"No se pudo validar rango de precio {precio_final_ars}."
-                    )
-                    acciones_por_fila.append({
-                        'linea': linea_num,
-                        'accion': 'error',
-                        'motivo': "Error validando rango de precio",
-                        'cliente': cliente_raw,
-                        'producto': producto_raw,
-                        'precio_final_ars': str(precio_final_ars)
-                    })
-                    continue
-
-            # Lógica de creación/actualización
-            precio_esp_existente = precios_existentes.get((cliente.id, producto.id))
-
-            if precio_esp_existente:
-                # Actualizar
-                precio_esp_existente.usar_precio_base = usar_precio_base
-                precio_esp_existente.margen_sobre_base = margen_sobre_base_calculado
-                precio_esp_existente.precio_unitario_fijo_ars = precio_final_ars
-                precio_esp_existente.moneda_original = moneda_original_guardada
-                precio_esp_existente.precio_original = precio_original_guardado
-                precio_esp_existente.tipo_cambio_usado = valor_dolar_oficial if moneda_csv == 'USD' else None
-                precio_esp_existente.activo = True
-                registros_actualizados += 1
-                # (logging y acciones_por_fila omitidos por brevedad)
-            else:
-                # Crear nuevo
-                nuevo_precio_esp = PrecioEspecialCliente(
-                    cliente_id=cliente.id,
-                    producto_id=producto.id,
-                    usar_precio_base=usar_precio_base,
-                    margen_sobre_base=margen_sobre_base_calculado,
-                    precio_unitario_fijo_ars=precio_final_ars,
-                    moneda_original=moneda_original_guardada,
-                    precio_original=precio_original_guardado,
-                    tipo_cambio_usado=valor_dolar_oficial if moneda_csv == 'USD' else None,
-                    activo=True
-                )
-                db.session.add(nuevo_precio_esp)
-                precios_existentes[(cliente.id, producto.id)] = nuevo_precio_esp
-                registros_creados += 1
-                # (logging y acciones_por_fila omitidos por brevedad)
-        
-        # --- 5. COMMIT Y RESPUESTA FINAL ---
-        db.session.commit()
-        
-        summary = {
-            "creados": registros_creados,
-            "actualizados": registros_actualizados,
-            "errores": len(filas_fallidas),
-            "ignoradas": filas_ignoradas,
-            "modos": {
-                "margen_explicito": contador_margen_explicito,
-                "margen_objetivo": contador_margen_objetivo,
-                "fijo": contador_fijo
-            }
-        }
+        resultado = importar_precios_especiales(None, df, columnas, valor_dolar_oficial, aplicar=False)
 
-        debug_mode = request.args.get('debug', 'false').lower() == 'true'
+        # --- 5. RESPUESTA FINAL ---
+        summary = resultado['summary']
+        filas_fallidas = resultado['failed_rows']
         if filas_fallidas:
             payload = {
                 "status": "completed_with_errors",
-                "message": f"Proceso completado. Se procesaron {registros_creados + registros_actualizados} registros, pero {len(filas_fallidas)} filas tuvieron errores.",
+                "message": f"Proceso completado. Se procesaron {summary['creados'] + summary['actualizados']} registros, pero {len(filas_fallidas)} filas tuvieron errores.",
                 "summary": summary,
                 "failed_rows": filas_fallidas
             }
-            if debug_mode:
-                payload['acciones_por_fila'] = acciones_por_fila
-            return jsonify(payload), 207
+            status_code = 207
         else:
             payload = {
                 "status": "success", "message": "Carga masiva completada exitosamente sin errores.",
                 "summary": summary
             }
-            if debug_mode:
-                payload['acciones_por_fila'] = acciones_por_fila
-            return jsonify(payload), 200
+            status_code = 200
+        payload['dry_run'] = True
+        payload['diff'] = resultado['diff']
+        payload['message'] = "Simulación: no se escribieron cambios. " + payload['message']
+        if request.args.get('debug', 'false').lower() == 'true':
+            payload['acciones_por_fila'] = [dict(fila, accion='error') for fila in filas_fallidas]
+        return jsonify(payload), status_code
 
     except pd.errors.ParserError as e:
         logger.exception("Error de parser al leer CSV: %s", e)
@@ -1,11 +1,10 @@
 # app/blueprints/productos.py
 
 from flask import Blueprint, request, jsonify, make_response, current_app, send_file
-from app import cache
 # Ajusta el import de db y modelos según tu estructura final.
 # Si __init__.py está en 'app/' y este archivo está en 'app/blueprints/', '..' es correcto.
 from .. import db, models
-from ..models import Producto, TipoCambio, Receta, RecetaItem, Cliente, PrecioEspecialCliente, DetalleOrdenCompra, DetalleVenta, ComboComponente # Importa TODOS los modelos necesarios
+from ..models import Producto, TipoCambio, Receta, RecetaItem, Cliente, PrecioEspecialCliente, DetalleOrdenCompra, DetalleVenta, ComboComponente, CategoriaProducto # Importa TODOS los modelos necesarios
 # Ajusta la ruta a tu módulo core de calculadora
 from ..calculator.core import obtener_coeficiente_por_rango
 from decimal import Decimal, InvalidOperation, DivisionByZero, ROUND_HALF_UP, ROUND_CEILING
@@ -14,6 +13,7 @@ import datetime
 import math
 import os
 import threading
+from functools import wraps
 import jwt
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment
@@ -21,6 +21,9 @@ from io import BytesIO # Para
 import logging
 from ..utils.decorators import token_required, roles_required
 from ..utils.permissions import ROLES
+from ..utils.indice_productos_utils import indice_productos, LIMITE_BUSQUEDA
+from ..utils.cache_utils import cache_con_tags, etag_por_tags, TAG_PRODUCTOS
+from ..utils.serializadores_utils import Proyeccion, a_float, a_iso
 
 # Crear el Blueprint para productos
 productos_bp = Blueprint('productos', __name__, url_prefix='/api/productos')
@@ -96,15 +99,32 @@ def _sincronizar_costos_recetas_si_corresponde():
     finally:
         _SYNC_COSTOS_LOCK.release()
 
+
+def _con_sync_costos_recetas(vista):
+    """
+    Corre la sincronización de costos de recetas antes de la caché/ETag del
+    listado: si cambia algún costo, su commit invalida TAG_PRODUCTOS y la
+    respuesta se arma de nuevo en lugar de servir la copia cacheada.
+    """
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        _sincronizar_costos_recetas_si_corresponde()
+        return vista(*args, **kwargs)
+    return envoltura
+
 # --- Función de Cálculo de Costo en Moneda de Referencia (USD) ---
 # En app/blueprints/productos.py
 
-def calcular_costo_producto_referencia(producto_id: int, visited=None) -> Decimal:
+def calcular_costo_producto_referencia(producto_id: int, visited=None, memo=None) -> Decimal:
     """
     Calcula el costo en USD por UNIDAD DE VENTA (VERSIÓN CORREGIDA).
     Esta versión asume que el 'costo_referencia_usd' de un producto base
     YA ES un costo unitario y no lo divide por la referencia.
+    'memo' (dict opcional) reutiliza costos ya resueltos entre llamadas, p. ej.
+    ingredientes compartidos por varias recetas de una misma venta.
     """
+    if memo is not None and producto_id in memo:
+        return memo[producto_id]
     if visited is None:
         visited = set()
     if producto_id in visited:
@@ -129,7 +149,7 @@ def calcular_costo_producto_referencia(producto_id: int, visited=None) -> Decima
             items_receta = receta.items.all() if hasattr(receta.items, 'all') else receta.items
             for item in items_receta:
                 if item.ingrediente_id:
-                    costo_ingrediente_unitario = calcular_costo_producto_referencia(item.ingrediente_id, visited.copy())
+                    costo_ingrediente_unitario = calcular_costo_producto_referencia(item.ingrediente_id, visited.copy(), memo)
                     porcentaje_item = Decimal(item.porcentaje or '0.0')
                     costo_final_unitario_usd += costo_ingrediente_unitario * (porcentaje_item / Decimal(100))
     
@@ -138,7 +158,40 @@ def calcular_costo_producto_referencia(producto_id: int, visited=None) -> Decima
     visited.remove(producto_id)
     
     # 4. Devolvemos la variable única, que siempre tendrá el valor correcto.
-    return costo_final_unitario_usd.quantize(Decimal("0.0001"))
+    costo_final_unitario_usd = costo_final_unitario_usd.quantize(Decimal("0.0001"))
+    if memo is not None:
+        memo[producto_id] = costo_final_unitario_usd
+    return costo_final_unitario_usd
+
+
+def resolver_costos_momento_ars(producto_ids, memo=None) -> dict:
+    """
+    Costo unitario en ARS "al momento" para varios productos: costo USD de referencia
+    por el TC 'Oficial' (si ajusta_por_tc) o 'Empresa', igual que el precio dinámico.
+    Lee productos y tipos de cambio una sola vez y comparte 'memo' entre recetas.
+    Devuelve {producto_id: (costo_unitario_ars, tc_usado)}; omite los que no se pueden calcular.
+    """
+    ids = {pid for pid in producto_ids if pid}
+    if not ids:
+        return {}
+    if memo is None:
+        memo = {}
+
+    tcs = {tc.nombre: tc.valor for tc in TipoCambio.query.filter(TipoCambio.nombre.in_(['Oficial', 'Empresa'])).all()}
+    productos = Producto.query.filter(Producto.id.in_(ids)).all()
+
+    costos = {}
+    for producto in productos:
+        tc_valor = tcs.get('Oficial' if producto.ajusta_por_tc else 'Empresa')
+        if not tc_valor or tc_valor <= 0:
+            continue
+        try:
+            costo_usd = calcular_costo_producto_referencia(producto.id, memo=memo)
+        except ValueError:
+            continue
+        tc_valor = Decimal(str(tc_valor))
+        costos[producto.id] = ((costo_usd * tc_valor).quantize(Decimal("0.0001"), ROUND_HALF_UP), tc_valor)
+    return costos
 
 # --- Función auxiliar para convertir Producto a Dict (Ajustada) ---
 def producto_a_dict(producto):
@@ -164,6 +217,39 @@ def producto_a_dict(producto):
     }
 
 
+def _completar_categoria(datos):
+    categoria_id = datos['_categoria_id']
+    datos['categoria'] = {"id": categoria_id, "nombre": datos['_categoria_nombre']} if categoria_id is not None else None
+
+
+# Misma salida que producto_a_dict leyendo solo columnas (listados completos del catálogo)
+PROYECCION_PRODUCTO = Proyeccion(
+    ('id', Producto.id),
+    ('nombre', Producto.nombre),
+    ('categoria_id', Producto.categoria_id),
+    ('_categoria_id', CategoriaProducto.id),
+    ('_categoria_nombre', CategoriaProducto.nombre),
+    ('unidad_venta', Producto.unidad_venta),
+    ('tipo_calculo', Producto.tipo_calculo),
+    ('ref_calculo', Producto.ref_calculo),
+    ('margen', Producto.margen, a_float),
+    ('costo_referencia_usd', Producto.costo_referencia_usd, a_float),
+    ('es_receta', Producto.es_receta),
+    ('activo', Producto.activo),
+    ('ajusta_por_tc', Producto.ajusta_por_tc),
+    ('fecha_actualizacion_costo', Producto.fecha_actualizacion_costo, a_iso),
+    completar=_completar_categoria,
+)
+
+
+def listar_productos_proyectados(solo_activos=False):
+    """Todos los productos (o solo los activos) ordenados por nombre, como dicts de producto_a_dict."""
+    query = PROYECCION_PRODUCTO.consulta().outerjoin(CategoriaProducto, Producto.categoria_id == CategoriaProducto.id)
+    if solo_activos:
+        query = query.filter(Producto.activo == True)
+    return PROYECCION_PRODUCTO.lista(query.order_by(Producto.nombre))
+
+
 @productos_bp.route('/actualizar_costos_por_aumento', methods=['POST'])
 @token_required 
 def actualizar_costos_por_aumento(current_user):
@@ -375,19 +461,14 @@ def obtener_productos_paginado_activos():
         return jsonify({"error": "Error interno del servidor al obtener productos"}), 500
 
 @productos_bp.route('/obtener_todos', methods=['GET'])
-@cache.cached(timeout=240)
+@_con_sync_costos_recetas
+@etag_por_tags(TAG_PRODUCTOS)
+@cache_con_tags(TAG_PRODUCTOS)
 def obtener_productos():
     """Obtiene una lista de todos los productos."""
     try:
-        _sincronizar_costos_recetas_si_corresponde()
-        # Considerar añadir paginación para listas potencialmente largas
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        productos_paginados = Producto.query.order_by(Producto.nombre).paginate(page=page, per_page=per_page, error_out=False)
-        productos = productos_paginados.items
-        #pagination_info = {...} # Añadir info de paginación a la respuesta
-        productos = Producto.query.order_by(Producto.nombre).all()
-        return jsonify([producto_a_dict(p) for p in productos]), 200
+        # Lista completa (para paginar usar /obtener_todos_paginado), solo las columnas serializadas
+        return jsonify(listar_productos_proyectados()), 200
     except Exception as e:
         print(f"ERROR: Excepción inesperada al obtener productos")
         traceback.print_exc()
@@ -395,22 +476,37 @@ def obtener_productos():
 
 
 @productos_bp.route('/obtener_todos_activos', methods=['GET'])
+@_con_sync_costos_recetas
+@etag_por_tags(TAG_PRODUCTOS)
+@cache_con_tags(TAG_PRODUCTOS)
 def obtener_productos_activos():
     """Obtiene una lista de todos los productos."""
     try:
-        # Considerar añadir paginación para listas potencialmente largas
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        productos_paginados = Producto.query.order_by(Producto.nombre).paginate(page=page, per_page=per_page, error_out=False)
-        productos = productos_paginados.items
-        #pagination_info = {...} # Añadir info de paginación a la respuesta
-        productos = Producto.query.order_by(Producto.nombre).all()
-        return jsonify([producto_a_dict(p) for p in productos if p.activo]), 200
+        # Lista completa (para paginar usar /obtener_todos_paginado_activos), filtrada en SQL
+        return jsonify(listar_productos_proyectados(solo_activos=True)), 200
     except Exception as e:
         print(f"ERROR: Excepción inesperada al obtener productos")
         traceback.print_exc()
         return jsonify({"error": "Error interno del servidor al obtener productos"}), 500
 
+@productos_bp.route('/buscar', methods=['GET'])
+def buscar_productos():
+    """
+    Typeahead de productos: top-k por prefijo de palabra del nombre (o del código)
+    desde el índice en memoria del proceso, sin descargar el catálogo completo.
+    Parámetros: q, limite (1-100, default 20), activos=true para excluir inactivos.
+    """
+    texto = request.args.get('q', default='', type=str)
+    limite = max(1, min(request.args.get('limite', default=LIMITE_BUSQUEDA, type=int), 100))
+    solo_activos = request.args.get('activos', default='false', type=str).lower() == 'true'
+    try:
+        indice_productos.asegurar_vigente()
+        resultados = indice_productos.buscar(texto, limite=limite, solo_activos=solo_activos)
+        return jsonify({"productos": resultados, "total": len(resultados)}), 200
+    except Exception:
+        logger.exception("ERROR [buscar_productos]: q=%s", texto)
+        return jsonify({"error": "Error interno del servidor al buscar productos"}), 500
+
 @productos_bp.route('/obtener/<int:producto_id>', methods=['GET'])
 def obtener_producto(producto_id):
     """Obtiene los detalles de un producto específico por su ID."""
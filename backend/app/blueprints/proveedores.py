@@ -5,6 +5,7 @@ from .. import db
 from ..models import Proveedor  # Importamos desde el models.py raíz
 from sqlalchemy.exc import IntegrityError
 import traceback # Para logs de errores más detallados
+from ..utils.cache_utils import cache_con_tags, etag_por_tags, TAG_PROVEEDORES
 
 # Creamos el Blueprint
 # url_prefix es clave para organizar las rutas de la API.
@@ -76,6 +77,8 @@ def crear_proveedor():
 # Endpoint: GET /api/v1/proveedores
 # También podría aceptar parámetros de paginación o filtros (ej. ?nombre=...)
 @proveedores_bp.route('/obtener-todos', methods=['GET'])
+@etag_por_tags(TAG_PROVEEDORES)
+@cache_con_tags(TAG_PROVEEDORES)
 def obtener_proveedores():
     """Obtiene una lista de todos los proveedores."""
     try:
@@ -311,20 +314,10 @@ def buscar_proveedor_por_cuit():
 # Historial de movimientos del proveedor (deuda/pagos)
 @proveedores_bp.route('/movimientos/<int:proveedor_id>', methods=['GET'])
 def movimientos_proveedor(proveedor_id):
-    from ..models import MovimientoProveedor
-    prov = Proveedor.query.get(proveedor_id)
-    if not prov:
-        return jsonify({'error': 'Proveedor no encontrado'}), 404
-    ms = MovimientoProveedor.query.filter_by(proveedor_id=proveedor_id).order_by(MovimientoProveedor.fecha.desc()).all()
-    return jsonify([
-        {
-            'id': m.id,
-            'orden_id': m.orden_id,
-            'tipo': m.tipo,
-            'monto': float(m.monto),
-            'fecha': m.fecha.isoformat() if m.fecha else None,
-            'descripcion': m.descripcion,
-            'usuario': m.usuario
-        } for m in ms
-    ])
+    """
+    Mismo estado de cuenta que /api/finanzas/proveedores/<id>/estado-cuenta:
+    orden cronológico, saldo acumulado y paginación por keyset (limit/cursor).
+    """
+    from .finanzas import respuesta_estado_cuenta
+    return respuesta_estado_cuenta(proveedor_id)
     
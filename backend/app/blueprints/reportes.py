@@ -26,8 +26,8 @@ from openpyxl.utils import get_column_letter
 # --- Imports locales ---
 from .. import db
 from ..models import DetalleVenta # Asegúrate de importar DetalleVenta si no está
-from ..models import Venta, OrdenCompra, Receta, RecetaItem
-from ..models import Producto, TipoCambio
+from ..models import Venta, OrdenCompra, Proveedor, Receta, RecetaItem
+from ..models import Producto, TipoCambio, VentaResumenDiario
 from ..calculator.core import obtener_coeficiente_por_rango
 from .productos import calcular_costo_producto_referencia
 from .productos import redondear_a_siguiente_decena, redondear_a_siguiente_centena
@@ -76,6 +76,18 @@ def _monto_oc_a_ars(oc: OrdenCompra, monto: Decimal) -> Decimal:
         tc = Decimal('1.0')
     return (base * tc).quantize(Decimal('0.01'))
 
+
+def _expresion_monto_oc_ars(columna):
+    """Equivalente SQL de _monto_oc_a_ars(oc, columna), para agregar sin cargar las órdenes."""
+    monto = func.coalesce(columna, 0)
+    tc = case((OrdenCompra.tc_transaccion > 0, OrdenCompra.tc_transaccion), else_=1)
+    return case((OrdenCompra.ajuste_tc == True, func.round(monto * tc, 2)), else_=monto)  # noqa: E712
+
+
+# Órdenes que todavía pueden tener saldo con el proveedor. RECIBIDO (recibida y
+# paga) y RECHAZADO quedan afuera: son el histórico cerrado que más crece.
+ESTADOS_OC_ABIERTOS = ['SOLICITADO', 'APROBADO', 'EN_ESPERA_RECEPCION', 'RECIBIDA_PARCIAL', 'CON DEUDA']
+
 @reportes_bp.route('/movimientos-excel', methods=['GET'])
 @token_required
 @roles_required(ROLES['ADMIN'], ROLES['CONTABLE']) # Ajustado para permitir ADMIN, CONTABLE y VENTAS_PEDIDOS
@@ -564,188 +576,115 @@ def exportar_formulas_a_excel(current_user):
 
 
 def _get_kpis_del_dia(fecha_seleccionada: date):
-    # (Las variables base_query_puerta y base_query_pedido deben definirse antes de usarse)
-    """Calcula y devuelve los KPIs específicos del día seleccionado."""
-    filtro_dia_entrega = func.date(Venta.fecha_pedido) == fecha_seleccionada
-
-    # Mejorar el cálculo de ventas de puerta: solo ventas de mostrador, sin cliente y sin estado cancelado/anulado
-    base_query_puerta = db.session.query(Venta).filter(
-    filtro_dia_entrega,
-        Venta.cliente_id.is_(None)
-    )
-
-    # Unidades por forma de pago (cuenta de ventas)
-    puerta_efectivo_unidades = base_query_puerta.filter(Venta.forma_pago == 'efectivo').count()
-    puerta_transferencia_unidades = base_query_puerta.filter(Venta.forma_pago == 'transferencia').count()
-    puerta_factura_unidades = base_query_puerta.filter(Venta.forma_pago == 'factura').count()
-
-    # Sumar el monto final redondeado de cada venta de puerta
-    ventas_puerta = db.session.query(Venta).filter(
-    filtro_dia_entrega,
-        Venta.cliente_id.is_(None)
-    ).all()
-    ingreso_puerta_hoy = sum(
-        Decimal(math.ceil((v.monto_final_redondeado or Decimal('0.0')) / 100) * 100)
-        for v in ventas_puerta
-    )
-
-    # Desglose de puerta por forma de pago (MONTOS)
-    puerta_efectivo = db.session.query(func.sum(Venta.monto_final_redondeado)).filter(
-    filtro_dia_entrega,
-        Venta.cliente_id.is_(None),
-        Venta.forma_pago == 'efectivo'
-    ).scalar() or Decimal('0.0')
-    puerta_transferencia = db.session.query(func.sum(Venta.monto_final_redondeado)).filter(
-    filtro_dia_entrega,
-        Venta.cliente_id.is_(None),
-        Venta.forma_pago == 'transferencia'
-    ).scalar() or Decimal('0.0')
-    puerta_factura = db.session.query(func.sum(Venta.monto_final_redondeado)).filter(
-    filtro_dia_entrega,
-        Venta.cliente_id.is_(None),
-        Venta.forma_pago == 'factura'
-    ).scalar() or Decimal('0.0')
-
-    def estado_de_venta(nombre_vendedor):
-        if not nombre_vendedor:
-            return ''
-        partes = nombre_vendedor.split('-', 1)
-        estado = partes[0].strip().upper()
-        return estado
-
-    ventas_pedido = db.session.query(Venta).filter(
-        filtro_dia_entrega,
-        Venta.cliente_id.isnot(None)
-    ).all()
-    ventas_pedido_filtradas = [v for v in ventas_pedido if estado_de_venta(v.nombre_vendedor) != 'CANCELADO']
-    base_query_pedido = db.session.query(Venta).filter(
-        filtro_dia_entrega,
-        Venta.cliente_id.isnot(None)
-    )
-    pedido_efectivo_unidades = base_query_pedido.filter(Venta.forma_pago == 'efectivo').count()
-    pedido_transferencia_unidades = base_query_pedido.filter(Venta.forma_pago == 'transferencia').count()
-    pedido_factura_unidades = base_query_pedido.filter(Venta.forma_pago == 'factura').count()
-    ingreso_pedido_hoy = sum(
-        Decimal(v.monto_final_redondeado or 0)
-        for v in ventas_pedido_filtradas
-    )
-
-    # Desglose de pedidos por forma de pago (MONTOS)
-    pedido_efectivo = sum(
-        Decimal(v.monto_final_redondeado or 0)
-        for v in ventas_pedido_filtradas if v.forma_pago == 'efectivo'
-    )
-    pedido_transferencia = sum(
-        Decimal(v.monto_final_redondeado or 0)
-        for v in ventas_pedido_filtradas if v.forma_pago == 'transferencia'
-    )
-    pedido_factura = sum(
-        Decimal(v.monto_final_redondeado or 0)
-        for v in ventas_pedido_filtradas if v.forma_pago == 'factura'
-    )
-
-    # KPIs de pedidos listos para entregar: si no hay columna estado, no se puede filtrar por 'Listo'.
-    pedidos_listos_cantidad = 0
-    cantidad_total_listos = 0
+    """
+    Calcula y devuelve los KPIs específicos del día seleccionado.
+    Se leen del resumen diario (ventas_resumen_diario): a lo sumo una fila por
+    canal × forma de pago × estado, sin recorrer las ventas del día.
+    """
+    R = VentaResumenDiario
+    es_puerta = R.canal == 'puerta'
+    es_pedido = R.canal == 'pedido'
+    pedido_vigente = and_(es_pedido, R.estado != 'CANCELADO')
+    formas_pago = ('efectivo', 'transferencia', 'factura')
+
+    columnas = [
+        # La puerta se redondea venta a venta a la centena superior
+        func.sum(case((es_puerta, R.monto_centena))).label('ingreso_puerta'),
+        func.sum(case((pedido_vigente, R.monto))).label('ingreso_pedido'),
+    ]
+    for forma in formas_pago:
+        es_forma = R.forma_pago == forma
+        columnas += [
+            func.sum(case((and_(es_puerta, es_forma), R.monto))).label(f'puerta_{forma}'),
+            func.sum(case((and_(pedido_vigente, es_forma), R.monto))).label(f'pedido_{forma}'),
+            # Las unidades cuentan todas las ventas, también los pedidos cancelados
+            func.sum(case((and_(es_puerta, es_forma), R.unidades))).label(f'puerta_{forma}_unidades'),
+            func.sum(case((and_(es_pedido, es_forma), R.unidades))).label(f'pedido_{forma}_unidades'),
+        ]
+
+    fila = db.session.query(*columnas).filter(R.fecha == fecha_seleccionada).one()
 
     def redondear_100(valor):
+        valor = Decimal(str(valor or 0))
         return (valor // 100 * 100) if valor == 0 else ((valor + 99) // 100 * 100)
 
-    return {
-        "ingreso_puerta_hoy": redondear_100(ingreso_puerta_hoy),
-        "ingreso_pedido_hoy": redondear_100(ingreso_pedido_hoy),
-        "pedidos_listos_para_entregar": pedidos_listos_cantidad,
-        "cantidad_total_listos": cantidad_total_listos,
-        "puerta_efectivo": redondear_100(puerta_efectivo),
-        "puerta_transferencia": redondear_100(puerta_transferencia),
-        "puerta_factura": redondear_100(puerta_factura),
-        "pedido_efectivo": redondear_100(pedido_efectivo),
-        "pedido_transferencia": redondear_100(pedido_transferencia),
-        "pedido_factura": redondear_100(pedido_factura),
-        "puerta_efectivo_unidades": puerta_efectivo_unidades,
-        "puerta_transferencia_unidades": puerta_transferencia_unidades,
-        "puerta_factura_unidades": puerta_factura_unidades,
-        "pedido_efectivo_unidades": pedido_efectivo_unidades,
-        "pedido_transferencia_unidades": pedido_transferencia_unidades,
-        "pedido_factura_unidades": pedido_factura_unidades,
+    kpis = {
+        "ingreso_puerta_hoy": redondear_100(fila.ingreso_puerta),
+        "ingreso_pedido_hoy": redondear_100(fila.ingreso_pedido),
+        # Sin columna de estado no se puede filtrar por 'Listo para entregar'
+        "pedidos_listos_para_entregar": 0,
+        "cantidad_total_listos": 0,
     }
+    for forma in formas_pago:
+        kpis[f"puerta_{forma}"] = redondear_100(getattr(fila, f'puerta_{forma}'))
+    for forma in formas_pago:
+        kpis[f"pedido_{forma}"] = redondear_100(getattr(fila, f'pedido_{forma}'))
+    for canal in ('puerta', 'pedido'):
+        for forma in formas_pago:
+            clave = f"{canal}_{forma}_unidades"
+            kpis[clave] = int(getattr(fila, clave) or 0)
+    return kpis
 
 def _get_kpis_entregas_manana(fecha_seleccionada: date):
-    """Calcula y devuelve los KPIs de entregas para el día siguiente."""
-    fecha_siguiente = fecha_seleccionada + timedelta(days=1)
-    
-    # --- CORRECCIÓN FINAL v2.6 ---
-    # Se ha confirmado que la columna correcta en el modelo Venta es 'fecha_pedido'.
-    COLUMNA_FECHA_ENTREGA = Venta.fecha_pedido
-    
-    pedidos_pendientes_manana = db.session.query(Venta).filter(
-        func.date(COLUMNA_FECHA_ENTREGA) == fecha_siguiente,
-        Venta.cliente_id.isnot(None)
-    ).count()
-    kgs_manana = db.session.query(func.sum(DetalleVenta.cantidad)).join(Venta, Venta.id == DetalleVenta.venta_id).filter(
-        func.date(COLUMNA_FECHA_ENTREGA) == fecha_siguiente,
-        Venta.cliente_id.isnot(None)
-    ).scalar() or Decimal('0.0')
+    """
+    Calcula y devuelve los KPIs de entregas para el día siguiente: pedidos con
+    cliente y fecha de pedido mañana, leídos del resumen diario.
+    """
+    R = VentaResumenDiario
+    fila = db.session.query(
+        func.sum(R.unidades).label('pedidos'),
+        func.sum(R.kgs).label('kgs'),
+    ).filter(R.fecha == fecha_seleccionada + timedelta(days=1), R.canal == 'pedido').one()
 
     return {
-        "pedidos_pendientes_manana": pedidos_pendientes_manana,
-        "kgs_manana": kgs_manana
+        "pedidos_pendientes_manana": int(fila.pedidos or 0),
+        "kgs_manana": Decimal(str(fila.kgs or 0))
     }
 
 def _get_kpis_de_compras():
-    """Calcula y devuelve los KPIs globales de compras y proveedores."""
-    ordenes = db.session.query(OrdenCompra).all()
-    deuda_proveedores = Decimal('0.0')
-    compras_por_recibir = Decimal('0.0')
-
-    for oc in ordenes:
-        total_ars = _monto_oc_a_ars(oc, oc.importe_total_estimado or Decimal('0.0'))
-        abonado_ars = _monto_oc_a_ars(oc, oc.importe_abonado or Decimal('0.0'))
-        deuda_oc = total_ars - abonado_ars
-        deuda_proveedores += deuda_oc
-        if (oc.estado or '').upper() == 'APROBADO':
-            compras_por_recibir += total_ars
-        
+    """
+    Calcula y devuelve los KPIs globales de compras y proveedores.
+    Un solo agregado SQL sobre las órdenes abiertas (filtro por estado indexado),
+    con la conversión a ARS resuelta en la consulta.
+    """
+    total_ars = _expresion_monto_oc_ars(OrdenCompra.importe_total_estimado)
+    abonado_ars = _expresion_monto_oc_ars(OrdenCompra.importe_abonado)
+    fila = db.session.query(
+        func.sum(total_ars - abonado_ars).label('deuda'),
+        func.sum(case((func.upper(OrdenCompra.estado) == 'APROBADO', total_ars), else_=0)).label('por_recibir'),
+    ).filter(OrdenCompra.estado.in_(ESTADOS_OC_ABIERTOS)).one()
+
     return {
-        "deuda_proveedores": deuda_proveedores,
-        "compras_por_recibir": compras_por_recibir
+        "deuda_proveedores": Decimal(str(fila.deuda or 0)),
+        "compras_por_recibir": Decimal(str(fila.por_recibir or 0))
     }
 
 def _get_kpis_del_mes(fecha_seleccionada: date):
-    """Calcula y devuelve los KPIs acumulados del mes hasta la fecha seleccionada."""
-    filtro_mes_actual = and_(
-        func.date(Venta.fecha_registro) >= fecha_seleccionada.replace(day=1),
-        func.date(Venta.fecha_registro) <= fecha_seleccionada
-    )
-    
-    # Obtener tipos de cambio para cálculo de costos
-    tc_oficial = TipoCambio.query.filter_by(nombre='Oficial').first()
-    tc_empresa = TipoCambio.query.filter_by(nombre='Empresa').first()
-
-    # Primero obtener todas las ventas del periodo EXCLUYENDO las canceladas
-    ventas_del_mes = db.session.query(Venta).filter(filtro_mes_actual).all()
-    ventas_no_canceladas = [v for v in ventas_del_mes if _extraer_estado_nombre_vendedor(v.nombre_vendedor) != 'CANCELADO']
-
-    ventas_mes_total = sum((v.monto_final_redondeado or Decimal('0.0')) for v in ventas_no_canceladas)
-
-    # Ingresos por puerta/pedidos y efectivo/otros
-    ingresos_puerta_mes = sum((v.monto_final_redondeado or Decimal('0.0')) for v in ventas_no_canceladas if v.cliente_id is None)
-    ingresos_pedidos_mes = sum((v.monto_final_redondeado or Decimal('0.0')) for v in ventas_no_canceladas if v.cliente_id is not None)
-    ingresos_efectivo_mes = sum((v.monto_final_redondeado or Decimal('0.0')) for v in ventas_no_canceladas if (v.forma_pago or '').strip().lower() == 'efectivo')
+    """
+    Calcula y devuelve los KPIs acumulados del mes (por fecha de registro) hasta
+    la fecha seleccionada. Suma filas del resumen diario: los costos variables
+    son cantidad × costo_unitario_momento_ars, el costo fijado al registrar
+    cada venta.
+    """
+    R = VentaResumenDiario
+    # Costos: las líneas sin costo resuelto no suman
+    totales = db.session.query(
+        func.sum(R.monto).label('total'),
+        func.sum(case((R.canal == 'puerta', R.monto), else_=0)).label('puerta'),
+        func.sum(case((R.canal == 'pedido', R.monto), else_=0)).label('pedidos'),
+        func.sum(case((func.lower(func.trim(R.forma_pago)) == 'efectivo', R.monto), else_=0)).label('efectivo'),
+        func.sum(R.costo).label('costo'),
+    ).filter(
+        R.fecha_registro.between(fecha_seleccionada.replace(day=1), fecha_seleccionada),
+        R.estado != 'CANCELADO',
+    ).one()
+
+    ventas_mes_total = Decimal(str(totales.total or 0))
+    ingresos_puerta_mes = Decimal(str(totales.puerta or 0))
+    ingresos_pedidos_mes = Decimal(str(totales.pedidos or 0))
+    ingresos_efectivo_mes = Decimal(str(totales.efectivo or 0))
     ingresos_otros_mes = ventas_mes_total - ingresos_efectivo_mes
-
-    # Calcular costos variables sumando costo real por detalle
-    costos_variables_mes = Decimal('0.0')
-    for v in ventas_no_canceladas:
-        for det in v.detalles:
-            try:
-                costo_unitario_usd = calcular_costo_producto_referencia(det.producto_id) or Decimal('0.0')
-                tc = tc_oficial if det.producto and det.producto.ajusta_por_tc else tc_empresa
-                tc_val = tc.valor if tc and tc.valor else Decimal('0.0')
-                costos_variables_mes += costo_unitario_usd * (det.cantidad or Decimal('0.0')) * tc_val
-            except Exception:
-                # Si falla el cálculo de costo de un producto, saltar y continuar
-                continue
+    costos_variables_mes = Decimal(str(totales.costo or 0))
 
     ganancia_bruta_mes = ventas_mes_total - costos_variables_mes
 
@@ -838,29 +777,26 @@ def get_dashboard_kpis(current_user):
 @roles_required(ROLES['ADMIN'], ROLES['CONTABLE'], ROLES['VENTAS_LOCAL'])
 def get_caja_del_dia(current_user):
     """
-    [NUEVO] Endpoint simple que devuelve el total de ventas del día actual,
-    desglosado por forma de pago.
+    [NUEVO] Endpoint simple que devuelve el total de ventas del día actual
+    (por fecha de registro), desglosado por forma de pago. Lee el resumen diario.
     """
     # Usar 'date' y 'datetime' importados directamente
     fecha_str = request.args.get('fecha', date.today().isoformat())
 
     try:
         fecha = date.fromisoformat(fecha_str)
-        start_of_day = datetime.combine(fecha, time.min)
-        end_of_day = datetime.combine(fecha, time.max)
     except ValueError:
         return jsonify({"error": "Formato de fecha inválido. Use YYYY-MM-DD."}), 400
         
     try:
-        ventas_del_dia = db.session.query(Venta).filter(
-            Venta.fecha_registro.between(start_of_day, end_of_day)
-        ).all() 
+        R = VentaResumenDiario
+        filas = db.session.query(R.forma_pago, func.sum(R.monto)).filter(
+            R.fecha_registro == fecha
+        ).group_by(R.forma_pago).having(func.sum(R.unidades) > 0).all()
 
         caja = defaultdict(Decimal)
-        for venta in ventas_del_dia:
-            forma_pago = venta.forma_pago or "Otro"
-            monto = venta.monto_final_redondeado or Decimal('0.0')
-            caja[forma_pago] += monto
+        for forma_pago, monto in filas:
+            caja[forma_pago or "Otro"] += Decimal(str(monto or 0))
         
         # Convertir a float para JSON
         caja_float = {k: float(v) for k, v in caja.items()}
@@ -968,6 +904,66 @@ def get_dashboard_kpis_lite(current_user):
         traceback.print_exc()
         return jsonify({"error": "Error interno al generar KPIs ligeros.", "detalle": str(e)}), 500
 
+# --- Resumen de ventas por rango (desde ventas_resumen_diario) ---
+@reportes_bp.route('/resumen-ventas', methods=['GET'])
+@token_required
+@roles_required(ROLES['ADMIN'], ROLES['CONTABLE'])
+def get_resumen_ventas(current_user):
+    """
+    Totales de ventas entre 'desde' y 'hasta' (YYYY-MM-DD, por fecha de pedido),
+    agrupados por canal, forma de pago y estado. Suma filas del resumen diario:
+    el costo no depende de cuántas ventas haya en el rango.
+    """
+    try:
+        hoy = date.today()
+        fecha_desde = date.fromisoformat(request.args.get('desde', hoy.replace(day=1).isoformat()))
+        fecha_hasta = date.fromisoformat(request.args.get('hasta', hoy.isoformat()))
+    except ValueError:
+        return jsonify({"error": "Formato de fecha inválido. Use YYYY-MM-DD."}), 400
+    if fecha_desde > fecha_hasta:
+        return jsonify({"error": "'desde' no puede ser posterior a 'hasta'."}), 400
+
+    try:
+        R = VentaResumenDiario
+        filas = db.session.query(
+            R.canal, R.forma_pago, R.estado,
+            func.sum(R.monto), func.sum(R.monto_con_recargos),
+            func.sum(R.unidades), func.sum(R.kgs), func.sum(R.costo),
+        ).filter(
+            R.fecha.between(fecha_desde, fecha_hasta)
+        ).group_by(R.canal, R.forma_pago, R.estado).order_by(R.canal, R.forma_pago, R.estado).all()
+
+        grupos = [
+            {
+                "canal": canal,
+                "forma_pago": forma_pago,
+                "estado": estado,
+                "monto": float(monto or 0),
+                "monto_con_recargos": float(monto_con_recargos or 0),
+                "unidades": int(unidades or 0),
+                "kgs": float(kgs or 0),
+                "costo": float(costo or 0),
+            }
+            for canal, forma_pago, estado, monto, monto_con_recargos, unidades, kgs, costo in filas
+        ]
+        # Los totales excluyen ventas canceladas
+        vigentes = [g for g in grupos if g["estado"] != 'CANCELADO']
+        return jsonify({
+            "desde": fecha_desde.isoformat(),
+            "hasta": fecha_hasta.isoformat(),
+            "grupos": grupos,
+            "totales": {
+                "monto": sum(g["monto"] for g in vigentes),
+                "unidades": sum(g["unidades"] for g in vigentes),
+                "kgs": sum(g["kgs"] for g in vigentes),
+                "costo": sum(g["costo"] for g in vigentes),
+            }
+        })
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": "Error interno al generar el resumen de ventas.", "detalle": str(e)}), 500
+
 # --- Reporte de Faltantes por Orden (Excel) ---
 @reportes_bp.route('/orden/<int:orden_id>/faltantes-excel', methods=['GET'])
 @token_required
@@ -1056,12 +1052,26 @@ def ordenes_pendientes_vencimientos(current_user):
     try:
         hoy = date.today()
         estados_pendientes = ['APROBADO', 'EN_ESPERA_RECEPCION', 'RECIBIDA_PARCIAL', 'CON DEUDA']
-        ordenes = db.session.query(OrdenCompra).options(selectinload(OrdenCompra.proveedor)).filter(OrdenCompra.estado.in_(estados_pendientes)).all()
+        # Solo las columnas del reporte; montos ya convertidos a ARS en SQL
+        ordenes = db.session.query(
+            OrdenCompra.id,
+            OrdenCompra.nro_solicitud_interno,
+            OrdenCompra.estado,
+            OrdenCompra.fecha_creacion,
+            OrdenCompra.fecha_aprobacion,
+            OrdenCompra.forma_pago,
+            _expresion_monto_oc_ars(OrdenCompra.importe_total_estimado).label('monto_total'),
+            _expresion_monto_oc_ars(OrdenCompra.importe_abonado).label('monto_pagado'),
+            Proveedor.nombre.label('proveedor_nombre'),
+            Proveedor.condiciones_pago,
+        ).outerjoin(Proveedor, Proveedor.id == OrdenCompra.proveedor_id).filter(
+            OrdenCompra.estado.in_(estados_pendientes)
+        ).all()
 
         resultados = []
         for oc in ordenes:
-            proveedor_nombre = oc.proveedor.nombre if oc.proveedor else ''
-            condiciones = oc.proveedor.condiciones_pago if oc.proveedor else None
+            proveedor_nombre = oc.proveedor_nombre or ''
+            condiciones = oc.condiciones_pago
             dias_str = ''
             if condiciones:
                 for ch in condiciones:
@@ -1075,10 +1085,8 @@ def ordenes_pendientes_vencimientos(current_user):
             dias_restantes = (fecha_venc - hoy).days
             prioridad = 'critico' if dias_restantes <= 0 else ('alto' if dias_restantes <= 3 else ('medio' if dias_restantes <= 7 else 'bajo'))
 
-            monto_total = oc.importe_total_estimado or Decimal('0.0')
-            monto_pagado = oc.importe_abonado or Decimal('0.0')
-            monto_total = _monto_oc_a_ars(oc, monto_total)
-            monto_pagado = _monto_oc_a_ars(oc, monto_pagado)
+            monto_total = Decimal(str(oc.monto_total or 0))
+            monto_pagado = Decimal(str(oc.monto_pagado or 0))
             deuda = monto_total - monto_pagado
 
             resultados.append({
@@ -0,0 +1,84 @@
+# app/blueprints/sync.py
+"""
+Sincronización incremental de catálogos para frontends y POS offline.
+
+GET /api/sync/cambios?desde=<version> devuelve, por entidad, el estado actual de
+lo creado o modificado después de 'desde' y los ids eliminados, más la versión
+a usar en el próximo pedido. Sin 'desde' solo informa la versión vigente (para
+arrancar después de una carga completa de los catálogos).
+"""
+from flask import Blueprint, request, jsonify
+from sqlalchemy.orm import joinedload
+import logging
+
+from .. import db
+from ..models import Producto, Cliente, PrecioEspecialCliente, TipoCambio
+from ..utils.decorators import token_required
+from ..utils.sincronizacion_utils import (
+    cambios_desde, version_actual, CAMBIOS_POR_PAGINA,
+    ENTIDAD_PRODUCTOS, ENTIDAD_CLIENTES, ENTIDAD_PRECIOS_ESPECIALES, ENTIDAD_TIPOS_CAMBIO,
+)
+from .productos import producto_a_dict
+from .clientes import cliente_a_diccionario
+from .precios_especiales import precio_especial_a_dict
+from .tipos_cambio import tipo_cambio_a_dict
+
+sync_bp = Blueprint('sync', __name__, url_prefix='/api/sync')
+logger = logging.getLogger(__name__)
+
+IDS_POR_CONSULTA = 1000
+
+# entidad -> (modelo, opciones de carga, serializador)
+SERIALIZADORES_SYNC = {
+    ENTIDAD_PRODUCTOS: (Producto, (joinedload(Producto.categoria),), producto_a_dict),
+    ENTIDAD_CLIENTES: (Cliente, (), cliente_a_diccionario),
+    ENTIDAD_PRECIOS_ESPECIALES: (
+        PrecioEspecialCliente,
+        (joinedload(PrecioEspecialCliente.cliente), joinedload(PrecioEspecialCliente.producto)),
+        precio_especial_a_dict,
+    ),
+    ENTIDAD_TIPOS_CAMBIO: (TipoCambio, (), tipo_cambio_a_dict),
+}
+
+
+def _estado_actual(entidad, ids):
+    """(serializados, eliminados): lo que todavía existe y los ids que ya no."""
+    modelo, opciones, serializar = SERIALIZADORES_SYNC[entidad]
+    ids = sorted(ids)
+    encontrados = []
+    for inicio in range(0, len(ids), IDS_POR_CONSULTA):
+        lote = ids[inicio:inicio + IDS_POR_CONSULTA]
+        encontrados.extend(modelo.query.options(*opciones).filter(modelo.id.in_(lote)).order_by(modelo.id))
+    existentes = {obj.id for obj in encontrados}
+    return [serializar(obj) for obj in encontrados], [i for i in ids if i not in existentes]
+
+
+@sync_bp.route('/cambios', methods=['GET'])
+@token_required
+def obtener_cambios(current_user):
+    """
+    Parámetros: desde (versión ya sincronizada por el cliente), limite (cambios
+    por página, 1-CAMBIOS_POR_PAGINA). Si 'hay_mas' es true, repetir con
+    desde=<version> devuelta.
+    """
+    desde = request.args.get('desde', type=int)
+    limite = max(1, min(request.args.get('limite', default=CAMBIOS_POR_PAGINA, type=int), CAMBIOS_POR_PAGINA))
+    if desde is None:
+        if request.args.get('desde'):
+            return jsonify({"error": "El parámetro 'desde' debe ser un entero."}), 400
+        return jsonify({"version": version_actual(), "hay_mas": False, "cambios": {}}), 200
+    if desde < 0:
+        return jsonify({"error": "El parámetro 'desde' no puede ser negativo."}), 400
+
+    try:
+        ids_por_entidad, version, hay_mas = cambios_desde(desde, limite)
+        cambios = {}
+        for entidad in SERIALIZADORES_SYNC:
+            ids = ids_por_entidad.get(entidad)
+            if ids:
+                actualizados, eliminados = _estado_actual(entidad, ids)
+                cambios[entidad] = {"actualizados": actualizados, "eliminados": eliminados}
+        return jsonify({"version": version, "hay_mas": hay_mas, "cambios": cambios}), 200
+    except Exception:
+        logger.exception("ERROR [obtener_cambios]: desde=%s", desde)
+        return jsonify({"error": "Error interno al obtener los cambios"}), 500
@@ -1,9 +1,14 @@
 # blueprints/tipos_cambio.py
 from flask import Blueprint, request, jsonify
-from ..models import TipoCambio
+from ..models import TipoCambio, TrabajoSegundoPlano
 from decimal import Decimal, InvalidOperation
 import traceback
+from sqlalchemy import func, and_
+from sqlalchemy.orm import selectinload
 from .. import db
+from ..utils.trabajos_utils import crear_trabajo, lanzar_trabajo, registrar_progreso
+from ..utils.cache_utils import cache_con_tags, etag_por_tags, invalidar_tags, TAG_TIPOS_CAMBIO, TAG_PRECIOS_ESPECIALES
+from ..utils.sincronizacion_utils import registrar_cambios_consulta, ENTIDAD_PRECIOS_ESPECIALES
 
 # --- Imports de Seguridad ---
 from ..utils.decorators import token_required, roles_required
@@ -12,53 +17,97 @@ from ..utils.permissions import ROLES # Importar diccionario de roles
 tipos_cambio_bp = Blueprint('tipos_cambio', __name__, url_prefix='/api/tipos_cambio')
 
 
-def _estado_upper(estado):
-    return str(estado or '').strip().upper()
+# Estados de OC que no se tocan al cambiar el dólar
+ESTADOS_OC_EXCLUIDOS_TC = ('RECHAZADO', 'CANCELADO', 'CANCELADA')
+# OCs por lote en el recálculo de deuda (una carga de OCs + items + débitos por lote)
+OCS_POR_LOTE = 200
+# Hasta este número de OCs el recálculo va en el mismo request; por encima, en segundo plano
+MAX_OCS_RECALCULO_SINCRONICO = 50
+TIPO_TRABAJO_DEUDA_OCS = 'RECALCULO_DEUDA_OC_TC'
 
 
-def _recalcular_deuda_oc_en_ars(orden_db, tc_actualizado):
-    """Recalcula el DEBITO usando la misma regla que el módulo de compras (ARS según TC de la orden)."""
-    try:
-        from ..blueprints.compras import _actualizar_movimiento_deuda
-
-        # `tc_actualizado` ya se asignó en `oc.tc_transaccion` antes de llamar aquí.
-        _actualizar_movimiento_deuda(
-            orden_db,
-            usuario_actualiza="Sistema",
-            descripcion=(
-                f"OC {orden_db.id} - Deuda recalculada por actualización de dólar compras "
-                f"(TC {tc_actualizado})"
-            ),
-        )
-    except Exception:
-        # No cortar el proceso masivo por una orden puntual.
-        pass
+def _filtro_ocs_pendientes_por_dolar():
+    """OCs con ajuste por TC que no estén anuladas."""
+    from ..models import OrdenCompra
+
+    # Solo excluir anuladas: en RECIBIDO puede seguir habiendo deuda en USD y debe
+    # expresarse en ARS según el DolarCompras vigente (no dejar montos "congelados").
+    estado = func.upper(func.trim(func.coalesce(OrdenCompra.estado, '')))
+    return and_(OrdenCompra.ajuste_tc.is_(True), estado.notin_(ESTADOS_OC_EXCLUIDOS_TC))
+
+
+def _actualizar_precios_especiales_usd(nuevo_valor):
+    """Reprecia en un solo UPDATE los precios especiales cargados en USD. Devuelve las filas tocadas."""
+    from ..models import PrecioEspecialCliente
+
+    filtro = (PrecioEspecialCliente.moneda_original == 'USD', PrecioEspecialCliente.precio_original.isnot(None))
+    actualizados = db.session.query(PrecioEspecialCliente).filter(*filtro).update({
+        PrecioEspecialCliente.precio_unitario_fijo_ars: PrecioEspecialCliente.precio_original * nuevo_valor,
+        PrecioEspecialCliente.tipo_cambio_usado: nuevo_valor,
+    }, synchronize_session=False)
+    registrar_cambios_consulta(ENTIDAD_PRECIOS_ESPECIALES, PrecioEspecialCliente.id, *filtro)
+    return actualizados
 
 
 def _actualizar_ocs_pendientes_por_dolar(nuevo_valor):
-    """Actualiza tc_transaccion y deuda para OCs abiertas en USD."""
+    """Fija tc_transaccion en un solo UPDATE para las OCs abiertas en USD. Devuelve sus ids."""
     from ..models import OrdenCompra
 
-    # Solo excluir anuladas: en RECIBIDO puede seguir habiendo deuda en USD y debe
-    # expresarse en ARS según el DolarCompras vigente (no dejar montos "congelados").
-    estados_excluidos = {'RECHAZADO', 'CANCELADO', 'CANCELADA'}
-    ocs = OrdenCompra.query.filter(
-        OrdenCompra.ajuste_tc.is_(True)
-    ).all()
+    filtro = _filtro_ocs_pendientes_por_dolar()
+    orden_ids = [oid for (oid,) in db.session.query(OrdenCompra.id).filter(filtro).order_by(OrdenCompra.id)]
+    if orden_ids:
+        db.session.query(OrdenCompra).filter(filtro).update(
+            {OrdenCompra.tc_transaccion: nuevo_valor}, synchronize_session=False
+        )
+    return orden_ids
 
-    ocs_actualizadas = 0
-    deudas_recalculadas = 0
 
-    for oc in ocs:
-        if _estado_upper(getattr(oc, 'estado', None)) in estados_excluidos:
-            continue
+def _recalcular_lote_deudas(orden_ids, tc_actualizado):
+    """Recalcula el DEBITO de un lote de OCs con la regla de compras (ARS según TC de la orden)."""
+    from ..models import OrdenCompra, MovimientoProveedor
+    from ..blueprints.compras import _actualizar_movimiento_deuda
 
-        oc.tc_transaccion = nuevo_valor
-        ocs_actualizadas += 1
-        _recalcular_deuda_oc_en_ars(oc, nuevo_valor)
-        deudas_recalculadas += 1
+    ocs = OrdenCompra.query.options(selectinload(OrdenCompra.items)).filter(
+        OrdenCompra.id.in_(orden_ids)
+    ).populate_existing().all()
+    debitos_por_orden = {}
+    for mov in MovimientoProveedor.query.filter(
+        MovimientoProveedor.orden_id.in_(orden_ids), MovimientoProveedor.tipo == 'DEBITO'
+    ).order_by(MovimientoProveedor.id):
+        debitos_por_orden.setdefault(mov.orden_id, mov)
 
-    return ocs_actualizadas, deudas_recalculadas
+    recalculadas = 0
+    for oc in ocs:
+        try:
+            _actualizar_movimiento_deuda(
+                oc,
+                usuario_actualiza="Sistema",
+                descripcion=(
+                    f"OC {oc.id} - Deuda recalculada por actualización de dólar compras "
+                    f"(TC {tc_actualizado})"
+                ),
+                debitos_por_orden=debitos_por_orden,
+            )
+            recalculadas += 1
+        except Exception as e:
+            # No cortar el proceso masivo por una orden puntual.
+            print(f"Error recalculando deuda de OC {oc.id}: {e}")
+    return recalculadas
+
+
+def recalcular_deudas_ocs(trabajo_id, orden_ids, tc_actualizado):
+    """
+    Tarea de segundo plano: recalcula deudas por lotes de OCS_POR_LOTE con un
+    commit por lote, registrando el avance en el trabajo.
+    """
+    tc_actualizado = Decimal(str(tc_actualizado))
+    recalculadas = 0
+    for inicio in range(0, len(orden_ids), OCS_POR_LOTE):
+        lote = orden_ids[inicio:inicio + OCS_POR_LOTE]
+        recalculadas += _recalcular_lote_deudas(lote, tc_actualizado)
+        registrar_progreso(trabajo_id, inicio + len(lote))
+        db.session.commit()
+    return recalculadas
 
 @tipos_cambio_bp.route('/crear', methods=['POST'])
 @token_required
@@ -91,6 +140,8 @@ def crear_tipo_cambio(current_user):
         return jsonify({"error": "Error interno"}), 500
 
 @tipos_cambio_bp.route('/obtener_todos', methods=['GET'])
+@etag_por_tags(TAG_TIPOS_CAMBIO)
+@cache_con_tags(TAG_TIPOS_CAMBIO)
 def obtener_tipos_cambio():
     tipos = TipoCambio.query.order_by(TipoCambio.nombre).all()
     return jsonify([tipo_cambio_a_dict(tc) for tc in tipos])
@@ -130,33 +181,42 @@ def actualizar_tipo_cambio(current_user, nombre):
 
         tc.valor = nuevo_valor
 
-        # --- Actualizar precios especiales en USD ---
-        from ..models import PrecioEspecialCliente
-        precios_usd = PrecioEspecialCliente.query.filter_by(moneda_original='USD').all()
-        actualizados = 0
-        for p in precios_usd:
-            if p.precio_original is not None:
-                try:
-                    nuevo_precio_ars = Decimal(str(p.precio_original)) * nuevo_valor
-                    p.precio_unitario_fijo_ars = nuevo_precio_ars
-                    p.tipo_cambio_usado = nuevo_valor
-                    actualizados += 1
-                except Exception as e:
-                    print(f"Error actualizando precio especial ID {p.id}: {e}")
-
-        ocs_actualizadas = 0
-        deudas_recalculadas = 0
+        # --- Actualizar precios especiales en USD (un solo UPDATE) ---
+        actualizados = _actualizar_precios_especiales_usd(nuevo_valor)
+
+        orden_ids = []
         if str(nombre).strip().upper() in {'DOLARCOMPRAS', 'OFICIAL', 'USD'}:
-            ocs_actualizadas, deudas_recalculadas = _actualizar_ocs_pendientes_por_dolar(nuevo_valor)
+            orden_ids = _actualizar_ocs_pendientes_por_dolar(nuevo_valor)
+
+        # Pocas OCs: deuda recalculada en la misma transacción que el TC.
+        # Muchas: el TC y los precios se confirman ya y la deuda sigue en segundo plano.
+        deudas_recalculadas = 0
+        trabajo = None
+        if len(orden_ids) <= MAX_OCS_RECALCULO_SINCRONICO:
+            deudas_recalculadas = _recalcular_lote_deudas(orden_ids, nuevo_valor) if orden_ids else 0
+        else:
+            trabajo = crear_trabajo(
+                TIPO_TRABAJO_DEUDA_OCS,
+                total=len(orden_ids),
+                parametros={'tipo_cambio': nombre, 'valor': str(nuevo_valor)},
+                usuario=getattr(current_user, 'nombre_usuario', None),
+            )
 
         db.session.commit()
+        # El TC se invalida al confirmar; los precios en USD cambiaron con un UPDATE masivo
+        invalidar_tags(TAG_PRECIOS_ESPECIALES)
 
-        return jsonify({
+        respuesta = {
             "tipo_cambio": tipo_cambio_a_dict(tc),
             "precios_usd_actualizados": actualizados,
-            "ordenes_compra_tc_actualizadas": ocs_actualizadas,
+            "ordenes_compra_tc_actualizadas": len(orden_ids),
             "ordenes_compra_deuda_recalculada": deudas_recalculadas
-        })
+        }
+        if trabajo is not None:
+            lanzar_trabajo(trabajo.id, recalcular_deudas_ocs, orden_ids, str(nuevo_valor))
+            respuesta["trabajo"] = trabajo.to_dict()
+            return jsonify(respuesta), 202
+        return jsonify(respuesta)
     except (ValueError, TypeError, InvalidOperation):
         db.session.rollback()
         return jsonify({"error": "Valor inválido"}), 400
@@ -187,6 +247,16 @@ def eliminar_tipo_cambio(current_user, nombre):
         traceback.print_exc()
         return jsonify({"error": "Error interno"}), 500
 
+@tipos_cambio_bp.route('/trabajos/<int:trabajo_id>', methods=['GET'])
+@token_required
+@roles_required(ROLES['ADMIN'])
+def obtener_trabajo(current_user, trabajo_id):
+    """Progreso (y resultado al terminar) de un trabajo: recálculo de /actualizar o carga masiva de precios especiales."""
+    trabajo = db.session.get(TrabajoSegundoPlano, trabajo_id)
+    if not trabajo:
+        return jsonify({"error": f"Trabajo {trabajo_id} no encontrado"}), 404
+    return jsonify(trabajo.to_dict())
+
 def tipo_cambio_a_dict(tc):
     return {
         "id": tc.id,
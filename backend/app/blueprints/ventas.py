@@ -1,22 +1,25 @@
 # app/blueprints/ventas.py
 
 from operator import or_
-from flask import Blueprint, request, jsonify, render_template, make_response
-import io
-import csv
+from flask import Blueprint, request, jsonify, render_template, make_response, Response, stream_with_context
+import json
 import re
 from sqlalchemy.orm import selectinload
-from sqlalchemy import func
+from sqlalchemy import func, case, literal, String
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP, ROUND_UP
 import math
 import traceback
+import uuid
 from ..utils import precios_utils
 from ..utils.ventas_montos_utils import asignar_subtotales_proporcionales_en_detalles
+from ..utils.csv_utils import iter_csv
+from ..utils.serializadores_utils import Proyeccion, a_float, a_iso
+from ..utils.resumen_ventas_utils import contribuciones_resumen, aplicar_delta_resumen
 from datetime import datetime, timezone, date
 # --- Imports locales ---
 from .. import db
 from ..models import ( Venta, DetalleVenta, Producto, UsuarioInterno, Cliente, # Añadido Cliente
-                      TipoCambio, PrecioEspecialCliente ) # Añadido PrecioEspecialCliente
+                      TipoCambio, PrecioEspecialCliente, AuditLog ) # Añadido PrecioEspecialCliente
 # Ajusta la ruta si es necesario para estas funciones auxiliares
 # Asumiendo que están en productos.py dentro de blueprints, o muévelas a utils si prefieres
 
@@ -31,6 +34,14 @@ ventas_bp = Blueprint('ventas', __name__, url_prefix='/api/ventas')
 RECARGO_TRANSFERENCIA_PORC = Decimal("10.5") # 10.5%
 RECARGO_FACTURA_PORC = Decimal("21.0") # 21.0% (IVA)
 VENDEDORES = ["pedidos","martin", "moises", "sergio", "gabriel", "mauricio", "elias", "ardiles", "redonedo"]
+# Estados de pedido codificados como prefijo de 'nombre_vendedor' ('ESTADO-vendedor')
+ESTADOS_VENTA_VALIDOS = ['Pendiente', 'Listo para Entregar', 'Entregado', 'Cancelado']
+# Tamaño de cada UPDATE ... WHERE id IN (...) en los cambios de estado masivos
+ESTADO_LOTE_CHUNK_SIZE = 500
+# Ventas por transacción en /registrar_lote
+REGISTRO_LOTE_CHUNK_SIZE = 100
+REGISTRO_LOTE_MAX_VENTAS = 2000
+CLAVE_IDEMPOTENCIA_MAX_LEN = 64
 
 # --- Función Auxiliar para calcular precio item VENTA (MODIFICADA con Precio Especial) ---
 def calcular_precio_item_venta(producto_id, cantidad_decimal, cliente_id=None):
@@ -247,6 +258,169 @@ def calcular_monto_final_y_vuelto(monto_base, forma_pago=None, requiere_factura=
     return monto_final, recargo_t, recargo_f, vuelto, error # Devuelve error=None si todo ok
 
 
+def _preparar_venta_desde_payload(data):
+    """
+    Valida el payload de una venta y calcula montos, recargos y vuelto usando
+    los precios enviados (sin recalcular). No toca la sesión.
+    Retorna: (campos_venta, campos_detalles, error_msg)
+    """
+    usuario_interno_id = data.get('usuario_interno_id')
+    cliente_id = data.get('cliente_id')
+    nombre_vendedor = data.get('nombre_vendedor')
+    items_payload = data.get('items')
+    forma_pago = data.get('forma_pago')
+    requiere_factura = data.get('requiere_factura', False)
+    monto_pagado_str = data.get('monto_pagado_cliente')
+    descuento_total_global_porc = Decimal(str(data.get('descuento_total_global_porcentaje', '0.0')))
+
+    if not all([usuario_interno_id, items_payload is not None, nombre_vendedor]):
+        return None, None, "Faltan campos requeridos"
+    if not isinstance(nombre_vendedor, str):
+        raise ValueError("'nombre_vendedor' debe ser texto.")
+    if not isinstance(items_payload, list):
+        raise ValueError("'items' debe ser una lista.")
+    if forma_pago is not None and not isinstance(forma_pago, str):
+        raise ValueError("'forma_pago' debe ser texto.")
+    if nombre_vendedor.lower() not in VENDEDORES:
+        return None, None, f"Vendedor '{nombre_vendedor}' no es válido."
+
+    monto_total_base_neto = Decimal("0.00")
+    detalles = []
+
+    for item_data in items_payload:
+        if not isinstance(item_data, dict):
+            raise ValueError("Cada item debe ser un objeto JSON.")
+        producto_id = item_data.get("producto_id")
+        cantidad = Decimal(str(item_data.get("cantidad", "0")))
+        descuento_item_porc = Decimal(str(item_data.get("descuento_item_porcentaje", "0.0")))
+        if cantidad <= 0:
+            continue
+
+        precio_unitario_venta_ars = Decimal(str(item_data.get("precio_unitario_venta_ars", "0")))
+        precio_total_item_ars = Decimal(str(item_data.get("precio_total_item_ars", "0")))
+
+        # El precio_total_item_ars ya debe venir con el descuento aplicado desde el frontend
+        # No volver a aplicar el descuento aquí
+
+        detalles.append(dict(
+            producto_id=producto_id, cantidad=cantidad,
+            precio_unitario_venta_ars=precio_unitario_venta_ars,
+            precio_total_item_ars=precio_total_item_ars,
+            descuento_item=descuento_item_porc,
+            observacion_item=item_data.get("observacion_item")
+        ))
+        monto_total_base_neto += precio_total_item_ars
+
+    # Aplicar descuento global
+    if descuento_total_global_porc > 0:
+        monto_total_base_neto = monto_total_base_neto * (Decimal('1.0') - descuento_total_global_porc / Decimal('100'))
+
+    # Calcular recargos simples
+    recargo_t_calc = Decimal(0)
+    recargo_f_calc = Decimal(0)
+    if forma_pago and forma_pago.strip().lower() == 'transferencia':
+        recargo_t_calc = (monto_total_base_neto * RECARGO_TRANSFERENCIA_PORC / Decimal(100)).quantize(Decimal("0.01"), ROUND_HALF_UP)
+    if requiere_factura:
+        recargo_f_calc = (monto_total_base_neto * RECARGO_FACTURA_PORC / Decimal(100)).quantize(Decimal("0.01"), ROUND_HALF_UP)
+
+    monto_final_a_pagar = monto_total_base_neto + recargo_t_calc + recargo_f_calc
+    # Redondeo por centena para alinear con la lógica que usan las boletas.
+    monto_final_a_pagar = Decimal(math.ceil(monto_final_a_pagar / 100) * 100)
+
+    vuelto_final_calc = Decimal('0.00')
+    if monto_pagado_str is not None:
+        monto_pagado_decimal = Decimal(str(monto_pagado_str))
+        if monto_pagado_decimal >= monto_final_a_pagar:
+            vuelto_final_calc = monto_pagado_decimal - monto_final_a_pagar
+
+    campos_venta = dict(
+        usuario_interno_id=usuario_interno_id,
+        cliente_id=cliente_id,
+        nombre_vendedor=nombre_vendedor,
+        fecha_pedido=datetime.fromisoformat(data['fecha_pedido']) if data.get('fecha_pedido') else datetime.now(timezone.utc),
+        observaciones=data.get('observaciones', ""),
+        monto_total=monto_total_base_neto,
+        forma_pago=forma_pago,
+        requiere_factura=requiere_factura,
+        recargo_transferencia=recargo_t_calc,
+        recargo_factura=recargo_f_calc,
+        monto_final_con_recargos=monto_final_a_pagar,
+        monto_final_redondeado=monto_final_a_pagar,
+        monto_pagado_cliente=Decimal(str(monto_pagado_str)).quantize(Decimal("0.01")) if monto_pagado_str else None,
+        vuelto_calculado=vuelto_final_calc.quantize(Decimal("0.01"), ROUND_HALF_UP),
+        descuento_general=descuento_total_global_porc,
+        direccion_entrega=data.get('direccion_entrega', ""),
+        clave_idempotencia=_normalizar_clave_idempotencia(data.get('clave_idempotencia'))
+    )
+    return campos_venta, detalles, None
+
+
+def _snapshot_costos_en_detalles(detalles, memo=None):
+    """
+    Completa costo_unitario_momento_ars y tc_costo_momento en los dicts de detalle
+    con el costo vigente al registrar la venta. Si un costo no se puede resolver
+    queda en None: nunca bloquea la venta.
+    """
+    from .productos import resolver_costos_momento_ars
+
+    try:
+        costos = resolver_costos_momento_ars([d.get('producto_id') for d in detalles], memo=memo)
+    except Exception:
+        traceback.print_exc()
+        costos = {}
+    for detalle in detalles:
+        costo_ars, tc_usado = costos.get(detalle.get('producto_id'), (None, None))
+        detalle['costo_unitario_momento_ars'] = costo_ars
+        detalle['tc_costo_momento'] = tc_usado
+    return detalles
+
+
+def _snapshots_costos_venta(venta_id):
+    """{producto_id: (costo_unitario_momento_ars, tc_costo_momento)} de los detalles actuales de la venta."""
+    snapshots = {}
+    filas = db.session.query(
+        DetalleVenta.producto_id, DetalleVenta.costo_unitario_momento_ars, DetalleVenta.tc_costo_momento
+    ).filter(DetalleVenta.venta_id == venta_id).order_by(DetalleVenta.id)
+    for producto_id, costo_ars, tc_usado in filas:
+        # Si el producto está repetido, vale la primera línea con costo resuelto
+        if producto_id not in snapshots or snapshots[producto_id][0] is None:
+            snapshots[producto_id] = (costo_ars, tc_usado)
+    return snapshots
+
+
+def _snapshot_costos_editando(detalles, snapshots_previos):
+    """
+    Al editar una venta: las líneas de productos que ya estaban en ella conservan
+    el costo y TC capturados al registrarla; solo los productos nuevos toman el
+    costo vigente.
+    """
+    nuevos = []
+    for detalle in detalles:
+        try:
+            previo = snapshots_previos.get(int(detalle.get('producto_id')))
+        except (TypeError, ValueError):
+            previo = None
+        if previo is None:
+            nuevos.append(detalle)
+        else:
+            detalle['costo_unitario_momento_ars'], detalle['tc_costo_momento'] = previo
+    if nuevos:
+        _snapshot_costos_en_detalles(nuevos)
+    return detalles
+
+
+def _normalizar_clave_idempotencia(clave):
+    """Clave de idempotencia enviada por el cliente (POS offline); None si no vino."""
+    if clave is None:
+        return None
+    clave = str(clave).strip()
+    if not clave:
+        return None
+    if len(clave) > CLAVE_IDEMPOTENCIA_MAX_LEN:
+        raise ValueError(f"'clave_idempotencia' no puede superar {CLAVE_IDEMPOTENCIA_MAX_LEN} caracteres.")
+    return clave
+
+
 # --- Endpoint: Registrar Nueva Venta (MODIFICADO para usar precios enviados sin recalcular) ---
 @ventas_bp.route('/registrar', methods=['POST'])
 @token_required
@@ -257,91 +431,156 @@ def registrar_venta(current_user):
         return jsonify({"error": "Payload JSON vacío"}), 400
 
     try:
-        usuario_interno_id = data.get('usuario_interno_id')
-        cliente_id = data.get('cliente_id')
-        nombre_vendedor = data.get('nombre_vendedor')
-        items_payload = data.get('items')
-        forma_pago = data.get('forma_pago')
-        requiere_factura = data.get('requiere_factura', False)
-        monto_pagado_str = data.get('monto_pagado_cliente')
-        descuento_total_global_porc = Decimal(str(data.get('descuento_total_global_porcentaje', '0.0')))
+        try:
+            campos_venta, campos_detalles, error_msg = _preparar_venta_desde_payload(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if error_msg:
+            return jsonify({"error": error_msg}), 400
 
-        if not all([usuario_interno_id, items_payload is not None, nombre_vendedor]):
-            return jsonify({"error": "Faltan campos requeridos"}), 400
-        if nombre_vendedor.lower() not in VENDEDORES:
-            return jsonify({"error": f"Vendedor '{nombre_vendedor}' no es válido."}), 400
+        # Reintento de un POS con la misma clave: devolver la venta ya registrada
+        if campos_venta['clave_idempotencia']:
+            venta_existente_id = db.session.query(Venta.id).filter(
+                Venta.clave_idempotencia == campos_venta['clave_idempotencia']
+            ).scalar()
+            if venta_existente_id:
+                return jsonify({"status": "success", "venta_id": venta_existente_id, "duplicada": True}), 200
 
-        monto_total_base_neto = Decimal("0.00")
-        detalles_venta_db = []
+        _snapshot_costos_en_detalles(campos_detalles)
+        nueva_venta = Venta(
+            **campos_venta,
+            detalles=[DetalleVenta(**d) for d in campos_detalles]
+        )
+        db.session.add(nueva_venta)
+        db.session.flush()
+        aplicar_delta_resumen({}, contribuciones_resumen([nueva_venta.id]))
+        db.session.commit()
 
-        for item_data in items_payload:
-            producto_id = item_data.get("producto_id")
-            cantidad = Decimal(str(item_data.get("cantidad", "0")))
-            descuento_item_porc = Decimal(str(item_data.get("descuento_item_porcentaje", "0.0")))
-            if cantidad <= 0:
-                continue
+        return jsonify({"status": "success", "venta_id": nueva_venta.id}), 201
 
-            precio_unitario_venta_ars = Decimal(str(item_data.get("precio_unitario_venta_ars", "0")))
-            precio_total_item_ars = Decimal(str(item_data.get("precio_total_item_ars", "0")))
+    except Exception as e:
+        db.session.rollback()
+        traceback.print_exc()
+        return jsonify({"error": f"Error interno del servidor: {str(e)}"}), 500
 
-            # El precio_total_item_ars ya debe venir con el descuento aplicado desde el frontend
-            # No volver a aplicar el descuento aquí
 
-            detalle = DetalleVenta(
-                producto_id=producto_id, cantidad=cantidad,
-                precio_unitario_venta_ars=precio_unitario_venta_ars,
-                precio_total_item_ars=precio_total_item_ars,
-                descuento_item=descuento_item_porc,
-                observacion_item=item_data.get("observacion_item")
+def registrar_ventas_en_lote(ventas_payload, chunk_size=REGISTRO_LOTE_CHUNK_SIZE):
+    """
+    Valida e inserta varias ventas con INSERT multi-fila (ventas y detalles_venta),
+    una transacción por bloque de chunk_size ventas.
+    Cada venta lleva clave_idempotencia (la enviada o una generada): con ella se
+    releen los ids insertados y se detectan reenvíos de ventas ya registradas.
+    Devuelve un resultado por venta, en el orden recibido.
+    """
+    resultados = [None] * len(ventas_payload)
+    preparadas = []  # (indice, clave, campos_venta, campos_detalles)
+    primer_indice_por_clave = {}
+
+    for indice, data in enumerate(ventas_payload):
+        if not isinstance(data, dict):
+            resultados[indice] = {"indice": indice, "status": "error", "error": "Cada venta debe ser un objeto JSON."}
+            continue
+        try:
+            campos_venta, campos_detalles, error_msg = _preparar_venta_desde_payload(data)
+        except (ValueError, TypeError, InvalidOperation) as e:
+            error_msg = f"Datos inválidos: {e}"
+        if error_msg:
+            resultados[indice] = {
+                "indice": indice,
+                "clave_idempotencia": data.get('clave_idempotencia'),
+                "status": "error",
+                "error": error_msg
+            }
+            continue
+
+        clave = campos_venta['clave_idempotencia'] or uuid.uuid4().hex
+        campos_venta['clave_idempotencia'] = clave
+        if clave in primer_indice_por_clave:
+            # Misma clave repetida dentro del lote: se registra una sola vez
+            resultados[indice] = {"indice": indice, "clave_idempotencia": clave, "status": "duplicada", "venta_id": None}
+            continue
+        primer_indice_por_clave[clave] = indice
+        preparadas.append((indice, clave, campos_venta, campos_detalles))
+
+    # Costos al momento resueltos una sola vez para todo el lote (memo de recetas compartido)
+    _snapshot_costos_en_detalles([d for _, _, _, detalles in preparadas for d in detalles], memo={})
+
+    ids_por_clave = {}
+    for inicio in range(0, len(preparadas), chunk_size):
+        bloque = preparadas[inicio:inicio + chunk_size]
+        claves_bloque = [clave for _, clave, _, _ in bloque]
+        try:
+            existentes = dict(
+                db.session.query(Venta.clave_idempotencia, Venta.id)
+                .filter(Venta.clave_idempotencia.in_(claves_bloque)).all()
             )
-            detalles_venta_db.append(detalle)
-            monto_total_base_neto += precio_total_item_ars
+            nuevas = [p for p in bloque if p[1] not in existentes]
+            insertadas = {}
+            if nuevas:
+                db.session.execute(Venta.__table__.insert(), [campos for _, _, campos, _ in nuevas])
+                insertadas = dict(
+                    db.session.query(Venta.clave_idempotencia, Venta.id)
+                    .filter(Venta.clave_idempotencia.in_([clave for _, clave, _, _ in nuevas])).all()
+                )
+                filas_detalle = [
+                    dict(detalle, venta_id=insertadas[clave])
+                    for _, clave, _, detalles in nuevas
+                    for detalle in detalles
+                ]
+                if filas_detalle:
+                    db.session.execute(DetalleVenta.__table__.insert(), filas_detalle)
+                aplicar_delta_resumen({}, contribuciones_resumen(list(insertadas.values())))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            traceback.print_exc()
+            for indice, clave, _, _ in bloque:
+                resultados[indice] = {"indice": indice, "clave_idempotencia": clave, "status": "error", "error": f"Error al guardar el bloque: {str(e)}"}
+            continue
+
+        for indice, clave, _, _ in bloque:
+            if clave in existentes:
+                ids_por_clave[clave] = existentes[clave]
+                resultados[indice] = {"indice": indice, "clave_idempotencia": clave, "status": "duplicada", "venta_id": existentes[clave]}
+            else:
+                ids_por_clave[clave] = insertadas[clave]
+                resultados[indice] = {"indice": indice, "clave_idempotencia": clave, "status": "creada", "venta_id": insertadas[clave]}
 
-        # Aplicar descuento global
-        if descuento_total_global_porc > 0:
-            monto_total_base_neto = monto_total_base_neto * (Decimal('1.0') - descuento_total_global_porc / Decimal('100'))
+    # Duplicados internos del lote: apuntan a la venta de su primera aparición
+    for resultado in resultados:
+        if resultado and resultado["status"] == "duplicada" and resultado.get("venta_id") is None:
+            resultado["venta_id"] = ids_por_clave.get(resultado["clave_idempotencia"])
+    return resultados
 
-        # Calcular recargos simples
-        recargo_t_calc = Decimal(0)
-        recargo_f_calc = Decimal(0)
-        if forma_pago and forma_pago.strip().lower() == 'transferencia':
-            recargo_t_calc = (monto_total_base_neto * RECARGO_TRANSFERENCIA_PORC / Decimal(100)).quantize(Decimal("0.01"), ROUND_HALF_UP)
-        if requiere_factura:
-            recargo_f_calc = (monto_total_base_neto * RECARGO_FACTURA_PORC / Decimal(100)).quantize(Decimal("0.01"), ROUND_HALF_UP)
-
-        monto_final_a_pagar = monto_total_base_neto + recargo_t_calc + recargo_f_calc
-        # Redondeo por centena para alinear con la lógica que usan las boletas.
-        monto_final_a_pagar = Decimal(math.ceil(monto_final_a_pagar / 100) * 100)
-
-        vuelto_final_calc = Decimal('0.00')
-        if monto_pagado_str is not None:
-            monto_pagado_decimal = Decimal(str(monto_pagado_str))
-            if monto_pagado_decimal >= monto_final_a_pagar:
-                vuelto_final_calc = monto_pagado_decimal - monto_final_a_pagar
 
-        nueva_venta = Venta(
-            usuario_interno_id=usuario_interno_id,
-            cliente_id=cliente_id,
-            nombre_vendedor=nombre_vendedor,
-            fecha_pedido=datetime.fromisoformat(data['fecha_pedido']) if data.get('fecha_pedido') else datetime.now(timezone.utc),
-            observaciones=data.get('observaciones', ""),
-            monto_total=monto_total_base_neto,
-            forma_pago=forma_pago,
-            requiere_factura=requiere_factura,
-            recargo_transferencia=recargo_t_calc,
-            recargo_factura=recargo_f_calc,
-            monto_final_con_recargos=monto_final_a_pagar,
-            monto_final_redondeado=monto_final_a_pagar,
-            monto_pagado_cliente=Decimal(str(monto_pagado_str)).quantize(Decimal("0.01")) if monto_pagado_str else None,
-            vuelto_calculado=vuelto_final_calc.quantize(Decimal("0.01"), ROUND_HALF_UP),
-            detalles=detalles_venta_db,
-            descuento_general=descuento_total_global_porc,
-            direccion_entrega=data.get('direccion_entrega', "")
-        )
-        db.session.add(nueva_venta)
-        db.session.commit()
+# --- Endpoint: Registrar varias ventas (sincronización POS offline / carga de fin de día) ---
+@ventas_bp.route('/registrar_lote', methods=['POST'])
+@token_required
+@roles_required(ROLES['VENTAS_LOCAL'], ROLES['VENTAS_PEDIDOS'], ROLES['ADMIN'])
+def registrar_lote_ventas(current_user):
+    """
+    Registra varias ventas en una sola petición. Payload: {"ventas": [<payload de /registrar>, ...]}.
+    Cada venta puede traer 'clave_idempotencia' para que reenviar la misma cola sea seguro.
+    Responde con el resultado de cada venta (creada / duplicada / error).
+    """
+    data = request.get_json()
+    if not data or not isinstance(data.get('ventas'), list) or not data['ventas']:
+        return jsonify({"error": "Payload inválido. Se requiere 'ventas' como lista no vacía."}), 400
+    if len(data['ventas']) > REGISTRO_LOTE_MAX_VENTAS:
+        return jsonify({"error": f"Se admiten hasta {REGISTRO_LOTE_MAX_VENTAS} ventas por lote."}), 400
 
-        return jsonify({"status": "success", "venta_id": nueva_venta.id}), 201
+    try:
+        resultados = registrar_ventas_en_lote(data['ventas'])
+        resumen = {
+            "creadas": sum(1 for r in resultados if r["status"] == "creada"),
+            "duplicadas": sum(1 for r in resultados if r["status"] == "duplicada"),
+            "errores": sum(1 for r in resultados if r["status"] == "error"),
+        }
+        return jsonify({
+            "status": "success" if resumen["errores"] == 0 else "partial",
+            "resumen": resumen,
+            "resultados": resultados
+        }), 201 if resumen["creadas"] else 200
 
     except Exception as e:
         db.session.rollback()
@@ -432,11 +671,10 @@ def calcular_vuelto():
 def obtener_ventas(current_user):
     """Obtiene una lista de ventas, con filtros opcionales y paginación. Optimizada con Eager Loading."""
     try:
-        # APLICADO: Eager loading para prevenir N+1 y asegurar que los datos estén disponibles
-        query = Venta.query.options(
-            selectinload(Venta.usuario_interno),
-            selectinload(Venta.cliente)
-        )
+        # Solo las columnas del resumen (usuario y cliente por outer join), sin entidades ORM
+        query = PROYECCION_VENTA_RESUMEN.consulta() \
+            .outerjoin(UsuarioInterno, Venta.usuario_interno_id == UsuarioInterno.id) \
+            .outerjoin(Cliente, Venta.cliente_id == Cliente.id)
 
         # --- Aplicar Filtros (sin cambios) ---
         usuario_id_filtro = request.args.get('usuario_id', type=int)
@@ -469,10 +707,9 @@ def obtener_ventas(current_user):
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         paginated_ventas = query.paginate(page=page, per_page=per_page, error_out=False)
-        ventas_db = paginated_ventas.items
 
-        # Serializar Resultados (sin cambios, ahora con los objetos cargados)
-        ventas_list = [venta_a_dict_resumen(v) for v in ventas_db]
+        # Serializar Resultados (mismo formato que venta_a_dict_resumen)
+        ventas_list = PROYECCION_VENTA_RESUMEN.lista(paginated_ventas.items)
 
         return jsonify({
             "ventas": ventas_list,
@@ -549,6 +786,10 @@ def actualizar_venta(current_user, venta_id):
         return jsonify({"error": "Payload JSON inválido o sin lista de 'items'"}), 400
         
     try:
+        resumen_antes = contribuciones_resumen([venta_id])
+        # El costo al momento de la venta no cambia al editarla
+        snapshots_previos = _snapshots_costos_venta(venta_id)
+
         # --- RECÁLCULO SIMPLIFICADO: Usar precios enviados ---
         DetalleVenta.query.filter_by(venta_id=venta_id).delete()
         db.session.flush()
@@ -570,7 +811,7 @@ def actualizar_venta(current_user, venta_id):
             # El precio_total_item_ars ya debe venir con el descuento aplicado desde el frontend
             # No volver a aplicar el descuento aquí
 
-            detalle_nuevo = DetalleVenta(
+            detalles_venta_nuevos.append(dict(
                 venta_id=venta_id,
                 producto_id=producto_id,
                 cantidad=cantidad,
@@ -578,10 +819,12 @@ def actualizar_venta(current_user, venta_id):
                 precio_total_item_ars=precio_total_item_ars,
                 descuento_item=descuento_item_porc,
                 observacion_item=item_data.get("observacion_item")
-            )
-            detalles_venta_nuevos.append(detalle_nuevo)
+            ))
             monto_total_base_nuevo += precio_total_item_ars
 
+        _snapshot_costos_editando(detalles_venta_nuevos, snapshots_previos)
+        detalles_venta_nuevos = [DetalleVenta(**d) for d in detalles_venta_nuevos]
+
         # Aplicar descuento global
         descuento_total_nuevo_porc = Decimal(str(data.get('descuento_total_global_porcentaje', '0.0')))
         if descuento_total_nuevo_porc > 0:
@@ -636,6 +879,8 @@ def actualizar_venta(current_user, venta_id):
             except Exception:
                 pass
 
+        db.session.flush()
+        aplicar_delta_resumen(resumen_antes, contribuciones_resumen([venta_id]))
         db.session.commit()
 
         # --- Volver a consultar la venta ---
@@ -842,7 +1087,10 @@ def eliminar_venta(current_user, venta_id):
     if not venta_db: return jsonify({"error": "Venta no encontrada"}), 404
     try:
         # Añadir lógica de negocio aquí si es necesario (ej: no borrar facturada)
+        resumen_antes = contribuciones_resumen([venta_id])
         db.session.delete(venta_db) # Cascade debería borrar detalles si está configurado en el modelo
+        db.session.flush()
+        aplicar_delta_resumen(resumen_antes, {})
         db.session.commit()
         print(f"INFO: Venta eliminada: ID {venta_id}")
         return jsonify({"message": f"Venta ID {venta_id} eliminada"}), 200
@@ -869,20 +1117,29 @@ def obtener_comprobante_venta(venta_id):
 
 # --- Funciones Auxiliares para Serializar Venta/Detalle (Actualizadas) ---
 
-def venta_a_dict_resumen(venta):
-    if not venta: return None
-    
-    # --- Lógica para parsear el estado y el vendedor ---
+def parsear_estado_y_vendedor(nombre_vendedor):
+    """
+    Separa el campo 'nombre_vendedor' con formato 'ESTADO-vendedor'.
+    Devuelve (estado, vendedor); sin prefijo válido el estado es 'Pendiente'.
+    """
     estado = 'Pendiente' # Valor por defecto
-    vendedor_real = venta.nombre_vendedor
-    if venta.nombre_vendedor:
-        partes = venta.nombre_vendedor.split('-', 1)
+    vendedor_real = nombre_vendedor
+    if nombre_vendedor:
+        partes = nombre_vendedor.split('-', 1)
         # Lista de estados válidos en mayúsculas
         estados_posibles = ['PENDIENTE', 'LISTO PARA ENTREGAR', 'ENTREGADO', 'CANCELADO']
         if len(partes) > 1 and partes[0].upper().replace(' ', '_') in [s.replace(' ', '_') for s in estados_posibles]:
             # Convierte "LISTO PARA ENTREGAR" a "Listo para Entregar"
             estado = partes[0].replace('_', ' ').title()
             vendedor_real = partes[1]
+    return estado, vendedor_real
+
+
+def venta_a_dict_resumen(venta):
+    if not venta: return None
+    
+    # --- Lógica para parsear el estado y el vendedor ---
+    estado, vendedor_real = parsear_estado_y_vendedor(venta.nombre_vendedor)
 
     return {
         "venta_id": venta.id,
@@ -905,6 +1162,33 @@ def venta_a_dict_resumen(venta):
         "monto_final_con_recargos": float(venta.monto_final_con_recargos) if venta.monto_final_con_recargos is not None else None,
     }
 
+
+def _completar_venta_resumen(datos):
+    datos['estado'], datos['nombre_vendedor'] = parsear_estado_y_vendedor(datos['nombre_vendedor'])
+    datos['descuento_total_global_porcentaje'] = float(datos['descuento_general'] or 0.0)
+
+
+# Misma salida que venta_a_dict_resumen leyendo solo columnas (listado de ventas)
+PROYECCION_VENTA_RESUMEN = Proyeccion(
+    ('venta_id', Venta.id),
+    ('nombre_vendedor', Venta.nombre_vendedor),
+    ('fecha_registro', Venta.fecha_registro, a_iso),
+    ('fecha_pedido', Venta.fecha_pedido, a_iso),
+    ('direccion_entrega', Venta.direccion_entrega),
+    ('usuario_interno_id', Venta.usuario_interno_id),
+    ('usuario_nombre', UsuarioInterno.nombre),
+    ('cliente_id', Venta.cliente_id),
+    ('cliente_nombre', Cliente.nombre_razon_social),
+    ('cliente_zona', Cliente.localidad),
+    ('cuit_cliente', Venta.cuit_cliente),
+    ('monto_total_base', Venta.monto_total, a_float),
+    ('forma_pago', Venta.forma_pago),
+    ('requiere_factura', Venta.requiere_factura),
+    ('descuento_general', Venta.descuento_general),
+    ('monto_final_con_recargos', Venta.monto_final_con_recargos, a_float),
+    completar=_completar_venta_resumen,
+)
+
 def venta_a_dict_completo(venta):
     if not venta: return None
     resumen = venta_a_dict_resumen(venta)
@@ -953,6 +1237,57 @@ def detalle_venta_a_dict(detalle):
     }
     
 
+def _expresion_nombre_vendedor_con_estado(nuevo_estado_db):
+    """
+    Expresión SQL que reemplaza el prefijo de estado de 'nombre_vendedor'
+    conservando el vendedor original (todo lo que sigue al primer '-').
+    """
+    pos_guion = func.instr(Venta.nombre_vendedor, '-')
+    vendedor_original = case(
+        (pos_guion > 0, func.substr(Venta.nombre_vendedor, pos_guion + 1)),
+        else_=Venta.nombre_vendedor
+    )
+    return literal(f"{nuevo_estado_db}-", type_=String) + vendedor_original
+
+
+def actualizar_estado_ventas_en_lote(venta_ids, nuevo_estado_db, usuario=None, chunk_size=ESTADO_LOTE_CHUNK_SIZE):
+    """
+    Aplica el cambio de estado con un UPDATE ... WHERE id IN (...) por bloque,
+    relee solo (id, nombre_vendedor), traslada los montos del bloque en el
+    resumen diario y deja un AuditLog por bloque.
+    No hace commit: el llamador decide la transacción.
+    Devuelve {venta_id: estado} de las ventas encontradas.
+    """
+    nuevo_valor = _expresion_nombre_vendedor_con_estado(nuevo_estado_db)
+    estados_por_id = {}
+    for inicio in range(0, len(venta_ids), chunk_size):
+        lote_ids = venta_ids[inicio:inicio + chunk_size]
+        resumen_antes = contribuciones_resumen(lote_ids)
+        db.session.query(Venta).filter(Venta.id.in_(lote_ids)).update(
+            {Venta.nombre_vendedor: nuevo_valor},
+            synchronize_session=False
+        )
+        aplicar_delta_resumen(resumen_antes, contribuciones_resumen(lote_ids))
+        filas = db.session.query(Venta.id, Venta.nombre_vendedor).filter(Venta.id.in_(lote_ids)).all()
+        if not filas:
+            continue
+        for venta_id, nombre_vendedor in filas:
+            estados_por_id[venta_id] = parsear_estado_y_vendedor(nombre_vendedor)[0]
+
+        log = AuditLog(  # type: ignore [call-arg]
+            entidad='Venta',
+            entidad_id=min(venta_id for venta_id, _ in filas),
+            accion='ACTUALIZAR_ESTADO_LOTE',
+            usuario=usuario
+        )
+        log.set_nuevos({
+            'estado': nuevo_estado_db,
+            'venta_ids': sorted(venta_id for venta_id, _ in filas)
+        })
+        db.session.add(log)
+    return estados_por_id
+
+
 @ventas_bp.route('/actualizar-estado-lote', methods=['POST'])
 @token_required
 @roles_required(ROLES['ADMIN'], ROLES['VENTAS_PEDIDOS']) # Define qué roles pueden hacer esto
@@ -960,6 +1295,8 @@ def actualizar_estado_lote(current_user):
     """
     Actualiza el estado de múltiples ventas a la vez.
     Reutiliza el campo 'nombre_vendedor' con el formato 'ESTADO-Vendedor'.
+    La transición se resuelve en SQL (un UPDATE por bloque de ESTADO_LOTE_CHUNK_SIZE ids),
+    sin cargar las ventas en la sesión.
     """
     data = request.get_json()
     if not data or 'venta_ids' not in data or 'nuevo_estado' not in data:
@@ -972,39 +1309,49 @@ def actualizar_estado_lote(current_user):
         return jsonify({"error": "'venta_ids' debe ser una lista no vacía de IDs."}), 400
 
     # Lista de estados válidos para asegurar la consistencia de los datos
-    estados_validos = ['Pendiente', 'Listo para Entregar', 'Entregado', 'Cancelado']
-    if nuevo_estado_str not in estados_validos:
-        return jsonify({"error": f"El estado '{nuevo_estado_str}' no es válido. Válidos son: {', '.join(estados_validos)}"}), 400
+    if nuevo_estado_str not in ESTADOS_VENTA_VALIDOS:
+        return jsonify({"error": f"El estado '{nuevo_estado_str}' no es válido. Válidos son: {', '.join(ESTADOS_VENTA_VALIDOS)}"}), 400
+
+    # Normalizar IDs (sin duplicados, conservando el orden recibido)
+    venta_ids_normalizados = []
+    try:
+        for vid in venta_ids:
+            vid_int = int(vid)
+            if vid_int not in venta_ids_normalizados:
+                venta_ids_normalizados.append(vid_int)
+    except (TypeError, ValueError):
+        return jsonify({"error": "'venta_ids' debe contener solo IDs numéricos."}), 400
     
     # Convertimos el estado del frontend (ej: "Listo para Entregar") a formato de BD (ej: "LISTO_PARA_ENTREGAR")
     nuevo_estado_db = nuevo_estado_str.upper().replace(' ', '_')
 
     try:
-        # Hacemos la consulta a la base de datos para obtener todas las ventas a la vez
-        ventas_a_actualizar = db.session.query(Venta).filter(Venta.id.in_(venta_ids)).all()
-        
-        if len(ventas_a_actualizar) != len(venta_ids):
-             ids_encontrados = {v.id for v in ventas_a_actualizar}
-             ids_faltantes = [vid for vid in venta_ids if vid not in ids_encontrados]
-             print(f"WARN [actualizar_estado_lote]: No se encontraron algunas ventas. IDs faltantes: {ids_faltantes}")
+        usuario = getattr(current_user, 'nombre_usuario', None) or getattr(current_user, 'nombre', None)
+        estados_por_id = actualizar_estado_ventas_en_lote(venta_ids_normalizados, nuevo_estado_db, usuario=usuario)
 
-        if not ventas_a_actualizar:
+        if not estados_por_id:
+            db.session.rollback()
             return jsonify({"error": "No se encontraron ventas con los IDs proporcionados."}), 404
 
-        count_actualizadas = 0
-        for venta in ventas_a_actualizar:
-            # Desarmamos el campo actual para obtener el vendedor original
-            partes = venta.nombre_vendedor.split('-', 1)
-            vendedor_original = partes[1] if len(partes) > 1 else venta.nombre_vendedor
-            
-            # Reconstruimos el campo con el NUEVO estado y el vendedor original
-            venta.nombre_vendedor = f"{nuevo_estado_db}-{vendedor_original}"
-            count_actualizadas += 1
-        
         db.session.commit()
-        
+
+        ids_faltantes = [vid for vid in venta_ids_normalizados if vid not in estados_por_id]
+        if ids_faltantes:
+            print(f"WARN [actualizar_estado_lote]: No se encontraron algunas ventas. IDs faltantes: {ids_faltantes}")
+
+        resultados = [
+            {
+                "venta_id": vid,
+                "actualizada": vid in estados_por_id,
+                "estado": estados_por_id.get(vid),
+            }
+            for vid in venta_ids_normalizados
+        ]
+        count_actualizadas = len(estados_por_id)
         return jsonify({
-            "message": f"{count_actualizadas} de {len(venta_ids)} ventas solicitadas fueron actualizadas al estado '{nuevo_estado_str}'."
+            "message": f"{count_actualizadas} de {len(venta_ids)} ventas solicitadas fueron actualizadas al estado '{nuevo_estado_str}'.",
+            "resultados": resultados,
+            "ids_faltantes": ids_faltantes
         }), 200
 
     except Exception as e:
@@ -1079,6 +1426,119 @@ def obtener_detalles_lote(current_user):
         traceback.print_exc()
         return jsonify({"error": "Error interno al obtener los detalles de las ventas.", "detalle": str(e)}), 500
     
+def _flag_payload(valor):
+    """Solo True o los strings 'true'/'1' activan la opción ("false" y "0" no)."""
+    return valor is True or (isinstance(valor, str) and valor.strip().lower() in ('true', '1'))
+
+
+def _query_montos_por_dolar(venta_ids, valor_dolar):
+    """
+    Una sola consulta (ventas ⨝ detalles_venta ⨝ productos/clientes/usuarios) que
+    devuelve cada línea ya escalada por valor_dolar, junto con el subtotal
+    proporcional (monto_final * tc * precio_linea / monto_total) calculado en SQL.
+    Filas ordenadas por (venta_id, detalle_id) para agruparlas en streaming.
+    """
+    tc = literal(valor_dolar, type_=db.Numeric(15, 4))
+    monto_final_escalado = func.coalesce(Venta.monto_final_con_recargos, 0) * tc
+    subtotal_proporcional = case(
+        (Venta.monto_total > 0, monto_final_escalado * func.coalesce(DetalleVenta.precio_total_item_ars, 0) / Venta.monto_total),
+        else_=None
+    )
+    return (
+        db.session.query(
+            Venta.id.label('venta_id'),
+            Venta.nombre_vendedor,
+            Venta.fecha_registro,
+            Venta.fecha_pedido,
+            Venta.direccion_entrega,
+            Venta.usuario_interno_id,
+            UsuarioInterno.nombre.label('usuario_nombre'),
+            Venta.cliente_id,
+            Cliente.nombre_razon_social.label('cliente_nombre'),
+            Cliente.localidad.label('cliente_zona'),
+            Venta.cuit_cliente,
+            Venta.monto_total,
+            Venta.forma_pago,
+            Venta.requiere_factura,
+            Venta.descuento_general,
+            monto_final_escalado.label('monto_final_escalado'),
+            DetalleVenta.id.label('detalle_id'),
+            DetalleVenta.producto_id,
+            Producto.nombre.label('producto_nombre'),
+            DetalleVenta.cantidad,
+            DetalleVenta.descuento_item,
+            (func.coalesce(DetalleVenta.precio_unitario_venta_ars, 0) * tc).label('precio_unitario_escalado'),
+            (func.coalesce(DetalleVenta.precio_total_item_ars, 0) * tc).label('precio_total_escalado'),
+            subtotal_proporcional.label('subtotal_proporcional'),
+            DetalleVenta.observacion_item,
+        )
+        .select_from(Venta)
+        .outerjoin(DetalleVenta, DetalleVenta.venta_id == Venta.id)
+        .outerjoin(Producto, Producto.id == DetalleVenta.producto_id)
+        .outerjoin(Cliente, Cliente.id == Venta.cliente_id)
+        .outerjoin(UsuarioInterno, UsuarioInterno.id == Venta.usuario_interno_id)
+        .filter(Venta.id.in_(venta_ids))
+        .order_by(Venta.id, DetalleVenta.id)
+    )
+
+
+def _ventas_desde_filas_por_dolar(filas, valor_dolar, exacto=False):
+    """
+    Agrupa las filas (ordenadas por venta) y emite un dict por venta con el mismo
+    formato que venta_a_dict_resumen + 'detalles'. Con exacto=True los montos
+    quedan como Decimal (se serializan como string sin pérdida); si no, float.
+    """
+    def _num(valor):
+        if valor is None:
+            return None
+        valor = Decimal(str(valor))
+        return valor if exacto else float(valor)
+
+    venta_actual = None
+    for fila in filas:
+        if venta_actual is None or venta_actual["venta_id"] != fila.venta_id:
+            if venta_actual is not None:
+                yield venta_actual
+            estado, vendedor_real = parsear_estado_y_vendedor(fila.nombre_vendedor)
+            venta_actual = {
+                "venta_id": fila.venta_id,
+                "estado": estado,
+                "nombre_vendedor": vendedor_real,
+                "fecha_registro": fila.fecha_registro.isoformat() if fila.fecha_registro else None,
+                "fecha_pedido": fila.fecha_pedido.isoformat() if fila.fecha_pedido else None,
+                "direccion_entrega": fila.direccion_entrega,
+                "usuario_interno_id": fila.usuario_interno_id,
+                "usuario_nombre": fila.usuario_nombre,
+                "cliente_id": fila.cliente_id,
+                "cliente_nombre": fila.cliente_nombre,
+                "cliente_zona": fila.cliente_zona,
+                "cuit_cliente": fila.cuit_cliente,
+                "monto_total_base": _num(fila.monto_total),
+                "forma_pago": fila.forma_pago,
+                "requiere_factura": fila.requiere_factura,
+                "descuento_general": fila.descuento_general,
+                "descuento_total_global_porcentaje": float(fila.descuento_general or 0.0),
+                "monto_final_con_recargos": _num(fila.monto_final_escalado),
+                "detalles": [],
+                "valor_dolar_usado": valor_dolar if exacto else float(valor_dolar),
+            }
+        if fila.detalle_id is None:
+            continue
+        venta_actual["detalles"].append({
+            "detalle_id": fila.detalle_id,
+            "producto_id": fila.producto_id,
+            "producto_nombre": fila.producto_nombre or "Producto no encontrado",
+            "cantidad": _num(fila.cantidad),
+            "descuento_item_porcentaje": float(fila.descuento_item or 0.0),
+            "precio_unitario_venta_ars": _num(fila.precio_unitario_escalado),
+            "precio_total_item_ars": _num(fila.precio_total_escalado),
+            "subtotal_proporcional_con_recargos": _num(fila.subtotal_proporcional),
+            "observacion_item": fila.observacion_item,
+        })
+    if venta_actual is not None:
+        yield venta_actual
+
+
 @ventas_bp.route('/recalcular-montos-por-dolar', methods=['POST'])
 @token_required
 @roles_required(ROLES['ADMIN'], ROLES['VENTAS_PEDIDOS'])
@@ -1086,58 +1546,40 @@ def recalcular_montos_por_dolar(current_user):
     """
     Endpoint paralelo para pruebas: recibe venta_ids y valor_dolar,
     devuelve las ventas con montos recalculados usando ese valor.
+    El escalado se calcula en la base con una única consulta.
+    Opcionales: 'exacto' (montos Decimal como string) y 'stream'
+    (respuesta NDJSON, una venta por línea, sin armar la lista en memoria).
     """
     data = request.get_json()
     if not data or 'venta_ids' not in data or 'valor_dolar' not in data:
         return jsonify({"error": "Payload incompleto. Se requieren 'venta_ids' y 'valor_dolar'."}), 400
 
     venta_ids = data['venta_ids']
-    valor_dolar = float(data['valor_dolar'])
+    try:
+        valor_dolar = Decimal(str(data['valor_dolar']))
+        # NaN/Infinity se parsean como Decimal pero no son un tipo de cambio
+        if not valor_dolar.is_finite() or valor_dolar <= 0:
+            return jsonify({"error": "'valor_dolar' debe ser un número mayor a 0."}), 400
+    except (InvalidOperation, TypeError, ValueError):
+        return jsonify({"error": "'valor_dolar' debe ser numérico."}), 400
     if not isinstance(venta_ids, list) or not venta_ids:
         return jsonify({"error": "'venta_ids' debe ser una lista no vacía de IDs."}), 400
-    if valor_dolar <= 0:
-        return jsonify({"error": "'valor_dolar' debe ser mayor a 0."}), 400
+    exacto = _flag_payload(data.get('exacto'))
+    stream = _flag_payload(data.get('stream'))
 
     try:
-        ventas_db = db.session.query(Venta).options(
-            selectinload(Venta.detalles).selectinload(DetalleVenta.producto),
-            selectinload(Venta.cliente),
-            selectinload(Venta.usuario_interno)
-        ).filter(Venta.id.in_(venta_ids)).all()
+        query = _query_montos_por_dolar(venta_ids, valor_dolar)
 
-        if not ventas_db:
-            return jsonify({"error": "No se encontraron ventas con los IDs proporcionados."}), 404
+        if stream:
+            def generar():
+                filas = query.yield_per(1000)
+                for venta_dict in _ventas_desde_filas_por_dolar(filas, valor_dolar, exacto=exacto):
+                    yield json.dumps(venta_dict, default=str, ensure_ascii=False) + "\n"
+            return Response(stream_with_context(generar()), mimetype='application/x-ndjson')
 
-        ventas_recalculadas = []
-        for venta in ventas_db:
-            monto_final_real = float(venta.monto_final_con_recargos) if venta.monto_final_con_recargos is not None else 0.0
-            monto_total_base = float(venta.monto_total) if venta.monto_total is not None else 0.0
-            # Recalcular montos por dólar
-            monto_final_recalculado = monto_final_real * valor_dolar
-            detalles_recalculados = []
-            for d in venta.detalles:
-                precio_total_item_ars = float(d.precio_total_item_ars or 0)
-                subtotal_proporcional = None
-                if monto_total_base > 0:
-                    subtotal_proporcional = monto_final_recalculado * (precio_total_item_ars / monto_total_base)
-                detalles_recalculados.append({
-                    "detalle_id": d.id,
-                    "producto_id": d.producto_id,
-                    "producto_nombre": d.producto.nombre if d.producto else "Producto no encontrado",
-                    "cantidad": float(d.cantidad),
-                    "descuento_item_porcentaje": float(getattr(d, "descuento_item", 0.0) or 0.0),
-                    "precio_unitario_venta_ars": float(d.precio_unitario_venta_ars or 0) * valor_dolar,
-                    "precio_total_item_ars": precio_total_item_ars * valor_dolar,
-                    "subtotal_proporcional_con_recargos": subtotal_proporcional,
-                    "observacion_item": d.observacion_item,
-                })
-            venta_dict = venta_a_dict_resumen(venta)
-            venta_dict.update({
-                "monto_final_con_recargos": monto_final_recalculado,
-                "detalles": detalles_recalculados,
-                "valor_dolar_usado": valor_dolar,
-            })
-            ventas_recalculadas.append(venta_dict)
+        ventas_recalculadas = list(_ventas_desde_filas_por_dolar(query.all(), valor_dolar, exacto=exacto))
+        if not ventas_recalculadas:
+            return jsonify({"error": "No se encontraron ventas con los IDs proporcionados."}), 404
 
         return jsonify(ventas_recalculadas)
 
@@ -1158,11 +1600,13 @@ def clientes_nuevos_puerta_csv(current_user):
     Se buscan coincidencias en:
     - Cliente.observaciones: líneas que contengan "Cliente por teléfono <numero> ... Fecha <ISO>"
     - Venta.observaciones: líneas que contengan "Cliente por teléfono <numero> ... Fecha <ISO>" (compatibilidad)
+
+    Se leen solo las columnas necesarias por bloques y dentro del streaming de la
+    respuesta (stream_with_context): la lectura empieza cuando se envía el archivo.
+    Lo único que queda en memoria es el mapa deduplicado (telefono, fecha) -> vendedor,
+    necesario para ordenar.
     """
     try:
-        # Mapa acumulador: (telefono, fecha_str) -> vendedor
-        rows_map = {}
-
         # --- Helper para parsear una línea de observación ---
         def parse_tel_fecha_from_text(text):
             tel = None
@@ -1182,51 +1626,47 @@ def clientes_nuevos_puerta_csv(current_user):
                     fecha_dt = None
             return tel, fecha_dt
 
-        # --- 1) Buscar en observaciones de Cliente ---
-        clientes = (
-            db.session.query(Cliente)
-            .filter((Cliente.observaciones != None) & (Cliente.observaciones.ilike('%Cliente por teléfono%')))
-            .all()
-        )
-        for cli in clientes:
-            obs = cli.observaciones or ''
-            for line in obs.splitlines():
-                tel, fecha_dt = parse_tel_fecha_from_text(line)
+        def filas_csv():
+            # Mapa acumulador: (telefono, fecha_str) -> vendedor
+            rows_map = {}
+
+            # --- 1) Buscar en observaciones de Cliente ---
+            observaciones_clientes = (
+                db.session.query(Cliente.observaciones)
+                .filter((Cliente.observaciones != None) & (Cliente.observaciones.ilike('%Cliente por teléfono%')))
+                .yield_per(500)
+            )
+            for (obs,) in observaciones_clientes:
+                for line in (obs or '').splitlines():
+                    tel, fecha_dt = parse_tel_fecha_from_text(line)
+                    if tel and fecha_dt:
+                        key = (tel, fecha_dt.date().isoformat())
+                        # No se conoce vendedor desde observaciones de Cliente; dejar vacío si no existe
+                        rows_map.setdefault(key, '')
+
+            # --- 2) Compatibilidad: Buscar en observaciones de Venta ---
+            observaciones_ventas = (
+                db.session.query(Venta.observaciones, Venta.nombre_vendedor)
+                .filter((Venta.observaciones != None) & (Venta.observaciones.ilike('%Cliente por teléfono%')))
+                .yield_per(500)
+            )
+            for obs, nombre_vendedor in observaciones_ventas:
+                tel, fecha_dt = parse_tel_fecha_from_text(obs or '')
                 if tel and fecha_dt:
                     key = (tel, fecha_dt.date().isoformat())
-                    # No se conoce vendedor desde observaciones de Cliente; dejar vacío si no existe
-                    rows_map.setdefault(key, '')
-
-        # --- 2) Compatibilidad: Buscar en observaciones de Venta ---
-        ventas = (
-            db.session.query(Venta)
-            .filter((Venta.observaciones != None) & (Venta.observaciones.ilike('%Cliente por teléfono%')))
-            .all()
-        )
-        for v in ventas:
-            tel, fecha_dt = parse_tel_fecha_from_text(v.observaciones or '')
-            if tel and fecha_dt:
-                key = (tel, fecha_dt.date().isoformat())
-                vendedor = (v.nombre_vendedor or '').strip()
-                # Preferir el vendedor si viene de la Venta
-                if key not in rows_map or not rows_map[key]:
-                    rows_map[key] = vendedor
-
-        # --- Construir filas finales y ordenar ---
-        rows = [ (tel, fecha, rows_map[(tel, fecha)]) for (tel, fecha) in rows_map.keys() ]
-        rows.sort(key=lambda x: (x[1], x[0], x[2] or ''))  # ordenar por fecha, tel, vendedor
-
-        # Generar CSV: columnas telefono, fecha, vendedor
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['telefono', 'fecha', 'vendedor'])
-        for tel, fecha_str, vendedor in rows:
-            writer.writerow([tel, fecha_str, vendedor])
-
-        csv_bytes = output.getvalue().encode('utf-8')
-        resp = make_response(csv_bytes)
-        resp.headers['Content-Type'] = 'text/csv; charset=utf-8'
+                    vendedor = (nombre_vendedor or '').strip()
+                    # Preferir el vendedor si viene de la Venta
+                    if key not in rows_map or not rows_map[key]:
+                        rows_map[key] = vendedor
+
+            # --- Filas ordenadas por fecha, tel, vendedor ---
+            for tel, fecha in sorted(rows_map, key=lambda clave: (clave[1], clave[0], rows_map[clave] or '')):
+                yield tel, fecha, rows_map[(tel, fecha)]
+
+        # Generar CSV en streaming: columnas telefono, fecha, vendedor
         hoy = datetime.now().strftime('%Y-%m-%d')
+        resp = Response(stream_with_context(iter_csv(['telefono', 'fecha', 'vendedor'], filas_csv())), mimetype='text/csv')
+        resp.headers['Content-Type'] = 'text/csv; charset=utf-8'
         resp.headers['Content-Disposition'] = f'attachment; filename="clientes_nuevos_puerta_{hoy}.csv"'
         return resp, 200
 
@@ -3,6 +3,7 @@
 # --- Imports ---
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import event, CheckConstraint, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.mysql import LONGTEXT
 from sqlalchemy.orm import validates, relationship
 from datetime import datetime, timezone
 from decimal import Decimal
@@ -11,6 +12,9 @@ import json
 
 # Importa la instancia 'db' creada en app/__init__.py
 from . import db
+from .utils.telefono_utils import telefono_nacional, invertir_telefono
+from .utils.sql_utils import upsert_incremental
+from .utils.impuestos_utils import tasa_porcentaje, tasa_iibb, tasa_cargada
 
 # --- Modelo Usuario Interno ---
 
@@ -158,7 +162,11 @@ class TipoCambio(db.Model):
 class Venta(db.Model):
     __tablename__ = 'ventas'
     # --- ¡¡AÑADIDO AQUÍ PARA SOLUCIONAR!! ---
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # KPIs diarios: rango de fecha_pedido + canal (cliente_id) + forma de pago
+        db.Index('ix_ventas_fecha_pedido_cliente_forma_pago', 'fecha_pedido', 'cliente_id', 'forma_pago'),
+        {'extend_existing': True},
+    )
     # ---------------------------------------
     id = db.Column(db.Integer, primary_key=True)
     usuario_interno_id = db.Column(db.Integer, db.ForeignKey('usuarios_internos.id'), nullable=False)
@@ -181,6 +189,8 @@ class Venta(db.Model):
     descuento_general = db.Column(db.Numeric(5, 2), nullable=True, default=0.00)
 
     vuelto_calculado = db.Column(db.Numeric(15, 2), nullable=True)
+    # Clave enviada por el POS (o generada en /registrar_lote) para que los reintentos no dupliquen ventas
+    clave_idempotencia = db.Column(db.String(64), unique=True, nullable=True)
     usuario_interno = db.relationship('UsuarioInterno', back_populates='ventas')
     cliente = db.relationship('Cliente', back_populates='ventas')
     detalles = db.relationship('DetalleVenta', back_populates='venta', lazy='select', cascade="all, delete-orphan")
@@ -197,6 +207,7 @@ class DetalleVenta(db.Model):
     observacion_item = db.Column(db.Text, nullable=True)
     margen_aplicado = db.Column(db.Numeric(10, 4), nullable=True)
     costo_unitario_momento_ars = db.Column(db.Numeric(15, 4), nullable=True)
+    tc_costo_momento = db.Column(db.Numeric(15, 4), nullable=True) # TC usado para costo_unitario_momento_ars
     coeficiente_usado = db.Column(db.Numeric(10, 4), nullable=True)
     precio_unitario_venta_ars = db.Column(db.Numeric(15, 4), nullable=False)
     precio_total_item_ars = db.Column(db.Numeric(15, 2), nullable=False)
@@ -244,6 +255,20 @@ class OrdenCompra(db.Model):
     cuenta = db.Column(db.String(100), nullable=True)
     iibb = db.Column(db.String(50), nullable=True)
     iva = db.Column(db.String(50), nullable=True)
+    # Metadatos tipados (antes marcadores __X__: dentro de observaciones/notas)
+    tc_snapshot = db.Column(db.Numeric(15, 4), nullable=True)  # TC de referencia al crear/aprobar/recibir
+    fecha_entrega_tentativa = db.Column(db.DateTime, nullable=True, index=True)
+    importe_base_sin_impuestos = db.Column(db.Numeric(15, 2), nullable=True)
+    iva_tasa = db.Column(db.Numeric(7, 4), nullable=True)  # fracción (0.21); None si no se cargó IVA
+    iibb_tasa = db.Column(db.Numeric(7, 4), nullable=True)
+
+    @validates('iva', 'iibb')
+    def validate_impuestos(self, key, valor):
+        if key == 'iva':
+            self.iva_tasa = tasa_cargada(valor, tasa_porcentaje)
+        else:
+            self.iibb_tasa = tasa_cargada(valor, tasa_iibb)
+        return valor
 
 # --- Modelo DetalleOrdenCompra ---
 class DetalleOrdenCompra(db.Model):
@@ -264,6 +289,10 @@ class DetalleOrdenCompra(db.Model):
 # --- Modelo AuditLog ---
 class AuditLog(db.Model):
     __tablename__ = 'audit_logs'
+    __table_args__ = (
+        # Historial de una entidad: WHERE entidad = ? AND entidad_id = ? ORDER BY fecha
+        db.Index('ix_audit_logs_entidad_entidad_id_fecha', 'entidad', 'entidad_id', 'fecha'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     entidad = db.Column(db.String(100), nullable=False)  # p.ej. 'OrdenCompra'
     entidad_id = db.Column(db.Integer, nullable=False)
@@ -288,18 +317,95 @@ class AuditLog(db.Model):
 # --- Modelo MovimientoProveedor ---
 class MovimientoProveedor(db.Model):
     __tablename__ = 'movimientos_proveedor'
+    __table_args__ = (
+        # Estado de cuenta: keyset por (fecha, id) dentro de cada proveedor
+        db.Index('ix_mov_prov_proveedor_fecha_id', 'proveedor_id', 'fecha', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     proveedor_id = db.Column(db.Integer, db.ForeignKey('proveedores.id'), nullable=False, index=True)
     orden_id = db.Column(db.Integer, db.ForeignKey('ordenes_compra.id'), nullable=False, index=True)
     tipo = db.Column(db.String(10), nullable=False)  # 'DEBITO' o 'CREDITO'
     monto = db.Column(db.Numeric(15, 2), nullable=False)
-    fecha = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    fecha = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))  # NOT NULL: clave del keyset (fecha, id)
     descripcion = db.Column(db.String(255), nullable=True)
     usuario = db.Column(db.String(100), nullable=True)
 
     proveedor = db.relationship('Proveedor')
     orden = db.relationship('OrdenCompra')
 
+
+class SaldoProveedor(db.Model):
+    """
+    Acumulado de movimientos_proveedor por proveedor (deuda = debitos - creditos).
+    Lo mantienen los eventos de MovimientoProveedor de abajo, en el mismo flush que
+    escribe el movimiento; scripts/conciliar_saldo_proveedor.py lo verifica contra
+    los movimientos.
+    """
+    __tablename__ = 'saldo_proveedor'
+    proveedor_id = db.Column(db.Integer, db.ForeignKey('proveedores.id', ondelete='CASCADE'), primary_key=True)
+    debitos = db.Column(db.Numeric(15, 2), nullable=False, default=Decimal('0.00'))
+    creditos = db.Column(db.Numeric(15, 2), nullable=False, default=Decimal('0.00'))
+
+    @property
+    def deuda(self):
+        return (self.debitos or Decimal('0')) - (self.creditos or Decimal('0'))
+
+
+def _aportes_movimiento(proveedor_id, tipo, monto):
+    """(proveedor_id, delta_debitos, delta_creditos) de un movimiento."""
+    monto = Decimal(str(monto or 0))
+    tipo = (tipo or '').upper()
+    return (
+        proveedor_id,
+        monto if tipo == 'DEBITO' else Decimal('0'),
+        monto if tipo == 'CREDITO' else Decimal('0'),
+    )
+
+
+def _aplicar_aportes_saldo(connection, aportes, signo=1):
+    filas = [
+        {'proveedor_id': pid, 'debitos': signo * deb, 'creditos': signo * cred}
+        for pid, deb, cred in aportes
+        if pid is not None and (deb or cred)
+    ]
+    upsert_incremental(
+        connection, SaldoProveedor.__table__, filas,
+        claves=('proveedor_id',), columnas=('debitos', 'creditos')
+    )
+
+
+@event.listens_for(MovimientoProveedor, 'after_insert')
+def _saldo_tras_insertar_movimiento(mapper, connection, target):
+    _aplicar_aportes_saldo(connection, [_aportes_movimiento(target.proveedor_id, target.tipo, target.monto)])
+
+
+def _aportes_guardados(connection, movimiento_id):
+    """Aportes del movimiento según la fila guardada (el objeto puede venir expirado)."""
+    tabla = MovimientoProveedor.__table__
+    fila = connection.execute(
+        tabla.select().with_only_columns([tabla.c.proveedor_id, tabla.c.tipo, tabla.c.monto])
+        .where(tabla.c.id == movimiento_id)
+    ).first()
+    return _aportes_movimiento(fila.proveedor_id, fila.tipo, fila.monto) if fila else None
+
+
+@event.listens_for(MovimientoProveedor, 'before_update')
+def _saldo_antes_de_actualizar_movimiento(mapper, connection, target):
+    # p.ej. _actualizar_movimiento_deuda reescribe el monto del DEBITO de la OC
+    previo = _aportes_guardados(connection, target.id)
+    actual = _aportes_movimiento(target.proveedor_id, target.tipo, target.monto)
+    if previo is not None and previo != actual:
+        _aplicar_aportes_saldo(connection, [previo], signo=-1)
+        _aplicar_aportes_saldo(connection, [actual])
+
+
+@event.listens_for(MovimientoProveedor, 'before_delete')
+def _saldo_antes_de_borrar_movimiento(mapper, connection, target):
+    previo = _aportes_guardados(connection, target.id)
+    if previo is not None:
+        _aplicar_aportes_saldo(connection, [previo], signo=-1)
+
+
 class Cliente(db.Model):
     __tablename__ = 'clientes'
     id = db.Column(db.Integer, primary_key=True)
@@ -310,6 +416,10 @@ class Cliente(db.Model):
     provincia = db.Column(db.String(100), nullable=True)
     codigo_postal = db.Column(db.String(20), nullable=True)
     telefono = db.Column(db.String(50), nullable=True)
+    # Número nacional en dígitos (sin 54/9/0/15) y su inverso, para buscar por sufijo
+    # con índice; se completan al asignar 'telefono'
+    telefono_normalizado = db.Column(db.String(50), nullable=True, index=True)
+    telefono_normalizado_inv = db.Column(db.String(50), nullable=True, index=True)
     email = db.Column(db.String(100), nullable=True, index=True)
     contacto_principal = db.Column(db.String(150), nullable=True) # Nombre de la persona de contacto
     condicion_iva = db.Column(db.String(50), nullable=True) # Ej: Responsable Inscripto, Monotributista, Consumidor Final
@@ -322,6 +432,12 @@ class Cliente(db.Model):
     # Asumiendo que en Venta tienes: cliente = db.relationship('Cliente', back_populates='ventas')
     ventas = db.relationship('Venta', back_populates='cliente', lazy='dynamic')
 
+    @validates('telefono')
+    def validate_telefono(self, key, telefono_value):
+        self.telefono_normalizado = telefono_nacional(telefono_value)
+        self.telefono_normalizado_inv = invertir_telefono(self.telefono_normalizado)
+        return telefono_value
+
     def repr(self):
         return f'<Cliente ID:{self.id} {self.nombre_razon_social}>'
 
@@ -451,3 +567,157 @@ class CostoHistorico(db.Model):
             'costo_total': float(self.costo_total),
             'detalles': self.detalles
         }
+
+
+# --- Modelo VentaResumenDiario ---
+class VentaResumenDiario(db.Model):
+    """
+    Resumen diario de ventas por (fecha de pedido, fecha de registro, canal,
+    con dirección de entrega, forma de pago, estado).
+    Se mantiene por deltas en cada alta/edición/baja/cambio de estado de ventas
+    (utils/resumen_ventas_utils.py) y se puede reconstruir con
+    scripts/reconstruir_resumen_ventas.py.
+    """
+    __tablename__ = 'ventas_resumen_diario'
+    __table_args__ = (
+        UniqueConstraint('fecha', 'fecha_registro', 'canal', 'con_direccion', 'forma_pago', 'estado',
+                         name='uq_ventas_resumen_diario_clave'),
+        # Caja del día y KPIs del mes van por fecha de registro
+        db.Index('ix_ventas_resumen_diario_fecha_registro', 'fecha_registro'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.Date, nullable=False)  # fecha de pedido
+    fecha_registro = db.Column(db.Date, nullable=False)
+    canal = db.Column(db.String(10), nullable=False)  # 'puerta' (sin cliente) o 'pedido'
+    con_direccion = db.Column(db.Boolean, nullable=False, default=False)  # direccion_entrega no vacía
+    forma_pago = db.Column(db.String(50), nullable=False, default='')
+    estado = db.Column(db.String(30), nullable=False)
+    monto = db.Column(db.Numeric(15, 2), nullable=False, default=0)  # suma de monto_final_redondeado
+    monto_con_recargos = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    monto_centena = db.Column(db.Numeric(15, 2), nullable=False, default=0)  # cada venta redondeada a la centena superior
+    unidades = db.Column(db.Integer, nullable=False, default=0)
+    kgs = db.Column(db.Numeric(15, 4), nullable=False, default=0)
+    costo = db.Column(db.Numeric(18, 4), nullable=False, default=0)  # cantidad × costo_unitario_momento_ars
+
+    def to_dict(self):
+        return {
+            'fecha': self.fecha.isoformat(),
+            'fecha_registro': self.fecha_registro.isoformat(),
+            'canal': self.canal,
+            'con_direccion': bool(self.con_direccion),
+            'forma_pago': self.forma_pago,
+            'estado': self.estado,
+            'monto': float(self.monto or 0),
+            'monto_con_recargos': float(self.monto_con_recargos or 0),
+            'unidades': self.unidades,
+            'kgs': float(self.kgs or 0),
+            'costo': float(self.costo or 0),
+        }
+
+
+# --- Modelo TrabajoSegundoPlano ---
+class TrabajoSegundoPlano(db.Model):
+    """
+    Seguimiento de procesos largos lanzados desde un request (p.ej. recálculo de
+    deudas de OCs al cambiar el dólar). Lo ejecuta utils/trabajos_utils.py en un
+    hilo aparte; el progreso queda en la tabla para poder consultarlo desde
+    cualquier worker.
+    """
+    __tablename__ = 'trabajos_segundo_plano'
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False, index=True)
+    estado = db.Column(db.String(20), nullable=False, default='PENDIENTE')  # PENDIENTE, EN_CURSO, COMPLETADO, ERROR
+    total = db.Column(db.Integer, nullable=False, default=0)
+    procesados = db.Column(db.Integer, nullable=False, default=0)
+    parametros = db.Column(db.Text, nullable=True)  # JSON
+    error = db.Column(db.Text, nullable=True)
+    resultado = db.Column(db.Text().with_variant(LONGTEXT(), 'mysql'), nullable=True)  # JSON devuelto por la tarea
+    usuario = db.Column(db.String(100), nullable=True)
+    fecha_creacion = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    fecha_actualizacion = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    fecha_fin = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'estado': self.estado,
+            'total': self.total,
+            'procesados': self.procesados,
+            'porcentaje': round(100.0 * self.procesados / self.total, 1) if self.total else 100.0,
+            'error': self.error,
+            'resultado': json.loads(self.resultado) if self.resultado else None,
+            'usuario': self.usuario,
+            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
+            'fecha_fin': self.fecha_fin.isoformat() if self.fecha_fin else None,
+        }
+
+
+# --- Modelo Secuencia ---
+class Secuencia(db.Model):
+    """
+    Contadores con nombre para numerar documentos (p.ej. 'orden_compra:20261019').
+    Se asignan con utils/secuencias_utils.siguiente_valor: un único UPDATE con
+    bloqueo de fila, sin contar filas de la tabla del documento.
+    """
+    __tablename__ = 'secuencias'
+    nombre = db.Column(db.String(100), primary_key=True)
+    valor = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+# --- Modelos AjustePrecioEspecial ---
+class AjustePrecioEspecial(db.Model):
+    """
+    Cabecera de cada ajuste porcentual global de precios especiales
+    (/precios_especiales/actualizar-global). Los valores previos quedan en
+    AjustePrecioEspecialDetalle para poder revertir el ajuste completo.
+    """
+    __tablename__ = 'ajustes_precios_especiales'
+    id = db.Column(db.Integer, primary_key=True)
+    porcentaje = db.Column(db.Numeric(10, 4), nullable=False)
+    direccion = db.Column(db.String(10), nullable=False)  # 'subida' o 'bajada'
+    factor = db.Column(db.Numeric(12, 6), nullable=False)
+    total_precios = db.Column(db.Integer, nullable=False, default=0)
+    usuario = db.Column(db.String(100), nullable=True)
+    fecha = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    fecha_reversion = db.Column(db.DateTime, nullable=True)
+    total_revertidos = db.Column(db.Integer, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'porcentaje': float(self.porcentaje),
+            'direccion': self.direccion,
+            'factor': float(self.factor),
+            'total_precios': self.total_precios,
+            'usuario': self.usuario,
+            'fecha': self.fecha.isoformat() if self.fecha else None,
+            'fecha_reversion': self.fecha_reversion.isoformat() if self.fecha_reversion else None,
+            'total_revertidos': self.total_revertidos,
+        }
+
+
+class AjustePrecioEspecialDetalle(db.Model):
+    """Precio antes/después de un ajuste global, una fila por precio especial tocado."""
+    __tablename__ = 'ajustes_precios_especiales_detalle'
+    ajuste_id = db.Column(db.Integer, db.ForeignKey('ajustes_precios_especiales.id', ondelete='CASCADE'), primary_key=True)
+    precio_especial_id = db.Column(db.Integer, primary_key=True)
+    precio_anterior = db.Column(db.Numeric(15, 4), nullable=False)
+    precio_nuevo = db.Column(db.Numeric(15, 4), nullable=False)
+
+
+# --- Modelo CambioSincronizacion ---
+class CambioSincronizacion(db.Model):
+    """
+    Registro de cambios de catálogo para /sync/cambios: una fila por entidad
+    creada, modificada o eliminada. 'version' es la de la transacción que hizo
+    el cambio (se asigna al confirmar, ver utils/sincronizacion_utils.py), por
+    eso las versiones se hacen visibles en orden creciente.
+    """
+    __tablename__ = 'cambios_sincronizacion'
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, index=True)
+    entidad = db.Column(db.String(30), nullable=False)  # 'productos', 'clientes', 'precios_especiales', 'tipos_cambio'
+    entidad_id = db.Column(db.Integer, nullable=False)
+    operacion = db.Column(db.String(15), nullable=False)  # 'alta', 'modificacion' o 'baja'
+    fecha = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,140 @@
+# utils/ajuste_precios_utils.py
+"""
+Ajuste porcentual global de precios especiales resuelto en SQL.
+
+Cada tramo de ids se procesa con dos sentencias en la misma transacción: un
+INSERT ... SELECT que guarda precio anterior/nuevo en
+ajustes_precios_especiales_detalle y un UPDATE con la misma expresión. Los
+tramos cortos mantienen breves los bloqueos; el detalle permite revertir el
+ajuste completo con la misma mecánica.
+"""
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import and_, exists, func, literal, select, Numeric
+
+from .. import db
+from ..models import PrecioEspecialCliente, AjustePrecioEspecial, AjustePrecioEspecialDetalle
+from .cache_utils import invalidar_tags, TAG_PRECIOS_ESPECIALES
+from .sincronizacion_utils import registrar_cambios_consulta, ENTIDAD_PRECIOS_ESPECIALES
+
+logger = logging.getLogger(__name__)
+
+PRECIOS_POR_TRAMO = 2000
+
+
+def expresion_ajuste(precio, direccion, factor):
+    """
+    Precio ajustado en SQL: en subidas se redondea hacia arriba a la decena
+    (como redondear_a_siguiente_decena_simplificado); en bajadas al centavo.
+    """
+    ajustado = precio * literal(factor, Numeric(12, 6))
+    if direccion == 'subida':
+        return func.ceil(ajustado / 10) * 10
+    return func.round(ajustado, 2)
+
+
+def _tramos(columna_id, *filtros):
+    """Rangos [desde, hasta] de ids que cubren las filas que cumplen 'filtros'."""
+    minimo, maximo = db.session.query(func.min(columna_id), func.max(columna_id)).filter(*filtros).one()
+    if minimo is None:
+        return
+    for desde in range(minimo, maximo + 1, PRECIOS_POR_TRAMO):
+        yield desde, desde + PRECIOS_POR_TRAMO - 1
+
+
+def aplicar_ajuste_global(porcentaje, direccion, factor, usuario=None):
+    """
+    Aplica 'factor' a todos los precios especiales activos con precio > 0,
+    con commit por tramo. Devuelve el AjustePrecioEspecial registrado.
+    """
+    precios = PrecioEspecialCliente.__table__
+    detalle = AjustePrecioEspecialDetalle.__table__
+    ajuste = AjustePrecioEspecial(porcentaje=porcentaje, direccion=direccion, factor=factor, usuario=usuario)
+    db.session.add(ajuste)
+    db.session.flush()
+
+    precio = precios.c.precio_unitario_fijo_ars
+    nuevo = expresion_ajuste(precio, direccion, factor)
+    ajustables = (precios.c.activo.is_(True), precio > 0)
+    total = 0
+    for desde, hasta in _tramos(precios.c.id, *ajustables):
+        filtro = and_(*ajustables, precios.c.id.between(desde, hasta))
+        db.session.execute(detalle.insert().from_select(
+            ['ajuste_id', 'precio_especial_id', 'precio_anterior', 'precio_nuevo'],
+            select(literal(ajuste.id), precios.c.id, precio, nuevo).where(filtro)
+        ))
+        resultado = db.session.execute(
+            precios.update().where(filtro).values(
+                precio_unitario_fijo_ars=nuevo, fecha_modificacion=datetime.utcnow()
+            )
+        )
+        total += resultado.rowcount
+        # Viaja en el commit del tramo: si un tramo falla, el total refleja lo ya aplicado
+        ajuste.total_precios = total
+        registrar_cambios_consulta(
+            ENTIDAD_PRECIOS_ESPECIALES, detalle.c.precio_especial_id,
+            detalle.c.ajuste_id == ajuste.id, detalle.c.precio_especial_id.between(desde, hasta)
+        )
+        db.session.commit()
+        invalidar_tags(TAG_PRECIOS_ESPECIALES)
+        logger.info("[ajuste_global %s] ids %s-%s: %s precios ajustados", ajuste.id, desde, hasta, resultado.rowcount)
+
+    db.session.commit()
+    return ajuste
+
+
+def revertir_ajuste(ajuste):
+    """
+    Vuelve al precio anterior los precios del ajuste que siguen con el valor que
+    les dejó el ajuste (los editados después no se tocan). Devuelve (revertidos, omitidos).
+    """
+    # La cabecera se lee bloqueada y se marca como revertida antes de los tramos:
+    # una segunda reversión concurrente espera el lock y después ve la marca.
+    ajuste = db.session.query(AjustePrecioEspecial).filter_by(id=ajuste.id) \
+        .with_for_update().populate_existing().one()
+    if ajuste.fecha_reversion is not None:
+        db.session.rollback()
+        raise ValueError(f"El ajuste {ajuste.id} ya fue revertido.")
+    ajuste.fecha_reversion = datetime.now(timezone.utc)
+    db.session.commit()
+
+    precios = PrecioEspecialCliente.__table__
+    detalle = AjustePrecioEspecialDetalle.__table__
+    sin_cambios_posteriores = and_(
+        detalle.c.ajuste_id == ajuste.id,
+        detalle.c.precio_especial_id == precios.c.id,
+        detalle.c.precio_nuevo == precios.c.precio_unitario_fijo_ars,
+    )
+    precio_anterior = select(detalle.c.precio_anterior).where(sin_cambios_posteriores).scalar_subquery()
+    revertidos = 0
+    try:
+        for desde, hasta in _tramos(detalle.c.precio_especial_id, detalle.c.ajuste_id == ajuste.id):
+            resultado = db.session.execute(
+                precios.update().where(
+                    precios.c.id.between(desde, hasta),
+                    exists().where(sin_cambios_posteriores)
+                ).values(precio_unitario_fijo_ars=precio_anterior, fecha_modificacion=datetime.utcnow())
+            )
+            revertidos += resultado.rowcount
+            registrar_cambios_consulta(
+                ENTIDAD_PRECIOS_ESPECIALES, detalle.c.precio_especial_id,
+                detalle.c.ajuste_id == ajuste.id, detalle.c.precio_especial_id.between(desde, hasta)
+            )
+            db.session.commit()
+            invalidar_tags(TAG_PRECIOS_ESPECIALES)
+            logger.info("[ajuste_global %s] reversión ids %s-%s: %s precios", ajuste.id, desde, hasta, resultado.rowcount)
+    except Exception:
+        # Se libera la marca para poder reintentar: los tramos ya revertidos no
+        # vuelven a coincidir con precio_nuevo y quedan fuera del reintento.
+        db.session.rollback()
+        ajuste.fecha_reversion = None
+        db.session.commit()
+        raise
+
+    # Los omitidos salen del detalle guardado, no de total_precios (puede haber quedado parcial)
+    en_detalle = db.session.query(func.count()).select_from(detalle) \
+        .filter(detalle.c.ajuste_id == ajuste.id).scalar()
+    ajuste.total_revertidos = revertidos
+    db.session.commit()
+    return revertidos, en_detalle - revertidos
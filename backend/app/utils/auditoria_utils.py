@@ -0,0 +1,159 @@
+# utils/auditoria_utils.py
+"""
+Escritura de audit_logs fuera del camino del request.
+
+registrar_auditoria() arma la fila (con el diff entre el estado previo y el nuevo)
+y la encola; un hilo por proceso junta las filas y las inserta de a lotes con un
+INSERT multi-fila. Si la cola está llena, o la app no habilita
+AUDITORIA_ASINCRONICA, la fila se escribe en el momento (fallback sincrónico).
+En ambos casos va por una conexión propia: no toca la sesión del request.
+"""
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import current_app
+
+from .. import db
+from ..models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+AUDITORIA_LOTE_DEFAULT = 200
+AUDITORIA_INTERVALO_SEG_DEFAULT = 1.0
+AUDITORIA_COLA_MAX_DEFAULT = 10000
+
+
+def diff_auditoria(previo, nuevo):
+    """
+    Campos que cambiaron entre dos dicts: (solo_previos, solo_nuevos).
+    Las claves que no cambiaron no se guardan.
+    """
+    previo = previo or {}
+    nuevo = nuevo or {}
+    claves = [k for k in nuevo if previo.get(k) != nuevo[k]]
+    claves += [k for k in previo if k not in nuevo]
+    return (
+        {k: previo.get(k) for k in claves if k in previo},
+        {k: nuevo.get(k) for k in claves if k in nuevo},
+    )
+
+
+def _json(data):
+    if data is None:
+        return None
+    try:
+        return json.dumps(data, ensure_ascii=False, default=str)
+    except Exception:
+        return str(data)
+
+
+def escribir_filas_auditoria(filas):
+    """INSERT multi-fila en audit_logs, en una transacción propia."""
+    if not filas:
+        return
+    with db.engine.begin() as conexion:
+        conexion.execute(AuditLog.__table__.insert().values(filas))
+
+
+class EscritorAuditoria:
+    """Cola acotada + hilo que vacía la cola de a lotes (uno por app y proceso)."""
+
+    def __init__(self, app, tamano_lote, intervalo_seg, max_cola):
+        self._app = app
+        self._tamano_lote = tamano_lote
+        self._intervalo_seg = intervalo_seg
+        self._cola = queue.Queue(maxsize=max_cola)
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def encolar(self, fila):
+        """False si la cola está llena (el llamador escribe en el momento)."""
+        self._asegurar_hilo()
+        try:
+            self._cola.put_nowait(fila)
+            return True
+        except queue.Full:
+            return False
+
+    def vaciar(self):
+        """Bloquea hasta que todo lo encolado quedó escrito (tests, cierre del proceso)."""
+        if self._hilo is not None:
+            self._cola.join()
+
+    def _asegurar_hilo(self):
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._correr, name='auditoria', daemon=True)
+                self._hilo.start()
+
+    def _siguiente_lote(self):
+        lote = [self._cola.get()]
+        limite = time.monotonic() + self._intervalo_seg
+        while len(lote) < self._tamano_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _correr(self):
+        while True:
+            lote = self._siguiente_lote()
+            try:
+                with self._app.app_context():
+                    escribir_filas_auditoria(lote)
+            except Exception:
+                logger.exception("No se pudieron escribir %s registros de auditoría", len(lote))
+            finally:
+                for _ in lote:
+                    self._cola.task_done()
+
+
+def _escritor():
+    app = current_app._get_current_object()
+    escritor = app.extensions.get('auditoria')
+    if escritor is None:
+        escritor = EscritorAuditoria(
+            app,
+            tamano_lote=app.config.get('AUDITORIA_LOTE', AUDITORIA_LOTE_DEFAULT),
+            intervalo_seg=app.config.get('AUDITORIA_INTERVALO_SEG', AUDITORIA_INTERVALO_SEG_DEFAULT),
+            max_cola=app.config.get('AUDITORIA_COLA_MAX', AUDITORIA_COLA_MAX_DEFAULT),
+        )
+        app.extensions['auditoria'] = escritor
+        atexit.register(escritor.vaciar)
+    return escritor
+
+
+def registrar_auditoria(entidad, entidad_id, accion, usuario=None, previos=None, nuevos=None):
+    """
+    Registra una acción sobre 'entidad'. Con 'previos' y 'nuevos' se guarda solo
+    lo que cambió; sin 'previos' (p.ej. CREAR) se guarda 'nuevos' completo.
+    Nunca levanta excepción: la auditoría no debe cortar la operación.
+    """
+    try:
+        if previos is not None:
+            previos, nuevos = diff_auditoria(previos, nuevos)
+        fila = {
+            'entidad': entidad,
+            'entidad_id': entidad_id,
+            'accion': accion,
+            'usuario': usuario,
+            'fecha': datetime.now(timezone.utc),
+            'datos_previos': _json(previos),
+            'datos_nuevos': _json(nuevos),
+        }
+        if current_app.config.get('AUDITORIA_ASINCRONICA') and _escritor().encolar(fila):
+            return
+        escribir_filas_auditoria([fila])
+    except Exception:
+        logger.exception("No se pudo registrar auditoría %s %s %s", entidad, entidad_id, accion)
@@ -0,0 +1,89 @@
+# utils/busqueda_clientes_utils.py
+"""
+Búsqueda de clientes por texto libre.
+
+En MySQL, con el índice FULLTEXT 'ft_clientes_busqueda' (parser ngram y sin
+stopwords, ver la migración 20261019_add_fulltext_clientes), la búsqueda es un MATCH ... AGAINST
+en modo booleano ordenado por relevancia, y los CUIT se buscan por prefijo sobre
+su índice B-tree. Sin el índice (p.ej. SQLite en tests) se mantiene el ILIKE
+'%termino%' sobre las cinco columnas.
+"""
+import re
+
+from sqlalchemy import or_, text
+from sqlalchemy.dialects.mysql import match
+
+from .. import db
+from ..models import Cliente
+
+INDICE_FULLTEXT_CLIENTES = 'ft_clientes_busqueda'
+# ngram_token_size por defecto de MySQL: términos más cortos no generan tokens
+LARGO_MINIMO_FULLTEXT = 2
+
+_OPERADORES_BOOLEANOS = re.compile(r'[+\-<>()~*"@]+')
+_PATRON_CUIT = re.compile(r'^[\d\-\s.]+$')
+
+# Presencia del índice por engine (se consulta una vez por proceso)
+_fulltext_por_engine = {}
+
+
+def columnas_fulltext():
+    return (Cliente.nombre_razon_social, Cliente.localidad, Cliente.email, Cliente.contacto_principal)
+
+
+def fulltext_disponible():
+    """True si la base es MySQL y tiene el índice FULLTEXT de clientes."""
+    bind = db.session.get_bind()
+    if bind.dialect.name != 'mysql':
+        return False
+    clave = str(bind.url)
+    if clave not in _fulltext_por_engine:
+        cantidad = db.session.execute(text(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'clientes' "
+            "AND index_name = :indice AND index_type = 'FULLTEXT'"
+        ), {'indice': INDICE_FULLTEXT_CLIENTES}).scalar()
+        _fulltext_por_engine[clave] = bool(cantidad)
+    return _fulltext_por_engine[clave]
+
+
+def _consulta_booleana(termino):
+    """'acme sa' -> '+"acme" +"sa"': cada palabra obligatoria, como frase de n-gramas."""
+    palabras = _OPERADORES_BOOLEANOS.sub(' ', termino).split()
+    palabras = [p for p in palabras if len(p) >= LARGO_MINIMO_FULLTEXT]
+    return ' '.join(f'+"{p}"' for p in palabras)
+
+
+def _filtro_like(termino):
+    like_term = f"%{termino}%"
+    return or_(
+        Cliente.nombre_razon_social.ilike(like_term),
+        Cliente.localidad.ilike(like_term),
+        Cliente.email.ilike(like_term),
+        Cliente.cuit.ilike(like_term),
+        Cliente.contacto_principal.ilike(like_term),
+    )
+
+
+def aplicar_busqueda_clientes(query, search_term):
+    """
+    Filtra y ordena 'query' (sobre Cliente) por 'search_term'. Con FULLTEXT, los
+    resultados salen por relevancia; si el término parece un CUIT se suma la
+    coincidencia por prefijo. Sin término, o sin índice, orden alfabético.
+    """
+    termino = (search_term or '').strip()
+    if not termino:
+        return query.order_by(Cliente.nombre_razon_social)
+
+    consulta = _consulta_booleana(termino)
+    if not consulta or not fulltext_disponible():
+        return query.filter(_filtro_like(termino)).order_by(Cliente.nombre_razon_social)
+
+    relevancia = match(*columnas_fulltext(), against=consulta).in_boolean_mode()
+    condiciones = [relevancia]
+    if _PATRON_CUIT.match(termino):
+        digitos = re.sub(r'\D', '', termino)
+        condiciones.append(Cliente.cuit.like(f'{termino}%'))
+        if digitos and digitos != termino:
+            condiciones.append(Cliente.cuit.like(f'{digitos}%'))
+    return query.filter(or_(*condiciones)).order_by(relevancia.desc(), Cliente.nombre_razon_social)
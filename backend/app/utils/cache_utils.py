@@ -0,0 +1,202 @@
+# utils/cache_utils.py
+"""
+Caché de respuestas compartida entre workers, con invalidación por tags.
+
+La instancia 'cache' (app/__init__.py) es Redis cuando está REDIS_URL y
+SimpleCache en memoria si no (desarrollo y tests). Cada tag de TAGS_CACHE tiene
+un número de versión guardado en la misma caché y la clave de cada respuesta
+incluye las versiones de sus tags: invalidar un tag es un INCR, las entradas
+anteriores dejan de leerse y expiran solas. Así las respuestas pueden vivir
+TTL_CACHE_LARGO sin quedar desactualizadas.
+
+Los commits de sesión que tocan modelos de TAGS_POR_TABLA invalidan sus tags
+automáticamente; los UPDATE masivos (query.update, SQL Core, upserts) deben
+llamar a invalidar_tags() después de confirmar.
+
+Las mismas versiones son la versión de catálogo de cada entidad: etag_por_tags()
+las expone como ETag fuerte y responde 304 a un If-None-Match vigente con una
+sola lectura de versiones, sin consultar la base ni serializar.
+"""
+import hashlib
+import logging
+import time
+from functools import wraps
+
+from flask import current_app, has_app_context, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .. import cache
+
+logger = logging.getLogger(__name__)
+
+TAG_PRODUCTOS = 'productos'
+TAG_CLIENTES = 'clientes'
+TAG_TIPOS_CAMBIO = 'tipos_cambio'
+TAG_PRECIOS_ESPECIALES = 'precios_especiales'
+TAG_COMBOS = 'combos'
+TAG_PROVEEDORES = 'proveedores'
+TAG_CATEGORIAS = 'categorias'
+TAGS_CACHE = (TAG_PRODUCTOS, TAG_CLIENTES, TAG_TIPOS_CAMBIO, TAG_PRECIOS_ESPECIALES,
+              TAG_COMBOS, TAG_PROVEEDORES, TAG_CATEGORIAS)
+
+TTL_CACHE_LARGO = 6 * 60 * 60
+
+# Tablas cuyos cambios vía ORM invalidan cada tag al confirmar la sesión
+TAGS_POR_TABLA = {
+    'productos': (TAG_PRODUCTOS,),
+    'categorias_producto': (TAG_PRODUCTOS, TAG_CATEGORIAS),
+    'recetas': (TAG_PRODUCTOS,),
+    'receta_items': (TAG_PRODUCTOS,),
+    'clientes': (TAG_CLIENTES,),
+    'tipos_cambio': (TAG_TIPOS_CAMBIO,),
+    'precios_especiales_cliente': (TAG_PRECIOS_ESPECIALES,),
+    'combos': (TAG_COMBOS,),
+    'combo_componentes': (TAG_COMBOS,),
+    'proveedores': (TAG_PROVEEDORES,),
+}
+
+# Cache-Control de las respuestas con ETag: el navegador guarda la copia pero revalida siempre
+CACHE_CONTROL_CATALOGO = 'private, no-cache'
+
+
+def _clave_tag(tag):
+    return f'cache_tag:{tag}'
+
+
+def cache_activa():
+    """True si hay app y la extensión de caché está inicializada en ella."""
+    return has_app_context() and cache in current_app.extensions.get('cache', {})
+
+
+def versiones_tags(tags):
+    """
+    Versión vigente de cada tag. Un tag sin versión (primera vez o desalojado
+    de Redis) arranca en el timestamp actual en ms, para no repetir una versión
+    que ya se haya usado en claves anteriores.
+    """
+    claves = [_clave_tag(tag) for tag in tags]
+    versiones = list(cache.get_many(*claves)) if claves else []
+    for posicion, (clave, version) in enumerate(zip(claves, versiones)):
+        if version is None:
+            cache.add(clave, int(time.time() * 1000), timeout=0)
+            versiones[posicion] = cache.get(clave)
+    return dict(zip(tags, versiones))
+
+
+def invalidar_tags(*tags):
+    """Invalida todas las respuestas cacheadas con alguno de 'tags'."""
+    if not cache_activa():
+        return
+    for tag in dict.fromkeys(tags):
+        try:
+            # Si no se pudo incrementar, borrar la versión fuerza una nueva en la próxima lectura
+            if cache.cache.inc(_clave_tag(tag)) is None:
+                cache.delete(_clave_tag(tag))
+        except Exception:
+            logger.exception("ERROR [invalidar_tags]: no se pudo invalidar el tag %s", tag)
+
+
+def _versiones_request(tags):
+    """versiones_tags() leídas una vez por request (las comparten ETag y caché)."""
+    leidas = request.environ.setdefault('cache_utils.versiones_tags', {})
+    if tags not in leidas:
+        leidas[tags] = versiones_tags(tags)
+    return leidas[tags]
+
+
+def _firma_request(tags, query_string):
+    versiones = _versiones_request(tags)
+    partes = [request.path] + [f'{tag}={versiones[tag]}' for tag in tags]
+    if query_string:
+        argumentos = sorted(request.args.items(multi=True))
+        partes.append(hashlib.md5(repr(argumentos).encode('utf-8')).hexdigest())
+    return '|'.join(partes)
+
+
+def _clave_respuesta(tags, query_string):
+    return 'vista:' + _firma_request(tags, query_string)
+
+
+def cache_con_tags(*tags, timeout=TTL_CACHE_LARGO, query_string=False):
+    """
+    Cachea las respuestas 200 de una vista bajo 'tags'. Se guarda el cuerpo ya
+    serializado (bytes + mimetype), válido tanto para Redis como en memoria.
+    Sin caché inicializada la vista se ejecuta siempre.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            if not cache_activa():
+                return vista(*args, **kwargs)
+            try:
+                clave = _clave_respuesta(tags, query_string)
+                guardada = cache.get(clave)
+            except Exception:
+                logger.exception("ERROR [cache_con_tags]: caché no disponible para %s", request.path)
+                return vista(*args, **kwargs)
+            if guardada is not None:
+                cuerpo, mimetype = guardada
+                return current_app.response_class(cuerpo, status=200, mimetype=mimetype)
+
+            respuesta = make_response(vista(*args, **kwargs))
+            if respuesta.status_code == 200 and not respuesta.direct_passthrough:
+                try:
+                    cache.set(clave, (respuesta.get_data(), respuesta.mimetype), timeout=timeout)
+                except Exception:
+                    logger.exception("ERROR [cache_con_tags]: no se pudo guardar %s", clave)
+            return respuesta
+        return envoltura
+    return decorador
+
+
+def etag_por_tags(*tags, query_string=True):
+    """
+    GET condicional sobre la versión de catálogo de 'tags': agrega un ETag fuerte
+    (hash de ruta, parámetros y versiones) y Cache-Control de revalidación; si
+    el If-None-Match coincide responde 304 sin ejecutar la vista. Va por encima
+    de cache_con_tags (y debajo de la autenticación).
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            if not cache_activa():
+                return vista(*args, **kwargs)
+            try:
+                etag = hashlib.sha1(_firma_request(tags, query_string).encode('utf-8')).hexdigest()
+            except Exception:
+                logger.exception("ERROR [etag_por_tags]: versiones no disponibles para %s", request.path)
+                return vista(*args, **kwargs)
+            if request.if_none_match.contains_weak(etag):
+                respuesta = current_app.response_class(status=304)
+            else:
+                respuesta = make_response(vista(*args, **kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+            respuesta.set_etag(etag)
+            respuesta.headers['Cache-Control'] = CACHE_CONTROL_CATALOGO
+            return respuesta
+        return envoltura
+    return decorador
+
+
+# --- Invalidación por commits ORM ---
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_tags_modificados(session, flush_context):
+    tags = session.info.setdefault('tags_cache', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tags.update(TAGS_POR_TABLA.get(getattr(obj, '__tablename__', None), ()))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_tags_modificados(session):
+    tags = session.info.pop('tags_cache', None)
+    if tags:
+        invalidar_tags(*sorted(tags))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_tags_modificados(session):
+    session.info.pop('tags_cache', None)
+
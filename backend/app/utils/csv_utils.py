@@ -0,0 +1,31 @@
+"""Escritura de CSV en streaming para respuestas Flask (sin dependencias Flask)."""
+
+from __future__ import annotations
+
+import csv
+import io
+from typing import Iterable, Iterator, Sequence
+
+# Filas acumuladas antes de emitir un bloque al cliente.
+CSV_FILAS_POR_BLOQUE = 500
+
+
+def iter_csv(encabezado: Sequence, filas: Iterable[Sequence], filas_por_bloque: int = CSV_FILAS_POR_BLOQUE,
+             encoding: str = "utf-8") -> Iterator[bytes]:
+    """
+    Genera el CSV por bloques de bytes (encabezado incluido) sin armar el archivo
+    completo en memoria. Pensado para Response(stream_with_context(...)).
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(encabezado)
+    pendientes = 0
+    for fila in filas:
+        writer.writerow(fila)
+        pendientes += 1
+        if pendientes >= filas_por_bloque:
+            yield buffer.getvalue().encode(encoding)
+            buffer.seek(0)
+            buffer.truncate(0)
+            pendientes = 0
+    yield buffer.getvalue().encode(encoding)
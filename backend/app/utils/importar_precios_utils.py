@@ -0,0 +1,379 @@
+# utils/importar_precios_utils.py
+"""
+Carga masiva de precios especiales (CSV/Excel) como pipeline por columnas.
+
+La normalización, la resolución de cliente/producto y la validación se hacen
+sobre Series de pandas (una consulta por tabla, sin get() por fila). Las filas
+válidas se escriben con INSERT ... ON DUPLICATE KEY UPDATE sobre
+uq_cliente_producto_precio_especial, en lotes con commit y progreso por lote.
+"""
+import logging
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal
+
+import pandas as pd
+from sqlalchemy import tuple_
+
+from .. import db
+from ..models import Cliente, Producto, PrecioEspecialCliente
+from .indice_nombres_utils import IndiceNombres
+from .cache_utils import invalidar_tags, TAG_PRECIOS_ESPECIALES
+from .sincronizacion_utils import registrar_cambios_consulta, ENTIDAD_PRECIOS_ESPECIALES
+from .sql_utils import upsert_reemplazo
+from .trabajos_utils import registrar_progreso
+
+logger = logging.getLogger(__name__)
+
+PRECIOS_POR_LOTE = 1000
+IDS_POR_CONSULTA = 1000
+# NUMERIC(15,4) => máximo entero permitido: 11 dígitos
+PRECIO_MAXIMO_ARS = Decimal('100000000000')
+
+COLUMNAS_IMPORTACION = (
+    'cliente', 'cliente_id', 'producto', 'producto_id', 'precio', 'moneda',
+    'usar_precio_base', 'margen_sobre_base',
+)
+CAMPOS_PRECIO = (
+    'usar_precio_base', 'margen_sobre_base', 'precio_unitario_fijo_ars',
+    'moneda_original', 'precio_original', 'tipo_cambio_usado', 'activo',
+)
+VALORES_VACIOS = ('', 'none', 'null', '-')
+VALORES_VERDADEROS = ('1', 'true', 't', 'si', 'sí', 'yes', 'y', 'verdadero', 'v', 'x')
+ALIAS_MONEDA = {
+    'ars': 'ARS', 'peso': 'ARS', 'pesos': 'ARS', 'arg': 'ARS',
+    'usd': 'USD', 'us': 'USD', 'dolar': 'USD', 'dollars': 'USD',
+}
+
+
+def normalizar_serie(serie):
+    """Versión vectorizada de indice_nombres_utils.normalizar_texto."""
+    texto = serie.fillna('').astype(str).str.strip().str.lower()
+    texto = texto.str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+    texto = texto.str.replace(r'[^a-z0-9 ]+', '', regex=True)
+    return texto.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def _texto(serie):
+    return serie.fillna('').astype(str).str.strip()
+
+
+def limpiar_precios(serie):
+    """
+    Normaliza precios escritos a mano ("$1.234,56", "1,234.56", "1234,56") a texto
+    decimal con punto. Devuelve (texto_limpio, vacio, invalido).
+    """
+    texto = _texto(serie)
+    vacio = texto == ''
+    texto = texto.str.replace(r'[\$€£]', '', regex=True)
+    texto = texto.str.replace('\u00a0', '', regex=False).str.replace(' ', '', regex=False)
+
+    con_coma = texto.str.contains(',', regex=False)
+    con_punto = texto.str.contains('.', regex=False)
+    # Con coma y punto: el último separador es el decimal
+    coma_decimal = con_coma & con_punto & (texto.str.rfind(',') > texto.str.rfind('.'))
+    texto = texto.mask(coma_decimal, texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    texto = texto.mask(con_coma & con_punto & ~coma_decimal, texto.str.replace(',', '', regex=False))
+    texto = texto.mask(con_coma & ~con_punto, texto.str.replace(',', '.', regex=False))
+    texto = texto.str.replace(r'[^0-9\.-]', '', regex=True)
+
+    invalido = ~vacio & (texto.isin(['', '.', '-']) | pd.to_numeric(texto, errors='coerce').isna())
+    return texto, vacio, invalido
+
+
+def limpiar_margenes(serie):
+    """Acepta '0.10', '10%', '10' o '10,5'. Devuelve (texto_limpio, invalido)."""
+    crudo = _texto(serie)
+    texto = crudo.str.replace('%', '', regex=False).str.strip().str.replace(',', '.', regex=False)
+    invalido = (crudo != '') & pd.to_numeric(texto, errors='coerce').isna()
+    return texto, invalido
+
+
+def _margen_decimal(texto):
+    valor = Decimal(texto)
+    # Valores > 1 se interpretan como porcentaje
+    return valor / Decimal('100') if abs(valor) > 1 else valor
+
+
+def _resolver_ids(modelo, columna_nombre, ids_texto, nombres_texto):
+    """
+    Id de modelo por fila: por la columna id si viene, si no por nombre exacto
+    (sin distinguir mayúsculas, tildes ni espacios repetidos).
+    Una consulta para los ids del archivo y una para el índice de nombres.
+    Devuelve (ids, ambiguos, indice): 'ambiguos' marca los nombres que coinciden
+    con más de un registro (quedan sin id) e indice=None si ninguna fila se
+    resolvió por nombre.
+    """
+    por_id = ids_texto != ''
+    ids = pd.to_numeric(ids_texto.where(por_id), errors='coerce').apply(
+        lambda v: int(v) if pd.notna(v) else None
+    )
+    candidatos = sorted({int(v) for v in ids.dropna()})
+    existentes = set()
+    for inicio in range(0, len(candidatos), IDS_POR_CONSULTA):
+        lote = candidatos[inicio:inicio + IDS_POR_CONSULTA]
+        existentes.update(i for (i,) in db.session.query(modelo.id).filter(modelo.id.in_(lote)))
+    resueltos = ids.where(ids.isin(existentes))
+    ambiguos = pd.Series(False, index=ids_texto.index)
+
+    indice = None
+    if (~por_id).any():
+        indice = IndiceNombres.desde_columnas(modelo.id, columna_nombre)
+        coincidencias = nombres_texto[~por_id].map(indice.exactos)
+        ambiguos[~por_id] = coincidencias.map(len) > 1
+        resueltos = resueltos.astype(object)
+        resueltos[~por_id] = coincidencias.map(lambda c: c[0] if len(c) == 1 else None)
+    return resueltos.map(lambda v: int(v) if pd.notna(v) else None).astype(object), ambiguos, indice
+
+
+def _precios_base(producto_ids):
+    """Precio base (cantidad 1, sin cliente) por producto, calculado una vez por producto."""
+    from .precios_utils import calculate_price
+    resultado = {}
+    for producto_id in producto_ids:
+        calculo = calculate_price(producto_id, 1, cliente_id=None, db=db)
+        if calculo.get('status') != 'success':
+            resultado[producto_id] = f"Error en cálculo de precio: {calculo.get('message', 'Unknown error')}"
+            continue
+        base = Decimal(str(calculo.get('precio_unitario_ars', '0')))
+        if base <= 0:
+            resultado[producto_id] = "El precio base del producto es cero o negativo, no se puede calcular margen."
+            continue
+        resultado[producto_id] = base
+    return resultado
+
+
+def _precios_existentes(claves):
+    """{(cliente_id, producto_id): {campo: valor}} para las claves indicadas."""
+    tabla = PrecioEspecialCliente.__table__
+    columnas = [tabla.c.cliente_id, tabla.c.producto_id] + [tabla.c[c] for c in CAMPOS_PRECIO]
+    cliente_ids = sorted({c for c, _ in claves})
+    existentes = {}
+    for inicio in range(0, len(cliente_ids), IDS_POR_CONSULTA):
+        lote = cliente_ids[inicio:inicio + IDS_POR_CONSULTA]
+        for fila in db.session.execute(db.select(*columnas).where(tabla.c.cliente_id.in_(lote))):
+            clave = (fila.cliente_id, fila.producto_id)
+            if clave in claves:
+                existentes[clave] = {c: getattr(fila, c) for c in CAMPOS_PRECIO}
+    return existentes
+
+
+def _valor_comparable(valor):
+    if isinstance(valor, (Decimal, float)):
+        return Decimal(str(valor)).normalize()
+    return valor
+
+
+def _valor_json(valor):
+    return float(valor) if isinstance(valor, Decimal) else valor
+
+
+def _cambios(previo, nuevo):
+    return {
+        campo: [_valor_json(previo[campo]), _valor_json(nuevo[campo])]
+        for campo in CAMPOS_PRECIO
+        if _valor_comparable(previo[campo]) != _valor_comparable(nuevo[campo])
+    }
+
+
+def importar_precios_especiales(trabajo_id, df, columnas, valor_dolar_oficial, aplicar=True):
+    """
+    Valida y carga las filas de 'df'. 'columnas' mapea cada nombre de
+    COLUMNAS_IMPORTACION a la columna real del archivo (o None si no está).
+    Con aplicar=False no escribe nada y devuelve además el diff contra la base.
+    Con trabajo_id publica el progreso por lote en trabajos_segundo_plano.
+    """
+    df = df.reset_index(drop=True)
+    vacia = pd.Series('', index=df.index, dtype=object)
+    col = {nombre: _texto(df[columnas[nombre]]) if columnas.get(nombre) else vacia for nombre in COLUMNAS_IMPORTACION}
+    es_vacio = {nombre: serie.str.lower().isin(VALORES_VACIOS) for nombre, serie in col.items()}
+    lineas = df.index + 2
+    etiqueta_cliente = col['cliente'].where(col['cliente'] != '', col['cliente_id'])
+    etiqueta_producto = col['producto'].where(col['producto'] != '', col['producto_id'])
+
+    # --- Filas ignoradas: vacías o con cliente+producto pero sin definición de precio ---
+    sin_precio = es_vacio['precio'] & es_vacio['usar_precio_base'] & es_vacio['margen_sobre_base']
+    ignorada = (sin_precio & es_vacio['cliente'] & es_vacio['cliente_id'] & es_vacio['producto']
+                & es_vacio['producto_id'] & es_vacio['moneda'])
+    ignorada |= (sin_precio & ~(es_vacio['cliente'] & es_vacio['cliente_id'])
+                 & ~(es_vacio['producto'] & es_vacio['producto_id']))
+
+    # --- Columnas derivadas ---
+    cliente_id, cliente_ambiguo, indice_clientes = _resolver_ids(
+        Cliente, Cliente.nombre_razon_social, col['cliente_id'], col['cliente'])
+    producto_id, producto_ambiguo, indice_productos = _resolver_ids(
+        Producto, Producto.nombre, col['producto_id'], col['producto'])
+    moneda = normalizar_serie(col['moneda']).map(ALIAS_MONEDA).fillna('ARS')
+    usar_texto = col['usar_precio_base'].str.lower()
+    usar_base = usar_texto.isin(VALORES_VERDADEROS) | usar_texto.str.contains('verdad', regex=False)
+    margen_explicito = usar_base & (col['margen_sobre_base'] != '')
+    precio_texto, precio_vacio, precio_invalido = limpiar_precios(col['precio'])
+    precio_num = pd.to_numeric(precio_texto.where(~precio_vacio & ~precio_invalido), errors='coerce')
+    margen_texto, margen_invalido = limpiar_margenes(col['margen_sobre_base'])
+    margen_objetivo = usar_base & ~margen_explicito & (precio_num > 0)
+    fijo = ~usar_base
+
+    # --- Errores, en el mismo orden de prioridad que la validación fila a fila ---
+    motivo = pd.Series(None, index=df.index, dtype=object)
+
+    def marcar(condicion, texto):
+        nuevos = condicion & motivo.isna() & ~ignorada
+        if nuevos.any():
+            motivo[nuevos] = texto[nuevos] if isinstance(texto, pd.Series) else texto
+
+    marcar(cliente_ambiguo, "Cliente '" + etiqueta_cliente + "' ambiguo: coincide con varios clientes.")
+    marcar(cliente_id.isna(), "Cliente '" + etiqueta_cliente + "' no encontrado.")
+    marcar(producto_ambiguo, "Producto '" + etiqueta_producto + "' ambiguo: coincide con varios productos.")
+    marcar(producto_id.isna(), "Producto '" + etiqueta_producto + "' no encontrado.")
+    detalle_precio = pd.Series('Precio negativo', index=df.index, dtype=object)
+    detalle_precio[precio_invalido] = 'Formato de precio inválido'
+    detalle_precio[precio_vacio] = 'Precio vacío'
+    precio_erroneo = precio_invalido | (precio_num < 0)
+    marcar(usar_base & ~margen_explicito & ~precio_vacio & precio_erroneo,
+           "Precio objetivo '" + col['precio'] + "' no es un número válido: " + detalle_precio)
+    marcar(fijo & (precio_vacio | precio_erroneo),
+           "Precio '" + col['precio'] + "' no es un número válido: " + detalle_precio)
+    marcar(margen_explicito & margen_invalido,
+           "Error en modo margen: Margen sobre base inválido: Formato de margen inválido: " + col['margen_sobre_base'])
+    marcar(usar_base & ~margen_explicito & ~(precio_num > 0),
+           "Error en modo margen: Para usar precio base debe especificar un margen en 'Margen Sobre Base' o un precio objetivo")
+    marcar(fijo & ~(precio_num > 0), "Precio requerido para modo precio fijo")
+
+    pendientes = margen_objetivo & motivo.isna() & ~ignorada
+    precios_base = _precios_base(sorted(set(producto_id[pendientes])))
+    base_error = producto_id.map(lambda pid: precios_base.get(pid) if isinstance(precios_base.get(pid), str) else None)
+    marcar(pendientes & base_error.notna(), "Error en modo margen: " + base_error.fillna(''))
+
+    # --- Valores finales de las filas válidas ---
+    filas = []
+    validas = motivo.isna() & ~ignorada
+    for idx in df.index[validas]:
+        es_usd = moneda[idx] == 'USD'
+        precio_original = Decimal(precio_texto[idx]) if pd.notna(precio_num[idx]) else Decimal('0')
+        margen = None
+        precio_final = Decimal('0')
+        if margen_explicito[idx]:
+            margen, precio_original, modo = _margen_decimal(margen_texto[idx]), Decimal('0'), 'margen_explicito'
+        elif margen_objetivo[idx]:
+            objetivo = precio_original * valor_dolar_oficial if es_usd else precio_original
+            objetivo = Decimal(round(float(objetivo) / 100) * 100)
+            margen, modo = objetivo / precios_base[producto_id[idx]] - Decimal('1'), 'margen_objetivo'
+        else:
+            precio_final, modo = (precio_original * valor_dolar_oficial if es_usd else precio_original), 'fijo'
+            if abs(precio_final.quantize(Decimal('1'))) >= PRECIO_MAXIMO_ARS:
+                motivo[idx] = (f"Precio resultante {precio_final} excede el límite permitido (máx < 100000000000). "
+                               "Verifique formato (separadores de miles / tipo de cambio).")
+                continue
+        filas.append({
+            'linea': int(lineas[idx]), 'modo': modo,
+            'cliente_id': int(cliente_id[idx]), 'producto_id': int(producto_id[idx]),
+            'usar_precio_base': bool(usar_base[idx]), 'margen_sobre_base': margen,
+            'precio_unitario_fijo_ars': precio_final, 'moneda_original': moneda[idx],
+            'precio_original': precio_original,
+            'tipo_cambio_usado': valor_dolar_oficial if es_usd else None, 'activo': True,
+        })
+
+    # --- Altas vs. actualizaciones (si la clave se repite en el archivo gana la última fila) ---
+    claves = {(f['cliente_id'], f['producto_id']) for f in filas}
+    existentes = _precios_existentes(claves)
+    vistas = set(existentes)
+    creados = actualizados = 0
+    ultima_por_clave = {}
+    for fila in filas:
+        clave = (fila['cliente_id'], fila['producto_id'])
+        if clave in vistas:
+            actualizados += 1
+        else:
+            creados += 1
+            vistas.add(clave)
+        ultima_por_clave[clave] = fila
+
+    errores = motivo.notna()
+    resultado = {
+        'summary': {
+            'creados': creados,
+            'actualizados': actualizados,
+            'errores': int(errores.sum()),
+            'ignoradas': int(ignorada.sum()),
+            'modos': {m: sum(1 for f in filas if f['modo'] == m) for m in ('margen_explicito', 'margen_objetivo', 'fijo')},
+        },
+        'failed_rows': [],
+    }
+    for i in df.index[errores]:
+        fila_fallida = {'linea': int(lineas[i]), 'cliente': etiqueta_cliente[i], 'producto': etiqueta_producto[i], 'motivo': motivo[i]}
+        # Nombres coincidentes (ambiguo) o parecidos (no encontrado) al resolver por nombre
+        if cliente_ambiguo[i]:
+            fila_fallida['sugerencias'] = [indice_clientes.nombres[c] for c in indice_clientes.exactos(col['cliente'][i])]
+        elif cliente_id[i] is None and indice_clientes is not None and col['cliente_id'][i] == '':
+            fila_fallida['sugerencias'] = indice_clientes.sugerencias(col['cliente'][i])
+        elif producto_ambiguo[i]:
+            fila_fallida['sugerencias'] = [indice_productos.nombres[p] for p in indice_productos.exactos(col['producto'][i])]
+        elif producto_id[i] is None and indice_productos is not None and col['producto_id'][i] == '':
+            fila_fallida['sugerencias'] = indice_productos.sugerencias(col['producto'][i])
+        resultado['failed_rows'].append(fila_fallida)
+
+    if not aplicar:
+        diff = []
+        sin_cambios = 0
+        for clave, fila in ultima_por_clave.items():
+            previo = existentes.get(clave)
+            cambios = _cambios(previo, fila) if previo else None
+            if previo and not cambios:
+                sin_cambios += 1
+                continue
+            diff.append({
+                'linea': fila['linea'], 'cliente_id': clave[0], 'producto_id': clave[1],
+                'accion': 'actualizar' if previo else 'crear',
+                'cambios': cambios or {c: [None, _valor_json(fila[c])] for c in CAMPOS_PRECIO},
+            })
+        resultado['summary']['sin_cambios'] = sin_cambios
+        resultado['diff'] = diff
+        return resultado
+
+    tabla = PrecioEspecialCliente.__table__
+    ahora = datetime.utcnow()
+    registros = [
+        dict({c: fila[c] for c in ('cliente_id', 'producto_id') + CAMPOS_PRECIO},
+             fecha_creacion=ahora, fecha_modificacion=ahora)
+        for fila in ultima_por_clave.values()
+    ]
+    # El progreso se mide en filas del archivo (el total del trabajo es len(df)): cada
+    # lote suma las filas que escribió, contando las repetidas de sus claves. Las
+    # filas con error o ignoradas no escriben nada y se suman al terminar, así que
+    # si un lote falla 'procesados' queda en las filas ya confirmadas.
+    filas_por_clave = Counter((f['cliente_id'], f['producto_id']) for f in filas)
+    lotes = 0
+    filas_confirmadas = 0
+    for inicio in range(0, len(registros), PRECIOS_POR_LOTE):
+        lote = registros[inicio:inicio + PRECIOS_POR_LOTE]
+        try:
+            upsert_reemplazo(
+                db.session, tabla, lote,
+                claves=('cliente_id', 'producto_id'), columnas=CAMPOS_PRECIO + ('fecha_modificacion',)
+            )
+            registrar_cambios_consulta(
+                ENTIDAD_PRECIOS_ESPECIALES, PrecioEspecialCliente.id,
+                tuple_(PrecioEspecialCliente.cliente_id, PrecioEspecialCliente.producto_id).in_(
+                    [(r['cliente_id'], r['producto_id']) for r in lote]
+                )
+            )
+            filas_lote = sum(filas_por_clave[(r['cliente_id'], r['producto_id'])] for r in lote)
+            if trabajo_id is not None:
+                registrar_progreso(trabajo_id, filas_confirmadas + filas_lote)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            # Los lotes anteriores ya tienen commit: el error lo dice para que no se asuma un rollback total
+            raise RuntimeError(
+                f"Falló el lote {lotes + 1}: {e}. Quedaron aplicados {lotes} lotes "
+                f"({inicio} precios, {filas_confirmadas} de {len(df)} filas)."
+            ) from e
+        invalidar_tags(TAG_PRECIOS_ESPECIALES)
+        lotes += 1
+        filas_confirmadas += filas_lote
+        logger.info("[cargar_csv] lote %s: %s/%s precios escritos", lotes, inicio + len(lote), len(registros))
+    if trabajo_id is not None:
+        # Viaja en el commit que cierra el trabajo (ejecutar_trabajo)
+        registrar_progreso(trabajo_id, len(df))
+    resultado['summary']['lotes'] = lotes
+    return resultado
@@ -0,0 +1,47 @@
+"""Tasas de IVA / IIBB de órdenes de compra (sin dependencias Flask)."""
+
+from decimal import Decimal
+
+
+def tasa_iibb(iibb_value):
+    """Parsea el campo `iibb` que puede ser '3%', '0.03', '3' y devuelve la fracción (ej 0.03).
+    Si no puede parsear devuelve Decimal('0').
+    """
+    try:
+        if iibb_value is None:
+            return Decimal('0')
+        if isinstance(iibb_value, (int, float, Decimal)):
+            v = Decimal(str(iibb_value))
+            # si <=1 asumimos fracción, si >1 asumimos porcentaje
+            return (v if v <= 1 else (v / Decimal('100')))
+        s = str(iibb_value).strip()
+        if s.endswith('%'):
+            s = s[:-1].strip()
+            return (Decimal(s) / Decimal('100'))
+        # si tiene coma o punto
+        v = Decimal(s)
+        return (v if v <= 1 else (v / Decimal('100')))
+    except Exception:
+        return Decimal('0')
+
+
+def tasa_porcentaje(value):
+    """Normaliza un valor porcentual como fracción decimal (ej. 21 -> 0.21)."""
+    try:
+        if value is None:
+            return Decimal('0')
+        raw = str(value).strip()
+        if not raw:
+            return Decimal('0')
+        normalized = raw.replace(',', '.')
+        parsed = Decimal(normalized)
+        return parsed if parsed <= 1 else (parsed / Decimal('100'))
+    except Exception:
+        return Decimal('0')
+
+
+def tasa_cargada(valor, parser):
+    """Tasa tipada para la columna: None si el campo de texto está vacío (impuesto no cargado)."""
+    if valor is None or str(valor).strip() == '':
+        return None
+    return parser(valor)
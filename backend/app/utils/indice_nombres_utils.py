@@ -0,0 +1,152 @@
+# utils/indice_nombres_utils.py
+"""
+Índice en memoria de nombres (productos, clientes, categorías) para
+importaciones y clasificaciones masivas.
+
+Se construye una vez por importación con una sola consulta (id, nombre), así
+cada fila del archivo se resuelve con búsquedas en diccionarios en lugar de un
+LIKE por fila. La coincidencia exacta usa una clave que solo ignora
+mayúsculas, tildes y espacios repetidos (conserva números y signos: "1/2 LT"
+no es "12 LT"); "contiene" compara sobre esa misma clave. La clave sin
+símbolos solo se usa para los trigramas: elegir candidatos de "contiene" y la
+coincidencia aproximada (para sugerir nombres cuando no hay coincidencia).
+"""
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from .. import db
+
+UMBRAL_SIMILITUD = 0.4
+MAX_SUGERENCIAS = 3
+
+
+def normalizar_texto(valor):
+    """Minúsculas, sin tildes ni símbolos y con espacios colapsados."""
+    if valor is None:
+        return ''
+    texto = str(valor).strip().lower()
+    texto = ''.join(ch for ch in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(ch))
+    texto = re.sub(r'[^a-z0-9 ]+', '', texto)
+    return re.sub(r'\s+', ' ', texto).strip()
+
+
+def clave_exacta(valor):
+    """Clave de coincidencia exacta: casefold, sin tildes y con espacios colapsados."""
+    if valor is None:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(valor).casefold())
+    texto = ''.join(ch for ch in texto if not unicodedata.combining(ch))
+    return re.sub(r'\s+', ' ', texto).strip()
+
+
+def trigramas(clave):
+    """Trigramas de una clave normalizada, con relleno en los bordes (como pg_trgm)."""
+    texto = f'  {clave} '
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceNombres:
+    """
+    Mapas clave -> ids (exacta y normalizada), con listas invertidas de
+    trigramas. Si varios registros comparten clave, todos quedan asociados a
+    ella y los llamadores deben tratar la coincidencia como ambigua.
+    """
+
+    def __init__(self, filas):
+        self.nombres = {}
+        self._clave_exacta_por_id = {}
+        self.ids_por_clave_exacta = defaultdict(list)
+        self.ids_por_clave = defaultdict(list)
+        self._claves_por_trigrama = defaultdict(set)
+        self._trigramas_por_clave = {}
+        for id_, nombre in filas:
+            self.nombres[id_] = nombre
+            exacta = clave_exacta(nombre)
+            self._clave_exacta_por_id[id_] = exacta
+            if exacta:
+                self.ids_por_clave_exacta[exacta].append(id_)
+            clave = normalizar_texto(nombre)
+            if not clave:
+                continue
+            self.ids_por_clave[clave].append(id_)
+            if clave not in self._trigramas_por_clave:
+                grams = trigramas(clave)
+                self._trigramas_por_clave[clave] = grams
+                for gram in grams:
+                    self._claves_por_trigrama[gram].add(clave)
+
+    @classmethod
+    def desde_columnas(cls, columna_id, columna_nombre, *filtros):
+        """Construye el índice con una única consulta (id, nombre)."""
+        return cls(db.session.query(columna_id, columna_nombre).filter(*filtros).all())
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def exactos(self, nombre):
+        """Ids con la misma clave exacta (más de uno: coincidencia ambigua)."""
+        return list(self.ids_por_clave_exacta.get(clave_exacta(nombre), ()))
+
+    def contienen(self, texto):
+        """
+        Ids cuyo nombre contiene 'texto' según la clave exacta (equivalente a
+        ILIKE '%texto%': "1/2" no encuentra "12"). Los trigramas de la clave sin
+        símbolos solo acotan los candidatos; si el nombre contiene el texto,
+        también lo contiene sin símbolos.
+        """
+        consulta = clave_exacta(texto)
+        if not consulta:
+            return []
+        sin_simbolos = normalizar_texto(texto)
+        if len(sin_simbolos) >= 3:
+            internos = [sin_simbolos[i:i + 3] for i in range(len(sin_simbolos) - 2)]
+            candidatas = set.intersection(*(self._claves_por_trigrama.get(g, set()) for g in internos))
+        else:
+            # Consulta corta (o solo símbolos): se recorren todas las claves
+            candidatas = self.ids_por_clave.keys()
+        ids = [id_ for clave in sorted(c for c in candidatas if sin_simbolos in c) for id_ in self.ids_por_clave[clave]]
+        if not sin_simbolos:
+            ids += [id_ for id_, nombre in self.nombres.items() if not normalizar_texto(nombre)]
+        return [id_ for id_ in ids if consulta in self._clave_exacta_por_id[id_]]
+
+    def aproximados(self, nombre, limite=MAX_SUGERENCIAS, umbral=UMBRAL_SIMILITUD):
+        """[(id, nombre, similitud)] por similitud de trigramas (Jaccard), de mayor a menor."""
+        consulta = normalizar_texto(nombre)
+        if not consulta:
+            return []
+        grams = trigramas(consulta)
+        comunes = Counter()
+        for gram in grams:
+            comunes.update(self._claves_por_trigrama.get(gram, ()))
+        puntajes = []
+        for clave, compartidos in comunes.items():
+            similitud = compartidos / (len(grams) + len(self._trigramas_por_clave[clave]) - compartidos)
+            if similitud >= umbral:
+                puntajes.append((similitud, clave))
+        puntajes.sort(key=lambda p: (-p[0], p[1]))
+        resultado = []
+        for similitud, clave in puntajes:
+            for id_ in self.ids_por_clave[clave]:
+                resultado.append((id_, self.nombres[id_], round(similitud, 3)))
+        return resultado[:limite]
+
+    def sugerencias(self, nombre, limite=MAX_SUGERENCIAS):
+        """Nombres parecidos para informar en errores de 'no encontrado'."""
+        return [nombre_sugerido for _, nombre_sugerido, _ in self.aproximados(nombre, limite=limite)]
+
+    def resolver(self, nombre, umbral=UMBRAL_SIMILITUD):
+        """
+        Resultado de resolución de un nombre:
+        {'ids': [...], 'tipo': 'exacto' | 'ambiguo' | 'aproximado' | None, 'sugerencias': [...]}.
+        Solo se acepta una coincidencia aproximada si es única en su mejor puntaje.
+        """
+        ids = self.exactos(nombre)
+        if len(ids) > 1:
+            return {'ids': ids, 'tipo': 'ambiguo', 'sugerencias': [self.nombres[i] for i in ids]}
+        if ids:
+            return {'ids': ids, 'tipo': 'exacto', 'sugerencias': []}
+        candidatos = self.aproximados(nombre, umbral=umbral)
+        if candidatos and (len(candidatos) == 1 or candidatos[0][2] > candidatos[1][2]):
+            return {'ids': [candidatos[0][0]], 'tipo': 'aproximado', 'sugerencias': [c[1] for c in candidatos]}
+        return {'ids': [], 'tipo': None, 'sugerencias': [c[1] for c in candidatos]}
@@ -0,0 +1,166 @@
+# utils/indice_productos_utils.py
+"""
+Índice en memoria (por proceso) para el typeahead de productos (/productos/buscar).
+
+Guarda listas ordenadas de (token, id), (nombre normalizado, id) y (código, id);
+una búsqueda es un bisect por cada palabra más una intersección, sin tocar la
+base. Se construye con una consulta la primera vez, se mantiene al día con los
+commits de Producto de este proceso (eventos de sesión) y se reconstruye
+completo cada INDICE_PRODUCTOS_TTL segundos para recoger cambios hechos por
+otros workers o por UPDATEs masivos.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .. import db
+from ..models import Producto
+from .indice_nombres_utils import normalizar_texto
+
+INDICE_PRODUCTOS_TTL = 300
+LIMITE_BUSQUEDA = 20
+
+
+def _rango_prefijo(lista, prefijo):
+    """Elementos (clave, id) de una lista ordenada cuya clave empieza con 'prefijo'."""
+    inicio = bisect_left(lista, (prefijo,))
+    fin = bisect_left(lista, (prefijo + '\uffff',))
+    return lista[inicio:fin]
+
+
+class IndiceProductos:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._productos = {}
+        self._tokens = []
+        self._nombres = []
+        self._codigos = []
+        self._construido_en = None
+
+    # --- Mantenimiento ---
+
+    def construir(self):
+        """Reconstrucción completa con una única consulta."""
+        filas = db.session.query(Producto.id, Producto.nombre, Producto.unidad_venta, Producto.activo).all()
+        with self._lock:
+            self._productos, self._tokens, self._nombres, self._codigos = {}, [], [], []
+            for fila in filas:
+                self._agregar(*fila, ordenar=False)
+            self._tokens.sort()
+            self._nombres.sort()
+            self._codigos.sort()
+            self._construido_en = time.monotonic()
+
+    def asegurar_vigente(self, ttl=INDICE_PRODUCTOS_TTL):
+        if self._construido_en is None or time.monotonic() - self._construido_en > ttl:
+            self.construir()
+
+    def invalidar(self):
+        with self._lock:
+            self._construido_en = None
+
+    def _agregar(self, id_, nombre, unidad_venta, activo, ordenar=True):
+        clave = normalizar_texto(nombre)
+        entradas = {
+            'tokens': [(token, id_) for token in set(clave.split())],
+            'nombre': (clave, id_),
+            'codigo': (str(id_), id_),
+        }
+        self._productos[id_] = {
+            'id': id_, 'nombre': nombre, 'unidad_venta': unidad_venta, 'activo': bool(activo), '_entradas': entradas,
+        }
+        if ordenar:
+            for token in entradas['tokens']:
+                insort(self._tokens, token)
+            insort(self._nombres, entradas['nombre'])
+            insort(self._codigos, entradas['codigo'])
+        else:
+            self._tokens.extend(entradas['tokens'])
+            self._nombres.append(entradas['nombre'])
+            self._codigos.append(entradas['codigo'])
+
+    def _quitar(self, id_):
+        producto = self._productos.pop(id_, None)
+        if producto is None:
+            return
+        entradas = producto['_entradas']
+        for lista, elementos in ((self._tokens, entradas['tokens']), (self._nombres, [entradas['nombre']]),
+                                 (self._codigos, [entradas['codigo']])):
+            for elemento in elementos:
+                posicion = bisect_left(lista, elemento)
+                if posicion < len(lista) and lista[posicion] == elemento:
+                    del lista[posicion]
+
+    def actualizar(self, productos=(), eliminados=()):
+        """Cambios incrementales: 'productos' son (id, nombre, unidad_venta, activo)."""
+        with self._lock:
+            if self._construido_en is None:
+                return
+            for id_ in eliminados:
+                self._quitar(id_)
+            for fila in productos:
+                self._quitar(fila[0])
+                self._agregar(*fila)
+
+    # --- Consulta ---
+
+    def buscar(self, texto, limite=LIMITE_BUSQUEDA, solo_activos=False):
+        """
+        Productos cuyo nombre tiene, para cada palabra buscada, un token que empieza
+        con ella (o cuyo código empieza con el texto). Primero los que empiezan con
+        el texto completo, luego el resto; alfabético dentro de cada grupo.
+        """
+        consulta = normalizar_texto(texto)
+        if not consulta:
+            return []
+        with self._lock:
+            ids = None
+            for palabra in consulta.split():
+                coinciden = {id_ for _, id_ in _rango_prefijo(self._tokens, palabra)}
+                ids = coinciden if ids is None else ids & coinciden
+                if not ids:
+                    break
+            ids = ids or set()
+            if consulta.isdigit():
+                ids |= {id_ for _, id_ in _rango_prefijo(self._codigos, consulta)}
+            por_prefijo = {id_ for _, id_ in _rango_prefijo(self._nombres, consulta)}
+
+            candidatos = [self._productos[id_] for id_ in ids]
+            if solo_activos:
+                candidatos = [p for p in candidatos if p['activo']]
+            candidatos.sort(key=lambda p: (p['id'] not in por_prefijo, p['_entradas']['nombre'][0], p['id']))
+            return [{k: v for k, v in p.items() if k != '_entradas'} for p in candidatos[:limite]]
+
+
+indice_productos = IndiceProductos()
+
+
+# --- Sincronización con los commits de este proceso ---
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_cambios_productos(session, flush_context):
+    cambios = session.info.setdefault('indice_productos', {'productos': {}, 'eliminados': set()})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Producto) and obj.id is not None:
+            cambios['productos'][obj.id] = (obj.id, obj.nombre, obj.unidad_venta, obj.activo)
+            cambios['eliminados'].discard(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Producto):
+            cambios['productos'].pop(obj.id, None)
+            cambios['eliminados'].add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _aplicar_cambios_productos(session):
+    cambios = session.info.pop('indice_productos', None)
+    if cambios:
+        indice_productos.actualizar(cambios['productos'].values(), cambios['eliminados'])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_cambios_productos(session):
+    session.info.pop('indice_productos', None)
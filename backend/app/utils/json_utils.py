@@ -0,0 +1,70 @@
+# utils/json_utils.py
+"""
+Proveedor JSON de la app sobre orjson (si está instalado).
+
+Mantiene la salida del proveedor por defecto de Flask: claves ordenadas,
+Decimal y UUID como string y fechas en formato RFC 822 (lo que los frontends
+ya reciben), pero serializa en C y arma la respuesta directamente desde bytes.
+La única diferencia es que los caracteres no ASCII salen en UTF-8 en lugar de
+escapes \\uXXXX (el JSON decodificado es el mismo).
+Si orjson no puede con un valor (p.ej. enteros de más de 64 bits) o se pasan
+argumentos propios de json.dumps, se usa el proveedor estándar.
+"""
+import decimal
+import uuid
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+    ORJSON_DISPONIBLE = True
+except ImportError:
+    orjson = None
+    ORJSON_DISPONIBLE = False
+
+
+def _default_orjson(valor):
+    """Tipos que orjson no resuelve como Flask: los convierte igual que DefaultJSONProvider."""
+    if isinstance(valor, date):
+        return http_date(valor)
+    if isinstance(valor, (decimal.Decimal, uuid.UUID)):
+        return str(valor)
+    if hasattr(valor, '__html__'):
+        return str(valor.__html__())
+    raise TypeError(f"Object of type {type(valor).__name__} is not JSON serializable")
+
+
+class ORJSONProvider(DefaultJSONProvider):
+
+    def _opciones(self, indentar=False):
+        opciones = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            opciones |= orjson.OPT_SORT_KEYS
+        if indentar:
+            opciones |= orjson.OPT_INDENT_2
+        return opciones
+
+    def _dumps_bytes(self, obj, indentar=False):
+        try:
+            return orjson.dumps(obj, default=_default_orjson, option=self._opciones(indentar))
+        except TypeError:
+            # orjson.JSONEncodeError es TypeError: el estándar da el mismo error o resuelve el caso borde
+            argumentos = {'indent': 2} if indentar else {'separators': (',', ':')}
+            return super().dumps(obj, **argumentos).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._dumps_bytes(obj, indentar) + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,169 @@
+# utils/resumen_ventas_utils.py
+"""
+Mantenimiento de ventas_resumen_diario (ver models.VentaResumenDiario).
+
+Cada camino de escritura de ventas toma las contribuciones de las ventas
+afectadas antes y después del cambio y aplica la diferencia con un upsert
+incremental (monto = monto + delta), dentro de la misma transacción.
+
+La clave lleva las dos fechas (pedido y registro) y los dos criterios de canal
+que usan los reportes (con/sin cliente y con/sin dirección de entrega), así
+cada KPI filtra y agrupa el resumen con la misma definición que usaba sobre
+las ventas. Una venta sin una de las fechas se imputa a la otra.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, case, and_, true
+
+from .. import db
+from ..models import Venta, DetalleVenta, VentaResumenDiario
+from .sql_utils import upsert_incremental
+
+ESTADOS_RESUMEN = ('PENDIENTE', 'LISTO_PARA_ENTREGAR', 'ENTREGADO', 'CANCELADO')
+CLAVES_RESUMEN = ('fecha', 'fecha_registro', 'canal', 'con_direccion', 'forma_pago', 'estado')
+METRICAS_RESUMEN = ('monto', 'monto_con_recargos', 'monto_centena', 'unidades', 'kgs', 'costo')
+IDS_POR_CONSULTA = 500
+
+
+def expresion_estado_venta():
+    """
+    Estado de la venta en SQL a partir del prefijo de nombre_vendedor ('ESTADO-vendedor').
+    Sin prefijo reconocido la venta cuenta como 'PENDIENTE'.
+    """
+    nombre = func.coalesce(Venta.nombre_vendedor, '')
+    pos_guion = func.instr(nombre, '-')
+    prefijo = case((pos_guion > 0, func.substr(nombre, 1, pos_guion - 1)), else_=nombre)
+    prefijo = func.replace(func.upper(func.trim(prefijo)), ' ', '_')
+    return case((prefijo.in_(ESTADOS_RESUMEN), prefijo), else_='PENDIENTE')
+
+
+def _fecha_pedido_efectiva():
+    return func.coalesce(Venta.fecha_pedido, Venta.fecha_registro)
+
+
+def _columnas_clave():
+    """Columnas de la clave del resumen, en el orden de CLAVES_RESUMEN."""
+    con_direccion = and_(Venta.direccion_entrega.isnot(None), Venta.direccion_entrega != '')
+    return (
+        func.date(_fecha_pedido_efectiva()).label('fecha'),
+        func.date(func.coalesce(Venta.fecha_registro, Venta.fecha_pedido)).label('fecha_registro'),
+        case((Venta.cliente_id.is_(None), 'puerta'), else_='pedido').label('canal'),
+        case((con_direccion, True), else_=False).label('con_direccion'),
+        func.coalesce(Venta.forma_pago, '').label('forma_pago'),
+        expresion_estado_venta().label('estado'),
+    )
+
+
+def _clave(fila):
+    fecha, fecha_registro, canal, con_direccion, forma_pago, estado = fila
+    return (_normalizar_fecha(fecha), _normalizar_fecha(fecha_registro), canal, bool(con_direccion), forma_pago, estado)
+
+
+def _metricas_vacias():
+    metricas = dict.fromkeys(METRICAS_RESUMEN, Decimal('0'))
+    metricas['unidades'] = 0
+    return metricas
+
+
+def _normalizar_fecha(valor):
+    # SQLite devuelve DATE() como texto
+    return date.fromisoformat(valor) if isinstance(valor, str) else valor
+
+
+def _contribuciones(filtro):
+    """Agrega las ventas que cumplen 'filtro' por clave del resumen: {clave: {metrica: valor}}."""
+    clave = _columnas_clave()
+    n = len(clave)
+    con_fecha = _fecha_pedido_efectiva().isnot(None)
+    monto = func.coalesce(Venta.monto_final_redondeado, 0)
+    resultado = defaultdict(_metricas_vacias)
+
+    # Nivel venta: montos y unidades
+    filas_venta = db.session.query(
+        *clave,
+        func.sum(monto),
+        func.sum(func.coalesce(Venta.monto_final_con_recargos, 0)),
+        func.sum(func.ceil(monto / 100.0) * 100),
+        func.count(Venta.id),
+    ).filter(filtro, con_fecha).group_by(*clave).all()
+    for fila in filas_venta:
+        suma_monto, suma_recargos, suma_centena, unidades = fila[n:]
+        metricas = resultado[_clave(fila[:n])]
+        metricas['monto'] = Decimal(str(suma_monto or 0))
+        metricas['monto_con_recargos'] = Decimal(str(suma_recargos or 0))
+        metricas['monto_centena'] = Decimal(str(suma_centena or 0))
+        metricas['unidades'] = int(unidades or 0)
+
+    # Nivel línea: kilos y costo al momento
+    filas_linea = db.session.query(
+        *clave,
+        func.sum(DetalleVenta.cantidad),
+        func.sum(DetalleVenta.cantidad * DetalleVenta.costo_unitario_momento_ars),
+    ).select_from(DetalleVenta).join(Venta, Venta.id == DetalleVenta.venta_id).filter(
+        filtro, con_fecha
+    ).group_by(*clave).all()
+    for fila in filas_linea:
+        kgs, costo = fila[n:]
+        metricas = resultado[_clave(fila[:n])]
+        metricas['kgs'] = Decimal(str(kgs or 0))
+        metricas['costo'] = Decimal(str(costo or 0))
+    return dict(resultado)
+
+
+def contribuciones_resumen(venta_ids):
+    """Contribución actual (según la sesión) de las ventas indicadas al resumen diario."""
+    venta_ids = [vid for vid in venta_ids if vid is not None]
+    total = {}
+    for inicio in range(0, len(venta_ids), IDS_POR_CONSULTA):
+        lote = venta_ids[inicio:inicio + IDS_POR_CONSULTA]
+        for clave, metricas in _contribuciones(Venta.id.in_(lote)).items():
+            if clave in total:
+                for nombre in METRICAS_RESUMEN:
+                    total[clave][nombre] += metricas[nombre]
+            else:
+                total[clave] = metricas
+    return total
+
+
+def aplicar_delta_resumen(antes, despues):
+    """
+    Suma (despues - antes) al resumen diario. No hace commit: se aplica en la
+    transacción del llamador, junto con el cambio de las ventas.
+    """
+    filas = []
+    for clave in set(antes) | set(despues):
+        previo, nuevo = antes.get(clave, _metricas_vacias()), despues.get(clave, _metricas_vacias())
+        delta = {nombre: nuevo[nombre] - previo[nombre] for nombre in METRICAS_RESUMEN}
+        if not any(delta.values()):
+            continue
+        filas.append(dict(delta, **dict(zip(CLAVES_RESUMEN, clave))))
+    upsert_incremental(
+        db.session, VentaResumenDiario.__table__, filas,
+        claves=CLAVES_RESUMEN, columnas=METRICAS_RESUMEN
+    )
+    return len(filas)
+
+
+def reconstruir_resumen_ventas(fecha_desde=None, fecha_hasta=None):
+    """
+    Recalcula el resumen desde ventas/detalles_venta para el rango indicado
+    (todo el historial si no se indica), por fecha de pedido. No hace commit.
+    Devuelve las filas escritas.
+    """
+    filtro_ventas = []
+    filtro_resumen = []
+    if fecha_desde:
+        filtro_ventas.append(_fecha_pedido_efectiva() >= datetime.combine(fecha_desde, time.min))
+        filtro_resumen.append(VentaResumenDiario.fecha >= fecha_desde)
+    if fecha_hasta:
+        filtro_ventas.append(_fecha_pedido_efectiva() < datetime.combine(fecha_hasta + timedelta(days=1), time.min))
+        filtro_resumen.append(VentaResumenDiario.fecha <= fecha_hasta)
+
+    db.session.query(VentaResumenDiario).filter(*filtro_resumen).delete(synchronize_session=False)
+    contribuciones = _contribuciones(and_(true(), *filtro_ventas))
+    filas = [dict(metricas, **dict(zip(CLAVES_RESUMEN, clave))) for clave, metricas in contribuciones.items()]
+    for inicio in range(0, len(filas), IDS_POR_CONSULTA):
+        db.session.execute(VentaResumenDiario.__table__.insert(), filas[inicio:inicio + IDS_POR_CONSULTA])
+    return len(filas)
@@ -0,0 +1,56 @@
+# utils/saldo_proveedor_utils.py
+"""Conciliación de saldo_proveedor contra los movimientos_proveedor crudos."""
+from decimal import Decimal
+
+from sqlalchemy import func, case
+
+from .. import db
+from ..models import MovimientoProveedor, SaldoProveedor
+
+
+def saldos_desde_movimientos():
+    """{proveedor_id: (debitos, creditos)} recalculado con un solo agregado sobre los movimientos."""
+    tipo = func.upper(MovimientoProveedor.tipo)
+    filas = db.session.query(
+        MovimientoProveedor.proveedor_id,
+        func.sum(case((tipo == 'DEBITO', MovimientoProveedor.monto), else_=0)),
+        func.sum(case((tipo == 'CREDITO', MovimientoProveedor.monto), else_=0)),
+    ).group_by(MovimientoProveedor.proveedor_id).all()
+    return {
+        pid: (Decimal(str(debitos or 0)), Decimal(str(creditos or 0)))
+        for pid, debitos, creditos in filas
+    }
+
+
+def conciliar_saldos_proveedor(aplicar=False):
+    """
+    Compara saldo_proveedor con los movimientos y devuelve las diferencias:
+    [{proveedor_id, debitos_tabla, creditos_tabla, debitos_reales, creditos_reales}].
+    Con aplicar=True reescribe las filas que no coinciden (sin commit).
+    """
+    esperados = saldos_desde_movimientos()
+    actuales = {
+        s.proveedor_id: (Decimal(str(s.debitos or 0)), Decimal(str(s.creditos or 0)))
+        for s in db.session.query(SaldoProveedor).all()
+    }
+    cero = (Decimal('0'), Decimal('0'))
+    diferencias = []
+    for pid in sorted(set(esperados) | set(actuales)):
+        esperado = esperados.get(pid, cero)
+        actual = actuales.get(pid, cero)
+        if esperado == actual:
+            continue
+        diferencias.append({
+            'proveedor_id': pid,
+            'debitos_tabla': actual[0],
+            'creditos_tabla': actual[1],
+            'debitos_reales': esperado[0],
+            'creditos_reales': esperado[1],
+        })
+        if aplicar:
+            saldo = db.session.get(SaldoProveedor, pid)
+            if saldo is None:
+                saldo = SaldoProveedor(proveedor_id=pid)
+                db.session.add(saldo)
+            saldo.debitos, saldo.creditos = esperado
+    return diferencias
@@ -0,0 +1,31 @@
+# utils/secuencias_utils.py
+"""Asignación de números correlativos sobre la tabla secuencias (ver models.Secuencia)."""
+from sqlalchemy import text
+
+from .. import db
+
+
+def siguiente_valor(nombre, session=None):
+    """
+    Incrementa la secuencia 'nombre' (creándola en 1 si no existe) y devuelve el
+    nuevo valor. No hace commit: la fila queda bloqueada hasta que el llamador
+    confirma o revierte, así dos transacciones nunca obtienen el mismo número y
+    un rollback no deja huecos. 'session' permite usarla desde eventos de sesión.
+    """
+    if session is None:
+        session = db.session
+    if session.get_bind().dialect.name == 'mysql':
+        # LAST_INSERT_ID(expr) deja el valor asignado en la conexión: sin SELECT sobre la tabla
+        session.execute(text(
+            "INSERT INTO secuencias (nombre, valor) VALUES (:nombre, LAST_INSERT_ID(1)) "
+            "ON DUPLICATE KEY UPDATE valor = LAST_INSERT_ID(valor + 1)"
+        ), {'nombre': nombre})
+        return int(session.execute(text("SELECT LAST_INSERT_ID()")).scalar())
+
+    session.execute(text(
+        "INSERT INTO secuencias (nombre, valor) VALUES (:nombre, 1) "
+        "ON CONFLICT (nombre) DO UPDATE SET valor = valor + 1"
+    ), {'nombre': nombre})
+    return int(session.execute(
+        text("SELECT valor FROM secuencias WHERE nombre = :nombre"), {'nombre': nombre}
+    ).scalar())
@@ -0,0 +1,59 @@
+# utils/serializadores_utils.py
+"""
+Serializadores por proyección de columnas para los listados grandes.
+
+Un serializador declara una vez las columnas y su clave JSON. La consulta trae
+solo esas columnas como tuplas, sin instanciar entidades ORM ni cargar
+relaciones. Cada fila se arma con dict(zip(claves, fila)) y después se
+convierten únicamente los campos que lo necesitan (Decimal -> float, fechas
+-> ISO), con el mismo resultado que los helpers *_a_dict equivalentes.
+"""
+from .. import db
+
+
+def a_float(valor):
+    return float(valor)
+
+
+def a_iso(valor):
+    return valor.isoformat()
+
+
+class Proyeccion:
+    """
+    campos: tuplas (clave, columna) o (clave, columna, conversor). El conversor
+    no se aplica a None. 'completar' recibe cada dict ya armado para campos
+    derivados o anidados; las claves que empiezan con '_' se descartan al final.
+    """
+
+    def __init__(self, *campos, completar=None):
+        self.columnas = [campo[1] for campo in campos]
+        self.claves = tuple(campo[0] for campo in campos)
+        self._conversiones = tuple((campo[0], campo[2]) for campo in campos if len(campo) > 2)
+        self._internas = tuple(clave for clave in self.claves if clave.startswith('_'))
+        self._completar = completar
+        self.serializar = self._compilar()
+
+    def _compilar(self):
+        claves, conversiones, internas, completar = self.claves, self._conversiones, self._internas, self._completar
+
+        def serializar(fila):
+            datos = dict(zip(claves, fila))
+            for clave, conversor in conversiones:
+                valor = datos[clave]
+                if valor is not None:
+                    datos[clave] = conversor(valor)
+            if completar is not None:
+                completar(datos)
+            for clave in internas:
+                del datos[clave]
+            return datos
+        return serializar
+
+    def consulta(self):
+        """Query sobre las columnas de la proyección; agregar joins, filtros y orden."""
+        return db.session.query(*self.columnas)
+
+    def lista(self, filas):
+        serializar = self.serializar
+        return [serializar(fila) for fila in filas]
@@ -0,0 +1,169 @@
+# utils/sincronizacion_utils.py
+"""
+Registro de cambios (cambios_sincronizacion) para la sincronización
+incremental de catálogos (/sync/cambios).
+
+Los cambios ORM sobre las tablas de ENTIDADES_SYNC se juntan en cada flush y
+se escriben al confirmar la sesión, todos con la misma versión: el siguiente
+valor de la secuencia SECUENCIA_SYNC. La fila de la secuencia queda bloqueada
+hasta el commit, así las versiones se hacen visibles en orden y un cliente que
+ya leyó la versión N no puede perderse una N-1 confirmada después.
+
+Los UPDATE masivos (query.update, SQL Core, upserts) no pasan por el flush:
+deben registrar sus filas con registrar_cambios() o registrar_cambios_consulta()
+antes de confirmar.
+"""
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, String, event, func, literal, select
+from sqlalchemy.orm import Session
+
+from .. import db
+from ..models import CambioSincronizacion, PrecioEspecialCliente
+from .secuencias_utils import siguiente_valor
+
+SECUENCIA_SYNC = 'cambios_sync'
+CAMBIOS_POR_PAGINA = 5000
+
+OP_ALTA = 'alta'
+OP_MODIFICACION = 'modificacion'
+OP_BAJA = 'baja'
+
+ENTIDAD_PRODUCTOS = 'productos'
+ENTIDAD_CLIENTES = 'clientes'
+ENTIDAD_PRECIOS_ESPECIALES = 'precios_especiales'
+ENTIDAD_TIPOS_CAMBIO = 'tipos_cambio'
+
+# Tabla -> entidad en el registro (y clave en la respuesta de /sync/cambios)
+ENTIDADES_SYNC = {
+    'productos': ENTIDAD_PRODUCTOS,
+    'clientes': ENTIDAD_CLIENTES,
+    'precios_especiales_cliente': ENTIDAD_PRECIOS_ESPECIALES,
+    'tipos_cambio': ENTIDAD_TIPOS_CAMBIO,
+}
+
+
+def _pendientes(session):
+    if session is None:
+        session = db.session
+    return session.info.setdefault('cambios_sync', {'filas': {}, 'consultas': []})
+
+
+def _combinar(anterior, nueva):
+    """Lo creado y luego modificado en la misma transacción sigue siendo alta; la baja siempre gana."""
+    if anterior is None or nueva == OP_BAJA or anterior == OP_BAJA:
+        return nueva
+    return anterior
+
+
+def registrar_cambios(entidad, ids, operacion=OP_MODIFICACION, session=None):
+    """Anota cambios de 'entidad' por id para el próximo commit de la sesión."""
+    filas = _pendientes(session)['filas']
+    for id_ in ids:
+        filas[(entidad, id_)] = _combinar(filas.get((entidad, id_)), operacion)
+
+
+def registrar_cambios_consulta(entidad, columna_id, *condiciones, operacion=OP_MODIFICACION, session=None):
+    """
+    Anota como cambiadas las filas que cumplan 'condiciones' al confirmar; se
+    escriben con un INSERT ... SELECT, sin traer los ids (para UPDATEs masivos).
+    """
+    _pendientes(session)['consultas'].append((entidad, columna_id, condiciones, operacion))
+
+
+def _registrar_dependientes(session, productos_ids, tipo_cambio_modificado):
+    """
+    Los precios especiales con usar_precio_base se calculan sobre el precio del
+    producto (y el TC): cambian aunque su fila no se toque.
+    """
+    base = PrecioEspecialCliente.usar_precio_base.is_(True)
+    if tipo_cambio_modificado:
+        registrar_cambios_consulta(ENTIDAD_PRECIOS_ESPECIALES, PrecioEspecialCliente.id, base, session=session)
+    elif productos_ids:
+        registrar_cambios_consulta(
+            ENTIDAD_PRECIOS_ESPECIALES, PrecioEspecialCliente.id,
+            base, PrecioEspecialCliente.producto_id.in_(sorted(productos_ids)), session=session
+        )
+
+
+# --- Lectura ---
+
+def version_actual():
+    return db.session.query(func.max(CambioSincronizacion.version)).scalar() or 0
+
+
+def cambios_desde(desde, limite=CAMBIOS_POR_PAGINA):
+    """
+    Ids cambiados con versión > 'desde', por entidad: ({entidad: set(ids)},
+    version, hay_mas). Pagina por versiones completas (una transacción nunca
+    queda partida entre dos páginas), así que una página puede pasar 'limite'.
+    """
+    version = CambioSincronizacion.version
+    tope = db.session.query(version).filter(version > desde).order_by(version) \
+        .offset(limite - 1).limit(1).scalar()
+    consulta = db.session.query(CambioSincronizacion.entidad, CambioSincronizacion.entidad_id, version) \
+        .filter(version > desde)
+    if tope is not None:
+        consulta = consulta.filter(version <= tope)
+
+    cambios = {}
+    ultima = desde
+    for entidad, entidad_id, version_fila in consulta:
+        cambios.setdefault(entidad, set()).add(entidad_id)
+        ultima = max(ultima, version_fila)
+    hay_mas = tope is not None and db.session.query(
+        db.session.query(version).filter(version > tope).exists()
+    ).scalar()
+    return cambios, ultima, bool(hay_mas)
+
+
+# --- Escritura con los commits ---
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_cambios_orm(session, flush_context):
+    productos_modificados = set()
+    tipo_cambio_modificado = False
+    cambios = [(obj, OP_ALTA) for obj in session.new]
+    cambios += [(obj, OP_MODIFICACION) for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    cambios += [(obj, OP_BAJA) for obj in session.deleted]
+    for obj, operacion in cambios:
+        entidad = ENTIDADES_SYNC.get(getattr(obj, '__tablename__', None))
+        if entidad is None or obj.id is None:
+            continue
+        registrar_cambios(entidad, [obj.id], operacion, session=session)
+        if entidad == ENTIDAD_PRODUCTOS and operacion == OP_MODIFICACION:
+            productos_modificados.add(obj.id)
+        elif entidad == ENTIDAD_TIPOS_CAMBIO:
+            tipo_cambio_modificado = True
+    _registrar_dependientes(session, productos_modificados, tipo_cambio_modificado)
+
+
+@event.listens_for(Session, 'before_commit')
+def _escribir_cambios(session):
+    # El commit vacía lo pendiente después de este evento: se adelanta para que pase por after_flush
+    session.flush()
+    pendientes = session.info.pop('cambios_sync', None)
+    if not pendientes or not (pendientes['filas'] or pendientes['consultas']):
+        return
+
+    version = siguiente_valor(SECUENCIA_SYNC, session=session)
+    ahora = datetime.utcnow()
+    tabla = CambioSincronizacion.__table__
+    if pendientes['filas']:
+        session.execute(tabla.insert(), [
+            {'version': version, 'entidad': entidad, 'entidad_id': entidad_id, 'operacion': operacion, 'fecha': ahora}
+            for (entidad, entidad_id), operacion in pendientes['filas'].items()
+        ])
+    for entidad, columna_id, condiciones, operacion in pendientes['consultas']:
+        session.execute(tabla.insert().from_select(
+            ['version', 'entidad', 'entidad_id', 'operacion', 'fecha'],
+            select(
+                literal(version, BigInteger), literal(entidad, String), columna_id,
+                literal(operacion, String), literal(ahora, DateTime)
+            ).where(*condiciones)
+        ))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_cambios(session):
+    session.info.pop('cambios_sync', None)
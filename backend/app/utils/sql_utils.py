@@ -0,0 +1,48 @@
+# utils/sql_utils.py
+"""Helpers SQL sin dependencia de modelos (los usan models.py y utils/)."""
+
+
+def upsert_incremental(conexion, tabla, filas, claves, columnas):
+    """
+    Inserta 'filas' en 'tabla' o, si la clave ya existe, suma los valores de
+    'columnas' a los actuales (columna = columna + nuevo). Es atómico por fila:
+    MySQL usa ON DUPLICATE KEY UPDATE; SQLite, ON CONFLICT DO UPDATE.
+    'conexion' puede ser una Session o una Connection.
+    """
+    if not filas:
+        return
+    bind = conexion if hasattr(conexion, 'dialect') else conexion.get_bind()
+    if bind.dialect.name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(tabla).values(filas)
+        stmt = stmt.on_duplicate_key_update({c: tabla.c[c] + stmt.inserted[c] for c in columnas})
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(tabla).values(filas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(claves),
+            set_={c: tabla.c[c] + stmt.excluded[c] for c in columnas}
+        )
+    conexion.execute(stmt)
+
+
+def upsert_reemplazo(conexion, tabla, filas, claves, columnas):
+    """
+    Como upsert_incremental pero reemplazando: si la clave ya existe, 'columnas'
+    toman el valor nuevo (columna = nuevo). Un solo INSERT multi-fila por llamada.
+    """
+    if not filas:
+        return
+    bind = conexion if hasattr(conexion, 'dialect') else conexion.get_bind()
+    if bind.dialect.name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(tabla).values(filas)
+        stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in columnas})
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(tabla).values(filas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(claves),
+            set_={c: stmt.excluded[c] for c in columnas}
+        )
+    conexion.execute(stmt)
@@ -0,0 +1,57 @@
+"""Normalización de teléfonos de clientes (sin dependencias Flask)."""
+
+from __future__ import annotations
+
+import re
+from typing import Optional
+
+_NO_DIGITOS = re.compile(r"\D+")
+
+# Número nacional argentino: característica + abonado, sin 54/9/0/15
+LARGO_NUMERO_NACIONAL = 10
+PREFIJO_PAIS = "54"
+PREFIJO_MOVIL_LOCAL = "15"
+
+
+def normalizar_telefono(telefono: Optional[str]) -> Optional[str]:
+    """Deja solo los dígitos del teléfono; None si no queda ninguno."""
+    if telefono is None:
+        return None
+    digitos = _NO_DIGITOS.sub("", str(telefono))
+    return digitos or None
+
+
+def invertir_telefono(telefono_normalizado: Optional[str]) -> Optional[str]:
+    """
+    Dígitos en orden inverso: una búsqueda por sufijo ('termina en 12345678')
+    se convierte en un LIKE 'x%' que puede resolver el índice.
+    """
+    if not telefono_normalizado:
+        return None
+    return telefono_normalizado[::-1]
+
+
+def telefono_nacional(telefono: Optional[str]) -> Optional[str]:
+    """
+    Dígitos del número nacional: quita el 54 (y el 9 de celulares) del formato
+    internacional, el 0 de larga distancia y el 15 de celulares después de la
+    característica (de 2 a 4 dígitos). Los números que no encajan (p.ej. sin
+    característica) quedan solo con sus dígitos.
+
+    "+54 9 11 1234-5678", "011 15 1234-5678" y "11 1234-5678" -> "1112345678".
+    """
+    digitos = normalizar_telefono(telefono)
+    if not digitos:
+        return None
+    if digitos.startswith(PREFIJO_PAIS) and len(digitos) >= LARGO_NUMERO_NACIONAL + len(PREFIJO_PAIS):
+        digitos = digitos[len(PREFIJO_PAIS):]
+        if digitos.startswith("9") and len(digitos) == LARGO_NUMERO_NACIONAL + 1:
+            digitos = digitos[1:]
+    if digitos.startswith("0"):
+        digitos = digitos[1:]
+    if len(digitos) == LARGO_NUMERO_NACIONAL + len(PREFIJO_MOVIL_LOCAL):
+        for largo_caracteristica in (2, 3, 4):
+            if digitos[largo_caracteristica:largo_caracteristica + 2] == PREFIJO_MOVIL_LOCAL:
+                digitos = digitos[:largo_caracteristica] + digitos[largo_caracteristica + 2:]
+                break
+    return digitos or None
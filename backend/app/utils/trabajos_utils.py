@@ -0,0 +1,88 @@
+# utils/trabajos_utils.py
+"""
+Trabajos en segundo plano con progreso persistido (ver models.TrabajoSegundoPlano).
+
+El request crea el trabajo, hace commit de su propio cambio y lanza la tarea en
+un hilo con su propio app context. La tarea recibe el id del trabajo, avanza por
+lotes y llama a registrar_progreso() antes de cada commit de lote. Lo que
+devuelve la tarea queda en 'resultado' (JSON) para consultarlo al terminar.
+"""
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+
+from flask import current_app
+
+from .. import db
+from ..models import TrabajoSegundoPlano
+
+logger = logging.getLogger(__name__)
+
+
+def crear_trabajo(tipo, total, parametros=None, usuario=None):
+    """Da de alta el trabajo en estado PENDIENTE (sin commit)."""
+    trabajo = TrabajoSegundoPlano(
+        tipo=tipo,
+        estado='PENDIENTE',
+        total=total,
+        procesados=0,
+        parametros=json.dumps(parametros, default=str) if parametros is not None else None,
+        usuario=usuario,
+    )
+    db.session.add(trabajo)
+    db.session.flush()
+    return trabajo
+
+
+def registrar_progreso(trabajo_id, procesados):
+    """Actualiza el avance del trabajo; viaja en el commit del lote del llamador."""
+    if trabajo_id is None:
+        return
+    db.session.query(TrabajoSegundoPlano).filter(TrabajoSegundoPlano.id == trabajo_id).update(
+        {'procesados': procesados, 'estado': 'EN_CURSO'}, synchronize_session=False
+    )
+
+
+def _finalizar_trabajo(trabajo_id, estado, error=None, resultado=None):
+    db.session.query(TrabajoSegundoPlano).filter(TrabajoSegundoPlano.id == trabajo_id).update(
+        {
+            'estado': estado, 'error': error, 'fecha_fin': datetime.now(timezone.utc),
+            'resultado': json.dumps(resultado, default=str) if resultado is not None else None,
+        },
+        synchronize_session=False,
+    )
+    db.session.commit()
+
+
+def ejecutar_trabajo(trabajo_id, tarea, *args, **kwargs):
+    """
+    Corre tarea(trabajo_id, *args, **kwargs) y deja el estado final registrado.
+    Devuelve el resultado de la tarea (None si falló). También sirve para correr
+    la tarea en el mismo request cuando solo interesa publicar el progreso.
+    """
+    try:
+        resultado = tarea(trabajo_id, *args, **kwargs)
+        _finalizar_trabajo(trabajo_id, 'COMPLETADO', resultado=resultado)
+        return resultado
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Trabajo %s falló", trabajo_id)
+        _finalizar_trabajo(trabajo_id, 'ERROR', error=str(e)[:2000])
+        return None
+
+
+def lanzar_trabajo(trabajo_id, tarea, *args, **kwargs):
+    """Ejecuta el trabajo en un hilo daemon. El trabajo ya debe estar commiteado."""
+    app = current_app._get_current_object()
+
+    def _correr():
+        with app.app_context():
+            try:
+                ejecutar_trabajo(trabajo_id, tarea, *args, **kwargs)
+            finally:
+                db.session.remove()
+
+    hilo = threading.Thread(target=_correr, name=f"trabajo-{trabajo_id}", daemon=True)
+    hilo.start()
+    return hilo
@@ -0,0 +1,26 @@
+"""Add clave_idempotencia to ventas for safe replays of batch registration.
+
+Revision ID: 20261019_add_clave_idempotencia_ventas
+Revises: 20261019_add_telefono_normalizado_clientes
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_add_clave_idempotencia_ventas'
+down_revision = '20261019_add_telefono_normalizado_clientes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('ventas', sa.Column('clave_idempotencia', sa.String(length=64), nullable=True))
+    # Único: MySQL admite múltiples NULL, así que las ventas históricas no chocan.
+    op.create_index('uq_ventas_clave_idempotencia', 'ventas', ['clave_idempotencia'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_ventas_clave_idempotencia', table_name='ventas')
+    op.drop_column('ventas', 'clave_idempotencia')
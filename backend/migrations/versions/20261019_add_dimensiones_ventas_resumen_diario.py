@@ -0,0 +1,93 @@
+"""Add fecha_registro and con_direccion to the ventas_resumen_diario key.
+
+Revision ID: 20261019_add_dimensiones_ventas_resumen_diario
+Revises: 20261019_create_cambios_sincronizacion
+Create Date: 2026-10-19
+
+Los dashboards separan canales por dirección de entrega y la caja del día y
+los KPIs del mes filtran por fecha de registro: el resumen necesita ambas
+dimensiones en la clave. Las filas actuales no se pueden repartir entre las
+nuevas claves, así que la tabla se vuelve a llenar en la misma migración con
+un INSERT ... SELECT sobre ventas/detalles_venta que usa la clave y las
+métricas de resumen_ventas_utils._contribuciones (los KPIs nunca leen el
+resumen vacío).
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_add_dimensiones_ventas_resumen_diario'
+down_revision = '20261019_create_cambios_sincronizacion'
+branch_labels = None
+depends_on = None
+
+# Una fila por venta con su clave del resumen (misma definición que
+# resumen_ventas_utils._columnas_clave) y los totales de sus líneas.
+VENTAS_CON_CLAVE = """
+    SELECT
+        DATE(COALESCE(v.fecha_pedido, v.fecha_registro)) AS fecha,
+        DATE(COALESCE(v.fecha_registro, v.fecha_pedido)) AS fecha_registro,
+        CASE WHEN v.cliente_id IS NULL THEN 'puerta' ELSE 'pedido' END AS canal,
+        CASE WHEN v.direccion_entrega IS NOT NULL AND v.direccion_entrega <> '' THEN 1 ELSE 0 END AS con_direccion,
+        COALESCE(v.forma_pago, '') AS forma_pago,
+        CASE WHEN e.prefijo IN ('PENDIENTE', 'LISTO_PARA_ENTREGAR', 'ENTREGADO', 'CANCELADO')
+             THEN e.prefijo ELSE 'PENDIENTE' END AS estado,
+        COALESCE(v.monto_final_redondeado, 0) AS monto,
+        COALESCE(v.monto_final_con_recargos, 0) AS monto_con_recargos,
+        COALESCE(d.kgs, 0) AS kgs,
+        COALESCE(d.costo, 0) AS costo
+    FROM ventas v
+    JOIN (
+        SELECT id, REPLACE(UPPER(TRIM(CASE
+            WHEN INSTR(COALESCE(nombre_vendedor, ''), '-') > 0
+            THEN SUBSTR(COALESCE(nombre_vendedor, ''), 1, INSTR(COALESCE(nombre_vendedor, ''), '-') - 1)
+            ELSE COALESCE(nombre_vendedor, '') END)), ' ', '_') AS prefijo
+        FROM ventas
+    ) e ON e.id = v.id
+    LEFT JOIN (
+        SELECT venta_id, SUM(cantidad) AS kgs, SUM(cantidad * costo_unitario_momento_ars) AS costo
+        FROM detalles_venta
+        GROUP BY venta_id
+    ) d ON d.venta_id = v.id
+    WHERE COALESCE(v.fecha_pedido, v.fecha_registro) IS NOT NULL
+"""
+
+
+def _llenar_resumen(claves):
+    columnas = ', '.join(claves)
+    op.execute(sa.text(f"""
+        INSERT INTO ventas_resumen_diario
+            ({columnas}, monto, monto_con_recargos, monto_centena, unidades, kgs, costo)
+        SELECT {columnas}, SUM(monto), SUM(monto_con_recargos), SUM(CEIL(monto / 100.0) * 100),
+               COUNT(*), SUM(kgs), SUM(costo)
+        FROM ({VENTAS_CON_CLAVE}) ventas_con_clave
+        GROUP BY {columnas}
+    """))
+
+
+def upgrade():
+    op.execute('DELETE FROM ventas_resumen_diario')
+    op.drop_constraint('uq_ventas_resumen_diario_clave', 'ventas_resumen_diario', type_='unique')
+    op.add_column('ventas_resumen_diario', sa.Column('fecha_registro', sa.Date(), nullable=False))
+    op.add_column('ventas_resumen_diario', sa.Column(
+        'con_direccion', sa.Boolean(), nullable=False, server_default=sa.false()
+    ))
+    op.create_unique_constraint(
+        'uq_ventas_resumen_diario_clave', 'ventas_resumen_diario',
+        ['fecha', 'fecha_registro', 'canal', 'con_direccion', 'forma_pago', 'estado']
+    )
+    op.create_index('ix_ventas_resumen_diario_fecha_registro', 'ventas_resumen_diario', ['fecha_registro'])
+    _llenar_resumen(('fecha', 'fecha_registro', 'canal', 'con_direccion', 'forma_pago', 'estado'))
+
+
+def downgrade():
+    op.execute('DELETE FROM ventas_resumen_diario')
+    op.drop_index('ix_ventas_resumen_diario_fecha_registro', table_name='ventas_resumen_diario')
+    op.drop_constraint('uq_ventas_resumen_diario_clave', 'ventas_resumen_diario', type_='unique')
+    op.drop_column('ventas_resumen_diario', 'con_direccion')
+    op.drop_column('ventas_resumen_diario', 'fecha_registro')
+    op.create_unique_constraint(
+        'uq_ventas_resumen_diario_clave', 'ventas_resumen_diario', ['fecha', 'canal', 'forma_pago', 'estado']
+    )
+    _llenar_resumen(('fecha', 'canal', 'forma_pago', 'estado'))
@@ -0,0 +1,42 @@
+"""Add FULLTEXT (ngram) index on clientes for the client search.
+
+Revision ID: 20261019_add_fulltext_clientes
+Revises: 20261019_create_ajustes_precios_especiales
+Create Date: 2026-10-19
+
+utils/busqueda_clientes_utils usa MATCH ... AGAINST sobre este índice cuando
+existe. Solo aplica a MySQL (InnoDB >= 5.7 con el parser ngram); en otros
+motores la búsqueda sigue con ILIKE y la migración no hace nada.
+
+El índice se crea sin stopwords: con ngram, InnoDB descarta todo token que
+contenga una stopword y la lista por defecto incluye 'a' e 'i', así que la
+mayoría de los bigramas de nombres y localidades en castellano ("an", "na",
+"ia"...) no se indexarían y '+"ana"' no encontraría a nadie. El uso de
+stopwords queda fijado al crear el índice: si alguna vez se recrea a mano
+(DROP + CREATE), hacerlo también con innodb_ft_enable_stopword = OFF en la sesión.
+"""
+
+from alembic import op
+
+
+revision = '20261019_add_fulltext_clientes'
+down_revision = '20261019_create_ajustes_precios_especiales'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.execute("SET SESSION innodb_ft_enable_stopword = OFF")
+    op.execute(
+        "CREATE FULLTEXT INDEX ft_clientes_busqueda "
+        "ON clientes (nombre_razon_social, localidad, email, contacto_principal) WITH PARSER ngram"
+    )
+    op.execute("SET SESSION innodb_ft_enable_stopword = ON")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.drop_index('ft_clientes_busqueda', table_name='clientes')
@@ -0,0 +1,29 @@
+"""Add composite index on audit_logs (entidad, entidad_id, fecha).
+
+Revision ID: 20261019_add_idx_audit_logs_entidad_fecha
+Revises: 20261019_create_secuencias
+Create Date: 2026-10-19
+
+Respalda la consulta del historial de auditoría de una entidad ordenado por fecha.
+"""
+
+from alembic import op
+
+
+revision = '20261019_add_idx_audit_logs_entidad_fecha'
+down_revision = '20261019_create_secuencias'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_audit_logs_entidad_entidad_id_fecha',
+        'audit_logs',
+        ['entidad', 'entidad_id', 'fecha'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_audit_logs_entidad_entidad_id_fecha', table_name='audit_logs')
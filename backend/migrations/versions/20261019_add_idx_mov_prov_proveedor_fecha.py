@@ -0,0 +1,29 @@
+"""Add composite index on movimientos_proveedor (proveedor_id, fecha, id).
+
+Revision ID: 20261019_add_idx_mov_prov_proveedor_fecha
+Revises: 20261019_create_saldo_proveedor
+Create Date: 2026-10-19
+
+Respalda la paginación por keyset del estado de cuenta de proveedores.
+"""
+
+from alembic import op
+
+
+revision = '20261019_add_idx_mov_prov_proveedor_fecha'
+down_revision = '20261019_create_saldo_proveedor'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_mov_prov_proveedor_fecha_id',
+        'movimientos_proveedor',
+        ['proveedor_id', 'fecha', 'id'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_mov_prov_proveedor_fecha_id', table_name='movimientos_proveedor')
@@ -0,0 +1,30 @@
+"""Add composite index on ventas (fecha_pedido, cliente_id, forma_pago).
+
+Revision ID: 20261019_add_idx_ventas_fecha_pedido_canal
+Revises: 20261019_add_tc_costo_momento_detalles_venta
+Create Date: 2026-10-19
+
+Respalda las consultas agregadas de KPIs del día (reportes y dashboard),
+que filtran por rango de fecha_pedido y discriminan canal/forma de pago.
+"""
+
+from alembic import op
+
+
+revision = '20261019_add_idx_ventas_fecha_pedido_canal'
+down_revision = '20261019_add_tc_costo_momento_detalles_venta'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_ventas_fecha_pedido_cliente_forma_pago',
+        'ventas',
+        ['fecha_pedido', 'cliente_id', 'forma_pago'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_ventas_fecha_pedido_cliente_forma_pago', table_name='ventas')
@@ -0,0 +1,151 @@
+"""Add typed OC metadata columns (tc_snapshot, fecha_entrega_tentativa, base and tax rates) and backfill them.
+
+Revision ID: 20261019_add_metadatos_tipados_ordencompra
+Revises: 20261019_create_trabajos_segundo_plano
+Create Date: 2026-10-19
+
+Hasta ahora estos datos vivían como marcadores de texto en observaciones_solicitud /
+notas_recepcion (__TC_SNAPSHOT__:, __FECHA_ENTREGA_TENTATIVA__:, __BASE_SIN_IMPUESTOS__:)
+y las tasas se parseaban de iva / iibb en cada cálculo. El backfill lee los
+marcadores una sola vez; los textos quedan como estaban.
+"""
+
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_add_metadatos_tipados_ordencompra'
+down_revision = '20261019_create_trabajos_segundo_plano'
+branch_labels = None
+depends_on = None
+
+FILAS_POR_LOTE = 1000
+
+
+def _linea_marcador(texto, marcador):
+    for linea in str(texto or '').split('\n'):
+        linea = linea.strip()
+        if linea.startswith(marcador):
+            return linea[len(marcador):].strip()
+    return None
+
+
+def _tc_snapshot(texto):
+    valor = _linea_marcador(texto, '__TC_SNAPSHOT__:')
+    try:
+        tc = Decimal(str(json.loads(valor).get('tc_usado')))
+        return tc if tc > 0 else None
+    except Exception:
+        return None
+
+
+def _fecha_entrega(texto):
+    try:
+        return datetime.fromisoformat(_linea_marcador(texto, '__FECHA_ENTREGA_TENTATIVA__:'))
+    except Exception:
+        return None
+
+
+def _base_sin_impuestos(texto):
+    try:
+        return Decimal(_linea_marcador(texto, '__BASE_SIN_IMPUESTOS__:'))
+    except Exception:
+        return None
+
+
+def _tasa_iva(valor):
+    # Misma regla que utils/impuestos_utils.tasa_porcentaje: '21' / '0,21' -> 0.21
+    raw = str(valor or '').strip()
+    if not raw:
+        return None
+    try:
+        parsed = Decimal(raw.replace(',', '.'))
+        return parsed if parsed <= 1 else parsed / Decimal('100')
+    except Exception:
+        return Decimal('0')
+
+
+def _tasa_iibb(valor):
+    # Misma regla que utils/impuestos_utils.tasa_iibb: '3%' / '3' / '0.03' -> 0.03
+    raw = str(valor or '').strip()
+    if not raw:
+        return None
+    try:
+        if raw.endswith('%'):
+            return Decimal(raw[:-1].strip()) / Decimal('100')
+        parsed = Decimal(raw)
+        return parsed if parsed <= 1 else parsed / Decimal('100')
+    except Exception:
+        return Decimal('0')
+
+
+def upgrade():
+    op.add_column('ordenes_compra', sa.Column('tc_snapshot', sa.Numeric(15, 4), nullable=True))
+    op.add_column('ordenes_compra', sa.Column('fecha_entrega_tentativa', sa.DateTime(), nullable=True))
+    op.add_column('ordenes_compra', sa.Column('importe_base_sin_impuestos', sa.Numeric(15, 2), nullable=True))
+    op.add_column('ordenes_compra', sa.Column('iva_tasa', sa.Numeric(7, 4), nullable=True))
+    op.add_column('ordenes_compra', sa.Column('iibb_tasa', sa.Numeric(7, 4), nullable=True))
+    op.create_index(
+        'ix_ordenes_compra_fecha_entrega_tentativa', 'ordenes_compra', ['fecha_entrega_tentativa'], unique=False
+    )
+
+    bind = op.get_bind()
+    actualizar = sa.text(
+        """
+        UPDATE ordenes_compra
+        SET tc_snapshot = :tc_snapshot,
+            fecha_entrega_tentativa = :fecha_entrega_tentativa,
+            importe_base_sin_impuestos = :importe_base_sin_impuestos,
+            iva_tasa = :iva_tasa,
+            iibb_tasa = :iibb_tasa
+        WHERE id = :id
+        """
+    ).bindparams(
+        sa.bindparam('tc_snapshot', type_=sa.Numeric(15, 4)),
+        sa.bindparam('fecha_entrega_tentativa', type_=sa.DateTime()),
+        sa.bindparam('importe_base_sin_impuestos', type_=sa.Numeric(15, 2)),
+        sa.bindparam('iva_tasa', type_=sa.Numeric(7, 4)),
+        sa.bindparam('iibb_tasa', type_=sa.Numeric(7, 4)),
+    )
+    ultimo_id = 0
+    while True:
+        filas = bind.execute(sa.text(
+            """
+            SELECT id, observaciones_solicitud, notas_recepcion, iva, iibb
+            FROM ordenes_compra
+            WHERE id > :ultimo_id
+            ORDER BY id
+            LIMIT :limite
+            """
+        ), {'ultimo_id': ultimo_id, 'limite': FILAS_POR_LOTE}).fetchall()
+        if not filas:
+            break
+        cambios = []
+        for oc_id, observaciones, notas, iva, iibb in filas:
+            cambio = {
+                'id': oc_id,
+                # Mismo orden de prioridad que se usaba al leer: observaciones y luego notas
+                'tc_snapshot': _tc_snapshot(observaciones) or _tc_snapshot(notas),
+                'fecha_entrega_tentativa': _fecha_entrega(observaciones),
+                'importe_base_sin_impuestos': _base_sin_impuestos(observaciones),
+                'iva_tasa': _tasa_iva(iva),
+                'iibb_tasa': _tasa_iibb(iibb),
+            }
+            if any(v is not None for k, v in cambio.items() if k != 'id'):
+                cambios.append(cambio)
+        if cambios:
+            bind.execute(actualizar, cambios)
+        ultimo_id = filas[-1][0]
+
+
+def downgrade():
+    op.drop_index('ix_ordenes_compra_fecha_entrega_tentativa', table_name='ordenes_compra')
+    op.drop_column('ordenes_compra', 'iibb_tasa')
+    op.drop_column('ordenes_compra', 'iva_tasa')
+    op.drop_column('ordenes_compra', 'importe_base_sin_impuestos')
+    op.drop_column('ordenes_compra', 'fecha_entrega_tentativa')
+    op.drop_column('ordenes_compra', 'tc_snapshot')
@@ -0,0 +1,29 @@
+"""Add resultado (JSON) to trabajos_segundo_plano.
+
+Revision ID: 20261019_add_resultado_trabajos_segundo_plano
+Revises: 20261019_telefono_nacional_clientes
+Create Date: 2026-10-19
+
+La carga masiva de precios especiales corre en segundo plano: el resumen y las
+filas con error que antes volvían en la respuesta quedan en el trabajo.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+revision = '20261019_add_resultado_trabajos_segundo_plano'
+down_revision = '20261019_telefono_nacional_clientes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('trabajos_segundo_plano', sa.Column(
+        'resultado', sa.Text().with_variant(mysql.LONGTEXT(), 'mysql'), nullable=True
+    ))
+
+
+def downgrade():
+    op.drop_column('trabajos_segundo_plano', 'resultado')
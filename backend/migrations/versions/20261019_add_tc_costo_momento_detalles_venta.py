@@ -0,0 +1,26 @@
+"""Add tc_costo_momento to detalles_venta (TC used for the sale-time cost snapshot).
+
+Revision ID: 20261019_add_tc_costo_momento_detalles_venta
+Revises: 20261019_add_clave_idempotencia_ventas
+Create Date: 2026-10-19
+
+El backfill de costo_unitario_momento_ars / tc_costo_momento para ventas
+históricas se corre aparte: scripts/backfill_costo_detalles_venta.py
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_add_tc_costo_momento_detalles_venta'
+down_revision = '20261019_add_clave_idempotencia_ventas'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('detalles_venta', sa.Column('tc_costo_momento', sa.Numeric(15, 4), nullable=True))
+
+
+def downgrade():
+    op.drop_column('detalles_venta', 'tc_costo_momento')
@@ -0,0 +1,42 @@
+"""Add telefono_normalizado (digits only) and its reversed form to clientes.
+
+Revision ID: 20261019_add_telefono_normalizado_clientes
+Revises: 20260409_seed_dolarcompras_tipo_cambio
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_add_telefono_normalizado_clientes'
+down_revision = '20260409_seed_dolarcompras_tipo_cambio'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('clientes', sa.Column('telefono_normalizado', sa.String(length=50), nullable=True))
+    op.add_column('clientes', sa.Column('telefono_normalizado_inv', sa.String(length=50), nullable=True))
+
+    # Backfill: solo dígitos y su inverso (la búsqueda por sufijo usa LIKE 'inv%').
+    op.execute(sa.text("""
+        UPDATE clientes
+        SET telefono_normalizado = NULLIF(REGEXP_REPLACE(telefono, '[^0-9]', ''), '')
+        WHERE telefono IS NOT NULL
+    """))
+    op.execute(sa.text("""
+        UPDATE clientes
+        SET telefono_normalizado_inv = REVERSE(telefono_normalizado)
+        WHERE telefono_normalizado IS NOT NULL
+    """))
+
+    op.create_index('ix_clientes_telefono_normalizado', 'clientes', ['telefono_normalizado'])
+    op.create_index('ix_clientes_telefono_normalizado_inv', 'clientes', ['telefono_normalizado_inv'])
+
+
+def downgrade():
+    op.drop_index('ix_clientes_telefono_normalizado_inv', table_name='clientes')
+    op.drop_index('ix_clientes_telefono_normalizado', table_name='clientes')
+    op.drop_column('clientes', 'telefono_normalizado_inv')
+    op.drop_column('clientes', 'telefono_normalizado')
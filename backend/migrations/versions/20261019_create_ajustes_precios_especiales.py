@@ -0,0 +1,48 @@
+"""Create ajustes_precios_especiales (+ detalle) to record and revert global special-price adjustments.
+
+Revision ID: 20261019_create_ajustes_precios_especiales
+Revises: 20261019_add_idx_audit_logs_entidad_fecha
+Create Date: 2026-10-19
+
+/precios_especiales/actualizar-global pasa a un UPDATE por tramos de ids; el
+detalle guarda precio anterior/nuevo de cada fila para poder revertir el ajuste.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_create_ajustes_precios_especiales'
+down_revision = '20261019_add_idx_audit_logs_entidad_fecha'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ajustes_precios_especiales',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('porcentaje', sa.Numeric(10, 4), nullable=False),
+        sa.Column('direccion', sa.String(length=10), nullable=False),
+        sa.Column('factor', sa.Numeric(12, 6), nullable=False),
+        sa.Column('total_precios', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('usuario', sa.String(length=100), nullable=True),
+        sa.Column('fecha', sa.DateTime(), nullable=True),
+        sa.Column('fecha_reversion', sa.DateTime(), nullable=True),
+        sa.Column('total_revertidos', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'ajustes_precios_especiales_detalle',
+        sa.Column('ajuste_id', sa.Integer(), nullable=False),
+        sa.Column('precio_especial_id', sa.Integer(), nullable=False),
+        sa.Column('precio_anterior', sa.Numeric(15, 4), nullable=False),
+        sa.Column('precio_nuevo', sa.Numeric(15, 4), nullable=False),
+        sa.ForeignKeyConstraint(['ajuste_id'], ['ajustes_precios_especiales.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('ajuste_id', 'precio_especial_id'),
+    )
+
+
+def downgrade():
+    op.drop_table('ajustes_precios_especiales_detalle')
+    op.drop_table('ajustes_precios_especiales')
@@ -0,0 +1,38 @@
+"""Create cambios_sincronizacion, the change log behind /sync/cambios.
+
+Revision ID: 20261019_create_cambios_sincronizacion
+Revises: 20261019_add_fulltext_clientes
+Create Date: 2026-10-19
+
+Cada transacción que toca productos, clientes, precios especiales o tipos de
+cambio agrega sus filas con una versión creciente (secuencia 'cambios_sync');
+los clientes piden solo lo posterior a la última versión que vieron.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_create_cambios_sincronizacion'
+down_revision = '20261019_add_fulltext_clientes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'cambios_sincronizacion',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('entidad', sa.String(length=30), nullable=False),
+        sa.Column('entidad_id', sa.Integer(), nullable=False),
+        sa.Column('operacion', sa.String(length=15), nullable=False),
+        sa.Column('fecha', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_cambios_sincronizacion_version', 'cambios_sincronizacion', ['version'])
+
+
+def downgrade():
+    op.drop_index('ix_cambios_sincronizacion_version', table_name='cambios_sincronizacion')
+    op.drop_table('cambios_sincronizacion')
@@ -0,0 +1,44 @@
+"""Create saldo_proveedor (running debit/credit totals per supplier) and backfill it.
+
+Revision ID: 20261019_create_saldo_proveedor
+Revises: 20261019_create_ventas_resumen_diario
+Create Date: 2026-10-19
+
+A partir de acá lo mantienen los eventos de MovimientoProveedor (models.py).
+Verificación posterior: scripts/conciliar_saldo_proveedor.py
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_create_saldo_proveedor'
+down_revision = '20261019_create_ventas_resumen_diario'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'saldo_proveedor',
+        sa.Column('proveedor_id', sa.Integer(), nullable=False),
+        sa.Column('debitos', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.Column('creditos', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('proveedor_id'),
+        sa.ForeignKeyConstraint(['proveedor_id'], ['proveedores.id'], name='fk_saldo_proveedor_proveedor', ondelete='CASCADE'),
+    )
+    op.execute(sa.text(
+        """
+        INSERT INTO saldo_proveedor (proveedor_id, debitos, creditos)
+        SELECT
+            mp.proveedor_id,
+            COALESCE(SUM(CASE WHEN UPPER(mp.tipo) = 'DEBITO' THEN mp.monto ELSE 0 END), 0),
+            COALESCE(SUM(CASE WHEN UPPER(mp.tipo) = 'CREDITO' THEN mp.monto ELSE 0 END), 0)
+        FROM movimientos_proveedor mp
+        GROUP BY mp.proveedor_id
+        """
+    ))
+
+
+def downgrade():
+    op.drop_table('saldo_proveedor')
@@ -0,0 +1,43 @@
+"""Create secuencias (named counters for document numbers) and seed the OC daily counters.
+
+Revision ID: 20261019_create_secuencias
+Revises: 20261019_add_metadatos_tipados_ordencompra
+Create Date: 2026-10-19
+
+nro_solicitud_interno pasa de COUNT(*) por día a utils/secuencias_utils.siguiente_valor.
+Se siembra cada día con el mayor correlativo ya emitido ('OC-YYYYMMDD-NNNN') para
+no repetir números de hoy.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_create_secuencias'
+down_revision = '20261019_add_metadatos_tipados_ordencompra'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'secuencias',
+        sa.Column('nombre', sa.String(length=100), nullable=False),
+        sa.Column('valor', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('nombre'),
+    )
+    op.execute(sa.text(
+        """
+        INSERT INTO secuencias (nombre, valor)
+        SELECT
+            CONCAT('orden_compra:', SUBSTRING(nro_solicitud_interno, 4, 8)),
+            MAX(CAST(SUBSTRING_INDEX(nro_solicitud_interno, '-', -1) AS UNSIGNED))
+        FROM ordenes_compra
+        WHERE nro_solicitud_interno REGEXP '^OC-[0-9]{8}-[0-9]+$'
+        GROUP BY SUBSTRING(nro_solicitud_interno, 4, 8)
+        """
+    ))
+
+
+def downgrade():
+    op.drop_table('secuencias')
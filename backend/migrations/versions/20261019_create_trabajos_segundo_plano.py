@@ -0,0 +1,41 @@
+"""Create trabajos_segundo_plano (progress tracking for background jobs).
+
+Revision ID: 20261019_create_trabajos_segundo_plano
+Revises: 20261019_add_idx_mov_prov_proveedor_fecha
+Create Date: 2026-10-19
+
+Lo usa el recálculo de deudas de OCs al actualizar el dólar (blueprints/tipos_cambio.py).
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_create_trabajos_segundo_plano'
+down_revision = '20261019_add_idx_mov_prov_proveedor_fecha'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'trabajos_segundo_plano',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=50), nullable=False),
+        sa.Column('estado', sa.String(length=20), nullable=False, server_default='PENDIENTE'),
+        sa.Column('total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('procesados', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('parametros', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('usuario', sa.String(length=100), nullable=True),
+        sa.Column('fecha_creacion', sa.DateTime(), nullable=True),
+        sa.Column('fecha_actualizacion', sa.DateTime(), nullable=True),
+        sa.Column('fecha_fin', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_trabajos_segundo_plano_tipo', 'trabajos_segundo_plano', ['tipo'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_trabajos_segundo_plano_tipo', table_name='trabajos_segundo_plano')
+    op.drop_table('trabajos_segundo_plano')
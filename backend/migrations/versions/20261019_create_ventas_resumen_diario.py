@@ -0,0 +1,39 @@
+"""Create ventas_resumen_diario (daily sales rollup by fecha/canal/forma_pago/estado).
+
+Revision ID: 20261019_create_ventas_resumen_diario
+Revises: 20261019_add_idx_ventas_fecha_pedido_canal
+Create Date: 2026-10-19
+
+La carga inicial se hace aparte: scripts/reconstruir_resumen_ventas.py --apply
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_create_ventas_resumen_diario'
+down_revision = '20261019_add_idx_ventas_fecha_pedido_canal'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ventas_resumen_diario',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('fecha', sa.Date(), nullable=False),
+        sa.Column('canal', sa.String(length=10), nullable=False),
+        sa.Column('forma_pago', sa.String(length=50), nullable=False, server_default=''),
+        sa.Column('estado', sa.String(length=30), nullable=False),
+        sa.Column('monto', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.Column('monto_con_recargos', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.Column('monto_centena', sa.Numeric(15, 2), nullable=False, server_default='0'),
+        sa.Column('unidades', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('kgs', sa.Numeric(15, 4), nullable=False, server_default='0'),
+        sa.Column('costo', sa.Numeric(18, 4), nullable=False, server_default='0'),
+        sa.UniqueConstraint('fecha', 'canal', 'forma_pago', 'estado', name='uq_ventas_resumen_diario_clave'),
+    )
+
+
+def downgrade():
+    op.drop_table('ventas_resumen_diario')
@@ -0,0 +1,40 @@
+"""Make movimientos_proveedor.fecha NOT NULL.
+
+Revision ID: 20261019_movimientos_proveedor_fecha_not_null
+Revises: 20261019_add_dimensiones_ventas_resumen_diario
+Create Date: 2026-10-19
+
+La paginación por keyset de /movimientos y del estado de cuenta compara y
+codifica (fecha, id): una fecha NULL rompía el cursor y dejaba la fila fuera
+de las páginas siguientes. Los movimientos sin fecha toman la fecha de su OC
+(creación, o última actualización); si tampoco la tiene, la más antigua
+posible, que es donde MySQL ordenaba los NULL.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '20261019_movimientos_proveedor_fecha_not_null'
+down_revision = '20261019_add_dimensiones_ventas_resumen_diario'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(sa.text("""
+        UPDATE movimientos_proveedor mp
+        JOIN ordenes_compra oc ON oc.id = mp.orden_id
+        SET mp.fecha = COALESCE(oc.fecha_creacion, oc.fecha_actualizacion)
+        WHERE mp.fecha IS NULL
+    """))
+    op.execute(sa.text("""
+        UPDATE movimientos_proveedor
+        SET fecha = '1970-01-01 00:00:00'
+        WHERE fecha IS NULL
+    """))
+    op.alter_column('movimientos_proveedor', 'fecha', nullable=False, existing_type=sa.DateTime())
+
+
+def downgrade():
+    op.alter_column('movimientos_proveedor', 'fecha', nullable=True, existing_type=sa.DateTime())
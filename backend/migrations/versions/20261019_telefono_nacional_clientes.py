@@ -0,0 +1,52 @@
+"""Store the national number in clientes.telefono_normalizado.
+
+Revision ID: 20261019_telefono_nacional_clientes
+Revises: 20261019_movimientos_proveedor_fecha_not_null
+Create Date: 2026-10-19
+
+/clientes/obtener_por_telefono compara el número nacional (sin 54/9/0/15,
+ver utils/telefono_utils.telefono_nacional): la columna pasa de "solo dígitos"
+a ese número. Se recalcula en Python con la misma función que usa el modelo,
+por tramos de ids.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.telefono_utils import normalizar_telefono, telefono_nacional, invertir_telefono
+
+
+revision = '20261019_telefono_nacional_clientes'
+down_revision = '20261019_movimientos_proveedor_fecha_not_null'
+branch_labels = None
+depends_on = None
+
+CLIENTES_POR_TRAMO = 1000
+
+
+def _recalcular(normalizar):
+    conexion = op.get_bind()
+    actualizar = sa.text(
+        "UPDATE clientes SET telefono_normalizado = :normalizado, telefono_normalizado_inv = :inv WHERE id = :id"
+    )
+    ultimo_id = 0
+    while True:
+        filas = conexion.execute(sa.text(
+            "SELECT id, telefono FROM clientes WHERE telefono IS NOT NULL AND id > :ultimo ORDER BY id LIMIT :limite"
+        ), {'ultimo': ultimo_id, 'limite': CLIENTES_POR_TRAMO}).fetchall()
+        if not filas:
+            break
+        ultimo_id = filas[-1].id
+        valores = []
+        for fila in filas:
+            normalizado = normalizar(fila.telefono)
+            valores.append({'id': fila.id, 'normalizado': normalizado, 'inv': invertir_telefono(normalizado)})
+        conexion.execute(actualizar, valores)
+
+
+def upgrade():
+    _recalcular(telefono_nacional)
+
+
+def downgrade():
+    _recalcular(normalizar_telefono)
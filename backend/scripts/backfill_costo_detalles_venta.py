@@ -0,0 +1,89 @@
+"""
+Backfill de costo_unitario_momento_ars / tc_costo_momento en detalles_venta.
+
+No hay historial de costo por producto ni de tipos de cambio: las líneas sin
+snapshot toman el costo de referencia y el TC vigentes, que es exactamente lo
+que el KPI mensual calculaba en cada request antes de existir el snapshot.
+Las líneas que ya tienen costo no se tocan.
+
+El costo de las líneas también está sumado en ventas_resumen_diario (KPIs de
+costos y margen del mes): cada bloque aplica al resumen la diferencia de las
+ventas afectadas en la misma transacción, como cualquier escritura de ventas.
+"""
+from sqlalchemy import bindparam
+
+from app import create_app, db
+from app.models import DetalleVenta
+from app.blueprints.productos import resolver_costos_momento_ars
+from app.utils.resumen_ventas_utils import contribuciones_resumen, aplicar_delta_resumen
+
+
+def run_backfill(dry_run=True, limit=None, chunk_size=1000):
+    total = 0
+    updated = 0
+    sin_costo = set()
+    memo = {}
+    ultimo_id = 0
+
+    stmt = (
+        DetalleVenta.__table__.update()
+        .where(DetalleVenta.__table__.c.id == bindparam('b_id'))
+        .values(costo_unitario_momento_ars=bindparam('b_costo'), tc_costo_momento=bindparam('b_tc'))
+    )
+
+    while True:
+        tamanio = chunk_size if not limit else min(chunk_size, limit - total)
+        if tamanio <= 0:
+            break
+        filas = (
+            db.session.query(DetalleVenta.id, DetalleVenta.venta_id, DetalleVenta.producto_id)
+            .filter(DetalleVenta.costo_unitario_momento_ars.is_(None), DetalleVenta.id > ultimo_id)
+            .order_by(DetalleVenta.id.asc())
+            .limit(tamanio)
+            .all()
+        )
+        if not filas:
+            break
+        total += len(filas)
+        ultimo_id = filas[-1].id
+
+        costos = resolver_costos_momento_ars({f.producto_id for f in filas}, memo=memo)
+        params = []
+        for fila in filas:
+            if fila.producto_id not in costos:
+                sin_costo.add(fila.producto_id)
+                continue
+            costo_ars, tc = costos[fila.producto_id]
+            params.append({'b_id': fila.id, 'b_costo': costo_ars, 'b_tc': tc})
+
+        if params:
+            venta_ids = sorted({fila.venta_id for fila in filas})
+            antes = contribuciones_resumen(venta_ids)
+            db.session.execute(stmt, params)
+            aplicar_delta_resumen(antes, contribuciones_resumen(venta_ids))
+            updated += len(params)
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+
+    print(f'total={total}')
+    print(f'updated={updated}')
+    print(f'dry_run={dry_run}')
+    print(f'productos_sin_costo_count={len(sin_costo)}')
+    if sin_costo:
+        print(f'productos_sin_costo_ids={sorted(sin_costo)}')
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Backfill de costo al momento en detalles_venta')
+    parser.add_argument('--apply', action='store_true', help='Aplicar cambios. Si no se pasa, corre en dry-run.')
+    parser.add_argument('--limit', type=int, default=None, help='Limita cantidad de detalles a procesar')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='Detalles por bloque/transacción')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        run_backfill(dry_run=not args.apply, limit=args.limit, chunk_size=args.chunk_size)
@@ -0,0 +1,63 @@
+"""
+Benchmark de los KPIs del día: cantidad de consultas SQL y tiempo por llamada.
+
+Antes de resolverse con agregados condicionales, reportes._get_kpis_del_dia
+emitía 11 consultas (counts, sums y dos .all() sumados en Python) y
+dashboard.get_dashboard_kpis 17. Ahora ambos leen ventas_resumen_diario con 1 consulta.
+
+Uso: python backend/scripts/benchmark_kpis_dia.py [--fecha YYYY-MM-DD] [--repeticiones N]
+"""
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.blueprints.reportes import _get_kpis_del_dia
+from app.blueprints.dashboard import get_dashboard_kpis
+
+
+def medir(nombre, funcion, repeticiones):
+    sentencias = []
+
+    def _registrar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _registrar)
+    try:
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        transcurrido = time.perf_counter() - inicio
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _registrar)
+
+    print(f"{nombre:<40} consultas/llamada={len(sentencias) // repeticiones:<4} "
+          f"ms/llamada={transcurrido * 1000 / repeticiones:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de KPIs del día')
+    parser.add_argument('--fecha', default=date.today().isoformat())
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+    fecha = date.fromisoformat(args.fecha)
+
+    app = create_app()
+    with app.app_context():
+        medir('reportes._get_kpis_del_dia', lambda: _get_kpis_del_dia(fecha), args.repeticiones)
+        # Se saltean token_required/roles_required: sólo interesa el trabajo en la base
+        vista = get_dashboard_kpis.__wrapped__.__wrapped__
+        with app.test_request_context(f'/api/dashboard/kpis?fecha_inicio={fecha}&fecha_fin={fecha}'):
+            medir('dashboard.get_dashboard_kpis', lambda: vista(None), args.repeticiones)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark de serialización del listado de productos: filas por segundo.
+
+Compara el camino anterior de /productos/obtener_todos (entidades ORM con
+joinedload de la categoría, producto_a_dict y el proveedor JSON de Flask) con
+el actual (PROYECCION_PRODUCTO sobre tuplas y ORJSONProvider). Usa una base
+SQLite en memoria con N productos, así que mide solo la construcción de la
+respuesta y no la red ni MySQL.
+
+Uso: python backend/scripts/benchmark_serializacion_productos.py [--productos N] [--repeticiones N]
+"""
+import argparse
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app import models  # noqa: F401  (registra las tablas en db.metadata)
+from app.models import CategoriaProducto, Producto
+from app.blueprints.productos import listar_productos_proyectados, producto_a_dict
+from app.utils.json_utils import ORJSONProvider, ORJSON_DISPONIBLE
+
+
+def cargar_productos(cantidad):
+    db.session.add_all([CategoriaProducto(id=i, nombre=f'Categoría {i}') for i in range(1, 11)])
+    fecha = datetime(2026, 10, 1, 12, 0)
+    db.session.bulk_insert_mappings(Producto, [
+        {
+            'id': i, 'nombre': f'Producto {i:05d}', 'unidad_venta': 'KG', 'tipo_calculo': 'KG',
+            'ref_calculo': '1', 'margen': Decimal('0.35'), 'costo_referencia_usd': Decimal('1.2345'),
+            'es_receta': i % 7 == 0, 'ajusta_por_tc': i % 3 == 0, 'fecha_actualizacion_costo': fecha,
+            'moneda_referencia': 'USD', 'activo': True, 'categoria_id': (i % 10) + 1 if i % 4 else None,
+        }
+        for i in range(1, cantidad + 1)
+    ])
+    db.session.commit()
+
+
+def medir(nombre, app, funcion, filas, repeticiones):
+    with app.test_request_context('/api/productos/obtener_todos'):
+        funcion()  # calentamiento
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            respuesta = funcion()
+        transcurrido = time.perf_counter() - inicio
+        db.session.expunge_all()
+    print(f"{nombre:<36} filas/s={filas * repeticiones / transcurrido:>10,.0f} "
+          f"ms/listado={transcurrido * 1000 / repeticiones:8.2f} bytes={len(respuesta.get_data()):,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de serialización de productos')
+    parser.add_argument('--productos', type=int, default=5000)
+    parser.add_argument('--repeticiones', type=int, default=10)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    estandar = DefaultJSONProvider(app)
+    rapido = ORJSONProvider(app) if ORJSON_DISPONIBLE else estandar
+    if not ORJSON_DISPONIBLE:
+        print("WARN: orjson no está instalado; se mide la proyección con el proveedor estándar.")
+
+    with app.app_context():
+        db.create_all()
+        cargar_productos(args.productos)
+
+        def orm_y_dict():
+            productos = Producto.query.options(joinedload(Producto.categoria)).order_by(Producto.nombre).all()
+            respuesta = estandar.response([producto_a_dict(p) for p in productos])
+            db.session.expunge_all()
+            return respuesta
+
+        medir('ORM + producto_a_dict + json', app, orm_y_dict, args.productos, args.repeticiones)
+        medir('proyección + orjson', app, lambda: rapido.response(listar_productos_proyectados()),
+              args.productos, args.repeticiones)
+        medir('proyección + json (solo consulta)', app, lambda: estandar.response(listar_productos_proyectados()),
+              args.productos, args.repeticiones)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Conciliación de saldo_proveedor contra movimientos_proveedor.
+
+El saldo se mantiene en cada escritura ORM de MovimientoProveedor; los cambios
+hechos por fuera (SQL de migraciones, borrados en cascada de órdenes) pueden
+desfasarlo. Este job lo detecta y, con --apply, lo corrige.
+"""
+from app import create_app, db
+from app.utils.saldo_proveedor_utils import conciliar_saldos_proveedor
+
+
+def run_conciliacion(dry_run=True):
+    diferencias = conciliar_saldos_proveedor(aplicar=not dry_run)
+    for d in diferencias:
+        print(
+            f"proveedor_id={d['proveedor_id']} "
+            f"tabla=({d['debitos_tabla']}, {d['creditos_tabla']}) "
+            f"movimientos=({d['debitos_reales']}, {d['creditos_reales']})"
+        )
+    if dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+
+    print(f'diferencias={len(diferencias)}')
+    print(f'dry_run={dry_run}')
+    return diferencias
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Concilia saldo_proveedor contra movimientos_proveedor')
+    parser.add_argument('--apply', action='store_true', help='Corregir diferencias. Si no se pasa, solo informa.')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        diferencias = run_conciliacion(dry_run=not args.apply)
+    # Código de salida != 0 si hubo diferencias sin corregir (útil en cron/monitoreo)
+    sys.exit(1 if diferencias and not args.apply else 0)
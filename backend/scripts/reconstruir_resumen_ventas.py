@@ -0,0 +1,60 @@
+"""
+Reconstrucción completa (o por rango) de ventas_resumen_diario desde ventas/detalles_venta.
+
+Se procesa mes a mes, una transacción por mes. Sirve para la carga inicial
+tras la migración y para corregir el resumen si alguna escritura lo salteó.
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import func
+
+from app import create_app, db
+from app.models import Venta
+from app.utils.resumen_ventas_utils import reconstruir_resumen_ventas
+
+
+def _meses(fecha_desde, fecha_hasta):
+    inicio = fecha_desde
+    while inicio <= fecha_hasta:
+        siguiente = (inicio.replace(day=1) + timedelta(days=32)).replace(day=1)
+        yield inicio, min(siguiente - timedelta(days=1), fecha_hasta)
+        inicio = siguiente
+
+
+def run_rebuild(dry_run=True, fecha_desde=None, fecha_hasta=None):
+    if fecha_desde is None or fecha_hasta is None:
+        # Misma fecha que la clave del resumen: la de pedido o, si falta, la de registro
+        fecha = func.coalesce(Venta.fecha_pedido, Venta.fecha_registro)
+        minimo, maximo = db.session.query(func.min(fecha), func.max(fecha)).one()
+        if minimo is None:
+            print('sin_ventas=True')
+            return
+        fecha_desde = fecha_desde or minimo.date()
+        fecha_hasta = fecha_hasta or maximo.date()
+
+    total_filas = 0
+    for desde, hasta in _meses(fecha_desde, fecha_hasta):
+        filas = reconstruir_resumen_ventas(desde, hasta)
+        total_filas += filas
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+        print(f'{desde.isoformat()}..{hasta.isoformat()} filas={filas}')
+
+    print(f'total_filas={total_filas}')
+    print(f'dry_run={dry_run}')
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Reconstruye ventas_resumen_diario')
+    parser.add_argument('--apply', action='store_true', help='Aplicar cambios. Si no se pasa, corre en dry-run.')
+    parser.add_argument('--desde', type=date.fromisoformat, default=None, help='YYYY-MM-DD (default: primera venta)')
+    parser.add_argument('--hasta', type=date.fromisoformat, default=None, help='YYYY-MM-DD (default: última venta)')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        run_rebuild(dry_run=not args.apply, fecha_desde=args.desde, fecha_hasta=args.hasta)
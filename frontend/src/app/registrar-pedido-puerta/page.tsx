@@ -322,11 +322,14 @@ export default function RegistrarPedidoPuertaPage() {
         if (!token) { throw new Error("No autenticado."); }
 
         // 1) Intentar obtener cliente existente por teléfono
+        let ambiguo = false;
         try {
             const resGet = await fetch(`https://quimex.sistemataup.online/api/clientes/obtener_por_telefono?telefono=${encodeURIComponent(telefono)}`, {
                 method: "GET",
                 headers: { "Authorization": `Bearer ${token}` }
             });
+            // Varios clientes con ese teléfono: no crear un duplicado ni elegir uno al azar
+            ambiguo = resGet.status === 409;
             if (resGet.ok) {
                 const data = await resGet.json();
                 if (data?.cliente?.id) {
@@ -336,6 +339,9 @@ export default function RegistrarPedidoPuertaPage() {
         } catch {
             // Ignorar errores de búsqueda y continuar con creación
         }
+        if (ambiguo) {
+            throw new Error("El teléfono coincide con más de un cliente. Elegí el cliente desde la búsqueda.");
+        }
 
         // 2) Crear nuevo cliente si no existe
         const payload = {
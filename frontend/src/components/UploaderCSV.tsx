@@ -23,6 +23,16 @@ interface UploadResult {
   failedRows?: FailedRow[];
   details?: string[];
 }
+// Trabajo en segundo plano (202): /api/tipos_cambio/trabajos/<id>
+interface Trabajo {
+  id: number;
+  estado: 'PENDIENTE' | 'EN_CURSO' | 'COMPLETADO' | 'ERROR';
+  total: number;
+  procesados: number;
+  porcentaje: number;
+  error: string | null;
+  resultado: { summary?: UploadResult['summary']; failed_rows?: FailedRow[] } | null;
+}
 interface UploaderProps {
   title: string;
   endpoint: string;
@@ -30,12 +40,30 @@ interface UploaderProps {
   instructions: React.ReactNode;
 }
 
+const API_BASE = 'https://quimex.sistemataup.online';
+const INTERVALO_CONSULTA_MS = 1000;
+
 // --- Componente ---
 const UploaderCSV: React.FC<UploaderProps> = ({ title, endpoint, fileKey, instructions }) => {
   // --- LÓGICA DEL COMPONENTE (SIN CAMBIOS) ---
   const [selectedFile, setSelectedFile] = useState<File | null>(null);
   const [isUploading, setIsUploading] = useState(false);
   const [uploadResult, setUploadResult] = useState<UploadResult | null>(null);
+  const [progreso, setProgreso] = useState<string | null>(null);
+
+  // Consulta el trabajo hasta que termina, mostrando el avance por lote
+  const esperarTrabajo = async (trabajoId: number, token: string): Promise<Trabajo> => {
+    for (;;) {
+      await new Promise((resolve) => setTimeout(resolve, INTERVALO_CONSULTA_MS));
+      const res = await fetch(`${API_BASE}/api/tipos_cambio/trabajos/${trabajoId}`, {
+        headers: { 'Authorization': `Bearer ${token}` },
+      });
+      const trabajo: Trabajo = await res.json();
+      if (!res.ok) throw new Error('No se pudo consultar el avance de la carga.');
+      setProgreso(`Procesando... ${trabajo.procesados}/${trabajo.total} filas (${trabajo.porcentaje}%)`);
+      if (trabajo.estado === 'COMPLETADO' || trabajo.estado === 'ERROR') return trabajo;
+    }
+  };
 
   const handleFileChange = (event: React.ChangeEvent<HTMLInputElement>) => {
     if (event.target.files && event.target.files[0]) {
@@ -52,18 +80,33 @@ const UploaderCSV: React.FC<UploaderProps> = ({ title, endpoint, fileKey, instru
     }
     setIsUploading(true);
     setUploadResult(null);
+    setProgreso(null);
     const formData = new FormData();
     formData.append(fileKey, selectedFile);
     try {
       const token = localStorage.getItem("authToken");
       if (!token) throw new Error("Usuario no autenticado.");
-      const response = await fetch(`https://quimex.sistemataup.online${endpoint}`, {
+      const response = await fetch(`${API_BASE}${endpoint}`, {
         method: 'POST',
         headers: { 'Authorization': `Bearer ${token}` },
         body: formData,
       });
-      const resultData = await response.json();
-      if (!response.ok && response.status !== 207) {
+      let resultData = await response.json();
+      if (response.status === 202 && resultData.trabajo_id) {
+        const trabajo = await esperarTrabajo(resultData.trabajo_id, token);
+        if (trabajo.estado === 'ERROR') {
+          // Cada lote se confirma por separado: los anteriores al error ya quedaron aplicados
+          throw new Error(`${trabajo.error || 'La carga falló.'} Filas confirmadas: ${trabajo.procesados} de ${trabajo.total}.`);
+        }
+        const filasFallidas = trabajo.resultado?.failed_rows || [];
+        resultData = {
+          message: filasFallidas.length > 0
+            ? `Proceso completado con ${filasFallidas.length} filas con errores.`
+            : 'Carga masiva completada exitosamente sin errores.',
+          summary: trabajo.resultado?.summary,
+          failed_rows: filasFallidas,
+        };
+      } else if (!response.ok && response.status !== 207) {
         throw new Error(resultData.error || 'Ocurrió un error en el servidor.', {
           cause: resultData.detalles_errores || resultData.failed_rows || [],
         });
@@ -91,6 +134,7 @@ const UploaderCSV: React.FC<UploaderProps> = ({ title, endpoint, fileKey, instru
         });
     } finally {
       setIsUploading(false);
+      setProgreso(null);
     }
   };
 
@@ -121,7 +165,7 @@ const UploaderCSV: React.FC<UploaderProps> = ({ title, endpoint, fileKey, instru
           disabled={!selectedFile || isUploading}
           className="w-full bg-indigo-600 text-white font-bold py-2 px-4 rounded-md hover:bg-indigo-700 transition-colors disabled:opacity-50 disabled:cursor-not-allowed"
         >
-          {isUploading ? 'Procesando...' : 'Cargar y Procesar Archivo'}
+          {isUploading ? (progreso || 'Procesando...') : 'Cargar y Procesar Archivo'}
         </button>
       </form>
 
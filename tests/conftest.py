@@ -0,0 +1,20 @@
+"""Fixtures compartidas: app Flask mínima sobre SQLite en memoria (sin MySQL)."""
+
+import pytest
+from flask import Flask
+
+
+@pytest.fixture
+def app_sqlite():
+    from app import db
+    from app import models  # noqa: F401  (registra las tablas en db.metadata)
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,66 @@
+"""Auditoría: diffs en lugar de snapshots, escritura por lotes en segundo plano y fallback sincrónico."""
+
+import json
+
+from sqlalchemy import event
+
+
+def test_diff_guarda_solo_lo_que_cambio():
+    from app.utils.auditoria_utils import diff_auditoria
+
+    previos, nuevos = diff_auditoria(
+        {'estado': 'SOLICITADO', 'importe_abonado': 0, 'proveedor_id': 3, 'viejo': 1},
+        {'estado': 'APROBADO', 'importe_abonado': 0, 'proveedor_id': 3, 'historial_pagos': []},
+    )
+    assert previos == {'estado': 'SOLICITADO', 'viejo': 1}
+    assert nuevos == {'estado': 'APROBADO', 'historial_pagos': []}
+
+
+def test_sin_cola_escribe_en_el_momento(app_sqlite):
+    from app.models import AuditLog
+    from app.utils.auditoria_utils import registrar_auditoria
+
+    registrar_auditoria('OrdenCompra', 7, 'APROBAR', 'ana',
+                        previos={'estado': 'SOLICITADO', 'id': 7}, nuevos={'estado': 'APROBADO', 'id': 7})
+    log = AuditLog.query.one()
+    assert (log.entidad, log.entidad_id, log.accion, log.usuario) == ('OrdenCompra', 7, 'APROBAR', 'ana')
+    assert json.loads(log.datos_previos) == {'estado': 'SOLICITADO'}
+    assert json.loads(log.datos_nuevos) == {'estado': 'APROBADO'}
+
+
+def test_cola_inserta_por_lotes_multifila(app_sqlite):
+    from app import db
+    from app.models import AuditLog
+    from app.utils.auditoria_utils import registrar_auditoria
+
+    app_sqlite.config.update(AUDITORIA_ASINCRONICA=True, AUDITORIA_LOTE=50)
+    inserts = []
+
+    def _registrar(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('INSERT INTO audit_logs'):
+            inserts.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _registrar)
+    try:
+        for i in range(120):
+            registrar_auditoria('Venta', i, 'CREAR', 'ana', nuevos={'id': i})
+        app_sqlite.extensions['auditoria'].vaciar()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _registrar)
+
+    assert AuditLog.query.count() == 120
+    assert 3 <= len(inserts) < 120
+
+
+def test_cola_llena_cae_a_escritura_sincronica(app_sqlite):
+    from app.models import AuditLog
+    from app.utils.auditoria_utils import registrar_auditoria
+
+    class _ColaLlena:
+        def encolar(self, fila):
+            return False
+
+    app_sqlite.config['AUDITORIA_ASINCRONICA'] = True
+    app_sqlite.extensions['auditoria'] = _ColaLlena()
+    registrar_auditoria('OrdenCompra', 1, 'CREAR', nuevos={'orden': {'id': 1}})
+    assert json.loads(AuditLog.query.one().datos_nuevos) == {'orden': {'id': 1}}
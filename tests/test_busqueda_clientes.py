@@ -0,0 +1,116 @@
+"""Búsqueda de clientes: FULLTEXT (MySQL) con ILIKE como respaldo."""
+
+import os
+
+import pytest
+from sqlalchemy.dialects import mysql
+
+
+def _crear_clientes(db):
+    from app.models import Cliente
+
+    db.session.add_all([
+        Cliente(nombre_razon_social='Acme SA', localidad='Rosario', cuit='20-12345678-9'),
+        Cliente(nombre_razon_social='Zeta SRL', localidad='Acmeville', email='compras@zeta.com'),
+        Cliente(nombre_razon_social='Beta', contacto_principal='Juan Acme'),
+        Cliente(nombre_razon_social='Inactivo Acme', activo=False),
+        Cliente(nombre_razon_social='Otro', cuit='30-99999999-1'),
+    ])
+    db.session.commit()
+
+
+def test_sin_fulltext_mantiene_ilike(app_sqlite):
+    from app import db
+    from app.blueprints.clientes import buscar_todos_clientes
+
+    _crear_clientes(db)
+    with app_sqlite.test_request_context('/?search_term=acme'):
+        cuerpo, estado = buscar_todos_clientes()
+    assert estado == 200
+    assert [c['nombre_razon_social'] for c in cuerpo.get_json()['clientes']] == ['Acme SA', 'Beta', 'Zeta SRL']
+
+    with app_sqlite.test_request_context('/?search_term=12345'):
+        cuerpo, _ = buscar_todos_clientes()
+    assert [c['nombre_razon_social'] for c in cuerpo.get_json()['clientes']] == ['Acme SA']
+
+
+def test_con_fulltext_usa_match_por_relevancia_y_cuit_por_prefijo(app_sqlite, monkeypatch):
+    from app.models import Cliente
+    from app.utils import busqueda_clientes_utils
+
+    monkeypatch.setattr(busqueda_clientes_utils, 'fulltext_disponible', lambda: True)
+    with app_sqlite.app_context():
+        consulta = busqueda_clientes_utils.aplicar_busqueda_clientes(Cliente.query, 'acme (sa)')
+        sql = str(consulta.statement.compile(dialect=mysql.dialect(), compile_kwargs={'literal_binds': True}))
+        assert "AGAINST ('+\"acme\" +\"sa\"' IN BOOLEAN MODE)" in sql
+        assert 'ORDER BY MATCH' in sql and 'LIKE' not in sql
+
+        consulta = busqueda_clientes_utils.aplicar_busqueda_clientes(Cliente.query, '20-1234')
+        sql = str(consulta.statement.compile(dialect=mysql.dialect(), compile_kwargs={'literal_binds': True}))
+        assert "clientes.cuit LIKE '20-1234%%'" in sql
+        assert "clientes.cuit LIKE '201234%%'" in sql
+
+        # Términos más cortos que el token ngram vuelven al ILIKE
+        consulta = busqueda_clientes_utils.aplicar_busqueda_clientes(Cliente.query, 'a')
+        sql = str(consulta.statement.compile(dialect=mysql.dialect(), compile_kwargs={'literal_binds': True}))
+        assert 'MATCH' not in sql and 'LIKE' in sql
+
+
+@pytest.fixture
+def app_mysql():
+    """App sobre un MySQL descartable (crea y borra todas las tablas): QUIMEX_TEST_MYSQL_URL."""
+    url = os.environ.get('QUIMEX_TEST_MYSQL_URL')
+    if not url:
+        pytest.skip('Definí QUIMEX_TEST_MYSQL_URL=mysql+pymysql://... (base descartable) para probar FULLTEXT')
+    pytest.importorskip('pymysql')
+    from flask import Flask
+    from app import db
+    from app import models  # noqa: F401  (registra las tablas en db.metadata)
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.mark.mysql
+def test_fulltext_ngram_encuentra_nombres_cortos_en_castellano(app_mysql):
+    import importlib.util
+    import pathlib
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+    from app import db
+    from app.models import Cliente
+    from app.utils import busqueda_clientes_utils
+
+    ruta = (pathlib.Path(__file__).resolve().parents[1] / 'backend' / 'migrations' / 'versions'
+            / '20261019_add_fulltext_clientes.py')
+    spec = importlib.util.spec_from_file_location('migracion_fulltext_clientes', str(ruta))
+    migracion = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migracion)
+    with db.engine.begin() as conexion, Operations.context(MigrationContext.configure(conexion)):
+        migracion.upgrade()
+
+    db.session.add_all([
+        Cliente(nombre_razon_social='Ana Gil', localidad='Tandil'),
+        Cliente(nombre_razon_social='Mariana Paz', localidad='Azul'),
+        Cliente(nombre_razon_social='Luis Pérez', localidad='Pila'),
+    ])
+    db.session.commit()  # InnoDB FULLTEXT solo ve filas confirmadas
+    busqueda_clientes_utils._fulltext_por_engine.clear()
+    assert busqueda_clientes_utils.fulltext_disponible()
+
+    def buscar(termino):
+        consulta = busqueda_clientes_utils.aplicar_busqueda_clientes(Cliente.query, termino)
+        return sorted(c.nombre_razon_social for c in consulta.all())
+
+    # "ana", "ia", "pila": bigramas con 'a'/'i' que la lista de stopwords por defecto descartaría
+    assert buscar('ana') == ['Ana Gil', 'Mariana Paz']
+    assert buscar('pila') == ['Luis Pérez']
+    assert buscar('ana tandil') == ['Ana Gil']
@@ -0,0 +1,160 @@
+"""Caché de respuestas con invalidación por tags (SimpleCache como stand-in de Redis)."""
+
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture
+def app_cache(app_sqlite):
+    from app import cache
+
+    cache.init_app(app_sqlite, config={'CACHE_TYPE': 'SimpleCache'})
+    yield app_sqlite
+    cache.clear()
+
+
+def _contar_consultas(db):
+    consultas = []
+    contar = lambda *args, **kwargs: consultas.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    return consultas, lambda: event.remove(db.engine, 'before_cursor_execute', contar)
+
+
+def test_commit_orm_invalida_el_tag(app_cache):
+    from decimal import Decimal
+    from app import db
+    from app.blueprints.tipos_cambio import obtener_tipos_cambio
+    from app.models import TipoCambio
+
+    db.session.add(TipoCambio(nombre='Oficial', valor=Decimal('1000')))
+    db.session.commit()
+
+    def listar():
+        with app_cache.test_request_context('/api/tipos_cambio/obtener_todos'):
+            respuesta = obtener_tipos_cambio()
+        assert respuesta.status_code == 200
+        return [(tc['nombre'], tc['valor']) for tc in respuesta.get_json()]
+
+    assert listar() == [('Oficial', 1000.0)]
+    consultas, quitar = _contar_consultas(db)
+    try:
+        assert listar() == [('Oficial', 1000.0)]
+    finally:
+        quitar()
+    assert consultas == []
+
+    TipoCambio.query.filter_by(nombre='Oficial').first().valor = Decimal('1100')
+    db.session.add(TipoCambio(nombre='Empresa', valor=Decimal('1200')))
+    db.session.commit()
+    assert listar() == [('Empresa', 1200.0), ('Oficial', 1100.0)]
+
+
+def test_update_masivo_requiere_invalidacion_explicita(app_cache):
+    from app import db
+    from app.blueprints.clientes import obtener_clientes
+    from app.models import Cliente
+    from app.utils.cache_utils import invalidar_tags, TAG_CLIENTES
+
+    db.session.add_all([Cliente(nombre_razon_social='Acme'), Cliente(nombre_razon_social='Beta')])
+    db.session.commit()
+
+    def nombres(query_string):
+        with app_cache.test_request_context('/api/clientes/obtener_todos', query_string=query_string):
+            respuesta = obtener_clientes()
+        return [c['nombre_razon_social'] for c in respuesta.get_json()['clientes']]
+
+    assert nombres({'per_page': 1}) == ['Acme']
+    assert nombres({'per_page': 1, 'page': 2}) == ['Beta']
+
+    # Un UPDATE sin pasar por el ORM no se detecta solo
+    Cliente.query.filter_by(nombre_razon_social='Acme').update({Cliente.nombre_razon_social: 'Zeta'})
+    db.session.commit()
+    assert nombres({'per_page': 1}) == ['Acme']
+
+    invalidar_tags(TAG_CLIENTES)
+    assert nombres({'per_page': 1}) == ['Beta']
+    assert nombres({'per_page': 1, 'page': 2}) == ['Zeta']
+
+
+def test_rollback_no_invalida(app_cache):
+    from app import cache, db
+    from app.models import Producto
+    from app.utils.cache_utils import versiones_tags, TAG_PRODUCTOS
+
+    version = versiones_tags([TAG_PRODUCTOS])[TAG_PRODUCTOS]
+    db.session.add(Producto(id=1, nombre='Soda'))
+    db.session.flush()
+    db.session.rollback()
+    assert versiones_tags([TAG_PRODUCTOS])[TAG_PRODUCTOS] == version
+
+    db.session.add(Producto(id=1, nombre='Soda'))
+    db.session.commit()
+    assert versiones_tags([TAG_PRODUCTOS])[TAG_PRODUCTOS] == version + 1
+    assert cache.get('cache_tag:productos') == version + 1
+
+
+def test_etag_y_304_por_version_de_catalogo(app_cache):
+    from app import db
+    from app.blueprints.proveedores import obtener_proveedores
+    from app.models import Proveedor
+
+    db.session.add(Proveedor(nombre='Quimica Sur'))
+    db.session.commit()
+
+    def pedir(etag=None):
+        headers = {'If-None-Match': f'"{etag}"'} if etag else {}
+        with app_cache.test_request_context('/api/proveedores/obtener-todos', headers=headers):
+            return obtener_proveedores()
+
+    respuesta = pedir()
+    etag, _ = respuesta.get_etag()
+    assert respuesta.status_code == 200 and etag
+    assert respuesta.headers['Cache-Control'] == 'private, no-cache'
+    assert [p['nombre'] for p in respuesta.get_json()] == ['Quimica Sur']
+
+    # Catálogo sin cambios: 304 sin cuerpo y sin tocar la base
+    consultas, quitar = _contar_consultas(db)
+    try:
+        respuesta = pedir(etag)
+    finally:
+        quitar()
+    assert consultas == []
+    assert respuesta.status_code == 304 and respuesta.get_data() == b''
+    assert respuesta.get_etag() == (etag, False)
+
+    db.session.add(Proveedor(nombre='Aditivos Norte'))
+    db.session.commit()
+    respuesta = pedir(etag)
+    assert respuesta.status_code == 200
+    assert respuesta.get_etag()[0] != etag
+    assert [p['nombre'] for p in respuesta.get_json()] == ['Aditivos Norte', 'Quimica Sur']
+
+
+def test_sync_de_costos_de_recetas_corre_antes_de_la_cache(app_cache, monkeypatch):
+    from datetime import datetime, timedelta
+    from decimal import Decimal
+    from app import db
+    from app.blueprints import productos
+    from app.models import Producto, Receta, RecetaItem
+
+    base = Producto(id=1, nombre='Base', costo_referencia_usd=Decimal('2'))
+    mezcla = Producto(id=2, nombre='Mezcla', es_receta=True, costo_referencia_usd=Decimal('1'))
+    db.session.add_all([base, mezcla, Receta(id=1, producto_final_id=2)])
+    db.session.flush()
+    db.session.add(RecetaItem(receta_id=1, ingrediente_id=1, porcentaje=Decimal('50')))
+    db.session.commit()
+
+    def costo_mezcla():
+        with app_cache.test_request_context('/api/productos/obtener_todos'):
+            respuesta = productos.obtener_productos()
+        return {p['id']: p['costo_referencia_usd'] for p in respuesta.get_json()}[2]
+
+    # Sync reciente: el cambio de costo del ingrediente llega con la receta todavía sin recalcular
+    monkeypatch.setattr(productos, '_ULTIMA_SYNC_COSTOS_UTC', datetime.utcnow())
+    base.costo_referencia_usd = Decimal('4')
+    db.session.commit()
+    assert costo_mezcla() == 1.0
+
+    # Vencido el intervalo, la sync corre aunque la respuesta esté en caché y la invalida
+    monkeypatch.setattr(productos, '_ULTIMA_SYNC_COSTOS_UTC', datetime.utcnow() - timedelta(hours=1))
+    assert costo_mezcla() == 2.0
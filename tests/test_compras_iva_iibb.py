@@ -50,6 +50,17 @@ if 'backend.app.utils.permissions' not in sys.modules:
     perm_mod = _types.ModuleType('backend.app.utils.permissions')
     perm_mod.ROLES = {'ADMIN': 'ADMIN', 'ALMACEN': 'ALMACEN', 'CONTABLE': 'CONTABLE'}
     sys.modules['backend.app.utils.permissions'] = perm_mod
+if 'backend.app.utils.impuestos_utils' not in sys.modules:
+    # Sin dependencias Flask: se carga el módulo real
+    imp_path = pathlib.Path(__file__).resolve().parents[1] / 'backend' / 'app' / 'utils' / 'impuestos_utils.py'
+    imp_spec = importlib.util.spec_from_file_location('backend.app.utils.impuestos_utils', str(imp_path))
+    imp_mod = importlib.util.module_from_spec(imp_spec)
+    imp_spec.loader.exec_module(imp_mod)
+    sys.modules['backend.app.utils.impuestos_utils'] = imp_mod
+if 'backend.app.utils.auditoria_utils' not in sys.modules:
+    aud_mod = _types.ModuleType('backend.app.utils.auditoria_utils')
+    aud_mod.registrar_auditoria = lambda *args, **kwargs: None
+    sys.modules['backend.app.utils.auditoria_utils'] = aud_mod
 
 import pytest
 
@@ -0,0 +1,71 @@
+"""Listado de órdenes de compra: cantidad de consultas constante por página (sin N+1)."""
+
+from contextlib import contextmanager
+from decimal import Decimal
+
+from sqlalchemy import event
+
+
+@contextmanager
+def _contar_consultas(engine):
+    sentencias = []
+
+    def _registrar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', _registrar)
+    try:
+        yield sentencias
+    finally:
+        event.remove(engine, 'before_cursor_execute', _registrar)
+
+
+def _crear_ordenes(db, cantidad):
+    from app.models import UsuarioInterno, Proveedor, Producto, OrdenCompra, DetalleOrdenCompra
+
+    aprobador = UsuarioInterno(nombre='Ana', apellido='Admin', nombre_usuario=f'admin{cantidad}',
+                               contrasena='x', email=f'admin{cantidad}@example.com', rol='ADMIN')
+    db.session.add(aprobador)
+    db.session.flush()
+    for i in range(cantidad):
+        proveedor = Proveedor(nombre=f'Proveedor {cantidad}-{i}')
+        productos = [Producto(nombre=f'Producto {cantidad}-{i}-{j}', activo=True) for j in range(2)]
+        db.session.add_all([proveedor] + productos)
+        db.session.flush()
+        orden = OrdenCompra(proveedor_id=proveedor.id, estado='APROBADO', aprobado_por_id=aprobador.id)
+        for producto in productos:
+            orden.items.append(DetalleOrdenCompra(producto_id=producto.id, cantidad_solicitada=Decimal('3'),
+                                                  cantidad_recibida=Decimal('1'),
+                                                  precio_unitario_estimado=Decimal('10')))
+        db.session.add(orden)
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def _listar(app, per_page):
+    from app import db
+    from app.blueprints.compras import obtener_ordenes_compra
+
+    with app.test_request_context(f'/?per_page={per_page}', headers={'X-User-Role': 'ADMIN'}):
+        with _contar_consultas(db.engine) as sentencias:
+            cuerpo = obtener_ordenes_compra.__wrapped__.__wrapped__(None).get_json()
+    return cuerpo['ordenes'], sentencias
+
+
+def test_listado_con_presupuesto_constante_de_consultas(app_sqlite):
+    from app import db
+
+    _crear_ordenes(db, 2)
+    ordenes_chica, consultas_chica = _listar(app_sqlite, per_page=50)
+    _crear_ordenes(db, 10)
+    ordenes_grande, consultas_grande = _listar(app_sqlite, per_page=50)
+
+    assert (len(ordenes_chica), len(ordenes_grande)) == (2, 12)
+    # COUNT de la paginación + página (con proveedor/aprobador) + items + productos
+    assert len(consultas_chica) == len(consultas_grande) == 4
+
+    orden = ordenes_grande[0]
+    assert orden['proveedor_nombre'].startswith('Proveedor ')
+    assert orden['aprobado_por'] in ('admin2', 'admin10')
+    assert [i['producto_nombre'][:9] for i in orden['items']] == ['Producto '] * 2
+    assert orden['cantidad_total_pendiente_recepcion'] == 4.0
@@ -0,0 +1,128 @@
+"""Estado de cuenta de proveedores: saldo acumulado por ventana y paginación por keyset."""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+
+def _crear_movimientos(db, cantidad=7):
+    from app.models import Proveedor, OrdenCompra, MovimientoProveedor
+
+    proveedor = Proveedor(nombre='Proveedor')
+    otro = Proveedor(nombre='Otro')
+    db.session.add_all([proveedor, otro])
+    db.session.flush()
+    orden = OrdenCompra(proveedor_id=proveedor.id, estado='APROBADO')
+    db.session.add(orden)
+    db.session.flush()
+    inicio = datetime(2026, 10, 1, 9, 0)
+    for i in range(cantidad):
+        db.session.add(MovimientoProveedor(
+            proveedor_id=proveedor.id, orden_id=orden.id,
+            tipo='DEBITO' if i % 3 != 2 else 'CREDITO',
+            monto=Decimal(100 * (i + 1)),
+            # Dos movimientos con la misma fecha: el desempate es por id
+            fecha=inicio + timedelta(days=i // 2),
+        ))
+    db.session.add(MovimientoProveedor(proveedor_id=otro.id, orden_id=orden.id, tipo='DEBITO', monto=Decimal('999')))
+    db.session.commit()
+    return proveedor.id
+
+
+def _pedir(app, vista, url, *args):
+    with app.test_request_context(url):
+        respuesta = vista(None, *args)
+    return respuesta.get_json() if not isinstance(respuesta, tuple) else respuesta[0].get_json()
+
+
+def test_paginas_encadenan_saldo_acumulado(app_sqlite):
+    from app import db
+    from app.models import MovimientoProveedor
+    from app.blueprints.finanzas import estado_cuenta_proveedor
+
+    proveedor_id = _crear_movimientos(db)
+    vista = estado_cuenta_proveedor.__wrapped__.__wrapped__
+
+    movimientos, cursor, primera = [], None, None
+    while True:
+        url = '/?limit=3' + (f'&cursor={cursor}' if cursor else '')
+        pagina = _pedir(app_sqlite, vista, url, proveedor_id)
+        primera = primera or pagina
+        movimientos += pagina['movimientos']
+        cursor = pagina['siguiente_cursor']
+        if not cursor:
+            break
+
+    esperados = db.session.query(MovimientoProveedor).filter_by(proveedor_id=proveedor_id).order_by(
+        MovimientoProveedor.fecha, MovimientoProveedor.id).all()
+    saldo, saldos = Decimal('0'), []
+    for m in esperados:
+        saldo += m.monto if m.tipo == 'DEBITO' else -m.monto
+        saldos.append(float(saldo))
+
+    assert [m['id'] for m in movimientos] == [m.id for m in esperados]
+    assert [m['saldo'] for m in movimientos] == saldos
+    assert primera['totales'] == {'debitos': 1900.0, 'creditos': 900.0, 'saldo': 1000.0}
+
+
+def test_fecha_desde_arrastra_saldo_previo(app_sqlite):
+    from app import db
+    from app.blueprints.finanzas import estado_cuenta_proveedor
+
+    proveedor_id = _crear_movimientos(db)
+    vista = estado_cuenta_proveedor.__wrapped__.__wrapped__
+    pagina = _pedir(app_sqlite, vista, '/?fecha_desde=2026-10-03', proveedor_id)
+
+    # Antes del 3/10: +100 +200 -300 +400
+    assert pagina['saldo_inicial'] == 400.0
+    assert [m['saldo'] for m in pagina['movimientos']] == [900.0, 300.0, 1000.0]
+    assert pagina['totales'] == {'debitos': 1200.0, 'creditos': 600.0, 'saldo': 600.0}
+
+
+def test_movimientos_proveedor_pagina_como_el_estado_de_cuenta(app_sqlite):
+    from app import db
+    from app.blueprints.finanzas import estado_cuenta_proveedor
+    from app.blueprints.proveedores import movimientos_proveedor
+
+    proveedor_id = _crear_movimientos(db)
+    vista_finanzas = estado_cuenta_proveedor.__wrapped__.__wrapped__
+
+    pagina = _pedir(app_sqlite, lambda _, *args: movimientos_proveedor(*args), '/?limit=3', proveedor_id)
+    assert len(pagina['movimientos']) == 3
+    assert pagina['siguiente_cursor']
+    assert pagina == _pedir(app_sqlite, vista_finanzas, '/?limit=3', proveedor_id)
+
+    with app_sqlite.test_request_context('/'):
+        _, estado = movimientos_proveedor(999999)
+    assert estado == 404
+
+
+def test_listado_movimientos_keyset_y_totales_sql(app_sqlite):
+    from app import db
+    from app.blueprints.finanzas import listar_movimientos
+
+    _crear_movimientos(db)
+    vista = listar_movimientos.__wrapped__.__wrapped__
+    completo = _pedir(app_sqlite, vista, '/')
+    primera = _pedir(app_sqlite, vista, '/?limit=5')
+    segunda = _pedir(app_sqlite, vista, f"/?limit=5&cursor={primera['siguiente_cursor']}")
+
+    assert len(completo['movimientos']) == 8
+    assert [m['id'] for m in primera['movimientos'] + segunda['movimientos']] == [m['id'] for m in completo['movimientos']]
+    assert segunda['siguiente_cursor'] is None
+    assert primera['totales'] == completo['totales'] == {'debitos': 2899.0, 'creditos': 900.0, 'neto': -1999.0}
+
+
+def test_movimiento_sin_fecha_no_se_guarda(app_sqlite):
+    import pytest
+    from sqlalchemy.exc import IntegrityError
+    from app import db
+    from app.models import MovimientoProveedor
+
+    proveedor_id = _crear_movimientos(db, cantidad=1)
+    orden_id = MovimientoProveedor.query.first().orden_id
+    # La fecha es parte del cursor (fecha, id): sin ella la fila quedaría fuera del keyset
+    with pytest.raises(IntegrityError):
+        db.session.execute(MovimientoProveedor.__table__.insert().values(
+            proveedor_id=proveedor_id, orden_id=orden_id, tipo='DEBITO', monto=Decimal('1'), fecha=None
+        ))
+    db.session.rollback()
@@ -0,0 +1,109 @@
+"""Índice de nombres en memoria para importaciones y clasificación masiva."""
+
+import io
+
+
+def _indice():
+    from app.utils.indice_nombres_utils import IndiceNombres
+
+    return IndiceNombres([
+        (1, 'Ácido Cítrico 25kg'),
+        (2, 'ACIDO MURIATICO'),
+        (3, 'Soda Cáustica'),
+        (4, 'Soda  caustica'),
+        (5, 'Glicerina'),
+    ])
+
+
+def test_exactos_contienen_y_aproximados():
+    indice = _indice()
+
+    assert indice.exactos('acido muriático') == [2]
+    assert indice.exactos('SODA CAUSTICA') == [3, 4]
+    assert indice.contienen('acido') == [1, 2]
+    assert indice.contienen('li') == [5]
+    assert indice.contienen('inexistente') == []
+
+    assert indice.aproximados('Glicerna')[0][:2] == (5, 'Glicerina')
+    assert indice.sugerencias('Acido Muriatco') == ['ACIDO MURIATICO']
+    assert indice.sugerencias('zzz') == []
+
+
+def test_clave_exacta_conserva_numeros_y_signos(app_sqlite):
+    from app.utils.indice_nombres_utils import IndiceNombres
+    from app.utils.importar_precios_utils import _resolver_ids
+    from app import db
+    from app.models import Producto
+    import pandas as pd
+
+    indice = IndiceNombres([
+        (1, 'ACIDO MURIATICO 1/2 LT'), (2, 'ACIDO MURIATICO 12 LT'),
+        (3, 'Hipoclorito 5.5%'), (4, 'Hipoclorito 55%'),
+    ])
+    assert indice.exactos('acido  muriático 12 lt') == [2]
+    assert indice.exactos('ACIDO MURIATICO 1/2 LT') == [1]
+    assert indice.exactos('hipoclorito 5.5%') == [3]
+    assert indice.exactos('Hipoclorito 55') == []
+    # "Contiene" compara con la misma clave: los signos cuentan
+    assert indice.contienen('1/2 lt') == [1]
+    assert indice.contienen('12 LT') == [2]
+    assert indice.contienen('5.5%') == [3]
+    assert indice.contienen('55%') == [4]
+    assert indice.contienen('5%') == [3, 4]
+    assert indice.contienen('/') == [1]
+
+    # Nombres que coinciden con varios registros se informan como ambiguos
+    ambiguo = _indice().resolver('soda caustica')
+    assert ambiguo['tipo'] == 'ambiguo' and ambiguo['ids'] == [3, 4]
+
+    db.session.add_all([Producto(id=1, nombre='Soda Cáustica'), Producto(id=2, nombre='SODA caustica'),
+                        Producto(id=3, nombre='Soda 1/2')])
+    db.session.commit()
+    ids, ambiguos, _ = _resolver_ids(Producto, Producto.nombre, pd.Series(['', '', '']),
+                                     pd.Series(['soda caustica', 'Soda 1/2', 'Soda 12']))
+    assert [None if pd.isna(v) else int(v) for v in ids] == [None, 3, None]
+    assert list(ambiguos) == [True, False, False]
+
+
+def test_resolver_informa_tipo_de_coincidencia():
+    indice = _indice()
+
+    assert indice.resolver('glicerina') == {'ids': [5], 'tipo': 'exacto', 'sugerencias': []}
+    aproximado = indice.resolver('Glicerna')
+    assert aproximado['tipo'] == 'aproximado' and aproximado['ids'] == [5]
+    assert indice.resolver('xyz')['tipo'] is None
+
+
+def test_clasificacion_csv_resuelve_con_el_indice(app_sqlite):
+    from sqlalchemy import event
+    from app import db
+    from app.blueprints.categoria_productos import upload_clasificacion_csv
+    from app.models import CategoriaProducto, Producto
+
+    db.session.add_all([CategoriaProducto(id=1, nombre='Ácidos'), CategoriaProducto(id=2, nombre='Bases')])
+    db.session.add_all([Producto(id=i, nombre=n) for i, n in
+                        [(1, 'Acido Citrico'), (2, 'Ácido Muriático'), (3, 'Soda Caustica'), (4, 'Glicerina')]])
+    db.session.commit()
+
+    csv = "Nombre,Categoria\nacido,ACIDOS\nsoda,bases\nGlicerna,Bases\nsoda,Inexistente\n" + "acido,acidos\n" * 30
+    consultas = []
+    contar = lambda *args, **kwargs: consultas.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        with app_sqlite.test_request_context('/', method='POST', content_type='multipart/form-data',
+                                             data={'file': (io.BytesIO(csv.encode('utf-8')), 'clasificacion.csv')}):
+            respuesta = upload_clasificacion_csv.__wrapped__.__wrapped__(None)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    cuerpo = respuesta.get_json()
+
+    # Dos consultas de índice, un UPDATE por categoría y el registro de cambios para /sync
+    # (versión + INSERT), sin importar la cantidad de filas
+    assert len(consultas) == 7
+    assert cuerpo['total_actualizados'] == 3 + 2 * 30
+    assert cuerpo['productos_no_encontrados'] == ['Glicerna']
+    assert cuerpo['categorias_no_encontradas'] == ['Inexistente']
+    assert {'nombre': 'Glicerna', 'error': 'Producto no encontrado', 'sugerencias': ['Glicerina']} in cuerpo['resultados']
+
+    db.session.expire_all()
+    assert {p.id: p.categoria_id for p in Producto.query.all()} == {1: 1, 2: 1, 3: 2, 4: None}
@@ -0,0 +1,142 @@
+"""Costo al momento fijado al registrar la venta y KPIs del mes como agregados SQL."""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+
+def _crear_catalogo(db):
+    from app.models import UsuarioInterno, Producto, TipoCambio, Receta, RecetaItem
+
+    usuario = UsuarioInterno(
+        nombre='Test', apellido='Test', nombre_usuario='test',
+        contrasena='x', email='test@example.com', rol='ADMIN'
+    )
+    base = Producto(nombre='Base', activo=True, costo_referencia_usd=Decimal('2'), ajusta_por_tc=True)
+    receta_prod = Producto(nombre='Mezcla', activo=True, es_receta=True, ajusta_por_tc=False)
+    db.session.add_all([
+        usuario, base, receta_prod,
+        TipoCambio(nombre='Oficial', valor=Decimal('1000')),
+        TipoCambio(nombre='Empresa', valor=Decimal('1200')),
+    ])
+    db.session.flush()
+    receta = Receta(producto_final_id=receta_prod.id)
+    db.session.add(receta)
+    db.session.flush()
+    db.session.add(RecetaItem(receta_id=receta.id, ingrediente_id=base.id, porcentaje=Decimal('50')))
+    db.session.commit()
+    return usuario.id, base.id, receta_prod.id
+
+
+def test_resolver_costos_momento_ars(app_sqlite):
+    from app import db
+    from app.blueprints.productos import resolver_costos_momento_ars
+
+    _, base_id, receta_id = _crear_catalogo(db)
+    costos = resolver_costos_momento_ars([base_id, receta_id])
+    assert costos[base_id] == (Decimal('2000'), Decimal('1000'))
+    assert costos[receta_id] == (Decimal('1200'), Decimal('1200'))
+
+
+def test_kpis_mes_suman_costo_snapshot(app_sqlite):
+    from app import db
+    from app.models import Venta, DetalleVenta
+    from app.blueprints.ventas import _snapshot_costos_en_detalles
+    from app.blueprints.reportes import _get_kpis_del_mes
+    from app.utils.resumen_ventas_utils import reconstruir_resumen_ventas
+
+    usuario_id, base_id, receta_id = _crear_catalogo(db)
+    hoy = date.today()
+    detalles = _snapshot_costos_en_detalles([
+        dict(producto_id=base_id, cantidad=Decimal('3'), precio_unitario_venta_ars=Decimal('3000'), precio_total_item_ars=Decimal('9000')),
+        dict(producto_id=receta_id, cantidad=Decimal('1'), precio_unitario_venta_ars=Decimal('2000'), precio_total_item_ars=Decimal('2000')),
+    ])
+    db.session.add_all([
+        Venta(usuario_interno_id=usuario_id, nombre_vendedor='martin', forma_pago='efectivo',
+              fecha_registro=datetime.combine(hoy, datetime.min.time()),
+              monto_final_redondeado=Decimal('11000'), detalles=[DetalleVenta(**d) for d in detalles]),
+        Venta(usuario_interno_id=usuario_id, nombre_vendedor='CANCELADO-martin', forma_pago='efectivo', cliente_id=None,
+              fecha_registro=datetime.combine(hoy, datetime.min.time()),
+              monto_final_redondeado=Decimal('5000'),
+              detalles=[DetalleVenta(**_snapshot_costos_en_detalles([dict(producto_id=base_id, cantidad=Decimal('1'), precio_unitario_venta_ars=Decimal('5000'), precio_total_item_ars=Decimal('5000'))])[0])]),
+    ])
+    db.session.commit()
+    # Las ventas se insertaron directo con el ORM: se arma el resumen diario que leen los KPIs
+    reconstruir_resumen_ventas()
+
+    kpis = _get_kpis_del_mes(hoy)
+    assert kpis["ventas_mes"] == Decimal('11000')
+    assert kpis["costos_variables_mes"] == Decimal('7200')
+    assert kpis["ganancia_bruta_mes"] == Decimal('3800')
+    assert kpis["ingresos_efectivo_mes"] == Decimal('11000')
+    assert kpis["ingresos_otros_mes"] == Decimal('0')
+
+
+def test_editar_venta_conserva_costo_al_momento(app_sqlite):
+    from app import db
+    from app.models import Venta, DetalleVenta, Producto, UsuarioInterno
+    from app.blueprints.ventas import _snapshot_costos_en_detalles, actualizar_venta
+    from app.blueprints.productos import resolver_costos_momento_ars
+
+    usuario_id, base_id, receta_id = _crear_catalogo(db)
+    detalles = _snapshot_costos_en_detalles([
+        dict(producto_id=base_id, cantidad=Decimal('3'), precio_unitario_venta_ars=Decimal('3000'), precio_total_item_ars=Decimal('9000')),
+    ])
+    venta = Venta(usuario_interno_id=usuario_id, nombre_vendedor='martin', forma_pago='efectivo',
+                  fecha_registro=datetime(2026, 1, 5, 10), direccion_entrega='Calle 1',
+                  monto_final_redondeado=Decimal('9000'), detalles=[DetalleVenta(**d) for d in detalles])
+    db.session.add(venta)
+    db.session.commit()
+
+    # Cambia el costo después de la venta
+    db.session.get(Producto, base_id).costo_referencia_usd = Decimal('5')
+    db.session.commit()
+
+    payload = {'items': [
+        {'producto_id': base_id, 'cantidad': '4', 'precio_unitario_venta_ars': '3000', 'precio_total_item_ars': '12000'},
+        {'producto_id': receta_id, 'cantidad': '1', 'precio_unitario_venta_ars': '2000', 'precio_total_item_ars': '2000'},
+    ]}
+    usuario = db.session.get(UsuarioInterno, usuario_id)
+    with app_sqlite.test_request_context(f'/ventas/actualizar/{venta.id}', method='PUT', json=payload):
+        respuesta = actualizar_venta.__wrapped__.__wrapped__(usuario, venta.id)
+    estado = respuesta[1] if isinstance(respuesta, tuple) else respuesta.status_code
+    assert estado == 200
+
+    db.session.expire_all()
+    snapshots = {d.producto_id: (d.costo_unitario_momento_ars, d.tc_costo_momento)
+                 for d in DetalleVenta.query.filter_by(venta_id=venta.id)}
+    # La línea que ya estaba conserva el costo del momento de la venta; la nueva toma el vigente
+    assert snapshots[base_id] == (Decimal('2000'), Decimal('1000'))
+    assert snapshots[receta_id] == resolver_costos_momento_ars([receta_id])[receta_id]
+
+
+def test_backfill_de_costos_actualiza_el_resumen(app_sqlite, capsys):
+    import importlib.util
+    import pathlib
+    from app import db
+    from app.models import Venta, DetalleVenta
+    from app.blueprints.reportes import _get_kpis_del_mes
+    from app.utils.resumen_ventas_utils import reconstruir_resumen_ventas
+
+    ruta = pathlib.Path(__file__).resolve().parents[1] / 'backend' / 'scripts' / 'backfill_costo_detalles_venta.py'
+    spec = importlib.util.spec_from_file_location('backfill_costo_detalles_venta', str(ruta))
+    backfill = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(backfill)
+
+    usuario_id, base_id, _ = _crear_catalogo(db)
+    hoy = date.today()
+    db.session.add(Venta(
+        usuario_interno_id=usuario_id, nombre_vendedor='martin', forma_pago='efectivo',
+        fecha_registro=datetime.combine(hoy, datetime.min.time()), monto_final_redondeado=Decimal('9000'),
+        detalles=[DetalleVenta(producto_id=base_id, cantidad=Decimal('3'), precio_unitario_venta_ars=Decimal('3000'),
+                               precio_total_item_ars=Decimal('9000'))],
+    ))
+    db.session.commit()
+    reconstruir_resumen_ventas()
+    db.session.commit()
+    assert _get_kpis_del_mes(hoy)["costos_variables_mes"] == Decimal('0')
+
+    backfill.run_backfill(dry_run=False)
+    # Sin reconstruir: el backfill ya dejó el costo en el resumen
+    kpis = _get_kpis_del_mes(hoy)
+    assert kpis["costos_variables_mes"] == Decimal('6000')
+    assert kpis["ganancia_bruta_mes"] == Decimal('3000')
@@ -0,0 +1,191 @@
+"""KPIs del día resueltos con una consulta agregada: mismos números que el cálculo fila a fila."""
+
+import math
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+
+@contextmanager
+def contar_consultas(engine):
+    sentencias = []
+
+    def _registrar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', _registrar)
+    try:
+        yield sentencias
+    finally:
+        event.remove(engine, 'before_cursor_execute', _registrar)
+
+
+def _crear_ventas(db):
+    from app.models import UsuarioInterno, Cliente, Producto, Venta, DetalleVenta
+
+    usuario = UsuarioInterno(
+        nombre='Test', apellido='Test', nombre_usuario='test',
+        contrasena='x', email='test@example.com', rol='ADMIN'
+    )
+    cliente = Cliente(nombre_razon_social='Cliente')
+    producto = Producto(nombre='Base', activo=True)
+    db.session.add_all([usuario, cliente, producto])
+    db.session.flush()
+
+    hoy = datetime.combine(date.today(), time(10, 30))
+    manana = hoy + timedelta(days=1)
+    filas = [
+        # (cliente, forma_pago, nombre_vendedor, fecha, direccion, monto, kilos)
+        (None, 'efectivo', 'martin', hoy, None, '1234.50', '2'),
+        (None, 'transferencia', 'martin', hoy, '', '999.99', '1'),
+        (None, 'factura', 'CANCELADO-martin', hoy, None, '501', '1'),
+        (cliente.id, 'efectivo', 'PENDIENTE-sergio', hoy, 'Calle 1', '2000', '5'),
+        (cliente.id, 'transferencia', 'CANCELADO-sergio', hoy, 'Calle 2', '3000', '4'),
+        (cliente.id, 'factura', 'ENTREGADO-sergio', hoy, 'Calle 3', '1500.10', '3'),
+        (cliente.id, 'efectivo', '', hoy, 'Calle 4', None, '1'),
+        (cliente.id, 'efectivo', 'sergio', manana, 'Calle 5', '700', '7'),
+        (None, 'efectivo', 'martin', hoy - timedelta(days=3), None, '10000', '9'),
+    ]
+    for cliente_id, forma, vendedor, fecha, direccion, monto, kilos in filas:
+        monto = Decimal(monto) if monto else None
+        db.session.add(Venta(
+            usuario_interno_id=usuario.id, cliente_id=cliente_id, forma_pago=forma,
+            nombre_vendedor=vendedor, fecha_pedido=fecha, direccion_entrega=direccion,
+            monto_final_redondeado=monto, monto_final_con_recargos=monto,
+            detalles=[DetalleVenta(
+                producto_id=producto.id, cantidad=Decimal(kilos),
+                precio_unitario_venta_ars=Decimal('1'), precio_total_item_ars=Decimal(kilos),
+                costo_unitario_momento_ars=Decimal('100'),
+            )],
+        ))
+    db.session.commit()
+
+
+def _kpis_del_dia_fila_a_fila(db, fecha):
+    """Cálculo de referencia: el algoritmo previo, venta por venta en Python."""
+    from app.models import Venta
+
+    ventas = [v for v in db.session.query(Venta).all()
+              if v.fecha_pedido and v.fecha_pedido.date() == fecha]
+    puerta = [v for v in ventas if v.cliente_id is None]
+    pedidos = [v for v in ventas if v.cliente_id is not None]
+    pedidos_vigentes = [
+        v for v in pedidos
+        if (v.nombre_vendedor or '').split('-', 1)[0].strip().upper() != 'CANCELADO'
+    ]
+
+    def redondear_100(valor):
+        return (valor // 100 * 100) if valor == 0 else ((valor + 99) // 100 * 100)
+
+    def monto(v):
+        return Decimal(v.monto_final_redondeado or 0)
+
+    esperado = {
+        "ingreso_puerta_hoy": redondear_100(sum(Decimal(math.ceil(monto(v) / 100) * 100) for v in puerta)),
+        "ingreso_pedido_hoy": redondear_100(sum(monto(v) for v in pedidos_vigentes)),
+        "pedidos_listos_para_entregar": 0,
+        "cantidad_total_listos": 0,
+    }
+    for forma in ('efectivo', 'transferencia', 'factura'):
+        esperado[f"puerta_{forma}"] = redondear_100(sum(monto(v) for v in puerta if v.forma_pago == forma))
+        esperado[f"pedido_{forma}"] = redondear_100(sum(monto(v) for v in pedidos_vigentes if v.forma_pago == forma))
+        esperado[f"puerta_{forma}_unidades"] = sum(1 for v in puerta if v.forma_pago == forma)
+        esperado[f"pedido_{forma}_unidades"] = sum(1 for v in pedidos if v.forma_pago == forma)
+    return esperado
+
+
+def test_kpis_del_dia_una_consulta_mismos_numeros(app_sqlite):
+    from app import db
+    from app.blueprints.reportes import _get_kpis_del_dia
+
+    from app.utils.resumen_ventas_utils import reconstruir_resumen_ventas
+
+    _crear_ventas(db)
+    reconstruir_resumen_ventas()
+    esperado = _kpis_del_dia_fila_a_fila(db, date.today())
+
+    with contar_consultas(db.engine) as sentencias:
+        kpis = _get_kpis_del_dia(date.today())
+
+    assert len(sentencias) == 1
+    assert kpis == esperado
+    assert kpis["ingreso_puerta_hoy"] == Decimal('2900')
+
+
+def test_dashboard_admin_una_consulta_al_resumen(app_sqlite):
+    from app import db
+    from app.blueprints.dashboard import get_dashboard_kpis
+    from app.utils.resumen_ventas_utils import reconstruir_resumen_ventas
+
+    _crear_ventas(db)
+    reconstruir_resumen_ventas()
+    vista = get_dashboard_kpis.__wrapped__.__wrapped__
+
+    with app_sqlite.test_request_context('/api/dashboard/kpis'):
+        with contar_consultas(db.engine) as sentencias:
+            datos = vista(None).get_json()
+
+    assert len(sentencias) == 1
+    assert datos["primera_fila"] == {
+        "compras_por_recibir": 0.0,
+        "deuda_proveedores": 0.0,
+        "ingreso_pedido_hoy": 6500.10,
+        "ingreso_pedido_manana": 700.0,
+        "ingreso_puerta_hoy": 2735.49,
+        "kgs_manana": 7.0,
+        "pedidos_pendientes_manana": 1,
+    }
+    assert datos["segunda_fila"] == {"costos_fijos_mes": 0.0, "costos_variables_mes": 1700.0, "ventas_mes": 9235.59}
+    assert datos["tercera_fila"]["relacion_ingresos"] == {"pedidos": 6500.10, "puerta": 2735.49}
+    assert datos["tercera_fila"]["relacion_pagos"] == {"efectivo": 3234.50, "otros": 6001.09}
+    # Pendientes: pedidos con dirección no entregados, de cualquier fecha (incluye cancelados)
+    assert datos["pendientes"] == {"kgs_pendientes": 17.0, "pedidos_pendientes": 4}
+
+
+def test_pedidos_caja_y_mes_desde_el_resumen(app_sqlite, monkeypatch):
+    from app import db
+    from app.blueprints import dashboard
+    from app.blueprints.reportes import get_caja_del_dia, _get_kpis_del_mes, _get_kpis_entregas_manana
+    from app.models import Venta
+    from app.utils.resumen_ventas_utils import reconstruir_resumen_ventas
+
+    _crear_ventas(db)
+    reconstruir_resumen_ventas()
+    monkeypatch.setattr(dashboard, 'AR_TZ', None)
+
+    with app_sqlite.test_request_context('/api/dashboard/ventas-pedidos'):
+        with contar_consultas(db.engine) as sentencias:
+            datos = dashboard.get_dashboard_ventas_pedidos.__wrapped__.__wrapped__(None).get_json()
+    assert len(sentencias) == 1
+    assert datos["hoy"] == {
+        "cantidad_pedidos": 3,
+        "cantidad_pedidos_por_forma_pago": {"efectivo": 2, "factura": 1},
+        "cantidad_kilos": 9.0,
+        "ingreso_puerta_hoy": 2735.49,
+        "ingreso_puerta_por_forma_pago": {"efectivo": 1234.5, "transferencia": 999.99, "factura": 501.0},
+        "ingreso_pedidos_hoy": 3500.10,
+        "ingreso_pedidos_por_forma_pago": {"efectivo": 2000.0, "factura": 1500.10},
+    }
+    assert datos["pendiente_entrega"] == {"cantidad_pedidos": 1, "cantidad_kilos": 7.0}
+
+    assert _get_kpis_entregas_manana(date.today()) == {"pedidos_pendientes_manana": 1, "kgs_manana": Decimal('7')}
+
+    # Caja y KPIs del mes van por fecha de registro (la de alta, no la del pedido)
+    ventas = Venta.query.all()
+    fecha_registro = ventas[0].fecha_registro.date()
+    caja_esperada = {}
+    for v in ventas:
+        if v.fecha_registro.date() == fecha_registro:
+            caja_esperada[v.forma_pago] = caja_esperada.get(v.forma_pago, 0) + float(v.monto_final_redondeado or 0)
+    with app_sqlite.test_request_context('/api/reportes/caja-del-dia', query_string={'fecha': fecha_registro.isoformat()}):
+        caja = get_caja_del_dia.__wrapped__.__wrapped__(None).get_json()
+    assert caja["resumen_caja"] == pytest.approx(caja_esperada)
+
+    vigentes = [v for v in ventas if not (v.nombre_vendedor or '').upper().startswith('CANCELADO')]
+    kpis = _get_kpis_del_mes(fecha_registro)
+    assert kpis["ventas_mes"] == sum(Decimal(v.monto_final_redondeado or 0) for v in vigentes)
+    assert kpis["ingresos_pedidos_mes"] == sum(Decimal(v.monto_final_redondeado or 0) for v in vigentes if v.cliente_id)
+    assert kpis["costos_variables_mes"] == Decimal('100') * sum(d.cantidad for v in vigentes for d in v.detalles)
@@ -0,0 +1,87 @@
+"""Metadatos de OC en columnas tipadas: tasas, fecha de entrega, snapshot de TC y backfill desde marcadores."""
+
+import importlib.util
+import pathlib
+from datetime import datetime
+from decimal import Decimal
+
+import sqlalchemy as sa
+
+
+def test_tasas_tipadas_siguen_a_iva_iibb(app_sqlite):
+    from app.models import OrdenCompra, DetalleOrdenCompra
+    from app.blueprints.compras import _importe_solicitado_con_impuestos
+
+    orden = OrdenCompra(proveedor_id=1, iva='21', iibb='3%')
+    assert (orden.iva_tasa, orden.iibb_tasa) == (Decimal('0.21'), Decimal('0.03'))
+    orden.items.append(DetalleOrdenCompra(producto_id=1, cantidad_solicitada=Decimal('2'),
+                                          precio_unitario_estimado=Decimal('50')))
+    assert _importe_solicitado_con_impuestos(orden) == Decimal('124.00')
+
+    orden.iva = ''
+    orden.iibb = None
+    assert (orden.iva_tasa, orden.iibb_tasa) == (None, None)
+    assert _importe_solicitado_con_impuestos(orden) == Decimal('100.00')
+
+
+def test_listado_filtra_y_ordena_por_fecha_de_entrega(app_sqlite):
+    from app import db
+    from app.models import OrdenCompra, Proveedor
+    from app.blueprints.compras import obtener_ordenes_compra
+
+    proveedor = Proveedor(nombre='Proveedor')
+    db.session.add(proveedor)
+    db.session.flush()
+    for dia in (20, 5, 12, None):
+        db.session.add(OrdenCompra(
+            proveedor_id=proveedor.id, estado='APROBADO', tc_snapshot=Decimal('1000'),
+            fecha_entrega_tentativa=datetime(2026, 11, dia, 12) if dia else None,
+        ))
+    db.session.commit()
+
+    vista = obtener_ordenes_compra.__wrapped__.__wrapped__
+    with app_sqlite.test_request_context('/?entrega_desde=2026-11-05&entrega_hasta=2026-11-12&orden=fecha_entrega'):
+        ordenes = vista(None).get_json()['ordenes']
+    assert [o['fecha_entrega_tentativa'] for o in ordenes] == ['2026-11-05T12:00:00', '2026-11-12T12:00:00']
+    assert all(o['tc_snapshot'] == 1.0 for o in ordenes)  # tc_transaccion por defecto (1.00) tiene prioridad
+
+    with app_sqlite.test_request_context('/?entrega_desde=05-11-2026'):
+        _, estado = vista(None)
+    assert estado == 400
+
+
+def test_migracion_completa_columnas_desde_marcadores():
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+
+    ruta = (pathlib.Path(__file__).resolve().parents[1] / 'backend' / 'migrations' / 'versions'
+            / '20261019_add_metadatos_tipados_ordencompra.py')
+    spec = importlib.util.spec_from_file_location('migracion_metadatos_oc', str(ruta))
+    migracion = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migracion)
+
+    engine = sa.create_engine('sqlite://')
+    with engine.begin() as conexion:
+        conexion.execute(sa.text(
+            "CREATE TABLE ordenes_compra (id INTEGER PRIMARY KEY, observaciones_solicitud TEXT, "
+            "notas_recepcion TEXT, iva VARCHAR(50), iibb VARCHAR(50))"
+        ))
+        conexion.execute(sa.text("INSERT INTO ordenes_compra VALUES (:id, :obs, :notas, :iva, :iibb)"), [
+            {'id': 1, 'obs': 'Urgente\n__FECHA_ENTREGA_TENTATIVA__:2026-11-05T12:00:00\n'
+                             '__TC_SNAPSHOT__:{"tc_usado": 1180.5, "fecha_snapshot": "x"}\n__BASE_SIN_IMPUESTOS__:250.00',
+             'notas': '__TC_SNAPSHOT__:{"tc_usado": 1300}', 'iva': '21', 'iibb': '3%'},
+            {'id': 2, 'obs': 'sin marcadores', 'notas': '__TC_SNAPSHOT__:{"tc_usado": 1300}', 'iva': '', 'iibb': None},
+            {'id': 3, 'obs': None, 'notas': None, 'iva': None, 'iibb': None},
+        ])
+        with Operations.context(MigrationContext.configure(conexion)):
+            migracion.upgrade()
+        filas = conexion.execute(sa.text(
+            "SELECT id, tc_snapshot, fecha_entrega_tentativa, importe_base_sin_impuestos, iva_tasa, iibb_tasa "
+            "FROM ordenes_compra ORDER BY id"
+        )).fetchall()
+
+    assert [tuple(f) for f in filas] == [
+        (1, 1180.5, '2026-11-05 12:00:00.000000', 250, 0.21, 0.03),
+        (2, 1300, None, None, None, None),
+        (3, None, None, None, None, None),
+    ]
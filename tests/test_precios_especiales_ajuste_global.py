@@ -0,0 +1,131 @@
+"""Ajuste global de precios especiales: UPDATE por tramos con detalle para revertir."""
+
+from decimal import Decimal
+
+
+def _crear_precios(db):
+    from app.models import PrecioEspecialCliente
+
+    db.session.add_all([
+        PrecioEspecialCliente(cliente_id=1, producto_id=1, precio_unitario_fijo_ars=Decimal('100')),
+        PrecioEspecialCliente(cliente_id=1, producto_id=2, precio_unitario_fijo_ars=Decimal('1001')),
+        PrecioEspecialCliente(cliente_id=2, producto_id=1, precio_unitario_fijo_ars=Decimal('500'), activo=False),
+        PrecioEspecialCliente(cliente_id=2, producto_id=2, precio_unitario_fijo_ars=Decimal('0')),
+        PrecioEspecialCliente(cliente_id=3, producto_id=1, precio_unitario_fijo_ars=Decimal('80.5')),
+    ])
+    db.session.commit()
+
+
+def _llamar(app, vista, *args, json=None):
+    with app.test_request_context('/', method='POST', json=json):
+        respuesta = vista.__wrapped__.__wrapped__(None, *args)
+    cuerpo, estado = respuesta if isinstance(respuesta, tuple) else (respuesta, 200)
+    return cuerpo.get_json(), estado
+
+
+def _precios(db):
+    from app.models import PrecioEspecialCliente
+
+    db.session.expire_all()
+    return [p.precio_unitario_fijo_ars for p in PrecioEspecialCliente.query.order_by(PrecioEspecialCliente.id)]
+
+
+def test_subida_por_tramos_y_reversion(app_sqlite, monkeypatch):
+    from app import db
+    from app.blueprints.precios_especiales import actualizar_precios_masivamente, revertir_ajuste_global
+    from app.models import PrecioEspecialCliente, AjustePrecioEspecialDetalle
+    from app.utils import ajuste_precios_utils
+
+    _crear_precios(db)
+    monkeypatch.setattr(ajuste_precios_utils, 'PRECIOS_POR_TRAMO', 2)
+
+    cuerpo, estado = _llamar(app_sqlite, actualizar_precios_masivamente, json={'porcentaje': '25', 'direccion': 'subida'})
+    assert estado == 200
+    assert cuerpo['total_precios_actualizados'] == 3
+    # Inactivos y precios en cero no se tocan; subidas a la decena siguiente
+    assert _precios(db) == [Decimal('130'), Decimal('1260'), Decimal('500'), Decimal('0'), Decimal('110')]
+    assert AjustePrecioEspecialDetalle.query.filter_by(ajuste_id=cuerpo['ajuste_id']).count() == 3
+
+    # Un precio editado después del ajuste no se revierte
+    editado = db.session.get(PrecioEspecialCliente, 2)
+    editado.precio_unitario_fijo_ars = Decimal('999')
+    db.session.commit()
+
+    revertido, estado = _llamar(app_sqlite, revertir_ajuste_global, cuerpo['ajuste_id'])
+    assert estado == 200
+    assert revertido['total_precios_revertidos'] == 2
+    assert revertido['omitidos_por_cambios_posteriores'] == 1
+    assert _precios(db) == [Decimal('100'), Decimal('999'), Decimal('500'), Decimal('0'), Decimal('80.5')]
+
+    _, estado = _llamar(app_sqlite, revertir_ajuste_global, cuerpo['ajuste_id'])
+    assert estado == 409
+
+
+def test_bajada_redondea_al_centavo(app_sqlite):
+    from app import db
+    from app.blueprints.precios_especiales import actualizar_precios_masivamente
+
+    _crear_precios(db)
+    cuerpo, estado = _llamar(app_sqlite, actualizar_precios_masivamente, json={'porcentaje': '50', 'direccion': 'bajada'})
+    assert estado == 200
+    assert cuerpo['total_precios_actualizados'] == 3
+    assert _precios(db) == [Decimal('50'), Decimal('500.5'), Decimal('500'), Decimal('0'), Decimal('40.25')]
+
+
+def test_reversion_de_un_ajuste_que_fallo_a_mitad(app_sqlite, monkeypatch):
+    from app import db
+    from app.blueprints.precios_especiales import actualizar_precios_masivamente, revertir_ajuste_global
+    from app.models import AjustePrecioEspecial
+    from app.utils import ajuste_precios_utils
+
+    _crear_precios(db)
+    monkeypatch.setattr(ajuste_precios_utils, 'PRECIOS_POR_TRAMO', 2)
+    registrar_original = ajuste_precios_utils.registrar_cambios_consulta
+    llamadas = []
+
+    def registrar_que_falla(*args, **kwargs):
+        llamadas.append(1)
+        if len(llamadas) == 2:
+            raise RuntimeError('se cortó la conexión')
+        return registrar_original(*args, **kwargs)
+
+    monkeypatch.setattr(ajuste_precios_utils, 'registrar_cambios_consulta', registrar_que_falla)
+    _, estado = _llamar(app_sqlite, actualizar_precios_masivamente, json={'porcentaje': '25', 'direccion': 'subida'})
+    assert estado == 500
+    # El primer tramo (ids 1-2) quedó aplicado y el total lo refleja
+    ajuste = AjustePrecioEspecial.query.one()
+    assert ajuste.total_precios == 2
+    assert _precios(db) == [Decimal('130'), Decimal('1260'), Decimal('500'), Decimal('0'), Decimal('80.5')]
+
+    monkeypatch.setattr(ajuste_precios_utils, 'registrar_cambios_consulta', registrar_original)
+    revertido, estado = _llamar(app_sqlite, revertir_ajuste_global, ajuste.id)
+    assert estado == 200
+    assert revertido['total_precios_revertidos'] == 2
+    assert revertido['omitidos_por_cambios_posteriores'] == 0
+    assert _precios(db) == [Decimal('100'), Decimal('1001'), Decimal('500'), Decimal('0'), Decimal('80.5')]
+
+
+def test_reversion_que_falla_se_puede_reintentar(app_sqlite, monkeypatch):
+    from app import db
+    from app.blueprints.precios_especiales import actualizar_precios_masivamente, revertir_ajuste_global
+    from app.models import AjustePrecioEspecial
+    from app.utils import ajuste_precios_utils
+
+    _crear_precios(db)
+    cuerpo, _ = _llamar(app_sqlite, actualizar_precios_masivamente, json={'porcentaje': '25', 'direccion': 'subida'})
+
+    def registrar_que_falla(*args, **kwargs):
+        raise RuntimeError('se cortó la conexión')
+
+    with monkeypatch.context() as parche:
+        parche.setattr(ajuste_precios_utils, 'registrar_cambios_consulta', registrar_que_falla)
+        _, estado = _llamar(app_sqlite, revertir_ajuste_global, cuerpo['ajuste_id'])
+    assert estado == 500
+    # La marca tomada bajo el lock se libera al fallar
+    db.session.expire_all()
+    assert db.session.get(AjustePrecioEspecial, cuerpo['ajuste_id']).fecha_reversion is None
+
+    revertido, estado = _llamar(app_sqlite, revertir_ajuste_global, cuerpo['ajuste_id'])
+    assert estado == 200
+    assert revertido['total_precios_revertidos'] == 3
+    assert revertido['ajuste']['fecha_reversion'] is not None
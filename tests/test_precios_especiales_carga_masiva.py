@@ -0,0 +1,143 @@
+"""Carga masiva de precios especiales: pipeline por columnas, upsert por lotes y modo dry-run."""
+
+import io
+from decimal import Decimal
+
+CSV = (
+    "Cliente;Producto;Precio;Moneda;Usar Precio Base;Margen Sobre Base\n"
+    "Química Sur;Ácido;$1.234,56;ARS;;\n"
+    "NORTE sa;Soda;10;U$S;;\n"
+    "Nadie;Soda;5;;;\n"
+    ";;;;;\n"
+    "Norte SA;Ácido;abc;;;\n"
+    "Norte SA;Soda;;;si;15%\n"
+)
+
+
+def _crear_base(db):
+    from app.models import Cliente, Producto, TipoCambio, PrecioEspecialCliente
+
+    db.session.add(TipoCambio(nombre='Oficial', valor=Decimal('1000')))
+    db.session.add_all([Cliente(id=1, nombre_razon_social='Quimica Sur'), Cliente(id=2, nombre_razon_social='Norte SA')])
+    db.session.add_all([Producto(id=1, nombre='Acido'), Producto(id=2, nombre='Soda')])
+    db.session.add(PrecioEspecialCliente(cliente_id=1, producto_id=1, precio_unitario_fijo_ars=Decimal('900'),
+                                         moneda_original='ARS', precio_original=Decimal('900'), activo=False))
+    db.session.commit()
+
+
+def _cargar(app, **query):
+    from app.blueprints.precios_especiales import cargar_precios_desde_csv
+
+    with app.test_request_context('/', method='POST', query_string=query, content_type='multipart/form-data',
+                                  data={'archivo_precios': (io.BytesIO(CSV.encode('utf-8')), 'precios.csv')}):
+        respuesta = cargar_precios_desde_csv.__wrapped__.__wrapped__(None)
+    cuerpo, estado = respuesta if isinstance(respuesta, tuple) else (respuesta, 200)
+    return cuerpo.get_json(), estado
+
+
+def _cargar_en_segundo_plano(app, monkeypatch):
+    """POST sin dry_run: 202 con el trabajo; la tarea se corre acá (SQLite en memoria no se comparte entre hilos)."""
+    from app.blueprints import precios_especiales
+    from app.blueprints.tipos_cambio import obtener_trabajo
+    from app.utils.trabajos_utils import ejecutar_trabajo
+
+    lanzados = []
+    monkeypatch.setattr(precios_especiales, 'lanzar_trabajo', lambda *args: lanzados.append(args))
+    cuerpo, estado = _cargar(app)
+    assert estado == 202
+    assert cuerpo['trabajo']['estado'] == 'PENDIENTE' and cuerpo['trabajo']['total'] == 6
+
+    ejecutar_trabajo(*lanzados[0])
+    with app.test_request_context('/'):
+        respuesta = obtener_trabajo.__wrapped__.__wrapped__(None, cuerpo['trabajo_id'])
+    return respuesta.get_json()
+
+
+def _resumen_esperado(cuerpo):
+    assert cuerpo['summary']['creados'] == 1
+    assert cuerpo['summary']['actualizados'] == 2
+    assert cuerpo['summary']['ignoradas'] == 1
+    assert cuerpo['summary']['modos'] == {'margen_explicito': 1, 'margen_objetivo': 0, 'fijo': 2}
+    assert [(f['linea'], f['motivo']) for f in cuerpo['failed_rows']] == [
+        (4, "Cliente 'Nadie' no encontrado."),
+        (6, "Precio 'abc' no es un número válido: Formato de precio inválido"),
+    ]
+
+
+def test_dry_run_devuelve_diff_sin_escribir(app_sqlite):
+    from app import db
+    from app.models import PrecioEspecialCliente, TrabajoSegundoPlano
+
+    _crear_base(db)
+    cuerpo, estado = _cargar(app_sqlite, dry_run='true')
+
+    assert estado == 207
+    assert cuerpo['dry_run'] is True
+    _resumen_esperado(cuerpo)
+    diff = {(d['cliente_id'], d['producto_id']): d for d in cuerpo['diff']}
+    assert diff[(1, 1)]['accion'] == 'actualizar'
+    assert diff[(1, 1)]['cambios']['precio_unitario_fijo_ars'] == [900.0, 1234.56]
+    assert diff[(1, 1)]['cambios']['activo'] == [False, True]
+    # La clave repetida en el archivo queda con la última fila (margen explícito)
+    assert diff[(2, 2)]['accion'] == 'crear'
+    assert diff[(2, 2)]['cambios']['margen_sobre_base'] == [None, 0.15]
+
+    assert PrecioEspecialCliente.query.count() == 1
+    assert TrabajoSegundoPlano.query.count() == 0
+
+
+def test_carga_escribe_por_lotes_con_progreso(app_sqlite, monkeypatch):
+    from app import db
+    from app.models import PrecioEspecialCliente
+    from app.utils import importar_precios_utils
+
+    _crear_base(db)
+    monkeypatch.setattr(importar_precios_utils, 'PRECIOS_POR_LOTE', 1)
+    trabajo = _cargar_en_segundo_plano(app_sqlite, monkeypatch)
+
+    assert trabajo['estado'] == 'COMPLETADO'
+    # Progreso en filas del archivo: con repetidas, errores e ignoradas igual llega al total
+    assert trabajo['procesados'] == trabajo['total'] == 6 and trabajo['porcentaje'] == 100.0
+    _resumen_esperado(trabajo['resultado'])
+    assert trabajo['resultado']['summary']['lotes'] == 2
+
+    db.session.expire_all()
+    precios = {(p.cliente_id, p.producto_id): p for p in PrecioEspecialCliente.query.all()}
+    assert len(precios) == 2
+    fijo = precios[(1, 1)]
+    assert fijo.precio_unitario_fijo_ars == Decimal('1234.56')
+    assert fijo.activo is True and fijo.usar_precio_base is False
+    margen = precios[(2, 2)]
+    assert margen.usar_precio_base is True
+    assert margen.margen_sobre_base == Decimal('0.15')
+    assert margen.moneda_original == 'ARS'
+    assert margen.precio_unitario_fijo_ars == Decimal('0')
+
+
+def test_falla_en_un_lote_informa_las_filas_ya_confirmadas(app_sqlite, monkeypatch):
+    from app import db
+    from app.models import PrecioEspecialCliente
+    from app.utils import importar_precios_utils
+
+    _crear_base(db)
+    monkeypatch.setattr(importar_precios_utils, 'PRECIOS_POR_LOTE', 1)
+    upsert_original = importar_precios_utils.upsert_reemplazo
+    llamadas = []
+
+    def upsert_que_falla(*args, **kwargs):
+        llamadas.append(1)
+        if len(llamadas) == 2:
+            raise RuntimeError('se cortó la conexión')
+        return upsert_original(*args, **kwargs)
+
+    monkeypatch.setattr(importar_precios_utils, 'upsert_reemplazo', upsert_que_falla)
+    trabajo = _cargar_en_segundo_plano(app_sqlite, monkeypatch)
+
+    # El primer lote (Química Sur / Ácido, una fila) quedó aplicado y el trabajo lo dice
+    assert trabajo['estado'] == 'ERROR' and trabajo['resultado'] is None
+    assert trabajo['procesados'] == 1 and trabajo['total'] == 6
+    assert 'Quedaron aplicados 1 lotes' in trabajo['error']
+
+    db.session.expire_all()
+    precios = PrecioEspecialCliente.query.all()
+    assert [(p.cliente_id, p.producto_id, p.precio_unitario_fijo_ars) for p in precios] == [(1, 1, Decimal('1234.56'))]
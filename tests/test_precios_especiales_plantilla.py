@@ -0,0 +1,73 @@
+"""Descarga de plantilla de precios especiales: una consulta con join, volcada en streaming."""
+
+import io
+from decimal import Decimal
+
+from openpyxl import load_workbook
+from sqlalchemy import event
+
+
+def _crear_base(db, cantidad_clientes):
+    from app.models import Cliente, Producto, TipoCambio, PrecioEspecialCliente
+
+    db.session.add(TipoCambio(nombre='Oficial', valor=Decimal('1000')))
+    db.session.add_all([Producto(id=1, nombre='Acido'), Producto(id=2, nombre='Soda')])
+    for i in range(1, cantidad_clientes + 1):
+        db.session.add(Cliente(id=i, nombre_razon_social=f'Cliente {i:03d}'))
+        if i % 2:
+            db.session.add_all([
+                PrecioEspecialCliente(cliente_id=i, producto_id=2, precio_unitario_fijo_ars=Decimal('1500'),
+                                      moneda_original='USD', precio_original=Decimal('2')),
+                PrecioEspecialCliente(cliente_id=i, producto_id=1, precio_unitario_fijo_ars=Decimal('0'),
+                                      usar_precio_base=True, margen_sobre_base=Decimal('0.1')),
+            ])
+    db.session.commit()
+
+
+def _descargar(app, db):
+    from app.blueprints.precios_especiales import descargar_plantilla_precios
+
+    consultas = []
+    contar = lambda *args, **kwargs: consultas.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        with app.test_request_context('/'):
+            respuesta = descargar_plantilla_precios.__wrapped__.__wrapped__(None)
+            respuesta.direct_passthrough = False
+            contenido = respuesta.get_data()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    return load_workbook(io.BytesIO(contenido)), consultas
+
+
+def test_plantilla_usa_consultas_constantes(app_sqlite, monkeypatch):
+    from app import db
+    from app.utils import precios_utils
+
+    calculos = []
+
+    def calculate_price(producto_id, cantidad, cliente_id=None, db=None):
+        calculos.append(producto_id)
+        return {'status': 'success', 'precio_unitario_ars': '200'}
+
+    monkeypatch.setattr(precios_utils, 'calculate_price', calculate_price)
+    _crear_base(db, cantidad_clientes=5)
+    wb, consultas_chico = _descargar(app_sqlite, db)
+    assert calculos == [1]
+
+    filas = list(wb['PRECIOS_ACTUALES'].iter_rows(values_only=True))
+    assert filas[0][-1] == 'Precio Vigente (ARS)'
+    assert filas[1] == (1, 'Cliente 001', 1, 'Acido', 0, True, 0.1, 'ARS', None, 220)
+    assert filas[2] == (1, 'Cliente 001', 2, 'Soda', 1500, False, None, 'USD', 2, 2000)
+    assert filas[3] == (2, 'Cliente 002', None, None, None, False, None, None, None, None)
+    assert len(filas) == 1 + 3 * 2 + 2
+    assert list(wb['PRECIOS_ACTUALES_RAW'].iter_rows(values_only=True))[1:] == filas[1:]
+    assert wb.sheetnames == ['PLANTILLA', 'PRECIOS_ACTUALES', 'PRECIOS_ACTUALES_RAW', 'INSTRUCCIONES']
+
+    from app.models import Cliente, Producto, TipoCambio, PrecioEspecialCliente
+    for modelo in (PrecioEspecialCliente, Cliente, Producto, TipoCambio):
+        modelo.query.delete()
+    db.session.commit()
+    _crear_base(db, cantidad_clientes=40)
+    _, consultas_grande = _descargar(app_sqlite, db)
+    assert len(consultas_grande) == len(consultas_chico)
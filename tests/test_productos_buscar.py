@@ -0,0 +1,54 @@
+"""Typeahead de productos: índice en memoria por prefijo de palabra y código."""
+
+from sqlalchemy import event
+
+
+def _buscar(app, query_string):
+    from app.blueprints.productos import buscar_productos
+
+    with app.test_request_context('/', query_string=query_string):
+        cuerpo, estado = buscar_productos()
+    assert estado == 200
+    return [(p['id'], p['nombre']) for p in cuerpo.get_json()['productos']]
+
+
+def test_buscar_por_prefijo_token_y_codigo(app_sqlite):
+    from app import db
+    from app.models import Producto
+    from app.utils.indice_productos_utils import indice_productos
+
+    indice_productos.invalidar()
+    db.session.add_all([
+        Producto(id=101, nombre='Ácido Cítrico 25kg', activo=True),
+        Producto(id=102, nombre='Soda Cáustica Escamas', activo=True),
+        Producto(id=203, nombre='Citrato de Sodio', activo=False),
+        Producto(id=204, nombre='Acido Muriatico', activo=True),
+    ])
+    db.session.commit()
+
+    assert _buscar(app_sqlite, {'q': 'acido'}) == [(101, 'Ácido Cítrico 25kg'), (204, 'Acido Muriatico')]
+    # Todas las palabras deben ser prefijo de algún token; los que empiezan con el texto van primero
+    assert _buscar(app_sqlite, {'q': 'cit'}) == [(203, 'Citrato de Sodio'), (101, 'Ácido Cítrico 25kg')]
+    assert _buscar(app_sqlite, {'q': 'sod esc'}) == [(102, 'Soda Cáustica Escamas')]
+    assert _buscar(app_sqlite, {'q': 'cit', 'activos': 'true'}) == [(101, 'Ácido Cítrico 25kg')]
+    assert _buscar(app_sqlite, {'q': '10'}) == [(101, 'Ácido Cítrico 25kg'), (102, 'Soda Cáustica Escamas')]
+    assert _buscar(app_sqlite, {'q': 'acido', 'limite': 1}) == [(101, 'Ácido Cítrico 25kg')]
+
+    # Los commits de Producto actualizan el índice sin volver a consultar la base
+    db.session.get(Producto, 204).nombre = 'Ácido Clorhídrico'
+    db.session.add(Producto(id=305, nombre='Acidulante', activo=True))
+    db.session.delete(db.session.get(Producto, 102))
+    db.session.commit()
+
+    consultas = []
+    contar = lambda *args, **kwargs: consultas.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', contar)
+    try:
+        assert _buscar(app_sqlite, {'q': 'acid'}) == [
+            (101, 'Ácido Cítrico 25kg'), (204, 'Ácido Clorhídrico'), (305, 'Acidulante')
+        ]
+        assert _buscar(app_sqlite, {'q': 'muria'}) == []
+        assert _buscar(app_sqlite, {'q': 'soda'}) == []
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', contar)
+    assert consultas == []
@@ -0,0 +1,63 @@
+"""KPIs de compras y órdenes pendientes con la conversión a ARS resuelta en SQL."""
+
+from datetime import datetime
+from decimal import Decimal
+
+
+def _crear_ordenes(db):
+    from app.models import Proveedor, OrdenCompra
+
+    proveedor = Proveedor(nombre='Proveedor', condiciones_pago='15 días')
+    db.session.add(proveedor)
+    db.session.flush()
+    filas = [
+        # (estado, total, abonado, ajuste_tc, tc)
+        ('APROBADO', '1000', '0', False, '1'),
+        ('APROBADO', '10.55', '0', True, '1200.50'),
+        ('CON DEUDA', '500', '200', True, '0'),
+        ('RECIBIDA_PARCIAL', '300', '100', None, '1'),
+        ('SOLICITADO', '50', '0', False, '1'),
+        ('RECIBIDO', '700', '700', False, '1'),
+        ('RECHAZADO', '900', '0', False, '1'),
+    ]
+    for estado, total, abonado, ajuste_tc, tc in filas:
+        db.session.add(OrdenCompra(
+            proveedor_id=proveedor.id, estado=estado,
+            importe_total_estimado=Decimal(total), importe_abonado=Decimal(abonado),
+            ajuste_tc=ajuste_tc, tc_transaccion=Decimal(tc),
+            fecha_aprobacion=datetime(2026, 10, 1),
+        ))
+    db.session.commit()
+
+
+def test_kpis_de_compras_igual_a_conversion_en_python(app_sqlite):
+    from app import db
+    from app.models import OrdenCompra
+    from app.blueprints.reportes import _get_kpis_de_compras, _monto_oc_a_ars, ESTADOS_OC_ABIERTOS
+
+    _crear_ordenes(db)
+    abiertas = [oc for oc in db.session.query(OrdenCompra).all() if oc.estado in ESTADOS_OC_ABIERTOS]
+    deuda = sum(_monto_oc_a_ars(oc, oc.importe_total_estimado) - _monto_oc_a_ars(oc, oc.importe_abonado) for oc in abiertas)
+    por_recibir = sum(_monto_oc_a_ars(oc, oc.importe_total_estimado) for oc in abiertas if oc.estado == 'APROBADO')
+
+    kpis = _get_kpis_de_compras()
+
+    assert kpis["deuda_proveedores"] == deuda == Decimal('14215.28')
+    assert kpis["compras_por_recibir"] == por_recibir == Decimal('13665.28')
+
+
+def test_ordenes_pendientes_vencimientos_montos_en_ars(app_sqlite):
+    from app import db
+    from app.blueprints.reportes import ordenes_pendientes_vencimientos
+
+    _crear_ordenes(db)
+    vista = ordenes_pendientes_vencimientos.__wrapped__.__wrapped__
+    with app_sqlite.test_request_context():
+        ordenes = vista(None).get_json()['ordenes_pendientes']
+
+    assert sorted(o['estado'] for o in ordenes) == ['APROBADO', 'APROBADO', 'CON DEUDA', 'RECIBIDA_PARCIAL']
+    en_usd = next(o for o in ordenes if o['importe_total_estimado'] == 12665.28)
+    assert en_usd['proveedor'] == 'Proveedor'
+    assert en_usd['fecha_vencimiento'] == '2026-10-16'
+    con_deuda = next(o for o in ordenes if o['estado'] == 'CON DEUDA')
+    assert con_deuda['deuda'] == 300.0
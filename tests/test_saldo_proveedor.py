@@ -0,0 +1,95 @@
+"""saldo_proveedor mantenido por los eventos de MovimientoProveedor y su conciliación."""
+
+from decimal import Decimal
+
+from sqlalchemy import event, text
+
+
+def _crear_base(db):
+    from app.models import Proveedor, OrdenCompra
+
+    proveedores = [Proveedor(nombre='Proveedor A'), Proveedor(nombre='Proveedor B'), Proveedor(nombre='Sin movimientos')]
+    db.session.add_all(proveedores)
+    db.session.flush()
+    orden = OrdenCompra(proveedor_id=proveedores[0].id, estado='APROBADO')
+    db.session.add(orden)
+    db.session.commit()
+    return [p.id for p in proveedores], orden.id
+
+
+def _mov(proveedor_id, orden_id, tipo, monto):
+    from app.models import MovimientoProveedor
+
+    return MovimientoProveedor(proveedor_id=proveedor_id, orden_id=orden_id, tipo=tipo, monto=Decimal(monto))
+
+
+def test_saldo_sigue_altas_ediciones_y_bajas(app_sqlite):
+    from app import db
+    from app.models import SaldoProveedor
+    from app.utils.saldo_proveedor_utils import conciliar_saldos_proveedor
+
+    (prov_a, prov_b, _), orden_id = _crear_base(db)
+    debito = _mov(prov_a, orden_id, 'DEBITO', '1000')
+    credito = _mov(prov_a, orden_id, 'CREDITO', '300')
+    db.session.add_all([debito, credito, _mov(prov_b, orden_id, 'DEBITO', '50')])
+    db.session.commit()
+    assert db.session.get(SaldoProveedor, prov_a).deuda == Decimal('700')
+
+    # Como _actualizar_movimiento_deuda: se reescribe el monto del DEBITO existente
+    debito.monto = Decimal('800')
+    db.session.commit()
+    assert db.session.get(SaldoProveedor, prov_a).deuda == Decimal('500')
+
+    db.session.delete(credito)
+    db.session.commit()
+    db.session.expire_all()
+    saldo_a = db.session.get(SaldoProveedor, prov_a)
+    assert (saldo_a.debitos, saldo_a.creditos) == (Decimal('800'), Decimal('0'))
+    assert conciliar_saldos_proveedor() == []
+
+
+def test_conciliacion_detecta_y_corrige_desfasaje(app_sqlite):
+    from app import db
+    from app.models import SaldoProveedor
+    from app.utils.saldo_proveedor_utils import conciliar_saldos_proveedor
+
+    (prov_a, _, _), orden_id = _crear_base(db)
+    db.session.add(_mov(prov_a, orden_id, 'DEBITO', '1000'))
+    db.session.commit()
+    # Cambio por fuera del ORM (como el SQL de una migración)
+    db.session.execute(text("UPDATE movimientos_proveedor SET monto = 1200"))
+    db.session.commit()
+
+    diferencias = conciliar_saldos_proveedor(aplicar=True)
+    db.session.commit()
+    assert [(d['proveedor_id'], d['debitos_reales']) for d in diferencias] == [(prov_a, Decimal('1200'))]
+    assert db.session.get(SaldoProveedor, prov_a).deuda == Decimal('1200')
+    assert conciliar_saldos_proveedor() == []
+
+
+def test_dashboard_financiero_una_lectura(app_sqlite):
+    from app import db
+    from app.blueprints.finanzas import dashboard_financiero
+
+    (prov_a, prov_b, prov_c), orden_id = _crear_base(db)
+    db.session.add_all([
+        _mov(prov_a, orden_id, 'DEBITO', '1000'), _mov(prov_a, orden_id, 'CREDITO', '400'),
+        _mov(prov_b, orden_id, 'CREDITO', '100'),
+    ])
+    db.session.commit()
+
+    sentencias = []
+    registrar = lambda conn, cursor, statement, *args: sentencias.append(statement)  # noqa: E731
+    event.listen(db.engine, 'before_cursor_execute', registrar)
+    try:
+        with app_sqlite.test_request_context():
+            datos = dashboard_financiero.__wrapped__.__wrapped__(None).get_json()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', registrar)
+
+    assert len(sentencias) == 1
+    assert datos['deuda_total'] == 600.0
+    assert datos['pagos_total'] == 500.0
+    assert [(r['proveedor_id'], r['deuda'], r['estado']) for r in datos['resumen_proveedores']] == [
+        (prov_a, 600.0, 'ROJO'), (prov_b, -100.0, 'VERDE'), (prov_c, 0.0, 'VERDE'),
+    ]
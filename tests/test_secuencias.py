@@ -0,0 +1,44 @@
+"""Tabla secuencias: números correlativos sin contar filas."""
+
+
+def test_siguiente_valor_por_nombre(app_sqlite):
+    from app import db
+    from app.models import Secuencia
+    from app.utils.secuencias_utils import siguiente_valor
+
+    assert [siguiente_valor('orden_compra:20261019') for _ in range(3)] == [1, 2, 3]
+    assert siguiente_valor('orden_compra:20261020') == 1
+    db.session.rollback()
+    # Un rollback devuelve los números: no quedan huecos
+    assert db.session.get(Secuencia, 'orden_compra:20261019') is None
+
+    siguiente_valor('remito')
+    db.session.commit()
+    assert siguiente_valor('remito') == 2
+
+
+def test_crear_orden_usa_la_secuencia_del_dia(app_sqlite, monkeypatch):
+    import datetime
+    from app import db
+    from app.models import UsuarioInterno, Proveedor, Producto, OrdenCompra, Secuencia
+    from app.blueprints import compras
+
+    usuario = UsuarioInterno(nombre='Ana', apellido='A', nombre_usuario='ana', contrasena='x',
+                             email='ana@example.com', rol='ALMACEN')
+    proveedor = Proveedor(nombre='Proveedor')
+    producto = Producto(nombre='Producto', activo=True)
+    db.session.add_all([usuario, proveedor, producto])
+    hoy = datetime.date.today().strftime('%Y%m%d')
+    # Ya había órdenes hoy (la migración siembra el último correlativo emitido)
+    db.session.add(Secuencia(nombre=f'orden_compra:{hoy}', valor=7))
+    db.session.commit()
+    monkeypatch.setattr(compras, '_resolver_tc_snapshot_payload', lambda data: None)
+
+    payload = {'proveedor_id': proveedor.id, 'items': [{'codigo_interno': producto.id, 'cantidad': '2', 'precio_unitario_estimado': '10'}]}
+    for _ in range(2):
+        with app_sqlite.test_request_context('/', method='POST', json=payload):
+            respuesta = compras.crear_orden_compra.__wrapped__.__wrapped__(usuario)
+        assert respuesta[1] == 201, respuesta[0].get_json()
+
+    numeros = [o.nro_solicitud_interno for o in OrdenCompra.query.order_by(OrdenCompra.id)]
+    assert numeros == [f'OC-{hoy}-0008', f'OC-{hoy}-0009']
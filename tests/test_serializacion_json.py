@@ -0,0 +1,73 @@
+"""Proveedor JSON sobre orjson y serializadores por proyección de columnas."""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+
+def test_orjson_provider_mantiene_la_salida_de_flask(app_sqlite):
+    from flask.json.provider import DefaultJSONProvider
+    from app.utils.json_utils import ORJSONProvider, ORJSON_DISPONIBLE
+
+    if not ORJSON_DISPONIBLE:
+        pytest.skip('orjson no instalado')
+    estandar, rapido = DefaultJSONProvider(app_sqlite), ORJSONProvider(app_sqlite)
+    datos = {
+        'precio': Decimal('12.50'), 'fecha': datetime(2026, 10, 19, 8, 30), 'dia': date(2026, 10, 19),
+        'nombre': 'Ácido Cítrico', 'items': [1, 2.5, None, True], 'z': {'b': 1, 'a': 2}, 'valor': 3,
+    }
+
+    assert json.loads(rapido.dumps(datos)) == json.loads(estandar.dumps(datos))
+    assert rapido.dumps({'b': 1, 'a': 2}) == '{"a":2,"b":1}'
+    assert rapido.loads(b'{"a": [1, "\\u00c1"]}') == {'a': [1, 'Á']}
+    # Argumentos propios de json.dumps van al proveedor estándar
+    assert rapido.dumps({'a': 1}, indent=1) == estandar.dumps({'a': 1}, indent=1)
+
+    app_sqlite.json = rapido
+    with app_sqlite.test_request_context('/'):
+        respuesta = app_sqlite.json.response(datos)
+    assert respuesta.mimetype == 'application/json'
+    assert respuesta.get_json() == json.loads(estandar.dumps(datos))
+
+
+def test_proyecciones_igual_que_los_helpers(app_sqlite):
+    from app import db
+    from app.blueprints.clientes import PROYECCION_CLIENTE, cliente_a_diccionario
+    from app.blueprints.productos import listar_productos_proyectados, producto_a_dict
+    from app.blueprints.ventas import PROYECCION_VENTA_RESUMEN, venta_a_dict_resumen
+    from app.models import CategoriaProducto, Cliente, Producto, UsuarioInterno, Venta
+
+    usuario = UsuarioInterno(nombre='Ana', apellido='Test', nombre_usuario='ana', contrasena='x',
+                             email='ana@example.com', rol='ADMIN')
+    db.session.add_all([
+        usuario, CategoriaProducto(id=1, nombre='Ácidos'),
+        Producto(id=1, nombre='Soda', activo=True, margen=Decimal('0.25'), costo_referencia_usd=Decimal('1.5'),
+                 fecha_actualizacion_costo=datetime(2026, 10, 1, 12, 0)),
+        Producto(id=2, nombre='Acido', activo=False, categoria_id=1),
+        Cliente(id=1, nombre_razon_social='Acme', cuit='20-1', fecha_alta=datetime(2026, 1, 2)),
+        Cliente(id=2, nombre_razon_social='Beta'),
+    ])
+    db.session.flush()
+    db.session.add_all([
+        Venta(id=1, usuario_interno_id=usuario.id, cliente_id=1, nombre_vendedor='ENTREGADO-ana', forma_pago='efectivo',
+              fecha_registro=datetime(2026, 10, 19, 9), monto_total=Decimal('100'), descuento_general=Decimal('5'),
+              monto_final_con_recargos=Decimal('95')),
+        Venta(id=2, usuario_interno_id=usuario.id, nombre_vendedor='ana', forma_pago='transferencia'),
+    ])
+    db.session.commit()
+
+    productos = Producto.query.order_by(Producto.nombre).all()
+    assert listar_productos_proyectados() == [producto_a_dict(p) for p in productos]
+    assert listar_productos_proyectados(solo_activos=True) == [producto_a_dict(p) for p in productos if p.activo]
+
+    clientes = Cliente.query.order_by(Cliente.id).all()
+    filas = PROYECCION_CLIENTE.consulta().order_by(Cliente.id).all()
+    assert PROYECCION_CLIENTE.lista(filas) == [cliente_a_diccionario(c) for c in clientes]
+
+    ventas = Venta.query.order_by(Venta.id).all()
+    filas = PROYECCION_VENTA_RESUMEN.consulta() \
+        .outerjoin(UsuarioInterno, Venta.usuario_interno_id == UsuarioInterno.id) \
+        .outerjoin(Cliente, Venta.cliente_id == Cliente.id).order_by(Venta.id).all()
+    assert PROYECCION_VENTA_RESUMEN.lista(filas) == [venta_a_dict_resumen(v) for v in ventas]
@@ -0,0 +1,85 @@
+"""Sincronización incremental: registro de cambios por versión y /sync/cambios."""
+
+from decimal import Decimal
+
+
+def _cambios(app, **query_string):
+    from app.blueprints.sync import obtener_cambios
+
+    with app.test_request_context('/api/sync/cambios', query_string=query_string):
+        cuerpo, estado = obtener_cambios.__wrapped__(None)
+    assert estado == 200
+    return cuerpo.get_json()
+
+
+def test_cambios_orm_y_masivos_por_version(app_sqlite):
+    from app import db
+    from app.blueprints.tipos_cambio import _actualizar_precios_especiales_usd
+    from app.models import CambioSincronizacion, Cliente, PrecioEspecialCliente, Producto, TipoCambio
+
+    db.session.add_all([
+        Producto(id=1, nombre='Soda'), Producto(id=2, nombre='Acido'),
+        Cliente(id=1, nombre_razon_social='Acme'), Cliente(id=2, nombre_razon_social='Beta'),
+        TipoCambio(nombre='Oficial', valor=Decimal('1000')),
+    ])
+    db.session.commit()
+    db.session.add_all([
+        PrecioEspecialCliente(id=1, cliente_id=1, producto_id=1, precio_unitario_fijo_ars=Decimal('1000'),
+                              moneda_original='USD', precio_original=Decimal('1')),
+        PrecioEspecialCliente(id=2, cliente_id=2, producto_id=2, precio_unitario_fijo_ars=Decimal('500'),
+                              moneda_original='ARS', precio_original=Decimal('500')),
+    ])
+    db.session.commit()
+
+    # Sin 'desde': solo la versión vigente; cada commit con cambios es una versión
+    inicial = _cambios(app_sqlite)
+    assert inicial == {'version': 2, 'hay_mas': False, 'cambios': {}}
+    assert {(c.version, c.entidad, c.operacion) for c in CambioSincronizacion.query} == {
+        (1, 'productos', 'alta'), (1, 'clientes', 'alta'), (1, 'tipos_cambio', 'alta'),
+        (2, 'precios_especiales', 'alta'),
+    }
+
+    # Commits sin cambios de catálogo no generan versión
+    db.session.commit()
+    assert _cambios(app_sqlite, desde=2) == {'version': 2, 'hay_mas': False, 'cambios': {}}
+
+    db.session.get(Producto, 2).nombre = 'Acido Citrico'
+    db.session.get(Cliente, 2).activo = False
+    db.session.commit()
+    # UPDATE masivo: se registra con una consulta, sin pasar por el ORM
+    _actualizar_precios_especiales_usd(Decimal('1100'))
+    db.session.commit()
+
+    respuesta = _cambios(app_sqlite, desde=2)
+    assert respuesta['version'] == 4 and respuesta['hay_mas'] is False
+    cambios = respuesta['cambios']
+    assert set(cambios) == {'productos', 'clientes', 'precios_especiales'}
+    assert [p['nombre'] for p in cambios['productos']['actualizados']] == ['Acido Citrico']
+    assert [(c['id'], c['activo']) for c in cambios['clientes']['actualizados']] == [(2, False)]
+    assert [p['id'] for p in cambios['precios_especiales']['actualizados']] == [1]
+    assert cambios['precios_especiales']['actualizados'][0]['precio_unitario_fijo_ars_guardado'] == 1100.0
+
+    db.session.delete(db.session.get(PrecioEspecialCliente, 2))
+    db.session.commit()
+    assert _cambios(app_sqlite, desde=4)['cambios'] == {
+        'precios_especiales': {'actualizados': [], 'eliminados': [2]}
+    }
+
+
+def test_paginado_no_parte_versiones(app_sqlite):
+    from app import db
+    from app.models import Cliente
+
+    db.session.add_all([Cliente(id=i, nombre_razon_social=f'Cliente {i}') for i in (1, 2, 3)])
+    db.session.commit()
+    db.session.add(Cliente(id=4, nombre_razon_social='Cliente 4'))
+    db.session.commit()
+
+    # El límite cae dentro de la versión 1: se devuelve completa
+    primera = _cambios(app_sqlite, desde=0, limite=2)
+    assert primera['version'] == 1 and primera['hay_mas'] is True
+    assert [c['id'] for c in primera['cambios']['clientes']['actualizados']] == [1, 2, 3]
+
+    segunda = _cambios(app_sqlite, desde=primera['version'], limite=2)
+    assert segunda['version'] == 2 and segunda['hay_mas'] is False
+    assert [c['id'] for c in segunda['cambios']['clientes']['actualizados']] == [4]
@@ -0,0 +1,109 @@
+"""Normalización de teléfonos de clientes y búsqueda por sufijo indexado."""
+
+import importlib.util
+import unittest
+from pathlib import Path
+
+_utils = Path(__file__).resolve().parents[1] / "backend" / "app" / "utils" / "telefono_utils.py"
+_spec = importlib.util.spec_from_file_location("telefono_utils", _utils)
+_mod = importlib.util.module_from_spec(_spec)
+assert _spec.loader is not None
+_spec.loader.exec_module(_mod)
+
+
+class TestTelefonoUtils(unittest.TestCase):
+    def test_normaliza_a_digitos(self):
+        self.assertEqual(_mod.normalizar_telefono("+54 9 (11) 1234-5678"), "5491112345678")
+        self.assertIsNone(_mod.normalizar_telefono("sin numero"))
+        self.assertIsNone(_mod.normalizar_telefono(None))
+
+    def test_invertir(self):
+        self.assertEqual(_mod.invertir_telefono("12345"), "54321")
+        self.assertIsNone(_mod.invertir_telefono(None))
+
+    def test_numero_nacional(self):
+        for telefono in ("+54 9 11 1234-5678", "54 11 1234-5678", "011 15 1234-5678", "11 1234-5678"):
+            self.assertEqual(_mod.telefono_nacional(telefono), "1112345678", telefono)
+        self.assertEqual(_mod.telefono_nacional("02494 15 123456"), "2494123456")
+        self.assertEqual(_mod.telefono_nacional("0249 15 4123456"), "2494123456")
+        # Sin característica quedan solo los dígitos
+        self.assertEqual(_mod.telefono_nacional("1234-5678"), "12345678")
+        self.assertIsNone(_mod.telefono_nacional("---"))
+
+
+def test_modelo_completa_columnas_normalizadas(app_sqlite):
+    from app import db
+    from app.models import Cliente
+
+    cliente = Cliente(nombre_razon_social="cliente nuevo", telefono="011 1234-5678")
+    db.session.add(cliente)
+    db.session.commit()
+    assert cliente.telefono_normalizado == "1112345678"
+    assert cliente.telefono_normalizado_inv == "8765432111"
+
+    encontrado = Cliente.query.filter(Cliente.telefono_normalizado_inv.like("87654321%")).first()
+    assert encontrado is not None and encontrado.id == cliente.id
+
+    cliente.telefono = None
+    db.session.commit()
+    assert cliente.telefono_normalizado is None
+    assert cliente.telefono_normalizado_inv is None
+
+
+def _buscar(app, telefono):
+    from app.blueprints.clientes import obtener_cliente_por_telefono
+
+    with app.test_request_context('/', query_string={'telefono': telefono}):
+        cuerpo, estado = obtener_cliente_por_telefono()
+    return cuerpo.get_json(), estado
+
+
+def test_busqueda_por_numero_nacional_sin_adivinar(app_sqlite):
+    from app import db
+    from app.models import Cliente
+
+    db.session.add_all([
+        Cliente(id=1, nombre_razon_social="Tandil", telefono="0249 15 4123456"),
+        # Mismos 8 dígitos finales con otra característica: no es el mismo cliente
+        Cliente(id=2, nombre_razon_social="Mar del Plata", telefono="0223 154-123456"),
+        Cliente(id=3, nombre_razon_social="CABA", telefono="+54 9 11 5555-0001"),
+        Cliente(id=4, nombre_razon_social="CABA bis", telefono="11 5555 0001"),
+    ])
+    db.session.commit()
+
+    cuerpo, estado = _buscar(app_sqlite, "+54 9 249 412-3456")
+    assert estado == 200 and cuerpo['cliente']['id'] == 1
+    cuerpo, estado = _buscar(app_sqlite, "223 4123456")
+    assert estado == 200 and cuerpo['cliente']['id'] == 2
+    # Otra característica con el mismo abonado: no se devuelve el primero que termine igual
+    _, estado = _buscar(app_sqlite, "0351 15 4123456")
+    assert estado == 404
+    # Dos clientes con el mismo número: 409 con los candidatos
+    cuerpo, estado = _buscar(app_sqlite, "011 15 5555-0001")
+    assert estado == 409
+    assert [c['id'] for c in cuerpo['candidatos']] == [3, 4]
+    # Sin característica: el sufijo coincide con dos clientes
+    cuerpo, estado = _buscar(app_sqlite, "4123456")
+    assert estado == 409
+    assert [c['id'] for c in cuerpo['candidatos']] == [1, 2]
+
+
+def test_csv_clientes_nuevos_puerta_incluye_clientes_sin_telefono(app_sqlite):
+    from app import db
+    from app.blueprints.ventas import clientes_nuevos_puerta_csv
+    from app.models import Cliente
+
+    db.session.add_all([
+        Cliente(nombre_razon_social="Con teléfono", telefono="11 1234-5678",
+                observaciones="Cliente por teléfono 1112345678 Fecha 2026-10-19T10:00:00"),
+        # El teléfono solo quedó en las observaciones: el export lo incluía y lo sigue incluyendo
+        Cliente(nombre_razon_social="Sin teléfono",
+                observaciones="Alta\nCliente por teléfono 2494123456 Fecha 2026-10-18T09:00:00"),
+    ])
+    db.session.commit()
+
+    with app_sqlite.test_request_context('/'):
+        respuesta, estado = clientes_nuevos_puerta_csv.__wrapped__.__wrapped__(None)
+        assert estado == 200 and respuesta.is_streamed
+        contenido = respuesta.get_data(as_text=True)
+    assert contenido.splitlines() == ['telefono,fecha,vendedor', '2494123456,2026-10-18,', '1112345678,2026-10-19,']
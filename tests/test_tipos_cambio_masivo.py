@@ -0,0 +1,98 @@
+"""Cambio de dólar: repricing por UPDATE masivo y recálculo de deudas de OCs por lotes/en segundo plano."""
+
+from decimal import Decimal
+
+
+def _crear_base(db, cantidad_ocs=3):
+    from app.models import (TipoCambio, PrecioEspecialCliente, Proveedor, OrdenCompra,
+                            DetalleOrdenCompra)
+
+    db.session.add(TipoCambio(nombre='DolarCompras', valor=Decimal('1000')))
+    db.session.add_all([
+        PrecioEspecialCliente(cliente_id=1, producto_id=1, precio_unitario_fijo_ars=Decimal('1000'),
+                              moneda_original='USD', precio_original=Decimal('1.5'), tipo_cambio_usado=Decimal('1000')),
+        PrecioEspecialCliente(cliente_id=1, producto_id=2, precio_unitario_fijo_ars=Decimal('777'),
+                              moneda_original='ARS', precio_original=Decimal('777')),
+    ])
+    proveedor = Proveedor(nombre='Proveedor USD')
+    db.session.add(proveedor)
+    db.session.flush()
+    ocs = []
+    for i in range(cantidad_ocs):
+        oc = OrdenCompra(proveedor_id=proveedor.id, estado='RECIBIDO', ajuste_tc=True,
+                         tc_transaccion=Decimal('1000'), importe_total_estimado=Decimal(10 * (i + 1)))
+        oc.items.append(DetalleOrdenCompra(producto_id=1, cantidad_solicitada=Decimal('1'),
+                                           cantidad_recibida=Decimal('1'),
+                                           precio_unitario_estimado=Decimal(10 * (i + 1))))
+        ocs.append(oc)
+    anulada = OrdenCompra(proveedor_id=proveedor.id, estado='RECHAZADO', ajuste_tc=True,
+                          tc_transaccion=Decimal('1000'), importe_total_estimado=Decimal('50'))
+    db.session.add_all(ocs + [anulada])
+    db.session.commit()
+    return proveedor.id, [oc.id for oc in ocs], anulada.id
+
+
+def _actualizar(app, valor):
+    from app.blueprints.tipos_cambio import actualizar_tipo_cambio
+
+    with app.test_request_context('/', method='PUT', json={'valor': valor}):
+        respuesta = actualizar_tipo_cambio.__wrapped__.__wrapped__(None, 'DolarCompras')
+    cuerpo, estado = respuesta if isinstance(respuesta, tuple) else (respuesta, 200)
+    return cuerpo.get_json(), estado
+
+
+def _verificar_deudas(db, proveedor_id, oc_ids, anulada_id, tc):
+    from app.models import OrdenCompra, MovimientoProveedor, PrecioEspecialCliente, SaldoProveedor
+
+    db.session.expire_all()
+    usd, ars = PrecioEspecialCliente.query.order_by(PrecioEspecialCliente.producto_id).all()
+    assert usd.precio_unitario_fijo_ars == Decimal('1.5') * tc
+    assert usd.tipo_cambio_usado == tc
+    assert ars.precio_unitario_fijo_ars == Decimal('777')
+
+    assert db.session.get(OrdenCompra, anulada_id).tc_transaccion == Decimal('1000')
+    debitos = {m.orden_id: m.monto for m in MovimientoProveedor.query.filter_by(tipo='DEBITO')}
+    assert debitos == {oid: Decimal(10 * (i + 1)) * tc for i, oid in enumerate(oc_ids)}
+    assert db.session.get(SaldoProveedor, proveedor_id).deuda == sum(debitos.values())
+
+
+def test_cambio_de_dolar_con_pocas_ocs_recalcula_en_el_request(app_sqlite):
+    from app import db
+
+    proveedor_id, oc_ids, anulada_id = _crear_base(db)
+    cuerpo, estado = _actualizar(app_sqlite, 1200)
+    assert estado == 200
+    assert cuerpo['precios_usd_actualizados'] == 1
+    assert cuerpo['ordenes_compra_tc_actualizadas'] == 3
+    assert cuerpo['ordenes_compra_deuda_recalculada'] == 3
+    assert 'trabajo' not in cuerpo
+    _verificar_deudas(db, proveedor_id, oc_ids, anulada_id, Decimal('1200'))
+
+    # Un segundo cambio reescribe los DEBITO existentes en lugar de duplicarlos
+    _actualizar(app_sqlite, 1300)
+    _verificar_deudas(db, proveedor_id, oc_ids, anulada_id, Decimal('1300'))
+
+
+def test_cascada_grande_va_a_trabajo_con_progreso(app_sqlite, monkeypatch):
+    from app import db
+    from app.blueprints import tipos_cambio
+    from app.models import TrabajoSegundoPlano
+    from app.utils.trabajos_utils import ejecutar_trabajo
+
+    proveedor_id, oc_ids, anulada_id = _crear_base(db, cantidad_ocs=5)
+    monkeypatch.setattr(tipos_cambio, 'MAX_OCS_RECALCULO_SINCRONICO', 2)
+    monkeypatch.setattr(tipos_cambio, 'OCS_POR_LOTE', 2)
+    # SQLite en memoria no se comparte entre hilos: se corre la tarea en el mismo hilo
+    lanzados = []
+    monkeypatch.setattr(tipos_cambio, 'lanzar_trabajo', lambda *args: lanzados.append(args))
+
+    cuerpo, estado = _actualizar(app_sqlite, 1200)
+    assert estado == 202
+    assert cuerpo['ordenes_compra_deuda_recalculada'] == 0
+    assert cuerpo['trabajo']['estado'] == 'PENDIENTE'
+    assert cuerpo['trabajo']['total'] == 5
+
+    ejecutar_trabajo(*lanzados[0])
+    trabajo = db.session.get(TrabajoSegundoPlano, cuerpo['trabajo']['id'])
+    assert (trabajo.estado, trabajo.procesados, trabajo.error) == ('COMPLETADO', 5, None)
+    _verificar_deudas(db, proveedor_id, oc_ids, anulada_id, Decimal('1200'))
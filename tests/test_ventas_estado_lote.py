@@ -0,0 +1,51 @@
+"""Cambio de estado masivo de ventas resuelto en SQL (UPDATE por bloque + AuditLog por bloque)."""
+
+from decimal import Decimal
+
+
+def _crear_ventas(db, nombres_vendedor):
+    from app.models import UsuarioInterno, Venta
+
+    usuario = UsuarioInterno(
+        nombre='Test', apellido='Test', nombre_usuario='test',
+        contrasena='x', email='test@example.com', rol='ADMIN'
+    )
+    db.session.add(usuario)
+    db.session.flush()
+    ventas = [
+        Venta(usuario_interno_id=usuario.id, nombre_vendedor=n, monto_total=Decimal('100.00'))
+        for n in nombres_vendedor
+    ]
+    db.session.add_all(ventas)
+    db.session.commit()
+    return [v.id for v in ventas]
+
+
+def test_actualiza_prefijo_y_conserva_vendedor(app_sqlite):
+    from app import db
+    from app.models import Venta, AuditLog
+    from app.blueprints.ventas import actualizar_estado_ventas_en_lote
+
+    ids = _crear_ventas(db, ['martin', 'PENDIENTE-sergio', 'LISTO_PARA_ENTREGAR-elias'])
+    estados = actualizar_estado_ventas_en_lote(ids + [9999], 'ENTREGADO', usuario='test')
+    db.session.commit()
+
+    assert estados == {ids[0]: 'Entregado', ids[1]: 'Entregado', ids[2]: 'Entregado'}
+    nombres = dict(db.session.query(Venta.id, Venta.nombre_vendedor).all())
+    assert nombres[ids[0]] == 'ENTREGADO-martin'
+    assert nombres[ids[1]] == 'ENTREGADO-sergio'
+    assert nombres[ids[2]] == 'ENTREGADO-elias'
+    assert db.session.query(AuditLog).count() == 1
+
+
+def test_un_audit_log_por_bloque(app_sqlite):
+    from app import db
+    from app.models import AuditLog
+    from app.blueprints.ventas import actualizar_estado_ventas_en_lote
+
+    ids = _crear_ventas(db, [f'v{i}' for i in range(5)])
+    estados = actualizar_estado_ventas_en_lote(ids, 'CANCELADO', chunk_size=2)
+    db.session.commit()
+
+    assert len(estados) == 5
+    assert db.session.query(AuditLog).filter_by(accion='ACTUALIZAR_ESTADO_LOTE').count() == 3
@@ -0,0 +1,85 @@
+"""Recalculo de montos por dólar resuelto en una sola consulta SQL."""
+
+from decimal import Decimal
+
+
+def _crear_venta_con_detalles(db):
+    from app.models import UsuarioInterno, Venta, DetalleVenta, Producto
+
+    usuario = UsuarioInterno(
+        nombre='Test', apellido='Test', nombre_usuario='test',
+        contrasena='x', email='test@example.com', rol='ADMIN'
+    )
+    p1 = Producto(nombre='Acido', activo=True)
+    p2 = Producto(nombre='Soda', activo=True)
+    db.session.add_all([usuario, p1, p2])
+    db.session.flush()
+    venta = Venta(
+        usuario_interno_id=usuario.id, nombre_vendedor='ENTREGADO-martin',
+        monto_total=Decimal('300.00'), monto_final_con_recargos=Decimal('600.00'),
+        detalles=[
+            DetalleVenta(producto_id=p1.id, cantidad=Decimal('1'), precio_unitario_venta_ars=Decimal('100'), precio_total_item_ars=Decimal('100')),
+            DetalleVenta(producto_id=p2.id, cantidad=Decimal('2'), precio_unitario_venta_ars=Decimal('100'), precio_total_item_ars=Decimal('200')),
+        ]
+    )
+    vacia = Venta(usuario_interno_id=usuario.id, nombre_vendedor='martin', monto_total=Decimal('0'))
+    db.session.add_all([venta, vacia])
+    db.session.commit()
+    return venta.id, vacia.id
+
+
+def test_escalado_y_subtotales_proporcionales(app_sqlite):
+    from app import db
+    from app.blueprints.ventas import _query_montos_por_dolar, _ventas_desde_filas_por_dolar
+
+    venta_id, vacia_id = _crear_venta_con_detalles(db)
+    valor_dolar = Decimal('2')
+    ventas = list(_ventas_desde_filas_por_dolar(
+        _query_montos_por_dolar([venta_id, vacia_id], valor_dolar).all(), valor_dolar, exacto=True
+    ))
+
+    assert [v["venta_id"] for v in ventas] == [venta_id, vacia_id]
+    venta = ventas[0]
+    assert venta["estado"] == 'Entregado'
+    assert venta["nombre_vendedor"] == 'martin'
+    assert venta["monto_final_con_recargos"] == Decimal('1200')
+    assert [d["producto_nombre"] for d in venta["detalles"]] == ['Acido', 'Soda']
+    assert [d["precio_total_item_ars"] for d in venta["detalles"]] == [Decimal('200'), Decimal('400')]
+    assert [d["subtotal_proporcional_con_recargos"] for d in venta["detalles"]] == [Decimal('400'), Decimal('800')]
+    assert ventas[1]["detalles"] == []
+
+
+def test_valor_dolar_no_finito_o_no_positivo_es_400(app_sqlite):
+    from app import db
+    from app.blueprints.ventas import recalcular_montos_por_dolar
+
+    venta_id, _ = _crear_venta_con_detalles(db)
+    vista = recalcular_montos_por_dolar.__wrapped__.__wrapped__
+    for valor in ('NaN', 'sNaN', 'Infinity', '-Infinity', '0', '-5', 'abc', None):
+        with app_sqlite.test_request_context(method='POST', json={'venta_ids': [venta_id], 'valor_dolar': valor}):
+            respuesta, estado = vista(None)
+        assert estado == 400, valor
+
+
+def test_flags_exacto_y_stream_se_parsean_explicitamente(app_sqlite):
+    from app import db
+    from app.blueprints.ventas import recalcular_montos_por_dolar
+
+    venta_id, _ = _crear_venta_con_detalles(db)
+    vista = recalcular_montos_por_dolar.__wrapped__.__wrapped__
+
+    def _pedir(**flags):
+        payload = {'venta_ids': [venta_id], 'valor_dolar': '2', **flags}
+        with app_sqlite.test_request_context(method='POST', json=payload):
+            return vista(None)
+
+    for falso in ('false', '0', 'no', '', 0, 1, None, False):
+        respuesta = _pedir(exacto=falso, stream=falso)
+        assert not respuesta.is_streamed, falso
+        assert respuesta.get_json()[0]['monto_final_con_recargos'] == 1200.0, falso
+
+    for verdadero in (True, 'true', 'TRUE', '1'):
+        assert _pedir(stream=verdadero).is_streamed, verdadero
+        # Con exacto los Decimal se serializan como string
+        monto = _pedir(exacto=verdadero).get_json()[0]['monto_final_con_recargos']
+        assert isinstance(monto, str) and Decimal(monto) == Decimal('1200'), verdadero
@@ -0,0 +1,90 @@
+"""Registro de ventas en lote con INSERT multi-fila y claves de idempotencia."""
+
+from decimal import Decimal
+
+
+def _payload_venta(usuario_id, producto_id, clave=None, vendedor='martin'):
+    payload = {
+        "usuario_interno_id": usuario_id,
+        "nombre_vendedor": vendedor,
+        "forma_pago": "efectivo",
+        "items": [
+            {"producto_id": producto_id, "cantidad": "2", "precio_unitario_venta_ars": "150", "precio_total_item_ars": "300"},
+        ],
+    }
+    if clave:
+        payload["clave_idempotencia"] = clave
+    return payload
+
+
+def _crear_base(db):
+    from app.models import UsuarioInterno, Producto
+
+    usuario = UsuarioInterno(
+        nombre='Test', apellido='Test', nombre_usuario='test',
+        contrasena='x', email='test@example.com', rol='ADMIN'
+    )
+    producto = Producto(nombre='Acido', activo=True)
+    db.session.add_all([usuario, producto])
+    db.session.commit()
+    return usuario.id, producto.id
+
+
+def test_lote_inserta_ventas_y_detalles(app_sqlite):
+    from app import db
+    from app.models import Venta, DetalleVenta
+    from app.blueprints.ventas import registrar_ventas_en_lote
+
+    usuario_id, producto_id = _crear_base(db)
+    resultados = registrar_ventas_en_lote(
+        [_payload_venta(usuario_id, producto_id, clave=f"pos-{i}") for i in range(5)]
+        + [_payload_venta(usuario_id, producto_id, vendedor='desconocido')],
+        chunk_size=2,
+    )
+
+    assert [r["status"] for r in resultados] == ["creada"] * 5 + ["error"]
+    assert db.session.query(Venta).count() == 5
+    assert db.session.query(DetalleVenta).count() == 5
+    venta = db.session.get(Venta, resultados[0]["venta_id"])
+    assert venta.clave_idempotencia == "pos-0"
+    assert venta.monto_final_con_recargos == Decimal('300')
+    assert [d.producto_id for d in venta.detalles] == [producto_id]
+
+
+def test_reenvio_con_misma_clave_no_duplica(app_sqlite):
+    from app import db
+    from app.models import Venta
+    from app.blueprints.ventas import registrar_ventas_en_lote
+
+    usuario_id, producto_id = _crear_base(db)
+    primera = registrar_ventas_en_lote([_payload_venta(usuario_id, producto_id, clave="pos-1")])
+    segunda = registrar_ventas_en_lote([
+        _payload_venta(usuario_id, producto_id, clave="pos-1"),
+        _payload_venta(usuario_id, producto_id, clave="pos-2"),
+        _payload_venta(usuario_id, producto_id, clave="pos-2"),
+    ])
+
+    assert [r["status"] for r in segunda] == ["duplicada", "creada", "duplicada"]
+    assert segunda[0]["venta_id"] == primera[0]["venta_id"]
+    assert segunda[2]["venta_id"] == segunda[1]["venta_id"]
+    assert db.session.query(Venta).count() == 2
+
+
+def test_venta_mal_formada_no_tumba_el_lote(app_sqlite):
+    from app import db
+    from app.models import Venta
+    from app.blueprints.ventas import registrar_ventas_en_lote
+
+    usuario_id, producto_id = _crear_base(db)
+    item_invalido = _payload_venta(usuario_id, producto_id, clave="pos-item")
+    item_invalido["items"].append("no-es-un-item")
+    vendedor_invalido = _payload_venta(usuario_id, producto_id, clave="pos-vendedor")
+    vendedor_invalido["nombre_vendedor"] = 123
+    resultados = registrar_ventas_en_lote([
+        _payload_venta(usuario_id, producto_id, clave="pos-ok"), item_invalido, vendedor_invalido,
+    ])
+
+    assert [r["status"] for r in resultados] == ["creada", "error", "error"]
+    assert "Cada item debe ser un objeto JSON" in resultados[1]["error"]
+    assert "'nombre_vendedor' debe ser texto" in resultados[2]["error"]
+    assert db.session.query(Venta).count() == 1
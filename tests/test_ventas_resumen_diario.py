@@ -0,0 +1,163 @@
+"""Resumen diario de ventas mantenido por deltas: siempre igual a una reconstrucción completa."""
+
+from decimal import Decimal
+
+
+def _payload_venta(usuario_id, producto_id, cliente_id=None, forma_pago='efectivo', cantidad='2'):
+    return {
+        "usuario_interno_id": usuario_id,
+        "cliente_id": cliente_id,
+        "nombre_vendedor": "martin",
+        "forma_pago": forma_pago,
+        "fecha_pedido": "2026-10-19T10:00:00",
+        "items": [
+            {"producto_id": producto_id, "cantidad": cantidad, "precio_unitario_venta_ars": "150", "precio_total_item_ars": "350"},
+        ],
+    }
+
+
+def _crear_base(db):
+    from app.models import UsuarioInterno, Producto, Cliente
+
+    usuario = UsuarioInterno(
+        nombre='Test', apellido='Test', nombre_usuario='test',
+        contrasena='x', email='test@example.com', rol='ADMIN'
+    )
+    producto = Producto(nombre='Acido', activo=True)
+    cliente = Cliente(nombre_razon_social='Cliente')
+    db.session.add_all([usuario, producto, cliente])
+    db.session.commit()
+    return usuario, producto.id, cliente.id
+
+
+def _resumen(db):
+    from app.models import VentaResumenDiario
+
+    filas = db.session.query(VentaResumenDiario).all()
+    return {
+        (f.fecha, f.canal, f.forma_pago, f.estado): (Decimal(f.monto), Decimal(f.monto_centena), f.unidades, Decimal(f.kgs))
+        for f in filas if f.unidades
+    }
+
+
+def _assert_igual_a_reconstruccion(db):
+    from app.utils.resumen_ventas_utils import reconstruir_resumen_ventas
+
+    incremental = _resumen(db)
+    reconstruir_resumen_ventas()
+    db.session.commit()
+    assert incremental == _resumen(db)
+    return incremental
+
+
+def test_alta_lote_estado_edicion_y_baja(app_sqlite):
+    from app import db
+    from app.blueprints.ventas import (
+        registrar_ventas_en_lote, actualizar_estado_ventas_en_lote, actualizar_venta, eliminar_venta
+    )
+
+    usuario, producto_id, cliente_id = _crear_base(db)
+    resultados = registrar_ventas_en_lote([
+        _payload_venta(usuario.id, producto_id),
+        _payload_venta(usuario.id, producto_id, forma_pago='transferencia'),
+        _payload_venta(usuario.id, producto_id, cliente_id=cliente_id, cantidad='5'),
+    ])
+    ids = [r["venta_id"] for r in resultados]
+    resumen = _assert_igual_a_reconstruccion(db)
+    assert sum(unidades for _, _, unidades, _ in resumen.values()) == 3
+
+    actualizar_estado_ventas_en_lote([ids[2]], 'CANCELADO')
+    db.session.commit()
+    resumen = _assert_igual_a_reconstruccion(db)
+    assert [clave[3] for clave in resumen if clave[1] == 'pedido'] == ['CANCELADO']
+
+    vista_actualizar = actualizar_venta.__wrapped__.__wrapped__
+    with app_sqlite.test_request_context(json={
+        "forma_pago": "factura",
+        "items": [{"producto_id": producto_id, "cantidad": "7", "precio_unitario_venta_ars": "100", "precio_total_item_ars": "700"}],
+    }):
+        _, status = vista_actualizar(usuario, ids[0])
+    assert status == 200
+    _assert_igual_a_reconstruccion(db)
+
+    vista_eliminar = eliminar_venta.__wrapped__.__wrapped__
+    with app_sqlite.test_request_context():
+        _, status = vista_eliminar(usuario, ids[1])
+    assert status == 200
+    resumen = _assert_igual_a_reconstruccion(db)
+    assert sorted(clave[2] for clave in resumen) == ['efectivo', 'factura']
+
+
+def test_kpis_del_dia_leen_el_resumen(app_sqlite):
+    from datetime import date
+    from app import db
+    from app.blueprints.ventas import registrar_ventas_en_lote
+    from app.blueprints.reportes import _get_kpis_del_dia
+
+    usuario, producto_id, cliente_id = _crear_base(db)
+    registrar_ventas_en_lote([
+        _payload_venta(usuario.id, producto_id),
+        _payload_venta(usuario.id, producto_id),
+        _payload_venta(usuario.id, producto_id, cliente_id=cliente_id),
+    ])
+
+    kpis = _get_kpis_del_dia(date(2026, 10, 19))
+    # Cada venta de puerta (350) se redondea a 400 antes de sumar
+    assert kpis["ingreso_puerta_hoy"] == Decimal('800')
+    assert kpis["ingreso_pedido_hoy"] == Decimal('400')
+    assert kpis["puerta_efectivo_unidades"] == 2
+    assert kpis["pedido_efectivo_unidades"] == 1
+
+
+def test_migracion_llena_el_resumen_igual_que_la_reconstruccion(app_sqlite):
+    import importlib.util
+    import pathlib
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+    from app import db
+    from app.blueprints.ventas import registrar_ventas_en_lote, actualizar_estado_ventas_en_lote
+    from datetime import date, datetime
+    from app.models import Venta, VentaResumenDiario
+    from app.utils.resumen_ventas_utils import reconstruir_resumen_ventas, CLAVES_RESUMEN, METRICAS_RESUMEN
+
+    ruta = (pathlib.Path(__file__).resolve().parents[1] / 'backend' / 'migrations' / 'versions'
+            / '20261019_add_dimensiones_ventas_resumen_diario.py')
+    spec = importlib.util.spec_from_file_location('migracion_dimensiones_resumen', str(ruta))
+    migracion = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migracion)
+
+    usuario, producto_id, cliente_id = _crear_base(db)
+    con_direccion = dict(_payload_venta(usuario.id, producto_id, cliente_id=cliente_id, cantidad='3'),
+                         direccion_entrega='Calle 1')
+    resultados = registrar_ventas_en_lote([
+        _payload_venta(usuario.id, producto_id),
+        _payload_venta(usuario.id, producto_id, cliente_id=cliente_id, forma_pago='transferencia'),
+        con_direccion,
+    ])
+    actualizar_estado_ventas_en_lote([resultados[1]['venta_id']], 'CANCELADO')
+    # Registro en otro día y costo al momento: ejercitan fecha_registro y costo
+    venta = db.session.get(Venta, resultados[2]['venta_id'])
+    venta.fecha_registro = datetime(2026, 10, 18, 18, 0)
+    for detalle in venta.detalles:
+        detalle.costo_unitario_momento_ars = Decimal('12.5')
+    db.session.commit()
+
+    def filas():
+        db.session.expire_all()
+        return sorted(
+            tuple(getattr(f, c) for c in CLAVES_RESUMEN) + tuple(Decimal(str(getattr(f, m))) for m in METRICAS_RESUMEN)
+            for f in db.session.query(VentaResumenDiario)
+        )
+
+    reconstruir_resumen_ventas()
+    db.session.commit()
+    esperado = filas()
+    assert len(esperado) == 3
+    assert (date(2026, 10, 19), date(2026, 10, 18), 'pedido', True) in [f[:4] for f in esperado]
+    assert sum(f[-1] for f in esperado) == Decimal('37.5')
+
+    db.session.query(VentaResumenDiario).delete()
+    with Operations.context(MigrationContext.configure(db.session.connection())):
+        migracion._llenar_resumen(CLAVES_RESUMEN)
+    db.session.commit()
+    assert filas() == esperado